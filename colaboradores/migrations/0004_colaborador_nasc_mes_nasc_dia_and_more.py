@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:12
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('colaboradores', '0003_alter_blocklist_options_alter_colaborador_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='colaborador',
+            name='nasc_mes',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.datetime.ExtractMonth('data_nascimento'), output_field=models.PositiveSmallIntegerField(null=True)),
+        ),
+        migrations.AddField(
+            model_name='colaborador',
+            name='nasc_dia',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.datetime.ExtractDay('data_nascimento'), output_field=models.PositiveSmallIntegerField(null=True)),
+        ),
+        migrations.AddIndex(
+            model_name='colaborador',
+            index=models.Index(fields=['status', 'nasc_mes', 'nasc_dia'], name='idx_colaboradores_aniversario'),
+        ),
+    ]
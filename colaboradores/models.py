@@ -4,6 +4,7 @@ Migrado de SQLAlchemy para Django ORM
 """
 
 from django.db import models
+from django.db.models.functions import ExtractDay, ExtractMonth
 from django.contrib.auth.models import User
 
 
@@ -72,6 +73,17 @@ class Colaborador(models.Model):
     celular = models.CharField(max_length=20, blank=True, null=True)
     email = models.EmailField(max_length=255, blank=True, null=True)
     data_nascimento = models.DateField(blank=True, null=True)
+    # Mês/dia de nascimento (colunas geradas, indexadas para aniversariantes)
+    nasc_mes = models.GeneratedField(
+        expression=ExtractMonth("data_nascimento"),
+        output_field=models.PositiveSmallIntegerField(null=True),
+        db_persist=True,
+    )
+    nasc_dia = models.GeneratedField(
+        expression=ExtractDay("data_nascimento"),
+        output_field=models.PositiveSmallIntegerField(null=True),
+        db_persist=True,
+    )
     naturalidade = models.CharField(max_length=100, blank=True, null=True)
     uf_naturalidade = models.CharField(max_length=2, blank=True, null=True)
     sexo = models.CharField(max_length=20, choices=Sexo.choices, blank=True, null=True)
@@ -191,6 +203,9 @@ class Colaborador(models.Model):
         verbose_name = "Colaborador"
         verbose_name_plural = "Colaboradores"
         ordering = ["nome_completo"]
+        indexes = [
+            models.Index(fields=["status", "nasc_mes", "nasc_dia"], name="idx_colaboradores_aniversario"),
+        ]
 
     def __str__(self):
         return self.nome_completo
@@ -9,6 +9,8 @@ from django.contrib import messages
 from django.core.paginator import Paginator
 from django.db.models import Count, Avg, Sum, Q
 from django.http import HttpResponse
+import numpy as np
+from rh_comum import analise_colunar
 
 from .models import (
     Empresa, Colaborador, Dependente, Localizacao,
@@ -352,8 +354,8 @@ def aniversariantes(request):
 
     aniversariantes_list = Colaborador.objects.filter(
         status='ATIVO',
-        data_nascimento__month=mes
-    ).order_by('data_nascimento__day')
+        nasc_mes=mes
+    ).order_by('nasc_dia')
 
     meses = [
         (1, 'Janeiro'), (2, 'Fevereiro'), (3, 'Março'),
@@ -433,7 +435,7 @@ def dashboard(request):
     # Aniversariantes do mês
     aniversariantes_mes = Colaborador.objects.filter(
         status='ATIVO',
-        data_nascimento__month=hoje.month
+        nasc_mes=hoje.month
     ).count()
 
     # Por empresa
@@ -484,25 +486,16 @@ def dashboard(request):
         status='ATIVO'
     ).values('grau_instrucao').annotate(total=Count('id')).order_by('-total')
 
-    # Demografia - Faixa Etária
-    por_faixa_etaria = []
-    faixas = [
-        ('18-25', 18, 25),
-        ('26-35', 26, 35),
-        ('36-45', 36, 45),
-        ('46-55', 46, 55),
-        ('56+', 56, 100),
+    # Demografia - Faixa Etária (idades de 18 a 100 anos)
+    nascimentos = Colaborador.objects.filter(
+        status='ATIVO', data_nascimento__isnull=False
+    ).values_list('data_nascimento', flat=True)
+    idades = analise_colunar.anos_completos(analise_colunar.coluna_datas(list(nascimentos)), hoje)
+    idades[(idades < 18) | (idades > 100)] = np.nan
+    por_faixa_etaria = [
+        {'faixa': item['faixa'], 'total': item['quantidade']}
+        for item in analise_colunar.contar_por_faixas(idades, analise_colunar.FAIXAS_IDADE)
     ]
-    for nome, min_idade, max_idade in faixas:
-        min_nasc = hoje.replace(year=hoje.year - max_idade - 1)
-        max_nasc = hoje.replace(year=hoje.year - min_idade)
-        count = Colaborador.objects.filter(
-            status='ATIVO',
-            data_nascimento__gte=min_nasc,
-            data_nascimento__lte=max_nasc
-        ).count()
-        if count > 0:
-            por_faixa_etaria.append({'faixa': nome, 'total': count})
 
     context = {
         'total_ativos': total_ativos,
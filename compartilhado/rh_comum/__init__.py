@@ -0,0 +1,6 @@
+"""
+Código compartilhado - RENOVO Montagens Industriais
+
+Pacote instalado pelo SGRH (Flet), pelo ERP e pelo site Django
+(pip install ./compartilhado), para que os três usem o mesmo código.
+"""
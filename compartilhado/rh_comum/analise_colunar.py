@@ -0,0 +1,171 @@
+"""
+Análise Colunar - Sistema de Gestão de RH
+RENOVO Montagens Industriais
+
+Distribui colaboradores em faixas (idade, salário, tempo de casa e
+quantidade de benefícios) com arrays NumPy: as colunas são convertidas
+uma única vez (datas em datetime64[D], valores em float64) e contadas com
+np.digitize/np.bincount, sem laços em Python por colaborador.
+
+Não depende do banco nem da interface: recebe sequências simples, como as
+colunas de uma consulta SQLite ou um QuerySet.values_list() do Django.
+Usado pelo dashboard do SGRH e pelo dashboard do Django.
+"""
+
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# =============================================================================
+# Faixas
+# =============================================================================
+# Cada faixa é (rótulo, limite superior); a última não tem limite (None).
+# Idade e tempo de casa usam anos completos com limite exclusivo
+# ("menor que"); salário usa limite inclusivo ("até").
+
+Faixas = Sequence[Tuple[str, Optional[float]]]
+
+FAIXAS_IDADE = [
+    ('18-25', 26),
+    ('26-35', 36),
+    ('36-45', 46),
+    ('46-55', 56),
+    ('56+', None),
+]
+
+FAIXAS_SALARIAIS = [
+    ('Até R$ 2.000', 2000),
+    ('R$ 2.001 - 3.500', 3500),
+    ('R$ 3.501 - 5.000', 5000),
+    ('R$ 5.001 - 8.000', 8000),
+    ('R$ 8.001 - 12.000', 12000),
+    ('Acima de R$ 12.000', None),
+]
+
+FAIXAS_TEMPO_CASA = [
+    ('Menos de 1 ano', 1),
+    ('1 a 2 anos', 3),
+    ('3 a 5 anos', 6),
+    ('6 a 10 anos', 11),
+    ('Mais de 10 anos', None),
+]
+
+FAIXAS_QTD_BENEFICIOS = [
+    ('Nenhum', 1),
+    ('1 a 2', 3),
+    ('3 a 4', 5),
+    ('5 ou mais', None),
+]
+
+
+# =============================================================================
+# Conversão de colunas
+# =============================================================================
+
+def coluna_datas(valores: Sequence) -> np.ndarray:
+    """
+    Converte datas ('AAAA-MM-DD', date ou None) em datetime64[D].
+    Valores vazios ou inválidos viram NaT.
+    """
+    try:
+        return np.array(valores, dtype='datetime64[D]')
+    except (ValueError, TypeError):
+        # Algum valor fora do formato: converter um a um
+        datas = np.empty(len(valores), dtype='datetime64[D]')
+        for i, valor in enumerate(valores):
+            try:
+                datas[i] = np.datetime64(valor, 'D') if valor else np.datetime64('NaT')
+            except (ValueError, TypeError):
+                datas[i] = np.datetime64('NaT')
+        return datas
+
+
+def coluna_valores(valores: Sequence) -> np.ndarray:
+    """Converte valores numéricos (ou None) em float64; None e inválidos viram NaN."""
+    try:
+        return np.array(valores, dtype=np.float64)
+    except (ValueError, TypeError):
+        numeros = np.empty(len(valores), dtype=np.float64)
+        for i, valor in enumerate(valores):
+            try:
+                numeros[i] = float(valor)
+            except (ValueError, TypeError):
+                numeros[i] = np.nan
+        return numeros
+
+
+def anos_completos(datas: np.ndarray, hoje: date = None) -> np.ndarray:
+    """
+    Anos completos entre cada data e hoje (idade, tempo de casa).
+    Retorna float64, com NaN onde a data é NaT.
+    """
+    hoje = hoje or date.today()
+    anos = datas.astype('datetime64[Y]')
+    meses = datas.astype('datetime64[M]')
+
+    ano = anos.astype(np.int64) + 1970
+    mes = (meses - anos).astype(np.int64) + 1
+    dia = (datas - meses).astype(np.int64) + 1
+
+    # Desconta 1 ano de quem ainda não fez aniversário (de data) neste ano
+    ainda_nao = (mes * 100 + dia) > (hoje.month * 100 + hoje.day)
+    resultado = (hoje.year - ano - ainda_nao).astype(np.float64)
+    resultado[np.isnat(datas)] = np.nan
+    return resultado
+
+
+# =============================================================================
+# Contagem por faixas
+# =============================================================================
+
+def contar_por_faixas(valores: np.ndarray, faixas: Faixas,
+                      limite_inclusivo: bool = False, incluir_vazias: bool = False) -> List[Dict]:
+    """
+    Conta os valores (NaN ignorados) em cada faixa.
+    limite_inclusivo=True coloca o valor igual ao limite na própria faixa ("até").
+    Retorna [{'faixa': rótulo, 'quantidade': n}, ...] na ordem das faixas.
+    """
+    limites = np.array([limite for _, limite in faixas[:-1]], dtype=np.float64)
+    if faixas[-1][1] is not None or np.any(np.diff(limites) <= 0):
+        raise ValueError("Faixas devem ter limites crescentes e a última sem limite (None)")
+
+    valores = valores[~np.isnan(valores)]
+    indices = np.digitize(valores, limites, right=limite_inclusivo)
+    contagens = np.bincount(indices, minlength=len(faixas))
+
+    return [
+        {'faixa': rotulo, 'quantidade': int(quantidade)}
+        for (rotulo, _), quantidade in zip(faixas, contagens)
+        if quantidade > 0 or incluir_vazias
+    ]
+
+
+def faixas_idade(nascimentos: Sequence, faixas: Faixas = FAIXAS_IDADE, hoje: date = None) -> List[Dict]:
+    """Distribuição por faixa etária a partir das datas de nascimento."""
+    return contar_por_faixas(anos_completos(coluna_datas(nascimentos), hoje), faixas)
+
+
+def faixas_tempo_casa(admissoes: Sequence, faixas: Faixas = FAIXAS_TEMPO_CASA, hoje: date = None) -> List[Dict]:
+    """Distribuição por tempo de casa a partir das datas de admissão."""
+    return contar_por_faixas(anos_completos(coluna_datas(admissoes), hoje), faixas)
+
+
+def faixas_salariais(salarios: Sequence, faixas: Faixas = FAIXAS_SALARIAIS) -> List[Dict]:
+    """Distribuição por faixa salarial (salários vazios ou zerados ficam de fora)."""
+    valores = coluna_valores(salarios)
+    valores[valores <= 0] = np.nan
+    return contar_por_faixas(valores, faixas, limite_inclusivo=True)
+
+
+def faixas_qtd_beneficios(beneficios: Sequence[Sequence], faixas: Faixas = FAIXAS_QTD_BENEFICIOS) -> List[Dict]:
+    """
+    Distribuição pela quantidade de benefícios de cada colaborador.
+    beneficios: uma sequência por benefício com 1/0 por colaborador
+    (as colunas vale_transporte, vale_refeicao, ...).
+    """
+    if not len(beneficios):
+        return []
+    matriz = np.nan_to_num(np.vstack([coluna_valores(coluna) for coluna in beneficios]))
+    return contar_por_faixas((matriz == 1).sum(axis=0).astype(np.float64), faixas)
@@ -0,0 +1,66 @@
+"""
+Migrações de Esquema SQLite - RENOVO Montagens Industriais
+
+Executor de migrações usado pelo SGRH (rh_database.db) e pelo ERP
+(erp_sistema.db). Cada migração é aplicada uma única vez e o número da
+última aplicada fica em PRAGMA user_version. Para alterar um esquema,
+acrescente uma nova migração ao final da lista do sistema.
+"""
+
+import sqlite3
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# (número, descrição, função que recebe a conexão)
+Migracao = Tuple[int, str, Callable[[sqlite3.Connection], None]]
+
+
+def versao_esquema(conn: sqlite3.Connection) -> int:
+    """Retorna a versão do esquema do banco (PRAGMA user_version)."""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def aplicar_migracoes(conn: sqlite3.Connection, migracoes: Sequence[Migracao]) -> List[Dict]:
+    """
+    Aplica as migrações pendentes (número maior que PRAGMA user_version)
+    em uma única transação: se alguma falhar, nenhuma é gravada.
+    Com o esquema atualizado, custa apenas a leitura de user_version.
+
+    O tempo de cada migração fica registrado na tabela migracoes_esquema.
+
+    Retorna [{'versao': 1, 'descricao': '...', 'duracao_ms': 12.3}, ...]
+    """
+    if versao_esquema(conn) >= migracoes[-1][0]:
+        return []
+
+    aplicadas = []
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Outra instância pode ter migrado enquanto esperávamos o bloqueio
+        versao = versao_esquema(conn)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS migracoes_esquema (
+                versao INTEGER PRIMARY KEY,
+                descricao TEXT NOT NULL,
+                duracao_ms REAL,
+                aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        for numero, descricao, migracao in migracoes:
+            if numero <= versao:
+                continue
+            inicio = time.perf_counter()
+            migracao(conn)
+            duracao_ms = round((time.perf_counter() - inicio) * 1000, 1)
+            conn.execute('''
+                INSERT OR REPLACE INTO migracoes_esquema (versao, descricao, duracao_ms, aplicada_em)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (numero, descricao, duracao_ms))
+            conn.execute(f'PRAGMA user_version = {int(numero)}')
+            aplicadas.append({'versao': numero, 'descricao': descricao, 'duracao_ms': duracao_ms})
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return aplicadas
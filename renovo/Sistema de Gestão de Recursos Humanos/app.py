@@ -32,6 +32,7 @@ from datetime import datetime, timedelta
 import time
 import asyncio
 import shutil
+import sqlite3
 
 
 def get_base_path():
@@ -65,7 +66,7 @@ ERP_USER_DATA = parse_args()
 from utilities import database as db
 from utilities.main import (
     criar_alertas_widget, criar_campo_view, criar_secao, FichaColaborador,
-    formatar_cpf, formatar_data_br, formatar_moeda,
+    formatar_cpf, formatar_data_br, formatar_data_db, formatar_moeda,
     COR_PRIMARIA, COR_SECUNDARIA, COR_SUCESSO, COR_ALERTA, COR_ERRO, COR_FUNDO, COR_CINZA_CLARO
 )
 from utilities.formulario_cadastro import FormularioCadastro
@@ -252,6 +253,10 @@ class SistemaRH:
                 )
             except Exception as e:
                 db.registrar_log("sistema", "aviso", f"Erro ao salvar dados temporários ao fechar: {str(e)}")
+        # Gravar os logs na fila, gerar o backup pendente e fechar as conexões
+        db.finalizar_logs()
+        db.finalizar_backup()
+        db.fechar_conexoes()
         self.page.window.destroy()
     
     def construir_interface(self):
@@ -636,6 +641,10 @@ class SistemaRH:
         self.pagina_atual = 1
         self.itens_por_pagina = 50
         self.total_colaboradores = 0
+        # Paginação por chave: cursor da página exibida e das vizinhas
+        self.cursor_pagina = None
+        self.cursor_proximo = None
+        self.cursor_anterior = None
 
         # Carregar lista de empresas para o filtro
         empresas = db.listar_empresas(apenas_ativas=True)
@@ -771,17 +780,18 @@ class SistemaRH:
 
     def _pagina_anterior(self, e):
         """Vai para a página anterior."""
-        if self.pagina_atual > 1:
+        if self.pagina_atual > 1 and self.cursor_anterior:
             self.pagina_atual -= 1
+            self.cursor_pagina = self.cursor_anterior
             filtro = self.campo_pesquisa.value if hasattr(self, 'campo_pesquisa') and self.campo_pesquisa.value else None
             self._carregar_colaboradores(filtro)
             self.page.update()
 
     def _pagina_proxima(self, e):
         """Vai para a próxima página."""
-        total_paginas = (self.total_colaboradores + self.itens_por_pagina - 1) // self.itens_por_pagina
-        if self.pagina_atual < total_paginas:
+        if self.cursor_proximo:
             self.pagina_atual += 1
+            self.cursor_pagina = self.cursor_proximo
             filtro = self.campo_pesquisa.value if hasattr(self, 'campo_pesquisa') and self.campo_pesquisa.value else None
             self._carregar_colaboradores(filtro)
             self.page.update()
@@ -798,28 +808,36 @@ class SistemaRH:
         # Determinar status baseado no modo de visualização
         status_filtro = 'INATIVO' if hasattr(self, 'visualizando_inativos') and self.visualizando_inativos else 'ATIVO'
 
-        # Calcular offset para paginação
-        offset = (self.pagina_atual - 1) * self.itens_por_pagina
-
-        # Obter total de colaboradores e lista paginada
-        self.total_colaboradores = db.contar_colaboradores(filtro=filtro, status=status_filtro, empresa_id=empresa_id, localizacao=localizacao)
-        colaboradores = db.listar_colaboradores(
+        # Obter a página atual (paginação por chave) e o total de colaboradores
+        pagina = db.listar_colaboradores_pagina(
             filtro=filtro,
             status=status_filtro,
             empresa_id=empresa_id,
             localizacao=localizacao,
             limite=self.itens_por_pagina,
-            offset=offset
+            cursor_pagina=self.cursor_pagina
         )
+        colaboradores = pagina['colaboradores']
+        if not colaboradores and self.cursor_pagina:
+            # A página deixou de existir (ex.: registros inativados); voltar ao início
+            self.cursor_pagina = None
+            return self._carregar_colaboradores(filtro)
+        self.total_colaboradores = pagina['total']
+        self.cursor_proximo = pagina['proximo']
+        self.cursor_anterior = pagina['anterior']
+        if not self.cursor_anterior:
+            self.pagina_atual = 1
+            self.cursor_pagina = None
 
         # Atualizar controles de paginação
+        offset = (self.pagina_atual - 1) * self.itens_por_pagina
         total_paginas = max(1, (self.total_colaboradores + self.itens_por_pagina - 1) // self.itens_por_pagina)
-        inicio = offset + 1 if self.total_colaboradores > 0 else 0
-        fim = min(offset + self.itens_por_pagina, self.total_colaboradores)
+        inicio = offset + 1 if colaboradores else 0
+        fim = offset + len(colaboradores)
 
         self.texto_paginacao.value = f"Exibindo {inicio}-{fim} de {self.total_colaboradores} colaboradores (Página {self.pagina_atual} de {total_paginas})"
-        self.btn_pagina_anterior.disabled = self.pagina_atual <= 1
-        self.btn_pagina_proxima.disabled = self.pagina_atual >= total_paginas
+        self.btn_pagina_anterior.disabled = not self.cursor_anterior
+        self.btn_pagina_proxima.disabled = not self.cursor_proximo
 
         self.lista_colaboradores.controls.clear()
 
@@ -832,12 +850,16 @@ class SistemaRH:
                 )
             )
         else:
+            # Localização, contrato e documentos de toda a página em poucas consultas
+            dados_pagina = db.carregar_dados_lista_colaboradores([c['id'] for c in colaboradores])
+
             for colab in colaboradores:
                 empresa_nome = colab.get('empresa_nome', '') or ''
                 foto_path = colab.get('foto_path', '')
+                dados_linha = dados_pagina.get(colab['id'], {})
 
-                # Obter localização atual do colaborador
-                localizacao = db.obter_localizacao_atual(colab['id'])
+                # Localização atual do colaborador
+                localizacao = dados_linha.get('localizacao')
                 if localizacao:
                     loc_texto = f"{localizacao.get('local_nome', '')}"
                     if localizacao.get('cidade') or localizacao.get('uf'):
@@ -864,18 +886,25 @@ class SistemaRH:
                     contrato_texto = "-"
                     contrato_cor = COR_CINZA_CLARO
 
+                # Vencimento do contrato de experiência vigente (para o tooltip)
+                contrato = dados_linha.get('contrato')
+                contrato_tooltip = None
+                if contrato:
+                    vencimento = contrato.get('data_fim_prorrogacao') or contrato.get('data_fim_inicial')
+                    contrato_tooltip = f"Vence em {formatar_data_br(vencimento)}"
+
                 # Widget do badge de contrato
                 contrato_widget = ft.Container(
                     content=ft.Text(contrato_texto, color="white", size=11),
                     bgcolor=contrato_cor,
                     padding=ft.padding.symmetric(horizontal=8, vertical=3),
                     border_radius=4,
+                    tooltip=contrato_tooltip,
                 ) if contrato_texto != "-" else ft.Text("-", size=14, color=ft.Colors.GREY)
 
                 # Widget do badge de documentos
-                status_docs = db.obter_status_documentos_colaborador(colab['id'])
-                docs_completos = status_docs.get('completos', 0)
-                docs_total = status_docs.get('total_obrigatorios', 0)
+                docs_completos = dados_linha.get('docs_completos', 0)
+                docs_total = dados_linha.get('docs_total', 0)
 
                 if docs_total > 0:
                     if docs_completos == docs_total:
@@ -932,6 +961,7 @@ class SistemaRH:
         self.visualizando_inativos = not self.visualizando_inativos
         # Resetar para primeira página ao alternar
         self.pagina_atual = 1
+        self.cursor_pagina = None
 
         if self.visualizando_inativos:
             self.btn_toggle_inativos.text = "Ver Ativos"
@@ -1004,6 +1034,7 @@ class SistemaRH:
     def _filtrar_colaboradores(self, e):
         # Resetar para primeira página ao filtrar
         self.pagina_atual = 1
+        self.cursor_pagina = None
         self._carregar_colaboradores(e.control.value)
         self.page.update()
 
@@ -1011,6 +1042,7 @@ class SistemaRH:
         self.empresa_selecionada = e.control.value if e.control.value else None
         # Resetar para primeira página ao mudar empresa
         self.pagina_atual = 1
+        self.cursor_pagina = None
         filtro_texto = self.campo_pesquisa.value if hasattr(self, 'campo_pesquisa') else None
         self._carregar_colaboradores(filtro_texto)
         self.page.update()
@@ -1019,6 +1051,7 @@ class SistemaRH:
         self.localizacao_selecionada = e.control.value if e.control.value else None
         # Resetar para primeira página ao mudar localização
         self.pagina_atual = 1
+        self.cursor_pagina = None
         filtro_texto = self.campo_pesquisa.value if hasattr(self, 'campo_pesquisa') else None
         self._carregar_colaboradores(filtro_texto)
         self.page.update()
@@ -1494,7 +1527,23 @@ class SistemaRH:
                     subtitle=ft.Text(f"{a.get('funcao', '')} - {a.get('empresa_nome', '')}"),
                 )
             )
-        
+
+        # Próximos 30 dias (atravessa a virada do mês e do ano)
+        proximos = []
+        for a in db.listar_aniversariantes_proximos(dias=30):
+            data_aniversario = datetime.strptime(a['data_aniversario'], '%Y-%m-%d')
+            dias = a['dias_para_aniversario']
+            quando = "Hoje" if dias == 0 else ("Amanhã" if dias == 1 else f"Em {dias} dias")
+            proximos.append(
+                ft.ListTile(
+                    leading=ft.CircleAvatar(content=ft.Text(data_aniversario.strftime('%d/%m'), size=10),
+                                            bgcolor=COR_SUCESSO if dias == 0 else COR_SECUNDARIA, color="white"),
+                    title=ft.Text(a.get('nome_completo', ''), weight=ft.FontWeight.BOLD),
+                    subtitle=ft.Text(f"{quando} - {a['idade']} anos - {a.get('funcao') or ''}"),
+                    dense=True,
+                )
+            )
+
         return ft.Column([
             ft.Container(
                 content=ft.Row([
@@ -1505,11 +1554,21 @@ class SistemaRH:
                 ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
                 padding=15, bgcolor="white", border_radius=8,
             ),
-            ft.Container(
-                content=ft.Column(lista if lista else [ft.Text("Nenhum aniversariante!", italic=True)],
-                                 scroll=ft.ScrollMode.AUTO),
-                expand=True, padding=10, bgcolor="white", border_radius=8,
-            ),
+            ft.Row([
+                ft.Container(
+                    content=ft.Column(lista if lista else [ft.Text("Nenhum aniversariante!", italic=True)],
+                                     scroll=ft.ScrollMode.AUTO),
+                    expand=2, padding=10, bgcolor="white", border_radius=8,
+                ),
+                ft.Container(
+                    content=ft.Column([
+                        ft.Text("Próximos 30 dias", size=16, weight=ft.FontWeight.BOLD),
+                        ft.Column(proximos if proximos else [ft.Text("Nenhum aniversariante!", italic=True)],
+                                  scroll=ft.ScrollMode.AUTO, expand=True),
+                    ], expand=True),
+                    expand=1, padding=10, bgcolor="white", border_radius=8,
+                ),
+            ], spacing=10, expand=True, vertical_alignment=ft.CrossAxisAlignment.STRETCH),
         ], spacing=10, expand=True)
 
     def _view_banco_talentos(self):
@@ -1708,16 +1767,26 @@ class SistemaRH:
         self._carregar_banco_talentos(filtro_texto)
         self.page.update()
 
-    def _view_blocklist(self):
-        # Usar a nova função que agrupa por CPF
-        registros_agrupados = db.listar_blocklist_agrupado()
+    def _view_blocklist(self, filtro: str = None):
+        # Usar a nova função que agrupa por CPF (filtrando por nome ou CPF, se informado)
+        registros_agrupados = db.listar_blocklist_agrupado(filtro)
         lista = []
 
         def atualizar_lista():
-            """Recarrega a lista de blocklist."""
-            self.container_principal.content = self._view_blocklist()
+            """Recarrega a lista de blocklist, mantendo a pesquisa."""
+            self.container_principal.content = self._view_blocklist(campo_pesquisa.value)
             self.page.update()
 
+        campo_pesquisa = ft.TextField(
+            label="Pesquisar por nome ou CPF",
+            prefix_icon=ft.Icons.SEARCH,
+            width=250,
+            value=filtro or "",
+            autofocus=bool(filtro),
+            on_submit=lambda e: atualizar_lista(),
+            border_color=COR_SECUNDARIA,
+        )
+
         def editar_justificativa(entrada):
             """Abre o dialog para editar a justificativa de uma entrada específica."""
             campo_justificativa = ft.TextField(
@@ -2075,16 +2144,28 @@ class SistemaRH:
                 padding=15, bgcolor="white", border_radius=8,
             ),
             ft.Container(
-                content=ft.Text(
-                    "Cada colaborador aparece apenas uma vez. Clique para ver o histórico completo de entradas.",
-                    size=12,
-                    italic=True,
-                    color=ft.Colors.GREY_700,
-                ),
+                content=ft.Row([
+                    ft.Text(
+                        "Cada colaborador aparece apenas uma vez. Clique para ver o histórico completo de entradas.",
+                        size=12,
+                        italic=True,
+                        color=ft.Colors.GREY_700,
+                        expand=True,
+                    ),
+                    campo_pesquisa,
+                ]),
                 padding=ft.padding.only(left=10, top=5),
             ),
             ft.Container(
                 content=ft.Column(lista if lista else [
+                    ft.Container(
+                        content=ft.Column([
+                            ft.Icon(ft.Icons.SEARCH_OFF, size=50, color=ft.Colors.GREY),
+                            ft.Text("Nenhum registro encontrado", italic=True, color=ft.Colors.GREY),
+                        ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=10),
+                        padding=30,
+                    )
+                ] if filtro else [
                     ft.Container(
                         content=ft.Column([
                             ft.Icon(ft.Icons.CHECK_CIRCLE, size=50, color=COR_SUCESSO),
@@ -2481,6 +2562,7 @@ class SistemaRH:
                 if e.path:
                     try:
                         # Copiar banco de dados para o local escolhido
+                        db.sincronizar_wal()
                         shutil.copy2(db.DATABASE_PATH, e.path)
 
                         # Registrar log
@@ -2576,17 +2658,8 @@ class SistemaRH:
                     # Fazer backup do banco atual antes de importar
                     backup_atual = db.backup_database()
 
-                    # Importar o novo banco
-                    shutil.copy2(arquivo_path, db.DATABASE_PATH)
-
-                    # Registrar log
-                    db.registrar_log(
-                        tipo_acao='IMPORTAR',
-                        categoria='BACKUP',
-                        descricao=f'Backup importado de: {arquivo_path}',
-                        entidade_tipo='backup',
-                        entidade_nome=os.path.basename(arquivo_path)
-                    )
+                    # Importar o novo banco (o log da importação é gravado ao reiniciar)
+                    db.restaurar_banco(arquivo_path)
 
                     # Mostrar mensagem de sucesso e reiniciar
                     self.page.snack_bar = ft.SnackBar(
@@ -2600,7 +2673,7 @@ class SistemaRH:
                     time.sleep(2)
                     self.page.window.close()
 
-                except (IOError, OSError, PermissionError) as ex:
+                except (IOError, OSError, PermissionError, sqlite3.Error) as ex:
                     db.registrar_log("sistema", "erro", f"Erro ao importar backup: {str(ex)}")
                     self.page.snack_bar = ft.SnackBar(
                         content=ft.Text(f"Erro ao importar: {str(ex)}"),
@@ -2731,8 +2804,13 @@ class SistemaRH:
         self.log_filtro_categoria = None
         self.log_filtro_tipo_acao = None
         self.log_filtro_pesquisa = None
+        self.log_filtro_data_inicio = None
+        self.log_filtro_data_fim = None
         self.log_pagina_atual = 0
         self.log_itens_por_pagina = 50
+        self.log_cursor_pagina = None
+        self.log_cursor_proximo = None
+        self.log_cursor_anterior = None
 
         def fechar(ev):
             dialog.open = False
@@ -2740,33 +2818,35 @@ class SistemaRH:
 
         def aplicar_filtros(e=None):
             self.log_pagina_atual = 0
+            self.log_cursor_pagina = None
             atualizar_lista_logs()
 
         def limpar_filtros(e=None):
             dropdown_categoria.value = ""
             dropdown_tipo_acao.value = ""
             campo_pesquisa.value = ""
+            campo_data_inicio.value = ""
+            campo_data_fim.value = ""
             self.log_filtro_categoria = None
             self.log_filtro_tipo_acao = None
             self.log_filtro_pesquisa = None
+            self.log_filtro_data_inicio = None
+            self.log_filtro_data_fim = None
             self.log_pagina_atual = 0
+            self.log_cursor_pagina = None
             atualizar_lista_logs()
             self.page.update()
 
         def pagina_anterior(e):
-            if self.log_pagina_atual > 0:
+            if self.log_pagina_atual > 0 and self.log_cursor_anterior:
                 self.log_pagina_atual -= 1
+                self.log_cursor_pagina = self.log_cursor_anterior
                 atualizar_lista_logs()
 
         def proxima_pagina(e):
-            total = db.contar_logs(
-                categoria=self.log_filtro_categoria,
-                tipo_acao=self.log_filtro_tipo_acao,
-                pesquisa=self.log_filtro_pesquisa
-            )
-            max_paginas = (total // self.log_itens_por_pagina) + (1 if total % self.log_itens_por_pagina > 0 else 0)
-            if self.log_pagina_atual < max_paginas - 1:
+            if self.log_cursor_proximo:
                 self.log_pagina_atual += 1
+                self.log_cursor_pagina = self.log_cursor_proximo
                 atualizar_lista_logs()
 
         def on_categoria_change(e):
@@ -2782,6 +2862,16 @@ class SistemaRH:
             if self.log_filtro_pesquisa or not e.control.value:
                 aplicar_filtros()
 
+        def on_data_change(e):
+            # Períodos antigos também são buscados nos meses arquivados
+            data_inicio = formatar_data_db(campo_data_inicio.value)
+            data_fim = formatar_data_db(campo_data_fim.value)
+            if (campo_data_inicio.value and not data_inicio) or (campo_data_fim.value and not data_fim):
+                return
+            self.log_filtro_data_inicio = data_inicio
+            self.log_filtro_data_fim = data_fim
+            aplicar_filtros()
+
         def formatar_data_hora(data_hora_str):
             """Formata data e hora para exibição."""
             if not data_hora_str:
@@ -2828,19 +2918,27 @@ class SistemaRH:
 
         def atualizar_lista_logs():
             """Atualiza a lista de logs com os filtros aplicados."""
-            logs = db.listar_logs(
+            pagina = db.listar_logs_pagina(
                 limite=self.log_itens_por_pagina,
-                offset=self.log_pagina_atual * self.log_itens_por_pagina,
-                categoria=self.log_filtro_categoria,
-                tipo_acao=self.log_filtro_tipo_acao,
-                pesquisa=self.log_filtro_pesquisa
-            )
-
-            total = db.contar_logs(
+                cursor_pagina=self.log_cursor_pagina,
                 categoria=self.log_filtro_categoria,
                 tipo_acao=self.log_filtro_tipo_acao,
+                data_inicio=self.log_filtro_data_inicio,
+                data_fim=self.log_filtro_data_fim,
                 pesquisa=self.log_filtro_pesquisa
             )
+            if not pagina['logs'] and self.log_cursor_pagina:
+                # A página deixou de existir (ex.: logs removidos); voltar ao início
+                self.log_pagina_atual = 0
+                self.log_cursor_pagina = None
+                return atualizar_lista_logs()
+            logs = pagina['logs']
+            total = pagina['total']
+            self.log_cursor_proximo = pagina['proximo']
+            self.log_cursor_anterior = pagina['anterior']
+            if not self.log_cursor_anterior:
+                self.log_pagina_atual = 0
+                self.log_cursor_pagina = None
 
             lista_logs.controls.clear()
 
@@ -2952,8 +3050,8 @@ class SistemaRH:
             if max_paginas == 0:
                 max_paginas = 1
             texto_paginacao.value = f"Página {self.log_pagina_atual + 1} de {max_paginas} ({total} registros)"
-            btn_anterior.disabled = self.log_pagina_atual == 0
-            btn_proximo.disabled = self.log_pagina_atual >= max_paginas - 1
+            btn_anterior.disabled = not self.log_cursor_anterior
+            btn_proximo.disabled = not self.log_cursor_proximo
 
             self.page.update()
 
@@ -2996,6 +3094,24 @@ class SistemaRH:
             dense=True,
         )
 
+        campo_data_inicio = ft.TextField(
+            label="De",
+            hint_text="DD/MM/AAAA",
+            width=120,
+            on_change=on_data_change,
+            border_color=COR_SECUNDARIA,
+            dense=True,
+        )
+
+        campo_data_fim = ft.TextField(
+            label="Até",
+            hint_text="DD/MM/AAAA",
+            width=120,
+            on_change=on_data_change,
+            border_color=COR_SECUNDARIA,
+            dense=True,
+        )
+
         # Lista de logs
         lista_logs = ft.Column(scroll=ft.ScrollMode.AUTO, spacing=0)
 
@@ -3042,6 +3158,8 @@ class SistemaRH:
                             dropdown_categoria,
                             dropdown_tipo_acao,
                             campo_pesquisa,
+                            campo_data_inicio,
+                            campo_data_fim,
                             ft.IconButton(
                                 icon=ft.Icons.CLEAR,
                                 tooltip="Limpar filtros",
@@ -3075,7 +3193,7 @@ class SistemaRH:
                     ),
 
                 ], spacing=5),
-                width=750,
+                width=880,
                 height=580,
             ),
             actions=[
@@ -0,0 +1,19 @@
+"""
+Testes do Sistema de Gestão de RH.
+
+Importar utilities.database inicializa o banco em get_base_path(); por isso
+RH_BASE_PATH aponta para uma pasta temporária antes de qualquer import do
+sistema, e os testes nunca tocam o banco real.
+
+Executar na pasta do sistema (com o pacote rh_comum instalado):
+    python -m pytest tests
+    python -m unittest discover -s tests -t .
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+os.environ['RH_BASE_PATH'] = tempfile.mkdtemp(prefix='sgrh_testes_')
+atexit.register(shutil.rmtree, os.environ['RH_BASE_PATH'], ignore_errors=True)
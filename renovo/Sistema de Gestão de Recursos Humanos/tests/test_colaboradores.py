@@ -0,0 +1,157 @@
+"""Testes da paginação por chave e da situação dos documentos (documentos_status)."""
+
+import itertools
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from utilities import database as db
+
+_cpfs = itertools.count(10000000000)
+
+
+def criar_colaborador(nome: str, **dados) -> int:
+    """Cadastra um colaborador de teste com CPF único."""
+    return db.criar_colaborador(dict(dados, nome_completo=nome, cpf=str(next(_cpfs))))
+
+
+def setUpModule():
+    db.definir_log_sincrono(True)
+
+
+class TestPaginacaoPorChave(unittest.TestCase):
+    """Nomes repetidos: nenhuma página pode pular ou repetir colaboradores."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.ids = [criar_colaborador('PAGINA REPETIDO') for _ in range(7)]
+        cls.ids += [criar_colaborador(f'PAGINA {letra}') for letra in 'ZABYC']
+
+    def _ordem_esperada(self, filtro=None):
+        where, params = 'status = ?', ['ATIVO']
+        if filtro:
+            where += ' AND nome_busca LIKE ?'
+            params.append(f'%{db.normalizar_busca(filtro)}%')
+        with db.conexao() as conn:
+            return [row['id'] for row in conn.execute(
+                f'SELECT id FROM colaboradores WHERE {where} ORDER BY nome_completo, id', params)]
+
+    def _percorrer(self, filtro=None, limite=3):
+        """Avança até a última página e volta até a primeira pelos cursores."""
+        paginas = [db.listar_colaboradores_pagina(filtro=filtro, limite=limite)]
+        while paginas[-1]['proximo']:
+            paginas.append(db.listar_colaboradores_pagina(
+                filtro=filtro, limite=limite, cursor_pagina=paginas[-1]['proximo']))
+
+        voltando = [paginas[-1]]
+        while voltando[-1]['anterior']:
+            voltando.append(db.listar_colaboradores_pagina(
+                filtro=filtro, limite=limite, cursor_pagina=voltando[-1]['anterior']))
+        return paginas, voltando[::-1]
+
+    def _ids(self, paginas):
+        return [[c['id'] for c in pagina['colaboradores']] for pagina in paginas]
+
+    def test_sem_filtro(self):
+        paginas, voltando = self._percorrer()
+
+        ids = list(itertools.chain.from_iterable(self._ids(paginas)))
+        self.assertEqual(ids, self._ordem_esperada())
+        self.assertEqual(self._ids(voltando), self._ids(paginas))
+        self.assertEqual(paginas[0]['total'], len(ids))
+
+    def test_com_filtro_relevancia_empatada(self):
+        paginas, voltando = self._percorrer(filtro='pagina repetido', limite=2)
+
+        ids = list(itertools.chain.from_iterable(self._ids(paginas)))
+        self.assertEqual(sorted(ids), sorted(self.ids[:7]))
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(self._ids(voltando), self._ids(paginas))
+
+    def test_cursor_invalido_volta_para_primeira_pagina(self):
+        primeira = db.listar_colaboradores_pagina(limite=3)
+        self.assertEqual(db.listar_colaboradores_pagina(limite=3, cursor_pagina='???'), primeira)
+
+
+class TestSituacaoDocumentos(unittest.TestCase):
+    """documentos_status deve acompanhar documentos e dependentes."""
+
+    def setUp(self):
+        diretorio = tempfile.mkdtemp(dir=os.environ['RH_BASE_PATH'])
+        patcher = mock.patch.object(db, 'DOCUMENTOS_DIR', diretorio)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.arquivo = os.path.join(diretorio, 'documento.pdf')
+        with open(self.arquivo, 'wb') as f:
+            f.write(b'%PDF-1.4')
+
+        self.colaborador_id = criar_colaborador('DOCUMENTOS TESTE')
+
+    def assertEmDia(self):
+        """A linha gravada é igual à situação calculada a partir das tabelas de origem."""
+        with db.conexao() as conn:
+            gravado = conn.execute('SELECT * FROM documentos_status WHERE colaborador_id = ?',
+                                   (self.colaborador_id,)).fetchone()
+            self.assertIsNotNone(gravado)
+            self.assertEqual(db._ler_status_documentos(conn, self.colaborador_id),
+                             db._status_documentos_atual(conn, self.colaborador_id))
+
+        status = db.obter_status_documentos_colaborador(self.colaborador_id)
+        linha = db.carregar_dados_lista_colaboradores([self.colaborador_id])[self.colaborador_id]
+        self.assertEqual((linha['docs_completos'], linha['docs_total']),
+                         (status['completos'], status['total_obrigatorios']))
+        return status
+
+    def _documento_id(self, tipo):
+        return db.obter_documento(self.colaborador_id, tipo)['id']
+
+    def test_cadastro(self):
+        status = self.assertEmDia()
+        self.assertEqual(status['completos'], 0)
+        self.assertEqual(status['total_obrigatorios'], len(db.DOCUMENTOS_OBRIGATORIOS))
+
+    def test_documentos(self):
+        tipo = db.DOCUMENTOS_OBRIGATORIOS[0]
+        db.salvar_documento(self.colaborador_id, tipo, self.arquivo, '10000000000')
+        self.assertEqual(self.assertEmDia()['completos'], 1)
+
+        db.marcar_documento_nao_necessario(self.colaborador_id, db.DOCUMENTOS_OBRIGATORIOS[1])
+        self.assertEqual(self.assertEmDia()['completos'], 2)
+
+        db.desmarcar_documento_nao_necessario(self.colaborador_id, db.DOCUMENTOS_OBRIGATORIOS[1])
+        self.assertEqual(self.assertEmDia()['completos'], 1)
+
+        db.excluir_documento(self._documento_id(tipo))
+        self.assertEqual(self.assertEmDia()['completos'], 0)
+
+    def test_dependentes(self):
+        base = len(db.DOCUMENTOS_OBRIGATORIOS)
+
+        filho_id = db.adicionar_dependente(self.colaborador_id, {'nome': 'Lia', 'parentesco': 'Filha'})
+        self.assertEqual(self.assertEmDia()['total_obrigatorios'], base + 1 + len(db.DOCUMENTOS_FILHO))
+
+        conjuge_id = db.adicionar_dependente(self.colaborador_id, {'nome': 'Rui', 'parentesco': 'Cônjuge'})
+        self.assertEqual(self.assertEmDia()['total_obrigatorios'], base + 2 + len(db.DOCUMENTOS_FILHO))
+
+        db.salvar_documento(self.colaborador_id, 'CPF - Lia', self.arquivo, '10000000000')
+        self.assertEqual(self.assertEmDia()['completos'], 1)
+
+        db.excluir_dependente(filho_id)
+        status = self.assertEmDia()
+        self.assertEqual(status['total_obrigatorios'], base + 1)
+        self.assertEqual(status['completos'], 0)
+
+        db.excluir_dependente(conjuge_id)
+        self.assertEqual(self.assertEmDia()['total_obrigatorios'], base)
+
+    def test_exclusao_do_colaborador_remove_a_situacao(self):
+        db.excluir_colaborador_permanente(self.colaborador_id)
+        with db.conexao() as conn:
+            self.assertIsNone(conn.execute('SELECT 1 FROM documentos_status WHERE colaborador_id = ?',
+                                           (self.colaborador_id,)).fetchone())
+
+
+if __name__ == '__main__':
+    unittest.main()
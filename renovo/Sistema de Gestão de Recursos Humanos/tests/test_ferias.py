@@ -0,0 +1,117 @@
+"""Testes da reconciliação conjunta de férias (reconciliar_ferias)."""
+
+import itertools
+import unittest
+
+from utilities import database as db
+
+_cpfs = itertools.count(20000000000)
+
+# Períodos aquisitivos de cada colaborador, como gravados antes da reconciliação:
+# (início, status, dias_gozados, dias_vendidos, gozos), com gozos = [(data_inicio, data_fim, dias, abono_pecuniario), ...]
+CENARIO = [
+    [  # Gozo completo ainda PENDENTE e dois períodos futuros sem gozo
+        ('2020-01-01', 'PENDENTE', 0, 0, [('2021-02-01', '2021-02-20', 20, 0),
+                                          ('2021-07-01', '2021-07-10', 10, 0)]),
+        ('2021-01-01', 'PENDENTE', 0, 0, []),
+        ('2022-01-01', 'PENDENTE', 0, 0, []),
+    ],
+    [  # CONCLUIDO com só 10 dias gozados e 10 vendidos
+        ('2020-06-01', 'CONCLUIDO', 30, 0, [('2021-08-01', '2021-08-10', 10, 0),
+                                            ('2021-08-11', '2021-08-20', 10, 1)]),
+    ],
+    [  # Já consistente
+        ('2020-03-01', 'CONCLUIDO', 20, 10, [('2021-05-01', '2021-05-20', 20, 0),
+                                             ('2021-05-21', '2021-05-30', 10, 1)]),
+        ('2021-03-01', 'PENDENTE', 0, 0, []),
+    ],
+]
+
+
+def setUpModule():
+    db.definir_log_sincrono(True)
+
+
+def montar_cenario() -> list:
+    """Cadastra os colaboradores de CENARIO e grava as férias como estão. Retorna os ids."""
+    ids = []
+    with db.conexao() as conn:
+        for periodos in CENARIO:
+            colaborador_id = db.criar_colaborador({'nome_completo': 'FERIAS TESTE',
+                                                   'cpf': str(next(_cpfs))})
+            ids.append(colaborador_id)
+            for inicio, status, gozados, vendidos, gozos in periodos:
+                ano = int(inicio[:4])
+                ferias_id = conn.execute('''
+                    INSERT INTO ferias (colaborador_id, periodo_aquisitivo_inicio, periodo_aquisitivo_fim,
+                                        periodo_concessivo_limite, dias_gozados, dias_vendidos, status)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (colaborador_id, inicio, f'{ano + 1}{inicio[4:]}', f'{ano + 2}{inicio[4:]}',
+                      gozados, vendidos, status)).lastrowid
+                conn.executemany('''
+                    INSERT INTO periodos_ferias (ferias_id, data_inicio, data_fim, dias, abono_pecuniario)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', [(ferias_id,) + gozo for gozo in gozos])
+        conn.commit()
+    return ids
+
+
+def situacao_ferias(colaborador_ids: list) -> list:
+    """Férias de cada colaborador, na ordem dos ids, sem ids e datas de gravação."""
+    situacao = []
+    with db.conexao() as conn:
+        for colaborador_id in colaborador_ids:
+            situacao.append([tuple(row) for row in conn.execute('''
+                SELECT periodo_aquisitivo_inicio, dias_gozados, dias_vendidos, status
+                FROM ferias WHERE colaborador_id = ?
+                ORDER BY periodo_aquisitivo_inicio
+            ''', (colaborador_id,))])
+    return situacao
+
+
+def resumo_por_colaborador(resumo: dict, colaborador_ids: list) -> list:
+    """Alterações do resumo de reconciliar_ferias agrupadas por colaborador (na ordem dos ids)."""
+    return [
+        ([(r['dias_gozados'], r['dias_vendidos'], r['status'])
+          for r in resumo['atualizados'] if r['colaborador_id'] == colaborador_id],
+         [r['periodo_aquisitivo_inicio'] for r in resumo['removidos'] if r['colaborador_id'] == colaborador_id])
+        for colaborador_id in colaborador_ids
+    ]
+
+
+class TestReconciliarFerias(unittest.TestCase):
+
+    def test_conjunta_igual_a_individual(self):
+        # Todos os colaboradores de uma vez, como em reconciliar_ferias_diario()
+        conjunta_ids = montar_cenario()
+        resumo = db.reconciliar_ferias()
+
+        individual_ids = montar_cenario()
+        resumos = [db.sincronizar_ferias_colaborador(colaborador_id) for colaborador_id in individual_ids]
+
+        self.assertEqual(situacao_ferias(conjunta_ids), situacao_ferias(individual_ids))
+        self.assertEqual(
+            resumo_por_colaborador(resumo, conjunta_ids),
+            [resumo_por_colaborador(r, [i])[0] for r, i in zip(resumos, individual_ids)]
+        )
+        self.assertEqual([r['verificados'] for r in resumos], [len(p) for p in CENARIO])
+
+    def test_resultado(self):
+        ids = montar_cenario()
+        resumo = db.reconciliar_ferias(ids)
+
+        self.assertEqual(situacao_ferias(ids), [
+            [('2020-01-01', 30, 0, 'CONCLUIDO'), ('2021-01-01', 0, 0, 'PENDENTE')],
+            [('2020-06-01', 10, 10, 'PENDENTE')],
+            [('2020-03-01', 20, 10, 'CONCLUIDO'), ('2021-03-01', 0, 0, 'PENDENTE')],
+        ])
+        self.assertEqual(resumo['verificados'], 6)
+        self.assertEqual([r['periodo_aquisitivo_inicio'] for r in resumo['removidos']], ['2022-01-01'])
+
+        # Uma segunda execução não encontra diferenças
+        self.assertEqual(db.reconciliar_ferias(ids)['atualizados'], [])
+        self.assertEqual(db.reconciliar_ferias(ids)['removidos'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""Testes dos contadores diários de logs (logs_stats_diario) com o arquivamento mensal."""
+
+import unittest
+from datetime import date
+
+from utilities import database as db
+
+
+def setUpModule():
+    db.definir_log_sincrono(True)
+
+
+class TestContadoresComArquivamento(unittest.TestCase):
+
+    def setUp(self):
+        # O arquivamento iniciado na importação do módulo deve ter terminado
+        with db._arquivamento_logs_lock:
+            pass
+
+        # Logs antigos gravados direto na tabela, como nos bancos de anos anteriores
+        self.antigos = [
+            ('CRIAR', 'COLABORADOR', '2021-01-05 09:00:00'),
+            ('CRIAR', 'COLABORADOR', '2021-01-05 10:00:00'),
+            ('EDITAR', 'COLABORADOR', '2021-01-05 11:00:00'),
+            ('LOGIN', 'SISTEMA', '2021-01-20 08:00:00'),
+            ('EXCLUIR', 'DOCUMENTO', '2021-02-10 14:30:00'),
+        ]
+        with db.conexao() as conn:
+            conn.executemany('''
+                INSERT INTO logs_sistema (tipo_acao, categoria, descricao, data_hora)
+                VALUES (?, ?, 'Registro antigo', ?)
+            ''', self.antigos)
+            conn.commit()
+
+    def _contadores(self):
+        with db.conexao() as conn:
+            return {(row['dia'], row['categoria'], row['tipo_acao']): row['total']
+                    for row in conn.execute('SELECT * FROM logs_stats_diario')}
+
+    def _contadores_antigos(self):
+        return {chave: total for chave, total in self._contadores().items() if chave[0] < '2022'}
+
+    def test_arquivamento_preserva_os_contadores(self):
+        antes = db.obter_estatisticas_log()
+        contadores_antigos = self._contadores_antigos()
+        self.assertEqual(sum(contadores_antigos.values()), len(self.antigos))
+
+        resultado = db.arquivar_logs(antes_de=date(2022, 1, 1))
+
+        self.assertEqual(resultado['movidos'], len(self.antigos))
+        self.assertEqual(resultado['meses'], ['2021-01', '2021-02'])
+        with db.conexao() as conn:
+            self.assertEqual(conn.execute(
+                "SELECT COUNT(*) FROM logs_sistema WHERE data_hora < '2022'").fetchone()[0], 0)
+
+        # Os contadores continuam somando os logs arquivados
+        self.assertEqual(self._contadores_antigos(), contadores_antigos)
+        depois = db.obter_estatisticas_log()
+        self.assertEqual(depois['total'], antes['total'] + 1)  # + o log do próprio arquivamento
+        self.assertEqual(sum(depois['por_categoria'].values()), depois['total'])
+        self.assertEqual(sum(depois['por_tipo_acao'].values()), depois['total'])
+
+        # A reconstrução a partir de logs_sistema e dos arquivos chega aos mesmos valores
+        contadores = self._contadores()
+        db.reconstruir_estatisticas_log()
+        self.assertEqual(self._contadores(), contadores)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""Testes das migrações de esquema (MIGRACOES / aplicar_migracoes)."""
+
+import os
+import unittest
+from unittest import mock
+
+from utilities import database as db
+
+
+class TestAplicarMigracoes(unittest.TestCase):
+    """Banco anterior ao controle de versão (user_version 0) migrado até a última versão."""
+
+    def setUp(self):
+        self.caminho = os.path.join(os.environ['RH_BASE_PATH'], 'legado.db')
+        if os.path.exists(self.caminho):
+            os.remove(self.caminho)
+
+        # Esquema e dados como eram gravados antes das migrações
+        conn = db._abrir_conexao(self.caminho)
+        try:
+            db._migracao_esquema_inicial(conn)
+            conn.execute('''
+                INSERT INTO colaboradores (nome_completo, cpf, data_nascimento, status)
+                VALUES ('José Araújo', '123.456.789-09', '1990-03-15', 'ATIVO')
+            ''')
+            conn.execute('''
+                INSERT INTO dependentes (colaborador_id, nome, parentesco)
+                VALUES (1, 'Ana Araújo', 'Filha')
+            ''')
+            conn.execute('''
+                INSERT INTO logs_sistema (tipo_acao, categoria, descricao, data_hora)
+                VALUES ('CRIAR', 'COLABORADOR', 'Cadastro', '2024-01-10 08:00:00')
+            ''')
+            conn.execute('PRAGMA user_version = 0')
+            conn.commit()
+        finally:
+            conn.encerrar()
+
+        # Os arquivos mensais de logs pertencem ao banco principal dos testes
+        for nome, valor in (('DATABASE_PATH', self.caminho),
+                            ('LOGS_ARQUIVO_DIR', os.path.join(os.environ['RH_BASE_PATH'], 'legado_logs'))):
+            patcher = mock.patch.object(db, nome, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self._fechar_conexao_legado)
+
+    def _fechar_conexao_legado(self):
+        conexoes = getattr(db._conexoes_thread, 'conexoes', {})
+        conn = conexoes.pop(self.caminho, None)
+        if conn is not None:
+            conn.encerrar()
+
+    def _consultar(self, sql, params=()):
+        with db.conexao() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def test_migra_da_versao_zero_ate_a_ultima(self):
+        aplicadas = db.aplicar_migracoes()
+
+        ultima = db.MIGRACOES[-1][0]
+        self.assertEqual([m['versao'] for m in aplicadas], [n for n, _, _ in db.MIGRACOES])
+        self.assertEqual(db.versao_esquema(), ultima)
+        self.assertEqual(ultima, 11)
+        versoes = [row['versao'] for row in self._consultar(
+            'SELECT versao FROM migracoes_esquema ORDER BY versao')]
+        self.assertEqual(versoes, list(range(1, ultima + 1)))
+
+        colaborador = dict(self._consultar('SELECT * FROM colaboradores')[0])
+        self.assertEqual(colaborador['cpf'], '12345678909')                  # migração 2
+        self.assertEqual((colaborador['nasc_mes'], colaborador['nasc_dia']), (3, 15))  # migração 4
+        self.assertEqual(colaborador['nome_busca'], db.normalizar_busca('José Araújo'))  # migração 5
+
+        status = self._consultar('SELECT * FROM documentos_status WHERE colaborador_id = 1')  # migração 6
+        self.assertEqual(len(status), 1)
+        self.assertEqual(status[0]['total_obrigatorios'],
+                         len(db.obter_todos_documentos_obrigatorios(1)))
+
+        contadores = self._consultar('SELECT dia, total FROM logs_stats_diario')  # migração 9
+        self.assertEqual([tuple(row) for row in contadores], [('2024-01-10', 1)])
+
+    def test_segunda_execucao_nao_faz_nada(self):
+        db.aplicar_migracoes()
+        registros = [tuple(row) for row in self._consultar('SELECT * FROM migracoes_esquema')]
+
+        self.assertEqual(db.aplicar_migracoes(), [])
+        self.assertEqual(db.versao_esquema(), db.MIGRACOES[-1][0])
+        self.assertEqual([tuple(row) for row in self._consultar('SELECT * FROM migracoes_esquema')],
+                         registros)
+
+    def test_falha_desfaz_todas_as_migracoes(self):
+        def falhar(conn):
+            raise RuntimeError('migração com erro')
+
+        with mock.patch.object(db, 'MIGRACOES', db.MIGRACOES + [(99, 'Com erro', falhar)]):
+            with self.assertRaises(RuntimeError):
+                db.aplicar_migracoes()
+
+        self.assertEqual(db.versao_esquema(), 0)
+        tabelas = self._consultar(
+            "SELECT name FROM sqlite_master WHERE name IN ('migracoes_esquema', 'logs_stats_diario')")
+        self.assertEqual(tabelas, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
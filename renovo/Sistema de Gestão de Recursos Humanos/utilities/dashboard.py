@@ -5,12 +5,19 @@ RENOVO Montagens Industriais
 Contém funções para obter estatísticas e dados para visualização em gráficos.
 """
 
+import sys
+import asyncio
+import sqlite3
 import flet as ft
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, date, timedelta
 from typing import Dict, List, Any, Optional
 from collections import defaultdict
 
+from rh_comum import analise_colunar
+
 from utilities import database as db
+from utilities import perfil_sql
 from utilities.constantes import (
     COR_PRIMARIA, COR_SECUNDARIA, COR_SUCESSO, COR_ALERTA, COR_ERRO, COR_FUNDO,
     GRAUS_INSTRUCAO, ESTADOS_CIVIS, TIPOS_CONTRATO
@@ -31,368 +38,476 @@ def obter_nome_mes(mes: int = None) -> str:
     return MESES_PT.get(mes, '')
 
 
+# =============================================================================
+# MOTOR DE AGREGAÇÃO DO DASHBOARD
+# =============================================================================
+# Todos os indicadores e distribuições dos colaboradores ativos saem de duas
+# leituras da tabela colaboradores: uma consulta com SUM(CASE ...) para os
+# indicadores e outra que emula GROUP BY GROUPING SETS (o SQLite não tem)
+# agrupando por cada dimensão um único conjunto materializado de ativos.
+# A maioria dos colaboradores é ativa, então "+status" faz o SQLite ler a
+# tabela em sequência em vez de ir e voltar pelo índice de status; CROSS
+# JOIN fixa a ordem das junções (o banco não tem estatísticas de ANALYZE).
+
+# Dimensão -> expressão sobre o conjunto de ativos
+DIMENSOES_DASHBOARD = {
+    'empresa': 'empresa_id',
+    'funcao': 'funcao',
+    'departamento': 'departamento',
+    'escolaridade': 'grau_instrucao',
+    'estado_civil': 'estado_civil',
+    'sexo': 'sexo',
+    'tipo_contrato': 'tipo_contrato',
+    'admissao_mes': "strftime('%Y-%m', data_admissao)",
+}
+
+BENEFICIOS_DASHBOARD = {
+    'Vale Transporte': 'vale_transporte',
+    'Vale Refeição': 'vale_refeicao',
+    'Vale Alimentação': 'vale_alimentacao',
+    'Assist. Médica': 'assistencia_medica',
+    'Assist. Odonto': 'assistencia_odontologica',
+    'Seguro de Vida': 'seguro_vida',
+}
+
+# MATERIALIZED (SQLite 3.35+) garante uma única leitura de colaboradores
+_MATERIALIZAR = 'MATERIALIZED' if sqlite3.sqlite_version_info >= (3, 35, 0) else ''
+
+_SQL_INDICADORES = f"""
+    SELECT
+        COUNT(*) AS total_ativos,
+        SUM(CASE WHEN c.nasc_mes = :mes THEN 1 ELSE 0 END) AS aniversariantes_mes,
+        SUM(CASE WHEN c.salario > 0 THEN 1 ELSE 0 END) AS com_salario,
+        SUM(CASE WHEN c.salario > 0 THEN c.salario END) AS total_folha,
+        SUM(CASE WHEN ds.faltando = 0 THEN 1 ELSE 0 END) AS documentos_completos,
+        {', '.join(f'SUM(CASE WHEN c.{coluna} = 1 THEN 1 ELSE 0 END) AS {coluna}'
+                   for coluna in BENEFICIOS_DASHBOARD.values())},
+        (SELECT COUNT(*) FROM empresas WHERE ativa = 1) AS total_empresas,
+        (SELECT COUNT(*) FROM contratos_experiencia ce
+         JOIN colaboradores c2 ON ce.colaborador_id = c2.id
+         WHERE ce.status = 'VIGENTE' AND c2.status = 'ATIVO'
+         AND (ce.data_fim_prorrogacao <= :limite_contratos
+              OR (ce.data_fim_prorrogacao IS NULL AND ce.data_fim_inicial <= :limite_contratos))
+        ) AS contratos_vencendo,
+        (SELECT COUNT(*) FROM ferias f
+         JOIN colaboradores c2 ON f.colaborador_id = c2.id
+         WHERE f.status = 'PENDENTE' AND c2.status = 'ATIVO'
+         AND f.periodo_concessivo_limite <= :limite_ferias
+        ) AS ferias_vencendo,
+        (SELECT COUNT(DISTINCT f.colaborador_id) FROM periodos_ferias pf
+         CROSS JOIN ferias f ON f.id = pf.ferias_id
+         CROSS JOIN colaboradores c2 ON c2.id = f.colaborador_id
+         WHERE pf.data_fim >= :hoje AND pf.data_inicio <= :hoje AND c2.status = 'ATIVO'
+        ) AS em_ferias
+    FROM colaboradores c
+    LEFT JOIN documentos_status ds ON ds.colaborador_id = c.id
+    WHERE +c.status = 'ATIVO'
+"""
+
+_SQL_DISTRIBUICOES = f"""
+    WITH ativos AS {_MATERIALIZAR} (
+        SELECT empresa_id, funcao, departamento, grau_instrucao, estado_civil, sexo, tipo_contrato,
+               CASE WHEN data_admissao >= :inicio_admissoes THEN data_admissao END AS data_admissao
+        FROM colaboradores
+        WHERE +status = 'ATIVO'
+    )
+    {' UNION ALL '.join(
+        f"SELECT '{dimensao}' AS dimensao, {expressao} AS valor, COUNT(*) AS quantidade "
+        f"FROM ativos GROUP BY valor"
+        for dimensao, expressao in DIMENSOES_DASHBOARD.items())}
+"""
+
+
+# Colunas dos ativos usadas por cada faixa (ver rh_comum/analise_colunar.py)
+_COLUNAS_FAIXAS = {
+    'idade': ('data_nascimento',),
+    'salario': ('salario',),
+    'tempo_casa': ('data_admissao',),
+    'qtd_beneficios': tuple(BENEFICIOS_DASHBOARD.values()),
+}
+
+
+def _calcular_indicadores(conn) -> Dict[str, Any]:
+    """Indicadores dos colaboradores ativos (uma leitura de colaboradores)."""
+    agora = datetime.now()
+    cursor = conn.cursor()
+    cursor.execute(_SQL_INDICADORES, {
+        'mes': agora.month,
+        'hoje': agora.strftime('%Y-%m-%d'),
+        'limite_contratos': (agora + timedelta(days=30)).strftime('%Y-%m-%d'),
+        'limite_ferias': (agora + timedelta(days=90)).strftime('%Y-%m-%d'),
+    })
+    linha = dict(cursor.fetchone())
+    return {chave: valor or 0 for chave, valor in linha.items()}
+
+
+def _calcular_distribuicoes(conn, meses_admissoes: int = 12) -> Dict[str, List[tuple]]:
+    """
+    Contagem dos colaboradores ativos por dimensão (uma leitura de colaboradores).
+    Retorna {dimensao: [(valor, quantidade), ...]} em ordem decrescente de
+    quantidade, sem valores vazios; 'admissao_mes' fica em ordem cronológica.
+    """
+    inicio_admissoes = (datetime.now() - timedelta(days=meses_admissoes * 30)).strftime('%Y-%m-%d')
+    cursor = conn.cursor()
+    cursor.execute(_SQL_DISTRIBUICOES, {'inicio_admissoes': inicio_admissoes})
+
+    distribuicoes = {dimensao: [] for dimensao in DIMENSOES_DASHBOARD}
+    for row in cursor.fetchall():
+        if row['valor'] is not None and row['valor'] != '':
+            distribuicoes[row['dimensao']].append((row['valor'], row['quantidade']))
+
+    for dimensao, contagens in distribuicoes.items():
+        if dimensao == 'admissao_mes':
+            contagens.sort()
+        else:
+            contagens.sort(key=lambda item: item[1], reverse=True)
+
+    # Empresas por nome (colaboradores de empresas inexistentes ficam de fora)
+    nomes = dict(cursor.execute('SELECT id, razao_social FROM empresas').fetchall())
+    distribuicoes['empresa'] = [(nomes[empresa_id], quantidade)
+                                for empresa_id, quantidade in distribuicoes['empresa'] if empresa_id in nomes]
+    return distribuicoes
+
+
+def _calcular_faixas(conn, faixas=tuple(_COLUNAS_FAIXAS)) -> Dict[str, List[Dict]]:
+    """
+    Faixas de idade, salário, tempo de casa e quantidade de benefícios,
+    lendo de colaboradores (uma vez) só as colunas das faixas pedidas.
+    """
+    nomes = list(dict.fromkeys(coluna for faixa in faixas for coluna in _COLUNAS_FAIXAS[faixa]))
+    linhas = conn.execute(
+        f"SELECT {', '.join(nomes)} FROM colaboradores WHERE +status = 'ATIVO'"
+    ).fetchall()
+    colunas = dict(zip(nomes, zip(*linhas))) if linhas else dict.fromkeys(nomes, ())
+
+    calculos = {
+        'idade': lambda: analise_colunar.faixas_idade(colunas['data_nascimento']),
+        'salario': lambda: analise_colunar.faixas_salariais(colunas['salario']),
+        'tempo_casa': lambda: analise_colunar.faixas_tempo_casa(colunas['data_admissao']),
+        'qtd_beneficios': lambda: analise_colunar.faixas_qtd_beneficios(
+            [colunas[coluna] for coluna in _COLUNAS_FAIXAS['qtd_beneficios']]),
+    }
+    return {faixa: calculos[faixa]() for faixa in faixas}
+
+
+def _estatisticas_gerais(indicadores: Dict) -> Dict[str, Any]:
+    """Cartões da visão geral a partir dos indicadores."""
+    com_salario = indicadores['com_salario']
+    return {
+        'total_ativos': indicadores['total_ativos'],
+        'total_empresas': indicadores['total_empresas'],
+        'contratos_vencendo': indicadores['contratos_vencendo'],
+        'ferias_vencendo': indicadores['ferias_vencendo'],
+        'aniversariantes_mes': indicadores['aniversariantes_mes'],
+        'em_ferias': indicadores['em_ferias'],
+        'media_salarial': indicadores['total_folha'] / com_salario if com_salario else 0,
+        'total_folha': indicadores['total_folha'],
+    }
+
+
+def _utilizacao_beneficios(indicadores: Dict) -> Dict[str, int]:
+    return {nome: indicadores[coluna] for nome, coluna in BENEFICIOS_DASHBOARD.items()}
+
+
+def _documentos_pendentes(indicadores: Dict) -> Dict[str, Any]:
+    total = indicadores['total_ativos']
+    completos = indicadores['documentos_completos']
+    return {
+        'total': total,
+        'completos': completos,
+        'pendentes': total - completos,
+        'percentual_completo': round((completos / total * 100) if total > 0 else 0, 1)
+    }
+
+
+def _lista_distribuicao(contagens: List[tuple], campo: str, limite: int = None) -> List[Dict]:
+    return [{campo: valor, 'quantidade': quantidade} for valor, quantidade in contagens[:limite]]
+
+
+# Partes compartilhadas pelas abas: cada uma é uma leitura de colaboradores
+_PARTES_DASHBOARD = {
+    'indicadores': _calcular_indicadores,
+    'distribuicoes': _calcular_distribuicoes,
+    'faixas': _calcular_faixas,
+}
+
+# Abas na ordem de DashboardView.tabs
+ABAS_DASHBOARD = ['visao_geral', 'quadro_pessoal', 'contratos_ferias', 'demografia', 'beneficios']
+
+
+def _dados_aba(conn, indice: int, partes: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Dados de uma aba do dashboard (chaves de obter_agregados_dashboard).
+    partes guarda os indicadores, distribuições e faixas já calculados,
+    para que abas diferentes não repitam a mesma leitura.
+    """
+    def parte(nome):
+        if nome not in partes:
+            partes[nome] = _PARTES_DASHBOARD[nome](conn)
+        return partes[nome]
+
+    if indice == 0:
+        return {
+            'estatisticas': _estatisticas_gerais(parte('indicadores')),
+            'contratos_vencendo': obter_contratos_vencendo(30),
+            'ferias_vencendo': obter_ferias_vencendo(90),
+            'aniversariantes': obter_aniversariantes_mes(),
+        }
+    elif indice == 1:
+        distribuicoes = parte('distribuicoes')
+        return {
+            'por_empresa': _lista_distribuicao(distribuicoes['empresa'], 'empresa'),
+            'por_local': obter_colaboradores_por_localizacao(),
+            'por_funcao': _lista_distribuicao(distribuicoes['funcao'], 'funcao', 15),
+            'por_departamento': _lista_distribuicao(distribuicoes['departamento'], 'departamento'),
+        }
+    elif indice == 2:
+        distribuicoes = parte('distribuicoes')
+        return {
+            'por_tipo_contrato': _lista_distribuicao(distribuicoes['tipo_contrato'], 'tipo'),
+            'admissoes': _lista_distribuicao(distribuicoes['admissao_mes'], 'mes'),
+        }
+    elif indice == 3:
+        distribuicoes = parte('distribuicoes')
+        faixas = parte('faixas')
+        return {
+            'por_escolaridade': _lista_distribuicao(distribuicoes['escolaridade'], 'escolaridade'),
+            'por_estado_civil': _lista_distribuicao(distribuicoes['estado_civil'], 'estado_civil'),
+            'por_sexo': _lista_distribuicao(distribuicoes['sexo'], 'sexo'),
+            'por_idade': faixas['idade'],
+            'por_tempo_casa': faixas['tempo_casa'],
+        }
+    elif indice == 4:
+        indicadores = parte('indicadores')
+        faixas = parte('faixas')
+        return {
+            'estatisticas': _estatisticas_gerais(indicadores),
+            'beneficios': _utilizacao_beneficios(indicadores),
+            'documentos': _documentos_pendentes(indicadores),
+            'faixas_salariais': faixas['salario'],
+            'por_qtd_beneficios': faixas['qtd_beneficios'],
+        }
+    raise ValueError(f"Aba do dashboard inválida: {indice}")
+
+
+def obter_agregados_dashboard() -> Dict[str, Any]:
+    """
+    Reúne os dados das cinco abas do dashboard:
+    {
+        'estatisticas': {...},          # cartões (obter_estatisticas_gerais)
+        'beneficios': {...},            # obter_utilizacao_beneficios
+        'documentos': {...},            # obter_documentos_pendentes
+        'por_empresa', 'por_local', 'por_funcao', 'por_departamento',
+        'por_escolaridade', 'por_estado_civil', 'por_sexo', 'por_tipo_contrato',
+        'por_idade', 'por_tempo_casa', 'por_qtd_beneficios', 'faixas_salariais',
+        'admissoes': [...],
+        'contratos_vencendo', 'ferias_vencendo', 'aniversariantes': [...],
+    }
+    """
+    agregados = {}
+    with db.conexao() as conn:
+        partes = {}
+        for indice in range(len(ABAS_DASHBOARD)):
+            agregados.update(_dados_aba(conn, indice, partes))
+    return agregados
+
+
+# -----------------------------------------------------------------------------
+# Carregamento em segundo plano e cache por aba
+# -----------------------------------------------------------------------------
+# As abas são carregadas fora da thread da interface por um executor de uma
+# única thread. O cache é válido enquanto a geração dos dados
+# (db.versao_dados) não muda: gravações de logs não a alteram, então trocar
+# de aba reaproveita os dados já carregados. O cache só é acessado por essa thread.
+
+_executor_dashboard = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dashboard')
+_cache_abas_dashboard = {'versao': None, 'partes': {}, 'abas': {}}
+
+
+def _carregar_dados_aba(indice: int) -> Dict[str, Any]:
+    """Dados da aba, do cache se o banco não mudou desde a última leitura."""
+    with db.conexao() as conn:
+        # fechar_conexoes() (restauração de backup) também avança a geração
+        versao = db.versao_dados(conn)
+        cache = _cache_abas_dashboard
+        if versao is None or cache['versao'] != versao:
+            cache.update(versao=versao, partes={}, abas={})
+
+        if indice not in cache['abas']:
+            cache['abas'][indice] = _dados_aba(conn, indice, cache['partes'])
+        return cache['abas'][indice]
+
+
+def carregar_aba_dashboard(indice: int):
+    """Agenda o carregamento dos dados da aba; retorna um Future com o dicionário."""
+    return _executor_dashboard.submit(_carregar_dados_aba, indice)
+
+
 # =============================================================================
 # FUNÇÕES DE CONSULTA DE DADOS PARA DASHBOARDS
 # =============================================================================
 
 def obter_estatisticas_gerais() -> Dict[str, Any]:
     """Obtém estatísticas gerais dos colaboradores ativos."""
-    conn = db.get_connection()
-    cursor = conn.cursor()
-
-    stats = {}
-
-    # Total de colaboradores ativos
-    cursor.execute("SELECT COUNT(*) FROM colaboradores WHERE status = 'ATIVO'")
-    stats['total_ativos'] = cursor.fetchone()[0]
-
-    # Total de empresas ativas
-    cursor.execute("SELECT COUNT(*) FROM empresas WHERE ativa = 1")
-    stats['total_empresas'] = cursor.fetchone()[0]
-
-    # Contratos de experiência vencendo nos próximos 30 dias
-    data_limite = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
-    cursor.execute("""
-        SELECT COUNT(*) FROM contratos_experiencia ce
-        JOIN colaboradores c ON ce.colaborador_id = c.id
-        WHERE ce.status = 'VIGENTE' AND c.status = 'ATIVO'
-        AND (ce.data_fim_prorrogacao <= ? OR (ce.data_fim_prorrogacao IS NULL AND ce.data_fim_inicial <= ?))
-    """, (data_limite, data_limite))
-    stats['contratos_vencendo'] = cursor.fetchone()[0]
-
-    # Férias vencendo nos próximos 90 dias
-    data_limite_ferias = (datetime.now() + timedelta(days=90)).strftime('%Y-%m-%d')
-    cursor.execute("""
-        SELECT COUNT(*) FROM ferias f
-        JOIN colaboradores c ON f.colaborador_id = c.id
-        WHERE f.status = 'PENDENTE' AND c.status = 'ATIVO'
-        AND f.periodo_concessivo_limite <= ?
-    """, (data_limite_ferias,))
-    stats['ferias_vencendo'] = cursor.fetchone()[0]
-
-    # Aniversariantes do mês
-    mes_atual = datetime.now().month
-    cursor.execute("""
-        SELECT COUNT(*) FROM colaboradores
-        WHERE status = 'ATIVO' AND strftime('%m', data_nascimento) = ?
-    """, (f'{mes_atual:02d}',))
-    stats['aniversariantes_mes'] = cursor.fetchone()[0]
-
-    # Colaboradores em férias atualmente
-    hoje = datetime.now().strftime('%Y-%m-%d')
-    cursor.execute("""
-        SELECT COUNT(DISTINCT c.id) FROM colaboradores c
-        JOIN ferias f ON c.id = f.colaborador_id
-        JOIN periodos_ferias pf ON f.id = pf.ferias_id
-        WHERE c.status = 'ATIVO' AND pf.data_inicio <= ? AND pf.data_fim >= ?
-    """, (hoje, hoje))
-    stats['em_ferias'] = cursor.fetchone()[0]
-
-    # Média salarial
-    cursor.execute("SELECT AVG(salario) FROM colaboradores WHERE status = 'ATIVO' AND salario > 0")
-    media = cursor.fetchone()[0]
-    stats['media_salarial'] = media if media else 0
-
-    # Total na folha (soma de salários)
-    cursor.execute("SELECT SUM(salario) FROM colaboradores WHERE status = 'ATIVO' AND salario > 0")
-    total = cursor.fetchone()[0]
-    stats['total_folha'] = total if total else 0
-
-    conn.close()
-    return stats
+    with db.conexao() as conn:
+        return _estatisticas_gerais(_calcular_indicadores(conn))
 
 
 def obter_colaboradores_por_empresa() -> List[Dict]:
     """Obtém contagem de colaboradores ativos por empresa."""
-    conn = db.get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT e.razao_social as empresa, COUNT(c.id) as quantidade
-        FROM colaboradores c
-        JOIN empresas e ON c.empresa_id = e.id
-        WHERE c.status = 'ATIVO'
-        GROUP BY e.id, e.razao_social
-        ORDER BY quantidade DESC
-    """)
-
-    resultado = [{'empresa': row[0], 'quantidade': row[1]} for row in cursor.fetchall()]
-    conn.close()
-    return resultado
+    with db.conexao() as conn:
+        return _lista_distribuicao(_calcular_distribuicoes(conn)['empresa'], 'empresa')
 
 
 def obter_colaboradores_por_localizacao() -> List[Dict]:
     """Obtém contagem de colaboradores ativos por localização atual."""
-    conn = db.get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT l.local_nome, l.cidade, l.uf, COUNT(DISTINCT c.id) as quantidade
-        FROM colaboradores c
-        JOIN localizacoes l ON c.id = l.colaborador_id
-        WHERE c.status = 'ATIVO' AND l.data_fim IS NULL
-        GROUP BY l.local_nome, l.cidade, l.uf
-        ORDER BY quantidade DESC
-    """)
+    with db.conexao() as conn:
+        cursor = conn.cursor()
 
-    resultado = []
-    for row in cursor.fetchall():
-        local = row[0]
-        if row[1]:
-            local += f" - {row[1]}"
-        if row[2]:
-            local += f"/{row[2]}"
-        resultado.append({'local': local, 'quantidade': row[3]})
-
-    conn.close()
+        cursor.execute("""
+            SELECT l.local_nome, l.cidade, l.uf, COUNT(DISTINCT c.id) as quantidade
+            FROM colaboradores c
+            JOIN localizacoes l ON c.id = l.colaborador_id
+            WHERE c.status = 'ATIVO' AND l.data_fim IS NULL
+            GROUP BY l.local_nome, l.cidade, l.uf
+            ORDER BY quantidade DESC
+        """)
+
+        resultado = []
+        for row in cursor.fetchall():
+            local = row[0]
+            if row[1]:
+                local += f" - {row[1]}"
+            if row[2]:
+                local += f"/{row[2]}"
+            resultado.append({'local': local, 'quantidade': row[3]})
     return resultado
 
 
 def obter_colaboradores_por_funcao() -> List[Dict]:
-    """Obtém contagem de colaboradores ativos por função."""
-    conn = db.get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT funcao, COUNT(*) as quantidade
-        FROM colaboradores
-        WHERE status = 'ATIVO' AND funcao IS NOT NULL AND funcao != ''
-        GROUP BY funcao
-        ORDER BY quantidade DESC
-        LIMIT 15
-    """)
-
-    resultado = [{'funcao': row[0], 'quantidade': row[1]} for row in cursor.fetchall()]
-    conn.close()
-    return resultado
+    """Obtém contagem de colaboradores ativos por função (15 mais frequentes)."""
+    with db.conexao() as conn:
+        return _lista_distribuicao(_calcular_distribuicoes(conn)['funcao'], 'funcao', 15)
 
 
 def obter_colaboradores_por_departamento() -> List[Dict]:
     """Obtém contagem de colaboradores ativos por departamento."""
-    conn = db.get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT departamento, COUNT(*) as quantidade
-        FROM colaboradores
-        WHERE status = 'ATIVO' AND departamento IS NOT NULL AND departamento != ''
-        GROUP BY departamento
-        ORDER BY quantidade DESC
-    """)
-
-    resultado = [{'departamento': row[0], 'quantidade': row[1]} for row in cursor.fetchall()]
-    conn.close()
-    return resultado
+    with db.conexao() as conn:
+        return _lista_distribuicao(_calcular_distribuicoes(conn)['departamento'], 'departamento')
 
 
 def obter_distribuicao_escolaridade() -> List[Dict]:
     """Obtém distribuição de escolaridade dos colaboradores ativos."""
-    conn = db.get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT grau_instrucao, COUNT(*) as quantidade
-        FROM colaboradores
-        WHERE status = 'ATIVO' AND grau_instrucao IS NOT NULL AND grau_instrucao != ''
-        GROUP BY grau_instrucao
-        ORDER BY quantidade DESC
-    """)
-
-    resultado = [{'escolaridade': row[0], 'quantidade': row[1]} for row in cursor.fetchall()]
-    conn.close()
-    return resultado
+    with db.conexao() as conn:
+        return _lista_distribuicao(_calcular_distribuicoes(conn)['escolaridade'], 'escolaridade')
 
 
 def obter_distribuicao_estado_civil() -> List[Dict]:
     """Obtém distribuição de estado civil dos colaboradores ativos."""
-    conn = db.get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT estado_civil, COUNT(*) as quantidade
-        FROM colaboradores
-        WHERE status = 'ATIVO' AND estado_civil IS NOT NULL AND estado_civil != ''
-        GROUP BY estado_civil
-        ORDER BY quantidade DESC
-    """)
-
-    resultado = [{'estado_civil': row[0], 'quantidade': row[1]} for row in cursor.fetchall()]
-    conn.close()
-    return resultado
+    with db.conexao() as conn:
+        return _lista_distribuicao(_calcular_distribuicoes(conn)['estado_civil'], 'estado_civil')
 
 
 def obter_distribuicao_sexo() -> List[Dict]:
     """Obtém distribuição por sexo dos colaboradores ativos."""
-    conn = db.get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT sexo, COUNT(*) as quantidade
-        FROM colaboradores
-        WHERE status = 'ATIVO' AND sexo IS NOT NULL AND sexo != ''
-        GROUP BY sexo
-        ORDER BY quantidade DESC
-    """)
-
-    resultado = [{'sexo': row[0], 'quantidade': row[1]} for row in cursor.fetchall()]
-    conn.close()
-    return resultado
+    with db.conexao() as conn:
+        return _lista_distribuicao(_calcular_distribuicoes(conn)['sexo'], 'sexo')
 
 
 def obter_distribuicao_idade() -> List[Dict]:
     """Obtém distribuição de colaboradores ativos por faixa etária."""
-    conn = db.get_connection()
-    cursor = conn.cursor()
+    with db.conexao() as conn:
+        return _calcular_faixas(conn, ('idade',))['idade']
 
-    cursor.execute("""
-        SELECT data_nascimento FROM colaboradores
-        WHERE status = 'ATIVO' AND data_nascimento IS NOT NULL
-    """)
-
-    faixas = {
-        '18-25': 0,
-        '26-35': 0,
-        '36-45': 0,
-        '46-55': 0,
-        '56+': 0
-    }
 
-    hoje = date.today()
-    for row in cursor.fetchall():
-        try:
-            nascimento = datetime.strptime(str(row[0]), '%Y-%m-%d').date()
-            idade = hoje.year - nascimento.year - ((hoje.month, hoje.day) < (nascimento.month, nascimento.day))
-
-            if idade < 26:
-                faixas['18-25'] += 1
-            elif idade < 36:
-                faixas['26-35'] += 1
-            elif idade < 46:
-                faixas['36-45'] += 1
-            elif idade < 56:
-                faixas['46-55'] += 1
-            else:
-                faixas['56+'] += 1
-        except:
-            pass
-
-    conn.close()
-    resultado = [{'faixa': k, 'quantidade': v} for k, v in faixas.items() if v > 0]
-    return resultado
+def obter_distribuicao_tempo_casa() -> List[Dict]:
+    """Obtém distribuição de colaboradores ativos por tempo de casa."""
+    with db.conexao() as conn:
+        return _calcular_faixas(conn, ('tempo_casa',))['tempo_casa']
 
 
 def obter_distribuicao_tipo_contrato() -> List[Dict]:
     """Obtém distribuição de colaboradores ativos por tipo de contrato."""
-    conn = db.get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT tipo_contrato, COUNT(*) as quantidade
-        FROM colaboradores
-        WHERE status = 'ATIVO' AND tipo_contrato IS NOT NULL AND tipo_contrato != ''
-        GROUP BY tipo_contrato
-        ORDER BY quantidade DESC
-    """)
-
-    resultado = [{'tipo': row[0], 'quantidade': row[1]} for row in cursor.fetchall()]
-    conn.close()
-    return resultado
+    with db.conexao() as conn:
+        return _lista_distribuicao(_calcular_distribuicoes(conn)['tipo_contrato'], 'tipo')
 
 
 def obter_admissoes_por_mes(meses: int = 12) -> List[Dict]:
     """Obtém quantidade de admissões nos últimos N meses (colaboradores ativos)."""
-    conn = db.get_connection()
-    cursor = conn.cursor()
-
-    data_inicio = (datetime.now() - timedelta(days=meses * 30)).strftime('%Y-%m-%d')
-
-    cursor.execute("""
-        SELECT strftime('%Y-%m', data_admissao) as mes, COUNT(*) as quantidade
-        FROM colaboradores
-        WHERE status = 'ATIVO' AND data_admissao >= ?
-        GROUP BY mes
-        ORDER BY mes
-    """, (data_inicio,))
-
-    resultado = [{'mes': row[0], 'quantidade': row[1]} for row in cursor.fetchall()]
-    conn.close()
-    return resultado
+    with db.conexao() as conn:
+        return _lista_distribuicao(_calcular_distribuicoes(conn, meses)['admissao_mes'], 'mes')
 
 
 def obter_contratos_vencendo(dias: int = 30) -> List[Dict]:
     """Obtém contratos de experiência vencendo nos próximos N dias."""
-    conn = db.get_connection()
-    cursor = conn.cursor()
+    with db.conexao() as conn:
+        cursor = conn.cursor()
 
-    hoje = datetime.now().strftime('%Y-%m-%d')
-    data_limite = (datetime.now() + timedelta(days=dias)).strftime('%Y-%m-%d')
-
-    cursor.execute("""
-        SELECT c.nome_completo, c.funcao, e.razao_social as empresa,
-               ce.data_fim_inicial, ce.data_fim_prorrogacao,
-               CASE WHEN ce.data_fim_prorrogacao IS NOT NULL
-                    THEN ce.data_fim_prorrogacao
-                    ELSE ce.data_fim_inicial END as data_vencimento
-        FROM contratos_experiencia ce
-        JOIN colaboradores c ON ce.colaborador_id = c.id
-        LEFT JOIN empresas e ON c.empresa_id = e.id
-        WHERE ce.status = 'VIGENTE' AND c.status = 'ATIVO'
-        AND (
-            (ce.data_fim_prorrogacao IS NOT NULL AND ce.data_fim_prorrogacao BETWEEN ? AND ?)
-            OR (ce.data_fim_prorrogacao IS NULL AND ce.data_fim_inicial BETWEEN ? AND ?)
-        )
-        ORDER BY data_vencimento
-    """, (hoje, data_limite, hoje, data_limite))
+        hoje = datetime.now().strftime('%Y-%m-%d')
+        data_limite = (datetime.now() + timedelta(days=dias)).strftime('%Y-%m-%d')
 
-    resultado = []
-    for row in cursor.fetchall():
-        data_venc = row[5] or row[4] or row[3]
-        dias_restantes = (datetime.strptime(str(data_venc), '%Y-%m-%d') - datetime.now()).days
-        resultado.append({
-            'nome': row[0],
-            'funcao': row[1] or '-',
-            'empresa': row[2] or '-',
-            'data_vencimento': data_venc,
-            'dias_restantes': dias_restantes
-        })
+        cursor.execute("""
+            SELECT c.nome_completo, c.funcao, e.razao_social as empresa,
+                   ce.data_fim_inicial, ce.data_fim_prorrogacao,
+                   CASE WHEN ce.data_fim_prorrogacao IS NOT NULL
+                        THEN ce.data_fim_prorrogacao
+                        ELSE ce.data_fim_inicial END as data_vencimento
+            FROM contratos_experiencia ce
+            JOIN colaboradores c ON ce.colaborador_id = c.id
+            LEFT JOIN empresas e ON c.empresa_id = e.id
+            WHERE ce.status = 'VIGENTE' AND c.status = 'ATIVO'
+            AND (
+                (ce.data_fim_prorrogacao IS NOT NULL AND ce.data_fim_prorrogacao BETWEEN ? AND ?)
+                OR (ce.data_fim_prorrogacao IS NULL AND ce.data_fim_inicial BETWEEN ? AND ?)
+            )
+            ORDER BY data_vencimento
+        """, (hoje, data_limite, hoje, data_limite))
 
-    conn.close()
+        resultado = []
+        for row in cursor.fetchall():
+            data_venc = row[5] or row[4] or row[3]
+            dias_restantes = (datetime.strptime(str(data_venc), '%Y-%m-%d') - datetime.now()).days
+            resultado.append({
+                'nome': row[0],
+                'funcao': row[1] or '-',
+                'empresa': row[2] or '-',
+                'data_vencimento': data_venc,
+                'dias_restantes': dias_restantes
+            })
     return resultado
 
 
 def obter_ferias_vencendo(dias: int = 90) -> List[Dict]:
     """Obtém períodos de férias vencendo nos próximos N dias."""
-    conn = db.get_connection()
-    cursor = conn.cursor()
-
-    hoje = datetime.now().strftime('%Y-%m-%d')
-    data_limite = (datetime.now() + timedelta(days=dias)).strftime('%Y-%m-%d')
+    with db.conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute("""
-        SELECT c.nome_completo, c.funcao, e.razao_social as empresa,
-               f.periodo_concessivo_limite, f.dias_direito, f.dias_gozados
-        FROM ferias f
-        JOIN colaboradores c ON f.colaborador_id = c.id
-        LEFT JOIN empresas e ON c.empresa_id = e.id
-        WHERE f.status = 'PENDENTE' AND c.status = 'ATIVO'
-        AND f.periodo_concessivo_limite BETWEEN ? AND ?
-        ORDER BY f.periodo_concessivo_limite
-    """, (hoje, data_limite))
+        hoje = datetime.now().strftime('%Y-%m-%d')
+        data_limite = (datetime.now() + timedelta(days=dias)).strftime('%Y-%m-%d')
 
-    resultado = []
-    for row in cursor.fetchall():
-        dias_restantes = (datetime.strptime(str(row[3]), '%Y-%m-%d') - datetime.now()).days
-        resultado.append({
-            'nome': row[0],
-            'funcao': row[1] or '-',
-            'empresa': row[2] or '-',
-            'limite': row[3],
-            'dias_direito': row[4],
-            'dias_gozados': row[5],
-            'dias_restantes': dias_restantes
-        })
-
-    conn.close()
+        cursor.execute("""
+            SELECT c.nome_completo, c.funcao, e.razao_social as empresa,
+                   f.periodo_concessivo_limite, f.dias_direito, f.dias_gozados
+            FROM ferias f
+            JOIN colaboradores c ON f.colaborador_id = c.id
+            LEFT JOIN empresas e ON c.empresa_id = e.id
+            WHERE f.status = 'PENDENTE' AND c.status = 'ATIVO'
+            AND f.periodo_concessivo_limite BETWEEN ? AND ?
+            ORDER BY f.periodo_concessivo_limite
+        """, (hoje, data_limite))
+
+        resultado = []
+        for row in cursor.fetchall():
+            dias_restantes = (datetime.strptime(str(row[3]), '%Y-%m-%d') - datetime.now()).days
+            resultado.append({
+                'nome': row[0],
+                'funcao': row[1] or '-',
+                'empresa': row[2] or '-',
+                'limite': row[3],
+                'dias_direito': row[4],
+                'dias_gozados': row[5],
+                'dias_restantes': dias_restantes
+            })
     return resultado
 
 
@@ -401,139 +516,56 @@ def obter_aniversariantes_mes(mes: int = None) -> List[Dict]:
     if mes is None:
         mes = datetime.now().month
 
-    conn = db.get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT c.nome_completo, c.data_nascimento, c.funcao, e.razao_social as empresa
-        FROM colaboradores c
-        LEFT JOIN empresas e ON c.empresa_id = e.id
-        WHERE c.status = 'ATIVO' AND strftime('%m', c.data_nascimento) = ?
-        ORDER BY strftime('%d', c.data_nascimento)
-    """, (f'{mes:02d}',))
+    with db.conexao() as conn:
+        cursor = conn.cursor()
 
-    resultado = []
-    for row in cursor.fetchall():
-        try:
-            nascimento = datetime.strptime(str(row[1]), '%Y-%m-%d')
-            idade = datetime.now().year - nascimento.year
-            resultado.append({
-                'nome': row[0],
-                'dia': nascimento.day,
-                'idade': idade,
-                'funcao': row[2] or '-',
-                'empresa': row[3] or '-'
-            })
-        except:
-            pass
-
-    conn.close()
+        cursor.execute("""
+            SELECT c.nome_completo, c.data_nascimento, c.funcao, e.razao_social as empresa
+            FROM colaboradores c
+            LEFT JOIN empresas e ON c.empresa_id = e.id
+            WHERE c.status = 'ATIVO' AND c.nasc_mes = ?
+            ORDER BY c.nasc_dia
+        """, (mes,))
+
+        resultado = []
+        for row in cursor.fetchall():
+            try:
+                nascimento = datetime.strptime(str(row[1]), '%Y-%m-%d')
+                idade = datetime.now().year - nascimento.year
+                resultado.append({
+                    'nome': row[0],
+                    'dia': nascimento.day,
+                    'idade': idade,
+                    'funcao': row[2] or '-',
+                    'empresa': row[3] or '-'
+                })
+            except:
+                pass
     return resultado
 
 
 def obter_utilizacao_beneficios() -> Dict[str, int]:
     """Obtém contagem de colaboradores ativos que utilizam cada benefício."""
-    conn = db.get_connection()
-    cursor = conn.cursor()
-
-    beneficios = {}
-
-    # Vale Transporte
-    cursor.execute("SELECT COUNT(*) FROM colaboradores WHERE status = 'ATIVO' AND vale_transporte = 1")
-    beneficios['Vale Transporte'] = cursor.fetchone()[0]
-
-    # Vale Refeição
-    cursor.execute("SELECT COUNT(*) FROM colaboradores WHERE status = 'ATIVO' AND vale_refeicao = 1")
-    beneficios['Vale Refeição'] = cursor.fetchone()[0]
-
-    # Vale Alimentação
-    cursor.execute("SELECT COUNT(*) FROM colaboradores WHERE status = 'ATIVO' AND vale_alimentacao = 1")
-    beneficios['Vale Alimentação'] = cursor.fetchone()[0]
-
-    # Assistência Médica
-    cursor.execute("SELECT COUNT(*) FROM colaboradores WHERE status = 'ATIVO' AND assistencia_medica = 1")
-    beneficios['Assist. Médica'] = cursor.fetchone()[0]
-
-    # Assistência Odontológica
-    cursor.execute("SELECT COUNT(*) FROM colaboradores WHERE status = 'ATIVO' AND assistencia_odontologica = 1")
-    beneficios['Assist. Odonto'] = cursor.fetchone()[0]
-
-    # Seguro de Vida
-    cursor.execute("SELECT COUNT(*) FROM colaboradores WHERE status = 'ATIVO' AND seguro_vida = 1")
-    beneficios['Seguro de Vida'] = cursor.fetchone()[0]
-
-    conn.close()
-    return beneficios
+    with db.conexao() as conn:
+        return _utilizacao_beneficios(_calcular_indicadores(conn))
 
 
 def obter_faixas_salariais() -> List[Dict]:
     """Obtém distribuição de colaboradores ativos por faixa salarial."""
-    conn = db.get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT salario FROM colaboradores
-        WHERE status = 'ATIVO' AND salario IS NOT NULL AND salario > 0
-    """)
-
-    faixas = {
-        'Até R$ 2.000': 0,
-        'R$ 2.001 - 3.500': 0,
-        'R$ 3.501 - 5.000': 0,
-        'R$ 5.001 - 8.000': 0,
-        'R$ 8.001 - 12.000': 0,
-        'Acima de R$ 12.000': 0
-    }
+    with db.conexao() as conn:
+        return _calcular_faixas(conn, ('salario',))['salario']
 
-    for row in cursor.fetchall():
-        salario = float(row[0])
-        if salario <= 2000:
-            faixas['Até R$ 2.000'] += 1
-        elif salario <= 3500:
-            faixas['R$ 2.001 - 3.500'] += 1
-        elif salario <= 5000:
-            faixas['R$ 3.501 - 5.000'] += 1
-        elif salario <= 8000:
-            faixas['R$ 5.001 - 8.000'] += 1
-        elif salario <= 12000:
-            faixas['R$ 8.001 - 12.000'] += 1
-        else:
-            faixas['Acima de R$ 12.000'] += 1
 
-    conn.close()
-    resultado = [{'faixa': k, 'quantidade': v} for k, v in faixas.items() if v > 0]
-    return resultado
+def obter_distribuicao_qtd_beneficios() -> List[Dict]:
+    """Obtém distribuição de colaboradores ativos pela quantidade de benefícios."""
+    with db.conexao() as conn:
+        return _calcular_faixas(conn, ('qtd_beneficios',))['qtd_beneficios']
 
 
 def obter_documentos_pendentes() -> Dict[str, Any]:
     """Obtém estatísticas de documentos pendentes dos colaboradores ativos."""
-    conn = db.get_connection()
-    cursor = conn.cursor()
-
-    # Total de colaboradores ativos
-    cursor.execute("SELECT COUNT(*) FROM colaboradores WHERE status = 'ATIVO'")
-    total = cursor.fetchone()[0]
-
-    # Colaboradores com documentos completos (todos obrigatórios)
-    # Simplificado: contar colaboradores que têm pelo menos 5 documentos
-    cursor.execute("""
-        SELECT c.id, COUNT(d.id) as docs
-        FROM colaboradores c
-        LEFT JOIN documentos_colaborador d ON c.id = d.colaborador_id
-        WHERE c.status = 'ATIVO'
-        GROUP BY c.id
-        HAVING docs >= 5
-    """)
-    completos = len(cursor.fetchall())
-
-    conn.close()
-
-    return {
-        'total': total,
-        'completos': completos,
-        'pendentes': total - completos,
-        'percentual_completo': round((completos / total * 100) if total > 0 else 0, 1)
-    }
+    with db.conexao() as conn:
+        return _documentos_pendentes(_calcular_indicadores(conn))
 
 
 # =============================================================================
@@ -568,12 +600,26 @@ def obter_cor(indice: int) -> str:
 # COMPONENTES DE INTERFACE DO DASHBOARD
 # =============================================================================
 
+# Tempo (s) que a troca de aba aguarda os dados antes de mostrar o esqueleto
+ESPERA_SEM_ESQUELETO = 0.05
+
+# Esqueleto de cada aba: linhas de blocos (largura, altura) como os cards e gráficos
+ESQUELETOS_ABAS = {
+    0: [[(200, 80)] * 6, [(200, 80)] * 2, [(250, 300)] * 3],
+    1: [[(450, 320)] * 2, [(450, 320)] * 2],
+    2: [[(320, 320), (550, 320)]],
+    3: [[(320, 320)] * 3, [(600, 300), (320, 320)]],
+    4: [[(200, 80)] * 4, [(450, 350), (450, 350), (320, 320)]],
+}
+
+
 class DashboardView:
     """Classe para construir a interface do Dashboard com abas."""
 
     def __init__(self, page: ft.Page):
         self.page = page
         self.aba_atual = 0
+        self._pre_carregado = False
 
     def build(self) -> ft.Container:
         """Constrói a view completa do dashboard."""
@@ -613,17 +659,61 @@ class DashboardView:
         self.page.update()
 
     def _carregar_aba(self, indice: int):
-        """Carrega o conteúdo da aba selecionada."""
-        if indice == 0:
-            self.conteudo_aba.content = self._build_visao_geral()
-        elif indice == 1:
-            self.conteudo_aba.content = self._build_quadro_pessoal()
-        elif indice == 2:
-            self.conteudo_aba.content = self._build_contratos_ferias()
-        elif indice == 3:
-            self.conteudo_aba.content = self._build_demografia()
-        elif indice == 4:
-            self.conteudo_aba.content = self._build_beneficios()
+        """
+        Carrega o conteúdo da aba selecionada em segundo plano. Se os dados
+        não chegarem em ESPERA_SEM_ESQUELETO segundos (aba fora do cache),
+        mostra o esqueleto da aba e a preenche quando terminarem.
+        """
+        futuro = carregar_aba_dashboard(indice)
+        wait([futuro], timeout=ESPERA_SEM_ESQUELETO)
+        if futuro.done():
+            self._exibir_aba(indice, futuro)
+        else:
+            self.conteudo_aba.content = self._criar_esqueleto(indice)
+            self.page.run_task(self._exibir_aba_ao_terminar, indice, futuro)
+
+    async def _exibir_aba_ao_terminar(self, indice: int, futuro):
+        """Aguarda os dados no loop da página e monta a aba fora da thread do executor."""
+        await asyncio.wait([asyncio.wrap_future(futuro)])
+        self._exibir_aba(indice, futuro, atualizar=True)
+
+    def _exibir_aba(self, indice: int, futuro, atualizar: bool = False):
+        """Monta a aba com os dados carregados (futuro já concluído)."""
+        if indice != self.aba_atual:
+            return  # O usuário já trocou de aba
+
+        try:
+            dados = futuro.result()
+        except Exception as e:
+            db.registrar_log("sistema", "aviso", f"Erro ao carregar dados do dashboard: {str(e)}")
+            self.conteudo_aba.content = ft.Container(
+                content=ft.Text(f"Erro ao carregar dados: {str(e)}", color=COR_ERRO),
+                padding=20,
+            )
+        else:
+            construtores = [self._build_visao_geral, self._build_quadro_pessoal,
+                            self._build_contratos_ferias, self._build_demografia, self._build_beneficios]
+            self.conteudo_aba.content = construtores[indice](dados)
+
+        if atualizar:
+            self.page.update()
+
+        # Depois da primeira aba, antecipa as demais para a troca ser imediata
+        if not self._pre_carregado:
+            self._pre_carregado = True
+            for outra in range(len(ABAS_DASHBOARD)):
+                if outra != indice:
+                    carregar_aba_dashboard(outra)
+
+    def _criar_esqueleto(self, indice: int) -> ft.Column:
+        """Blocos cinza no formato da aba, exibidos enquanto os dados carregam."""
+        return ft.Column([
+            ft.Row([
+                ft.Container(width=largura, height=altura, bgcolor="#eeeeee", border_radius=10)
+                for largura, altura in linha
+            ], spacing=15, wrap=True)
+            for linha in ESQUELETOS_ABAS[indice]
+        ], spacing=15)
 
     def _criar_card_kpi(self, titulo: str, valor: str, icone, cor: str, subtitulo: str = None) -> ft.Container:
         """Cria um card de KPI estilizado."""
@@ -927,12 +1017,12 @@ class DashboardView:
     # ABAS DO DASHBOARD
     # =========================================================================
 
-    def _build_visao_geral(self) -> ft.Container:
+    def _build_visao_geral(self, dados: Dict) -> ft.Container:
         """Constrói a aba de Visão Geral."""
-        stats = obter_estatisticas_gerais()
-        contratos_venc = obter_contratos_vencendo(30)
-        ferias_venc = obter_ferias_vencendo(90)
-        aniversariantes = obter_aniversariantes_mes()
+        stats = dados['estatisticas']
+        contratos_venc = dados['contratos_vencendo']
+        ferias_venc = dados['ferias_vencendo']
+        aniversariantes = dados['aniversariantes']
 
         # Cards de KPIs
         kpis = ft.Row([
@@ -1008,12 +1098,12 @@ class DashboardView:
             alertas,
         ], spacing=10)
 
-    def _build_quadro_pessoal(self) -> ft.Container:
+    def _build_quadro_pessoal(self, dados: Dict) -> ft.Container:
         """Constrói a aba de Quadro de Pessoal."""
-        por_empresa = obter_colaboradores_por_empresa()
-        por_local = obter_colaboradores_por_localizacao()
-        por_funcao = obter_colaboradores_por_funcao()
-        por_departamento = obter_colaboradores_por_departamento()
+        por_empresa = dados['por_empresa']
+        por_local = dados['por_local']
+        por_funcao = dados['por_funcao']
+        por_departamento = dados['por_departamento']
 
         # Linha 1: Empresa e Localização
         linha1 = ft.Row([
@@ -1037,10 +1127,10 @@ class DashboardView:
             linha2,
         ], spacing=10)
 
-    def _build_contratos_ferias(self) -> ft.Container:
+    def _build_contratos_ferias(self, dados: Dict) -> ft.Container:
         """Constrói a aba de Contratos & Férias."""
-        por_tipo_contrato = obter_distribuicao_tipo_contrato()
-        admissoes = obter_admissoes_por_mes(12)
+        por_tipo_contrato = dados['por_tipo_contrato']
+        admissoes = dados['admissoes']
 
         # Gráficos: Tipo de contrato e Admissões
         linha1 = ft.Row([
@@ -1054,12 +1144,13 @@ class DashboardView:
             linha1,
         ], spacing=10)
 
-    def _build_demografia(self) -> ft.Container:
+    def _build_demografia(self, dados: Dict) -> ft.Container:
         """Constrói a aba de Demografia."""
-        por_idade = obter_distribuicao_idade()
-        por_escolaridade = obter_distribuicao_escolaridade()
-        por_estado_civil = obter_distribuicao_estado_civil()
-        por_sexo = obter_distribuicao_sexo()
+        por_idade = dados['por_idade']
+        por_escolaridade = dados['por_escolaridade']
+        por_estado_civil = dados['por_estado_civil']
+        por_sexo = dados['por_sexo']
+        por_tempo_casa = dados['por_tempo_casa']
 
         # Linha 1: Gráficos de pizza
         linha1 = ft.Row([
@@ -1071,11 +1162,13 @@ class DashboardView:
                                        "Faixa Etária", 320),
         ], spacing=15, wrap=True)
 
-        # Linha 2: Escolaridade
+        # Linha 2: Escolaridade e Tempo de Casa
         linha2 = ft.Row([
             self._criar_grafico_barras(por_escolaridade, 'escolaridade', 'quantidade',
                                         "Distribuição por Escolaridade", 600, 300),
-        ], spacing=15)
+            self._criar_grafico_pizza(por_tempo_casa, 'faixa', 'quantidade',
+                                       "Tempo de Casa", 320),
+        ], spacing=15, wrap=True)
 
         return ft.Column([
             linha1,
@@ -1083,11 +1176,12 @@ class DashboardView:
             linha2,
         ], spacing=10)
 
-    def _build_beneficios(self) -> ft.Container:
+    def _build_beneficios(self, dados: Dict) -> ft.Container:
         """Constrói a aba de Benefícios."""
-        beneficios = obter_utilizacao_beneficios()
-        faixas_salariais = obter_faixas_salariais()
-        stats = obter_estatisticas_gerais()
+        beneficios = dados['beneficios']
+        faixas_salariais = dados['faixas_salariais']
+        por_qtd_beneficios = dados['por_qtd_beneficios']
+        stats = dados['estatisticas']
         total_ativos = stats['total_ativos']
 
         # Converter benefícios para lista
@@ -1138,6 +1232,8 @@ class DashboardView:
             card_beneficios,
             self._criar_grafico_barras(faixas_salariais, 'faixa', 'quantidade',
                                         "Distribuição por Faixa Salarial", 450, 350),
+            self._criar_grafico_pizza(por_qtd_beneficios, 'faixa', 'quantidade',
+                                       "Benefícios por Colaborador", 320),
         ], spacing=15, wrap=True)
 
         # Cards de resumo financeiro
@@ -1183,60 +1279,58 @@ class DashboardView:
 
 def obter_historico_localizacoes(colaborador_id: int) -> List[Dict]:
     """Obtém o histórico de localizações de um colaborador com tempo em cada local."""
-    conn = db.get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT local_nome, cidade, uf, data_inicio, data_fim, observacoes
-        FROM localizacoes
-        WHERE colaborador_id = ?
-        ORDER BY data_inicio DESC
-    """, (colaborador_id,))
-
-    resultado = []
-    hoje = date.today()
+    with db.conexao() as conn:
+        cursor = conn.cursor()
 
-    for row in cursor.fetchall():
-        data_inicio = datetime.strptime(str(row[3]), '%Y-%m-%d').date() if row[3] else None
-        data_fim = datetime.strptime(str(row[4]), '%Y-%m-%d').date() if row[4] else None
-
-        if data_inicio:
-            fim = data_fim if data_fim else hoje
-            dias = (fim - data_inicio).days
-            # Se foi e voltou no mesmo dia, conta como 1 dia
-            if dias == 0:
-                dias = 1
-            meses = dias // 30
-            dias_resto = dias % 30
-
-            if meses > 0:
-                tempo = f"{meses} mês(es)" + (f" e {dias_resto} dia(s)" if dias_resto > 0 else "")
+        cursor.execute("""
+            SELECT local_nome, cidade, uf, data_inicio, data_fim, observacoes
+            FROM localizacoes
+            WHERE colaborador_id = ?
+            ORDER BY data_inicio DESC
+        """, (colaborador_id,))
+
+        resultado = []
+        hoje = date.today()
+
+        for row in cursor.fetchall():
+            data_inicio = datetime.strptime(str(row[3]), '%Y-%m-%d').date() if row[3] else None
+            data_fim = datetime.strptime(str(row[4]), '%Y-%m-%d').date() if row[4] else None
+
+            if data_inicio:
+                fim = data_fim if data_fim else hoje
+                dias = (fim - data_inicio).days
+                # Se foi e voltou no mesmo dia, conta como 1 dia
+                if dias == 0:
+                    dias = 1
+                meses = dias // 30
+                dias_resto = dias % 30
+
+                if meses > 0:
+                    tempo = f"{meses} mês(es)" + (f" e {dias_resto} dia(s)" if dias_resto > 0 else "")
+                else:
+                    tempo = f"{dias} dia(s)"
             else:
-                tempo = f"{dias} dia(s)"
-        else:
-            tempo = "-"
-            dias = 0
+                tempo = "-"
+                dias = 0
 
-        local = row[0]
-        if row[1]:
-            local += f" - {row[1]}"
-        if row[2]:
-            local += f"/{row[2]}"
+            local = row[0]
+            if row[1]:
+                local += f" - {row[1]}"
+            if row[2]:
+                local += f"/{row[2]}"
 
-        resultado.append({
-            'local': local,
-            'local_nome': row[0],
-            'cidade': row[1],
-            'uf': row[2],
-            'data_inicio': row[3],
-            'data_fim': row[4],
-            'observacoes': row[5],
-            'tempo': tempo,
-            'dias': dias,
-            'atual': data_fim is None
-        })
-
-    conn.close()
+            resultado.append({
+                'local': local,
+                'local_nome': row[0],
+                'cidade': row[1],
+                'uf': row[2],
+                'data_inicio': row[3],
+                'data_fim': row[4],
+                'observacoes': row[5],
+                'tempo': tempo,
+                'dias': dias,
+                'atual': data_fim is None
+            })
     return resultado
 
 
@@ -1245,78 +1339,43 @@ def obter_historico_ferias(colaborador_id: int) -> List[Dict]:
     # Sincronizar dados de férias antes de exibir (garante consistência)
     db.sincronizar_ferias_colaborador(colaborador_id)
 
-    conn = db.get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT f.id, f.periodo_aquisitivo_inicio, f.periodo_aquisitivo_fim,
-               f.periodo_concessivo_limite, f.dias_direito, f.dias_gozados,
-               f.dias_vendidos, f.status
-        FROM ferias f
-        WHERE f.colaborador_id = ?
-        ORDER BY f.periodo_aquisitivo_inicio DESC
-    """, (colaborador_id,))
-
     hoje = date.today()
     resultado = []
     colaborador_em_ferias = False
-    ferias_atual_id = None
 
-    for row in cursor.fetchall():
-        ferias_id = row[0]
-
-        # Buscar períodos de gozo
-        cursor.execute("""
-            SELECT data_inicio, data_fim, dias, abono_pecuniario
-            FROM periodos_ferias
-            WHERE ferias_id = ?
-            ORDER BY data_inicio
-        """, (ferias_id,))
-
-        periodos = []
-        em_ferias_agora = False
-        dias_ja_gozados_ate_hoje = 0
-        dias_restantes_ferias_atual = 0
+    for f in db.carregar_historico_ferias(colaborador_id, hoje):
+        em_ferias_agora = f['em_ferias_agora']
         periodo_ferias_atual = None
-
-        for p in cursor.fetchall():
-            periodo_info = {
-                'data_inicio': p[0],
-                'data_fim': p[1],
-                'dias': p[2],
-                'abono': p[3]
+        if f['periodo_ferias_atual']:
+            p = f['periodo_ferias_atual']
+            periodo_ferias_atual = {
+                'data_inicio': p['data_inicio'],
+                'data_fim': p['data_fim'],
+                'dias': p['dias'],
+                'abono': p['abono_pecuniario']
             }
-            periodos.append(periodo_info)
-
-            # Verificar se está em férias agora (não é abono pecuniário)
-            if p[0] and p[1] and not p[3]:  # não é abono
-                try:
-                    dt_inicio = datetime.strptime(p[0], '%Y-%m-%d').date()
-                    dt_fim = datetime.strptime(p[1], '%Y-%m-%d').date()
-                    if dt_inicio <= hoje <= dt_fim:
-                        em_ferias_agora = True
-                        colaborador_em_ferias = True
-                        ferias_atual_id = ferias_id
-                        periodo_ferias_atual = periodo_info
-                        # Calcular dias já gozados até hoje (incluindo hoje)
-                        dias_ja_gozados_ate_hoje = (hoje - dt_inicio).days + 1
-                        # Calcular dias restantes das férias atuais
-                        dias_restantes_ferias_atual = (dt_fim - hoje).days
-                except:
-                    pass
+        periodos = [
+            {
+                'data_inicio': p['data_inicio'],
+                'data_fim': p['data_fim'],
+                'dias': p['dias'],
+                'abono': p['abono_pecuniario']
+            }
+            for p in f['periodos']
+        ]
 
-        status_original = row[7]
-        dias_gozados = row[5]
-        dias_vendidos = row[6]
-        dias_direito = row[4]
+        status_original = f['status']
+        dias_gozados = f['dias_gozados']
+        dias_vendidos = f['dias_vendidos']
+        dias_direito = f['dias_direito']
 
         # Ajustar status e dias se estiver em férias agora
         if em_ferias_agora:
+            colaborador_em_ferias = True
             status_display = 'EM FÉRIAS'
-            # Calcular dias gozados até hoje (dias já registrados antes + dias do período atual até hoje)
-            # Precisamos calcular quantos dias de outros períodos já foram gozados
-            dias_outros_periodos = dias_gozados - (periodo_ferias_atual['dias'] if periodo_ferias_atual else 0)
-            dias_gozados_ate_hoje = dias_outros_periodos + dias_ja_gozados_ate_hoje
+            # Dias já registrados em outros períodos + dias do período atual até hoje
+            dias_outros_periodos = dias_gozados - periodo_ferias_atual['dias']
+            dias_gozados_ate_hoje = dias_outros_periodos + f['dias_ja_gozados_ate_hoje']
             dias_restantes = dias_direito - dias_gozados_ate_hoje - dias_vendidos
         else:
             status_display = status_original
@@ -1324,12 +1383,12 @@ def obter_historico_ferias(colaborador_id: int) -> List[Dict]:
             dias_restantes = dias_direito - dias_gozados - dias_vendidos
 
         resultado.append({
-            'id': ferias_id,
-            'periodo_aquisitivo_inicio': row[1],
-            'periodo_aquisitivo_fim': row[2],
-            'periodo_concessivo_limite': row[3],
+            'id': f['id'],
+            'periodo_aquisitivo_inicio': f['periodo_aquisitivo_inicio'],
+            'periodo_aquisitivo_fim': f['periodo_aquisitivo_fim'],
+            'periodo_concessivo_limite': f['periodo_concessivo_limite'],
             'dias_direito': dias_direito,
-            'dias_gozados': dias_gozados_ate_hoje if em_ferias_agora else dias_gozados,
+            'dias_gozados': dias_gozados_ate_hoje,
             'dias_gozados_original': dias_gozados,
             'dias_vendidos': dias_vendidos,
             'dias_restantes': dias_restantes,
@@ -1337,87 +1396,74 @@ def obter_historico_ferias(colaborador_id: int) -> List[Dict]:
             'status_original': status_original,
             'periodos': periodos,
             'em_ferias_agora': em_ferias_agora,
-            'dias_ja_gozados_ate_hoje': dias_ja_gozados_ate_hoje if em_ferias_agora else 0,
-            'dias_restantes_ferias_atual': dias_restantes_ferias_atual if em_ferias_agora else 0,
+            'dias_ja_gozados_ate_hoje': f['dias_ja_gozados_ate_hoje'],
+            'dias_restantes_ferias_atual': f['dias_restantes_ferias_atual'],
             'periodo_ferias_atual': periodo_ferias_atual
         })
 
-    conn.close()
-
     # Se o colaborador está em férias, não mostrar o próximo período (que seria o período aquisitivo em andamento)
     if colaborador_em_ferias and len(resultado) > 1:
-        # Filtrar para não mostrar períodos futuros/em aquisição quando está em férias
-        resultado_filtrado = []
-        for f in resultado:
-            # Mostrar o período atual (em férias) e períodos já concluídos
-            if f['em_ferias_agora'] or f['status_original'] == 'CONCLUIDO':
-                resultado_filtrado.append(f)
-            elif f['status_original'] == 'PENDENTE' and not f['em_ferias_agora']:
-                # Verificar se é um período futuro (ainda em aquisição)
-                try:
-                    fim_aquisitivo = datetime.strptime(f['periodo_aquisitivo_fim'], '%Y-%m-%d').date()
-                    # Se o período aquisitivo ainda não terminou, não mostrar
-                    if fim_aquisitivo >= hoje:
-                        continue
-                except:
-                    pass
-                resultado_filtrado.append(f)
-        return resultado_filtrado
+        hoje_iso = hoje.isoformat()
+        # Mostrar o período atual (em férias), os concluídos e os pendentes cujo
+        # período aquisitivo já terminou
+        return [
+            f for f in resultado
+            if f['em_ferias_agora'] or f['status_original'] == 'CONCLUIDO'
+            or (f['status_original'] == 'PENDENTE'
+                and not (f['periodo_aquisitivo_fim'] and f['periodo_aquisitivo_fim'] >= hoje_iso))
+        ]
 
     return resultado
 
 
 def obter_historico_salarios(colaborador_id: int) -> List[Dict]:
     """Obtém o histórico de alterações salariais de um colaborador."""
-    conn = db.get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT campo, valor_anterior, valor_novo, data_alteracao
-        FROM historico_alteracoes
-        WHERE colaborador_id = ? AND campo = 'salario'
-        ORDER BY data_alteracao DESC
-    """, (colaborador_id,))
-
-    resultado = []
-    for row in cursor.fetchall():
-        try:
-            valor_anterior = float(row[1]) if row[1] else 0
-            valor_novo = float(row[2]) if row[2] else 0
-            diferenca = valor_novo - valor_anterior
-            percentual = ((valor_novo - valor_anterior) / valor_anterior * 100) if valor_anterior > 0 else 0
-        except:
-            valor_anterior = 0
-            valor_novo = 0
-            diferenca = 0
-            percentual = 0
+    with db.conexao() as conn:
+        cursor = conn.cursor()
 
-        resultado.append({
-            'valor_anterior': valor_anterior,
-            'valor_novo': valor_novo,
-            'diferenca': diferenca,
-            'percentual': percentual,
-            'data': row[3]
-        })
+        cursor.execute("""
+            SELECT campo, valor_anterior, valor_novo, data_alteracao
+            FROM historico_alteracoes
+            WHERE colaborador_id = ? AND campo = 'salario'
+            ORDER BY data_alteracao DESC
+        """, (colaborador_id,))
+
+        resultado = []
+        for row in cursor.fetchall():
+            try:
+                valor_anterior = float(row[1]) if row[1] else 0
+                valor_novo = float(row[2]) if row[2] else 0
+                diferenca = valor_novo - valor_anterior
+                percentual = ((valor_novo - valor_anterior) / valor_anterior * 100) if valor_anterior > 0 else 0
+            except:
+                valor_anterior = 0
+                valor_novo = 0
+                diferenca = 0
+                percentual = 0
 
-    conn.close()
+            resultado.append({
+                'valor_anterior': valor_anterior,
+                'valor_novo': valor_novo,
+                'diferenca': diferenca,
+                'percentual': percentual,
+                'data': row[3]
+            })
     return resultado
 
 
 def obter_historico_funcoes(colaborador_id: int) -> List[Dict]:
     """Obtém o histórico de alterações de função de um colaborador."""
-    conn = db.get_connection()
-    cursor = conn.cursor()
+    with db.conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute("""
-        SELECT campo, valor_anterior, valor_novo, data_alteracao
-        FROM historico_alteracoes
-        WHERE colaborador_id = ? AND campo = 'funcao'
-        ORDER BY data_alteracao DESC
-    """, (colaborador_id,))
+        cursor.execute("""
+            SELECT campo, valor_anterior, valor_novo, data_alteracao
+            FROM historico_alteracoes
+            WHERE colaborador_id = ? AND campo = 'funcao'
+            ORDER BY data_alteracao DESC
+        """, (colaborador_id,))
 
-    resultado = [{'funcao_anterior': row[1], 'funcao_nova': row[2], 'data': row[3]} for row in cursor.fetchall()]
-    conn.close()
+        resultado = [{'funcao_anterior': row[1], 'funcao_nova': row[2], 'data': row[3]} for row in cursor.fetchall()]
     return resultado
 
 
@@ -2596,3 +2642,8 @@ class AnaliseColaboradorDialog:
             ], horizontal_alignment=ft.CrossAxisAlignment.CENTER),
             padding=10,
         )
+
+
+# Perfil SQL opcional (RH_PERFIL_SQL=1): medir as consultas do dashboard
+if perfil_sql.ativo():
+    perfil_sql.instrumentar_modulo(sys.modules[__name__])
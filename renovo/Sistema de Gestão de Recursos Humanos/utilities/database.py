@@ -5,18 +5,38 @@ RENOVO Montagens Industriais
 
 import sqlite3
 import os
+import calendar
 import sys
 import shutil
-from datetime import datetime, date, timedelta
-from typing import Optional, List, Dict, Any
+import gzip
+import time
+import atexit
+import threading
+import unicodedata
+from contextlib import contextmanager
+from pathlib import Path
+from collections import Counter, deque, OrderedDict
+from datetime import datetime, date, timedelta, timezone
+from typing import Optional, List, Dict, Any, Tuple
 import json
+import copy
+import base64
+import hashlib
+
+from rh_comum import migracoes
+
+from utilities import perfil_sql
 
 
 def get_base_path():
     """
     Retorna o caminho base do executável ou script.
     Necessário para PyInstaller --onefile funcionar corretamente.
+    A variável de ambiente RH_BASE_PATH substitui o caminho (ex.: benchmarks
+    com bancos sintéticos, sem tocar no banco real).
     """
+    if os.environ.get('RH_BASE_PATH'):
+        return os.environ['RH_BASE_PATH']
     if getattr(sys, 'frozen', False):
         # Executando como executável PyInstaller
         return os.path.dirname(sys.executable)
@@ -27,18 +47,367 @@ def get_base_path():
 
 DATABASE_PATH = os.path.join(get_base_path(), "rh_database.db")
 BACKUP_DIR = os.path.join(get_base_path(), "backups")
+LOGS_ARQUIVO_DIR = os.path.join(get_base_path(), "logs_arquivo")
+PERFIL_SQL_DIR = os.path.join(get_base_path(), "perfil_sql")
+IMPORTACAO_PENDENTE_PATH = os.path.join(get_base_path(), "importacao_pendente.json")
+
+# Perfil SQL opcional (RH_PERFIL_SQL=1): ver utilities/perfil_sql.py
+perfil_sql.ativar_se_configurado(PERFIL_SQL_DIR)
+
+
+# =============================================================================
+# Gerenciador de Conexões
+# =============================================================================
+
+# Pragmas aplicados uma única vez, quando a conexão da thread é aberta
+PRAGMAS_CONEXAO = [
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('mmap_size', 268435456),   # 256 MB
+    ('cache_size', -32000),     # ~32 MB (valor negativo = KiB)
+    ('busy_timeout', 10000),    # ms
+    ('temp_store', 'MEMORY'),
+]
+
+_conexoes_thread = threading.local()
+_conexoes_abertas = []
+_conexoes_lock = threading.Lock()
+
+# Restauração de backup (restaurar_banco): enquanto o arquivo é substituído as
+# demais threads aguardam na entrada de conexao(); depois da substituição o
+# banco só volta a ser usado quando o sistema é reiniciado.
+_banco_liberado = threading.Event()
+_banco_liberado.set()
+_thread_restauracao = None
+_banco_substituido = False
+
+# Geração dos dados: avança sempre que uma conexão do sistema confirma (ou
+# desfaz) alterações em tabelas que não sejam as de log. Serve de versão aos
+# caches de contagem e do dashboard, que assim não são invalidados pelos lotes
+# do GravadorLog. Gravações de outros processos não avançam a geração.
+_geracao_dados = 0
+_geracao_dados_lock = threading.Lock()
+
+
+def _avancar_geracao_dados():
+    """Marca os dados em cache (contagens, dashboard) como desatualizados."""
+    global _geracao_dados
+    with _geracao_dados_lock:
+        _geracao_dados += 1
+
+
+class ConexaoRH(sqlite3.Connection):
+    """
+    Conexão persistente compartilhada pelas funções de uma mesma thread.
+    close() não fecha o arquivo: apenas descarta alterações não confirmadas
+    e devolve a conexão ao gerenciador. Use encerrar() para fechar de fato.
+    Dentro de uma unit_of_work(), commit() é adiado até o fim da unidade.
+    """
 
-def get_connection():
-    """Retorna uma conexão com o banco de dados."""
-    conn = sqlite3.connect(DATABASE_PATH)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.encerrada = False
+        self.profundidade = 0
+        self.unidades_trabalho = 0
+        self.backup_pendente = False
+        self.data_version_referencia = None
+        self.alteracoes_logs = 0   # linhas alteradas em blocos _gravacao_logs()
+        self.alteracoes_dados = 0  # demais linhas já refletidas em _geracao_dados
+
+    def _alteracoes_pendentes(self) -> bool:
+        return self.total_changes - self.alteracoes_logs != self.alteracoes_dados
+
+    def _registrar_alteracoes(self):
+        if self._alteracoes_pendentes():
+            self.alteracoes_dados = self.total_changes - self.alteracoes_logs
+            _avancar_geracao_dados()
+
+    def commit(self):
+        if self.unidades_trabalho:
+            return
+        super().commit()
+        self._registrar_alteracoes()
+
+    def rollback(self):
+        super().rollback()
+        self._registrar_alteracoes()
+
+    def close(self):
+        if self.encerrada or self.profundidade > 0:
+            return
+        if self.in_transaction:
+            self.rollback()
+
+    def encerrar(self):
+        if not self.encerrada:
+            self.encerrada = True
+            super().close()
+
+
+def _abrir_conexao(caminho: str) -> ConexaoRH:
+    """Abre e configura uma nova conexão com o banco."""
+    conn = sqlite3.connect(caminho, factory=ConexaoRH, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    conn.create_function('normalizar_busca', 1, normalizar_busca, deterministic=True)
+    for pragma, valor in PRAGMAS_CONEXAO:
+        conn.execute(f'PRAGMA {pragma} = {valor}')
+    if perfil_sql.ativo():
+        perfil_sql.instrumentar_conexao(conn)
+    with _conexoes_lock:
+        _conexoes_abertas.append(conn)
     return conn
 
-def init_database():
-    """Inicializa o banco de dados com todas as tabelas necessárias."""
-    conn = get_connection()
+
+def get_connection() -> ConexaoRH:
+    """
+    Retorna a conexão persistente da thread atual (abrindo-a na primeira chamada).
+    Chamar close() na conexão retornada apenas a devolve ao gerenciador.
+    """
+    conexoes = getattr(_conexoes_thread, 'conexoes', None)
+    if conexoes is None:
+        conexoes = _conexoes_thread.conexoes = {}
+
+    conn = conexoes.get(DATABASE_PATH)
+    if conn is None or conn.encerrada:
+        conn = conexoes[DATABASE_PATH] = _abrir_conexao(DATABASE_PATH)
+    return conn
+
+
+def _entrar_conexao() -> ConexaoRH:
+    """
+    Entra em um bloco conexao() da thread. Durante uma restauração de backup,
+    o bloco mais externo de outra thread espera a restauração terminar.
+    """
+    while True:
+        conn = get_connection()
+        conn.profundidade += 1
+        if (conn.profundidade > 1 or _banco_liberado.is_set()
+                or threading.current_thread() is _thread_restauracao):
+            break
+        conn.profundidade -= 1
+        _banco_liberado.wait()
+
+    if _banco_substituido and conn.profundidade == 1:
+        conn.profundidade -= 1
+        raise sqlite3.OperationalError("O banco de dados foi substituído; reinicie o sistema")
+    return conn
+
+
+def _aguardar_conexoes_livres(timeout: float = 30):
+    """Espera as outras threads saírem de seus blocos conexao()."""
+    propria = getattr(_conexoes_thread, 'conexoes', {}).get(DATABASE_PATH)
+    limite = time.monotonic() + timeout
+    while True:
+        with _conexoes_lock:
+            ocupadas = [c for c in _conexoes_abertas
+                        if c is not propria and not c.encerrada and c.profundidade > 0]
+        if not ocupadas:
+            return
+        if time.monotonic() > limite:
+            raise sqlite3.OperationalError("O banco de dados está em uso; tente novamente")
+        time.sleep(0.01)
+
+
+@contextmanager
+def conexao():
+    """
+    Context manager de acesso ao banco usado pelas funções CRUD.
+
+    Fornece a conexão persistente da thread. Ao sair do bloco mais externo,
+    confirma as alterações pendentes; em caso de exceção, desfaz.
+    Blocos aninhados (uma função CRUD chamando outra) compartilham a conexão.
+    """
+    conn = _entrar_conexao()
+    try:
+        yield conn
+    except BaseException:
+        conn.profundidade -= 1
+        if conn.profundidade == 0 and conn.in_transaction:
+            conn.rollback()
+        raise
+    else:
+        conn.profundidade -= 1
+        if conn.profundidade == 0 and conn.in_transaction:
+            conn.commit()
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Agrupa várias operações CRUD em uma única transação.
+
+    As funções chamadas dentro do bloco compartilham a conexão da thread;
+    seus commit() são adiados, os registros de log são gravados na mesma
+    transação e o backup é sinalizado uma única vez, ao final. Se ocorrer
+    uma exceção, nada do que foi feito no bloco é gravado.
+    """
+    with conexao() as conn:
+        conn.unidades_trabalho += 1
+        try:
+            yield conn
+        except BaseException:
+            conn.unidades_trabalho -= 1
+            if not conn.unidades_trabalho:
+                conn.backup_pendente = False
+            raise
+        conn.unidades_trabalho -= 1
+
+    if not conn.unidades_trabalho and conn.backup_pendente:
+        conn.backup_pendente = False
+        agendar_backup()
+
+
+def _unidade_de_trabalho_ativa() -> Optional[ConexaoRH]:
+    """Retorna a conexão da thread se houver uma unit_of_work() em andamento."""
+    conexoes = getattr(_conexoes_thread, 'conexoes', None)
+    conn = conexoes.get(DATABASE_PATH) if conexoes else None
+    if conn is not None and not conn.encerrada and conn.unidades_trabalho:
+        return conn
+    return None
+
+
+@contextmanager
+def _gravacao_logs(conn: ConexaoRH):
+    """Bloco que só altera logs_sistema e seus contadores: não avança _geracao_dados."""
+    antes = conn.total_changes
+    try:
+        yield conn
+    finally:
+        conn.alteracoes_logs += conn.total_changes - antes
+
+
+def versao_dados(conn: ConexaoRH) -> Optional[int]:
+    """
+    Versão dos dados (exceto logs) para chaves de cache. Retorna None se a
+    própria conexão tem alterações ainda não confirmadas: nesse caso o cache
+    não deve ser lido nem gravado.
+    """
+    if conn._alteracoes_pendentes():
+        return None
+    return _geracao_dados
+
+
+def sincronizar_wal():
+    """Transfere o conteúdo do WAL para o arquivo principal do banco."""
+    with conexao() as conn:
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+
+def fechar_conexoes():
+    """
+    Fecha todas as conexões abertas (de todas as threads).
+    Deve ser chamada antes de substituir o arquivo do banco e ao encerrar o sistema.
+    """
+    # Logs ainda na fila pertencem ao banco atual
+    try:
+        descarregar_logs()
+    except sqlite3.Error:
+        pass
+
+    with _conexoes_lock:
+        conexoes = list(_conexoes_abertas)
+        _conexoes_abertas.clear()
+
+    for conn in conexoes:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        except sqlite3.Error:
+            pass
+        conn.encerrar()
+
+    # O arquivo pode ser substituído (restauração de backup)
+    invalidar_cache_referencia()
+    _avancar_geracao_dados()
+
+
+# =============================================================================
+# Cache de Dados de Referência
+# =============================================================================
+# Empresas, locais, tipos de documentos e configurações mudam raramente, mas
+# são lidos a cada troca de tela. Cada grupo fica em memória por até
+# CACHE_REFERENCIA_TTL segundos. As funções que alteram esses dados chamam
+# invalidar_cache_referencia(); gravações de outras conexões (outra thread
+# ou outro processo usando o mesmo arquivo) mudam PRAGMA data_version e
+# também esvaziam o cache.
+
+CACHE_REFERENCIA_TTL = {
+    'empresas': 300,
+    'locais': 300,
+    'contagem_locais': 60,
+    'tipos_documentos': 600,
+    'configuracoes': 300,
+}
+
+_cache_referencia = {}          # (grupo, argumentos) -> (expira_em, valor)
+_cache_referencia_geracao = 0   # incrementada a cada invalidação
+_cache_referencia_lock = threading.Lock()
+
+
+def invalidar_cache_referencia(*grupos: str):
+    """Descarta os grupos informados do cache (todos, se nenhum for informado)."""
+    global _cache_referencia_geracao
+
+    with _cache_referencia_lock:
+        _cache_referencia_geracao += 1
+        if not grupos:
+            _cache_referencia.clear()
+            return
+        for chave in [chave for chave in _cache_referencia if chave[0] in grupos]:
+            del _cache_referencia[chave]
+
+
+def _em_cache_referencia(grupo: str, argumentos: tuple, carregar):
+    """
+    Retorna o valor em cache de (grupo, argumentos) ou o obtém com carregar(conn).
+    Dentro de uma transação com alterações pendentes a consulta vai direto ao
+    banco, para não guardar dados que ainda podem ser desfeitos.
+    """
+    with conexao() as conn:
+        if conn.in_transaction:
+            return carregar(conn)
+
+        data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if data_version != conn.data_version_referencia:
+            conn.data_version_referencia = data_version
+            invalidar_cache_referencia()
+
+        chave = (grupo, argumentos)
+        agora = time.monotonic()
+        with _cache_referencia_lock:
+            em_cache = _cache_referencia.get(chave)
+            geracao = _cache_referencia_geracao
+        if em_cache and em_cache[0] > agora:
+            return copy.deepcopy(em_cache[1])
+
+        valor = carregar(conn)
+
+    with _cache_referencia_lock:
+        # Uma invalidação durante a consulta torna o valor obtido suspeito
+        if geracao == _cache_referencia_geracao:
+            _cache_referencia[chave] = (agora + CACHE_REFERENCIA_TTL[grupo], valor)
+    return copy.deepcopy(valor)
+
+# =============================================================================
+# Migrações do Esquema
+# =============================================================================
+# Cada migração é numerada e aplicada uma única vez; o número da última
+# aplicada fica em PRAGMA user_version. Para alterar o esquema (tabelas,
+# colunas, índices, triggers, COLUNAS_BUSCA_COLABORADOR, CHAVES_BUSCA),
+# acrescente uma nova migração ao final de MIGRACOES; não altere as existentes.
+
+def _adicionar_coluna(conn, tabela: str, coluna: str, definicao: str):
+    """Adiciona a coluna à tabela se ela ainda não existir."""
+    colunas = [col[1] for col in conn.execute(f"PRAGMA table_info({tabela})").fetchall()]
+    if coluna not in colunas:
+        conn.execute(f'ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}')
+
+
+def _migracao_esquema_inicial(conn):
+    """Tabelas do sistema, colunas acrescentadas em versões antigas e índices."""
     cursor = conn.cursor()
-    
+
     # Tabela de Empresas Contratantes
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS empresas (
@@ -60,18 +429,18 @@ def init_database():
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     ''')
-    
+
     # Tabela Principal de Colaboradores
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS colaboradores (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            
+        
             -- Foto
             foto_path TEXT,
-            
+        
             -- Empresa Contratante
             empresa_id INTEGER,
-            
+        
             -- Dados Pessoais
             nome_completo TEXT NOT NULL,
             endereco TEXT,
@@ -99,7 +468,7 @@ def init_database():
             cpf_mae TEXT,
             nome_pai TEXT,
             cpf_pai TEXT,
-            
+        
             -- Documentos
             carteira_profissional TEXT,
             serie_carteira TEXT,
@@ -124,14 +493,14 @@ def init_database():
             pis TEXT,
             data_cadastramento_pis DATE,
             reservista TEXT,
-            
+        
             -- Exame Médico
             data_exame_medico DATE,
             tipo_exames TEXT,
             nome_medico TEXT,
             crm TEXT,
             uf_crm TEXT,
-            
+        
             -- Dados Último Registro
             cnpj_ultimo_emprego TEXT,
             empresa_ultimo_emprego TEXT,
@@ -140,7 +509,7 @@ def init_database():
             matricula_ultimo TEXT,
             primeiro_registro TEXT,
             data_ultima_contribuicao_sindical DATE,
-            
+        
             -- Dados da Empresa Atual
             data_admissao DATE,
             funcao TEXT,
@@ -155,7 +524,7 @@ def init_database():
             dias_folga TEXT,
             observacoes_contrato TEXT,
             tipo_contrato TEXT,
-            
+        
             -- Benefícios
             vale_transporte INTEGER DEFAULT 0,
             vt_valor_diario REAL,
@@ -175,17 +544,17 @@ def init_database():
             adiantamento INTEGER DEFAULT 0,
             percentual_adiantamento REAL,
             data_pagamento_adiantamento INTEGER,
-            
+        
             -- Dados Bancários
             tipo_conta TEXT,
             banco TEXT,
             agencia TEXT,
             conta TEXT,
             observacoes_banco TEXT,
-            
+        
             -- Observações Gerais
             observacoes_gerais TEXT,
-            
+        
             -- Status
             status TEXT DEFAULT 'ATIVO',
             data_desligamento DATE,
@@ -194,15 +563,15 @@ def init_database():
             motivo_inativacao TEXT,
             submotivo_inativacao TEXT,
             data_inativacao DATE,
-            
+        
             -- Controle
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            
+        
             FOREIGN KEY (empresa_id) REFERENCES empresas(id)
         )
     ''')
-    
+
     # Tabela de Dependentes
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS dependentes (
@@ -251,7 +620,7 @@ def init_database():
             FOREIGN KEY (colaborador_id) REFERENCES colaboradores(id) ON DELETE CASCADE
         )
     ''')
-    
+
     # Tabela de Períodos de Férias (fracionamento)
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS periodos_ferias (
@@ -266,7 +635,7 @@ def init_database():
             FOREIGN KEY (ferias_id) REFERENCES ferias(id) ON DELETE CASCADE
         )
     ''')
-    
+
     # Tabela de Histórico de Contratos
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS contratos_experiencia (
@@ -284,7 +653,7 @@ def init_database():
             FOREIGN KEY (colaborador_id) REFERENCES colaboradores(id) ON DELETE CASCADE
         )
     ''')
-    
+
     # Tabela Block-list (Ex-funcionários)
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS blocklist (
@@ -301,7 +670,7 @@ def init_database():
             FOREIGN KEY (empresa_id) REFERENCES empresas(id)
         )
     ''')
-    
+
     # Tabela de Configurações
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS configuracoes (
@@ -340,23 +709,22 @@ def init_database():
         )
     ''')
 
-    # Tabela de Logs do Sistema (histórico centralizado)
+    # Situação dos documentos obrigatórios por colaborador (mantida a cada alteração)
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS logs_sistema (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            tipo_acao TEXT NOT NULL,
-            categoria TEXT NOT NULL,
-            descricao TEXT NOT NULL,
-            entidade_tipo TEXT,
-            entidade_id INTEGER,
-            entidade_nome TEXT,
-            valor_anterior TEXT,
-            valor_novo TEXT,
-            usuario TEXT DEFAULT 'Sistema',
-            data_hora TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        CREATE TABLE IF NOT EXISTS documentos_status (
+            colaborador_id INTEGER PRIMARY KEY,
+            total_obrigatorios INTEGER NOT NULL,
+            completos INTEGER NOT NULL,
+            faltando INTEGER NOT NULL,
+            lista_faltando TEXT,
+            atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (colaborador_id) REFERENCES colaboradores(id) ON DELETE CASCADE
         )
     ''')
 
+    # Tabela de Logs do Sistema (histórico centralizado)
+    cursor.execute(_SQL_TABELA_LOGS)
+
     # Tabela de Usuários do Sistema
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS usuarios (
@@ -397,131 +765,366 @@ def init_database():
         )
     ''')
 
-    conn.commit()
+    # Colunas que bancos antigos não possuem
+    _adicionar_coluna(conn, 'colaboradores', 'motivo_inativacao', 'TEXT')
+    _adicionar_coluna(conn, 'colaboradores', 'submotivo_inativacao', 'TEXT')
+    _adicionar_coluna(conn, 'colaboradores', 'data_inativacao', 'DATE')
+    _adicionar_coluna(conn, 'documentos_colaborador', 'nao_necessario', 'INTEGER DEFAULT 0')
+    _adicionar_coluna(conn, 'usuarios', 'senha_resetada', 'INTEGER DEFAULT 0')
 
-    # Migração: adicionar colunas de inativação se não existirem
-    try:
-        cursor = conn.cursor()
-        cursor.execute("PRAGMA table_info(colaboradores)")
-        colunas = [col[1] for col in cursor.fetchall()]
+    # Índices para tabela colaboradores
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_colaboradores_cpf ON colaboradores(cpf)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_colaboradores_status ON colaboradores(status)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_colaboradores_empresa ON colaboradores(empresa_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_colaboradores_nome ON colaboradores(nome_completo)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_colaboradores_status_nome ON colaboradores(status, nome_completo)')
 
-        if 'motivo_inativacao' not in colunas:
-            cursor.execute('ALTER TABLE colaboradores ADD COLUMN motivo_inativacao TEXT')
-        if 'submotivo_inativacao' not in colunas:
-            cursor.execute('ALTER TABLE colaboradores ADD COLUMN submotivo_inativacao TEXT')
-        if 'data_inativacao' not in colunas:
-            cursor.execute('ALTER TABLE colaboradores ADD COLUMN data_inativacao DATE')
+    # Índices para tabela blocklist
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_blocklist_cpf ON blocklist(cpf)')
 
-        conn.commit()
-    except:
-        pass
+    # Índices para tabela ferias
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_ferias_colaborador ON ferias(colaborador_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_ferias_status_limite ON ferias(status, periodo_concessivo_limite)')
 
-    # Migração: normalizar CPFs para 11 dígitos
-    try:
-        cursor = conn.cursor()
-        # Verificar se a migração já foi feita checando a tabela de configurações
-        cursor.execute("SELECT valor FROM configuracoes WHERE chave = 'migracao_cpf_11_digitos'")
-        resultado = cursor.fetchone()
+    # Índices para tabela periodos_ferias
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_periodos_ferias_data_fim ON periodos_ferias(ferias_id, data_fim)')
 
-        if not resultado:
-            conn.close()
-            # Executar migração
-            migrar_cpfs_para_11_digitos()
-            # Marcar como executada
-            conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO configuracoes (chave, valor) VALUES ('migracao_cpf_11_digitos', '1')")
-            conn.commit()
-        else:
-            conn.close()
-    except Exception:
-        try:
-            conn.close()
-        except:
-            pass
+    # Índices para tabela dependentes
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_dependentes_colaborador ON dependentes(colaborador_id)')
 
-    # Migração: adicionar coluna nao_necessario na tabela documentos_colaborador
-    try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("PRAGMA table_info(documentos_colaborador)")
-        colunas = [col[1] for col in cursor.fetchall()]
+    # Índices para tabela documentos_colaborador
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_documentos_colaborador ON documentos_colaborador(colaborador_id)')
+
+    # Índices para tabela contratos_experiencia
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_contratos_colaborador ON contratos_experiencia(colaborador_id)')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_contratos_vigentes_colaborador
+        ON contratos_experiencia(colaborador_id) WHERE status = 'VIGENTE'
+    ''')
+    cursor.execute(f'''
+        CREATE INDEX IF NOT EXISTS idx_contratos_vigentes_fim
+        ON contratos_experiencia({_SQL_FIM_CONTRATO.replace('ce.', '')}) WHERE status = 'VIGENTE'
+    ''')
+
+
+def _migracao_cpfs_11_digitos(conn):
+    """Normaliza os CPFs para 11 dígitos (bancos anteriores à normalização)."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT valor FROM configuracoes WHERE chave = 'migracao_cpf_11_digitos'")
+    if not cursor.fetchone():
+        migrar_cpfs_para_11_digitos()
+        cursor.execute("INSERT INTO configuracoes (chave, valor) VALUES ('migracao_cpf_11_digitos', '1')")
+
+
+def _migracao_contratos_experiencia(conn):
+    """Contratos de experiência de colaboradores antigos (sem registro na tabela)."""
+    _garantir_contratos_experiencia(conn)
+
+
+def _migracao_documentos_status(conn):
+    """
+    Remove a situação dos documentos junto com o colaborador e a calcula
+    para os colaboradores já cadastrados.
+    """
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS documentos_status_ad AFTER DELETE ON colaboradores BEGIN
+            DELETE FROM documentos_status WHERE colaborador_id = old.id;
+        END
+    ''')
+    reconstruir_status_documentos()
 
-        if 'nao_necessario' not in colunas:
-            cursor.execute('ALTER TABLE documentos_colaborador ADD COLUMN nao_necessario INTEGER DEFAULT 0')
-            conn.commit()
-        conn.close()
-    except:
-        pass
 
-    # Migração: adicionar coluna senha_resetada na tabela usuarios
+def _migracao_indice_busca(conn):
+    """Índice FTS5 de colaboradores (SQLite sem FTS5 continua usando LIKE)."""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("PRAGMA table_info(usuarios)")
-        colunas = [col[1] for col in cursor.fetchall()]
+        _criar_indice_busca(conn)
+    except sqlite3.OperationalError:
+        pass
 
-        if 'senha_resetada' not in colunas:
-            cursor.execute('ALTER TABLE usuarios ADD COLUMN senha_resetada INTEGER DEFAULT 0')
-            conn.commit()
-        conn.close()
-    except:
+
+def _migracao_indices_log(conn):
+    """Índices de logs_sistema (o índice FTS5 é opcional, como o de colaboradores)."""
+    try:
+        _criar_indices_log(conn)
+    except sqlite3.OperationalError:
         pass
 
-    # Criar índices para melhorar performance de buscas
+
+def _migracao_indices_busca_nomes(conn):
+    """Índice FTS5 da blocklist (SQLite sem FTS5 continua usando LIKE)."""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
+        _criar_indices_busca_nomes(conn)
+    except sqlite3.OperationalError:
+        pass
 
-        # Índices para tabela colaboradores
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_colaboradores_cpf ON colaboradores(cpf)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_colaboradores_status ON colaboradores(status)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_colaboradores_empresa ON colaboradores(empresa_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_colaboradores_nome ON colaboradores(nome_completo)')
 
-        # Índices para tabela blocklist
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_blocklist_cpf ON blocklist(cpf)')
+def _migracao_indice_ferias_em_andamento(conn):
+    """Períodos de férias por data de término (quem está de férias hoje)."""
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_periodos_ferias_vigencia
+        ON periodos_ferias(data_fim, data_inicio)
+    ''')
 
-        # Índices para tabela ferias
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_ferias_colaborador ON ferias(colaborador_id)')
 
-        # Índices para tabela dependentes
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_dependentes_colaborador ON dependentes(colaborador_id)')
+def versao_esquema() -> int:
+    """Retorna a versão do esquema do banco (PRAGMA user_version)."""
+    with conexao() as conn:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
 
-        # Índices para tabela documentos_colaborador
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_documentos_colaborador ON documentos_colaborador(colaborador_id)')
 
-        # Índices para tabela contratos_experiencia
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_contratos_colaborador ON contratos_experiencia(colaborador_id)')
+def aplicar_migracoes() -> List[Dict]:
+    """
+    Aplica as migrações pendentes de MIGRACOES em uma única transação
+    (ver rh_comum.migracoes). Dentro da unit_of_work() os commit() das
+    funções auxiliares chamadas pelas migrações são adiados até o fim.
 
-        conn.commit()
-        conn.close()
-    except:
-        pass
+    Retorna [{'versao': 1, 'descricao': '...', 'duracao_ms': 12.3}, ...]
+    """
+    if versao_esquema() >= MIGRACOES[-1][0]:
+        return []
+
+    with unit_of_work() as conn:
+        return migracoes.aplicar_migracoes(conn, MIGRACOES)
+
+
+def _detectar_indices_fts(conn):
+    """Ativa a busca FTS5 de colaboradores, nomes e logs se os índices existirem e forem utilizáveis."""
+    global _busca_fts_ativa, _busca_logs_fts_ativa
+
+    for tabela in ['colaboradores_fts', 'logs_fts'] + [f'{t}_fts' for t in COLUNAS_BUSCA_NOMES]:
+        try:
+            conn.execute(f'SELECT 1 FROM {tabela} LIMIT 0')
+            ativa = True
+        except sqlite3.OperationalError:
+            ativa = False
+        if tabela == 'colaboradores_fts':
+            _busca_fts_ativa = ativa
+        elif tabela == 'logs_fts':
+            _busca_logs_fts_ativa = ativa
+        elif ativa:
+            _busca_nomes_fts_ativa.add(tabela[:-len('_fts')])
+        else:
+            _busca_nomes_fts_ativa.discard(tabela[:-len('_fts')])
+
+
+def init_database():
+    """Inicializa o banco de dados: aplica as migrações pendentes do esquema."""
+    aplicar_migracoes()
+
+    with conexao() as conn:
+        _detectar_indices_fts(conn)
+
+        # Reconstruir a situação dos documentos quando a regra de
+        # documentos obrigatórios mudar
+        try:
+            if obter_configuracao('documentos_status_versao') != _versao_regra_documentos():
+                reconstruir_status_documentos()
+        except sqlite3.Error:
+            pass
 
     # Criar diretório de backups se não existir
     if not os.path.exists(BACKUP_DIR):
         os.makedirs(BACKUP_DIR)
 
-def backup_database():
-    """Realiza backup do banco de dados."""
+
+# =============================================================================
+# Serviço de Backup
+# =============================================================================
+
+BACKUP_INTERVALO_MINUTOS = 10    # no máximo um backup a cada N minutos...
+BACKUP_MAX_ALTERACOES = 25       # ...ou assim que houver N alterações pendentes
+BACKUP_QUANTIDADE_MANTER = 10
+BACKUP_COMPACTAR = False         # True grava os backups como .db.gz
+BACKUP_PAGINAS_POR_PASSO = 1024  # páginas copiadas por passo da API de backup
+
+
+def _gerar_snapshot(compactar: bool = BACKUP_COMPACTAR) -> Optional[str]:
+    """
+    Gera uma cópia consistente do banco usando a API de backup do SQLite.
+    A cópia é feita em passos, sem bloquear as gravações do sistema, e só
+    recebe o nome definitivo depois de concluída.
+    """
     if not os.path.exists(DATABASE_PATH):
         return None
 
     if not os.path.exists(BACKUP_DIR):
         os.makedirs(BACKUP_DIR)
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_path = os.path.join(BACKUP_DIR, f"rh_backup_{timestamp}.db")
-    shutil.copy2(DATABASE_PATH, backup_path)
+    # Milissegundos no nome e um contador se ainda assim já existir:
+    # um backup nunca sobrescreve outro
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+    extensao = '.db.gz' if compactar else '.db'
+    nome = f"rh_backup_{timestamp}"
+    contador = 0
+    while any(os.path.exists(os.path.join(BACKUP_DIR, nome + ext)) for ext in ('.db', '.db.gz')):
+        contador += 1
+        nome = f"rh_backup_{timestamp}_{contador}"
+    backup_path = os.path.join(BACKUP_DIR, nome + extensao)
+    temp_path = os.path.join(BACKUP_DIR, nome + '.db.tmp')
+
+    origem = sqlite3.connect(DATABASE_PATH, timeout=10)
+    destino = sqlite3.connect(temp_path)
+    try:
+        origem.backup(destino, pages=BACKUP_PAGINAS_POR_PASSO, sleep=0.005)
+        # O backup herda o modo WAL; volta ao modo padrão para ser um arquivo único
+        destino.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        destino.close()
+        origem.close()
+
+    if compactar:
+        with open(temp_path, 'rb') as f_in, gzip.open(backup_path, 'xb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(temp_path)
+    else:
+        os.replace(temp_path, backup_path)
+
+    _aplicar_retencao_backups()
+    return backup_path
+
 
-    # Manter apenas os últimos 10 backups
-    backups = sorted([f for f in os.listdir(BACKUP_DIR) if f.endswith('.db')])
-    while len(backups) > 10:
+def _aplicar_retencao_backups():
+    """Mantém apenas os últimos BACKUP_QUANTIDADE_MANTER backups."""
+    backups = sorted([f for f in os.listdir(BACKUP_DIR)
+                      if f.startswith('rh_backup_') and f.endswith(('.db', '.db.gz'))])
+    while len(backups) > BACKUP_QUANTIDADE_MANTER:
         oldest = backups.pop(0)
         os.remove(os.path.join(BACKUP_DIR, oldest))
 
-    return backup_path
+
+class ServicoBackup:
+    """
+    Agrupa as alterações do banco e gera backups em segundo plano.
+
+    Cada gravação apenas registra uma alteração pendente. Uma thread dedicada
+    gera o backup quando o intervalo, contado a partir da primeira alteração
+    pendente, expira ou quando o número de alterações pendentes atinge o
+    limite, o que ocorrer primeiro. Sem alterações pendentes a thread dorme.
+    """
+
+    def __init__(self, intervalo_minutos: float = BACKUP_INTERVALO_MINUTOS,
+                 max_alteracoes: int = BACKUP_MAX_ALTERACOES,
+                 compactar: bool = BACKUP_COMPACTAR):
+        self.intervalo = intervalo_minutos * 60
+        self.max_alteracoes = max_alteracoes
+        self.compactar = compactar
+        self.alteracoes_pendentes = 0
+        self.primeira_alteracao = None
+        self.ultimo_backup = time.monotonic()
+        self.ultimo_erro = None
+        self._lock = threading.Lock()
+        self._lock_snapshot = threading.Lock()
+        self._sinal = threading.Event()
+        self._thread = None
+        self._parar = False
+
+    def registrar_alteracao(self):
+        """Registra uma alteração no banco, iniciando a thread se necessário."""
+        with self._lock:
+            self.alteracoes_pendentes += 1
+            if self.primeira_alteracao is None:
+                # Inicia a contagem do intervalo e acorda a thread
+                self.primeira_alteracao = time.monotonic()
+                self._sinal.set()
+            if self._thread is None or not self._thread.is_alive():
+                self._parar = False
+                self._thread = threading.Thread(target=self._executar,
+                                                name='ServicoBackup', daemon=True)
+                self._thread.start()
+            if self.alteracoes_pendentes >= self.max_alteracoes:
+                self._sinal.set()
+
+    def _executar(self):
+        """Laço da thread de backup."""
+        while True:
+            with self._lock:
+                primeira = self.primeira_alteracao
+            if primeira is None:
+                self._sinal.wait()
+            else:
+                self._sinal.wait(timeout=max(primeira + self.intervalo - time.monotonic(), 0))
+            self._sinal.clear()
+            if self._parar:
+                return
+
+            with self._lock:
+                pendentes = self.alteracoes_pendentes
+                primeira = self.primeira_alteracao
+            expirou = primeira is not None and time.monotonic() - primeira >= self.intervalo
+            if pendentes and (pendentes >= self.max_alteracoes or expirou):
+                try:
+                    self.backup_agora()
+                except Exception as e:
+                    self.ultimo_erro = str(e)
+                    # Nova tentativa após outro intervalo (ou ao atingir o limite)
+                    with self._lock:
+                        if self.alteracoes_pendentes:
+                            self.primeira_alteracao = time.monotonic()
+
+    def backup_agora(self, compactar: bool = None) -> Optional[str]:
+        """Gera um backup imediatamente e zera as alterações pendentes."""
+        if compactar is None:
+            compactar = self.compactar
+        with self._lock_snapshot:
+            with self._lock:
+                pendentes = self.alteracoes_pendentes
+                primeira = self.primeira_alteracao
+                self.alteracoes_pendentes = 0
+                self.primeira_alteracao = None
+            try:
+                caminho = _gerar_snapshot(compactar)
+            except Exception:
+                with self._lock:
+                    self.alteracoes_pendentes += pendentes
+                    if pendentes and primeira is not None:
+                        self.primeira_alteracao = min(self.primeira_alteracao or primeira, primeira)
+                raise
+            self.ultimo_backup = time.monotonic()
+            self.ultimo_erro = None
+            return caminho
+
+    def finalizar(self):
+        """Encerra a thread e gera o backup das alterações ainda pendentes."""
+        with self._lock:
+            self._parar = True
+            thread = self._thread
+            self._thread = None
+        self._sinal.set()
+        if thread is not None:
+            thread.join(timeout=30)
+        if self.alteracoes_pendentes:
+            self.backup_agora()
+
+
+_servico_backup = ServicoBackup()
+
+
+def agendar_backup():
+    """
+    Sinaliza uma alteração no banco para o serviço de backup.
+    Dentro de uma unit_of_work(), o sinal é dado uma única vez, ao final.
+    """
+    conn = _unidade_de_trabalho_ativa()
+    if conn is not None:
+        conn.backup_pendente = True
+        return
+    _servico_backup.registrar_alteracao()
+
+
+def finalizar_backup():
+    """Gera o backup pendente, se houver. Chamado ao encerrar o sistema."""
+    try:
+        _servico_backup.finalizar()
+    except Exception as e:
+        _servico_backup.ultimo_erro = str(e)
+
+
+def backup_database(compactar: bool = None):
+    """Realiza backup imediato do banco de dados."""
+    return _servico_backup.backup_agora(compactar)
+
+
+atexit.register(finalizar_backup)
 
 
 def validar_banco_dados(caminho_arquivo: str) -> bool:
@@ -563,37 +1166,131 @@ def validar_banco_dados(caminho_arquivo: str) -> bool:
         return False
 
 
+# =============================================================================
+# Restauração de Backup
+# =============================================================================
+
+def restaurar_banco(caminho_arquivo: str):
+    """
+    Substitui o banco atual pelo arquivo informado (importação de backup).
+
+    O gravador de logs e o serviço de backup são encerrados, o arquivamento
+    de logs é bloqueado e as demais threads aguardam suas conexões; o
+    conteúdo é copiado com a API de backup do SQLite, sem sobrescrever o
+    arquivo sob conexões abertas. Em seguida o sistema deve ser reiniciado:
+    as migrações são aplicadas ao banco importado e o log da importação é
+    gravado na abertura (registrar_importacao_pendente).
+    """
+    global _thread_restauracao, _banco_substituido
+
+    finalizar_logs()
+    finalizar_backup()
+
+    if not _arquivamento_logs_lock.acquire(timeout=30):
+        raise sqlite3.OperationalError("Arquivamento de logs em andamento; tente novamente")
+    try:
+        with _servico_backup._lock_snapshot:
+            _thread_restauracao = threading.current_thread()
+            _banco_liberado.clear()
+            try:
+                _aguardar_conexoes_livres()
+                fechar_conexoes()
+
+                origem = sqlite3.connect(caminho_arquivo)
+                destino = sqlite3.connect(DATABASE_PATH, timeout=10)
+                try:
+                    # Sem WAL no destino, o backup pode trocar também o tamanho de página
+                    destino.execute('PRAGMA journal_mode = DELETE')
+                    origem.backup(destino, pages=BACKUP_PAGINAS_POR_PASSO)
+                finally:
+                    destino.close()
+                    origem.close()
+                _banco_substituido = True
+
+                with open(IMPORTACAO_PENDENTE_PATH, 'w', encoding='utf-8') as f:
+                    json.dump({'arquivo': caminho_arquivo,
+                               'data_hora': datetime.now().isoformat(timespec='seconds')}, f)
+            finally:
+                _thread_restauracao = None
+                _banco_liberado.set()
+    finally:
+        _arquivamento_logs_lock.release()
+
+
+def registrar_importacao_pendente():
+    """Grava o log de uma importação de backup feita antes do reinício."""
+    if not os.path.exists(IMPORTACAO_PENDENTE_PATH):
+        return
+    try:
+        with open(IMPORTACAO_PENDENTE_PATH, encoding='utf-8') as f:
+            arquivo = json.load(f).get('arquivo', '')
+    except (OSError, ValueError):
+        arquivo = ''
+
+    registrar_log(
+        tipo_acao='IMPORTAR',
+        categoria='BACKUP',
+        descricao=f'Backup importado de: {arquivo}',
+        entidade_tipo='backup',
+        entidade_nome=os.path.basename(arquivo)
+    )
+    os.remove(IMPORTACAO_PENDENTE_PATH)
+
+
+# =============================================================================
+# Configurações
+# =============================================================================
+
+def obter_configuracao(chave: str, padrao: str = None) -> Optional[str]:
+    """Retorna o valor de uma chave da tabela configuracoes (em cache)."""
+    def carregar(conn):
+        return {row['chave']: row['valor'] for row in conn.execute('SELECT chave, valor FROM configuracoes')}
+
+    return _em_cache_referencia('configuracoes', (), carregar).get(chave, padrao)
+
+
+def salvar_configuracao(chave: str, valor: str):
+    """Grava (ou substitui) o valor de uma chave da tabela configuracoes."""
+    with conexao() as conn:
+        conn.execute('''
+            INSERT OR REPLACE INTO configuracoes (chave, valor, updated_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+        ''', (chave, valor))
+        conn.commit()
+    invalidar_cache_referencia('configuracoes')
+
+
 # =============================================================================
 # CRUD Empresas
 # =============================================================================
 
 def criar_empresa(dados: dict) -> int:
     """Cria uma nova empresa."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        INSERT INTO empresas (razao_social, cnpj, endereco, numero, complemento,
-                             bairro, cep, cidade, uf, telefone, email, logo_path)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        dados.get('razao_social'),
-        dados.get('cnpj'),
-        dados.get('endereco'),
-        dados.get('numero'),
-        dados.get('complemento'),
-        dados.get('bairro'),
-        dados.get('cep'),
-        dados.get('cidade'),
-        dados.get('uf'),
-        dados.get('telefone'),
-        dados.get('email'),
-        dados.get('logo_path')
-    ))
-
-    empresa_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+        cursor.execute('''
+            INSERT INTO empresas (razao_social, cnpj, endereco, numero, complemento,
+                                 bairro, cep, cidade, uf, telefone, email, logo_path)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            dados.get('razao_social'),
+            dados.get('cnpj'),
+            dados.get('endereco'),
+            dados.get('numero'),
+            dados.get('complemento'),
+            dados.get('bairro'),
+            dados.get('cep'),
+            dados.get('cidade'),
+            dados.get('uf'),
+            dados.get('telefone'),
+            dados.get('email'),
+            dados.get('logo_path')
+        ))
+
+        empresa_id = cursor.lastrowid
+        conn.commit()
+    invalidar_cache_referencia('empresas')
 
     # Registrar log
     nome = dados.get('razao_social', 'Empresa')
@@ -609,60 +1306,56 @@ def criar_empresa(dados: dict) -> int:
     return empresa_id
 
 def listar_empresas(apenas_ativas: bool = True) -> List[Dict]:
-    """Lista todas as empresas."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    if apenas_ativas:
-        cursor.execute('SELECT * FROM empresas WHERE ativa = 1 ORDER BY razao_social')
-    else:
-        cursor.execute('SELECT * FROM empresas ORDER BY razao_social')
-    
-    empresas = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return empresas
+    """Lista todas as empresas (em cache, ver CACHE_REFERENCIA_TTL)."""
+    def carregar(conn):
+        cursor = conn.cursor()
+        if apenas_ativas:
+            cursor.execute('SELECT * FROM empresas WHERE ativa = 1 ORDER BY razao_social')
+        else:
+            cursor.execute('SELECT * FROM empresas ORDER BY razao_social')
+        return [dict(row) for row in cursor.fetchall()]
+
+    return _em_cache_referencia('empresas', (apenas_ativas,), carregar)
 
 def obter_empresa(empresa_id: int) -> Optional[Dict]:
     """Obtém uma empresa pelo ID."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM empresas WHERE id = ?', (empresa_id,))
-    row = cursor.fetchone()
-    conn.close()
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM empresas WHERE id = ?', (empresa_id,))
+        row = cursor.fetchone()
     return dict(row) if row else None
 
 def atualizar_empresa(empresa_id: int, dados: dict) -> bool:
     """Atualiza os dados de uma empresa."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
     
-    campos = []
-    valores = []
-    for key, value in dados.items():
-        if key != 'id':
-            campos.append(f"{key} = ?")
-            valores.append(value)
+        campos = []
+        valores = []
+        for key, value in dados.items():
+            if key != 'id':
+                campos.append(f"{key} = ?")
+                valores.append(value)
     
-    valores.append(empresa_id)
+        valores.append(empresa_id)
     
-    cursor.execute(f'''
-        UPDATE empresas SET {', '.join(campos)}, updated_at = CURRENT_TIMESTAMP
-        WHERE id = ?
-    ''', valores)
+        cursor.execute(f'''
+            UPDATE empresas SET {', '.join(campos)}, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', valores)
     
-    conn.commit()
-    affected = cursor.rowcount
-    conn.close()
+        conn.commit()
+        affected = cursor.rowcount
+    invalidar_cache_referencia('empresas')
     return affected > 0
 
 
 def contar_colaboradores_empresa(empresa_id: int) -> int:
     """Conta quantos colaboradores estão vinculados a uma empresa."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT COUNT(*) FROM colaboradores WHERE empresa_id = ?', (empresa_id,))
-    resultado = cursor.fetchone()
-    conn.close()
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM colaboradores WHERE empresa_id = ?', (empresa_id,))
+        resultado = cursor.fetchone()
     return resultado[0] if resultado else 0
 
 
@@ -676,18 +1369,16 @@ def excluir_empresa(empresa_id: int, excluir_colaboradores: bool = False) -> boo
     empresa = obter_empresa(empresa_id)
     nome_empresa = empresa.get('razao_social', 'Empresa') if empresa else 'Empresa'
 
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    # Verificar se há colaboradores vinculados
-    cursor.execute('SELECT COUNT(*) FROM colaboradores WHERE empresa_id = ?', (empresa_id,))
-    qtd_colaboradores = cursor.fetchone()[0]
+        # Verificar se há colaboradores vinculados
+        cursor.execute('SELECT COUNT(*) FROM colaboradores WHERE empresa_id = ?', (empresa_id,))
+        qtd_colaboradores = cursor.fetchone()[0]
 
-    if qtd_colaboradores > 0 and not excluir_colaboradores:
-        conn.close()
-        return False
+        if qtd_colaboradores > 0 and not excluir_colaboradores:
+            return False
 
-    try:
         if excluir_colaboradores and qtd_colaboradores > 0:
             # Obter IDs dos colaboradores para excluir registros relacionados
             cursor.execute('SELECT id FROM colaboradores WHERE empresa_id = ?', (empresa_id,))
@@ -711,29 +1402,224 @@ def excluir_empresa(empresa_id: int, excluir_colaboradores: bool = False) -> boo
         cursor.execute('DELETE FROM empresas WHERE id = ?', (empresa_id,))
 
         conn.commit()
-        conn.close()
+    invalidar_cache_referencia()
 
-        # Registrar log
-        descricao = f'Empresa excluída: {nome_empresa}'
-        if excluir_colaboradores and qtd_colaboradores > 0:
-            descricao += f' (incluindo {qtd_colaboradores} colaborador(es))'
-        registrar_log(
-            tipo_acao='EXCLUIR',
-            categoria='EMPRESA',
-            descricao=descricao,
-            entidade_tipo='empresa',
-            entidade_id=empresa_id,
-            entidade_nome=nome_empresa
+    # Registrar log
+    descricao = f'Empresa excluída: {nome_empresa}'
+    if excluir_colaboradores and qtd_colaboradores > 0:
+        descricao += f' (incluindo {qtd_colaboradores} colaborador(es))'
+    registrar_log(
+        tipo_acao='EXCLUIR',
+        categoria='EMPRESA',
+        descricao=descricao,
+        entidade_tipo='empresa',
+        entidade_id=empresa_id,
+        entidade_nome=nome_empresa
+    )
+
+    # Backup automático
+    agendar_backup()
+
+    return True
+
+
+# =============================================================================
+# Busca de Colaboradores (índice FTS5)
+# =============================================================================
+
+# Colunas de nome que recebem uma chave de busca normalizada (tabela -> coluna).
+# A chave é calculada em Python pelas funções que gravam o nome.
+CHAVES_BUSCA = {
+    'colaboradores': 'nome_completo',
+    'blocklist': 'nome',
+}
+
+# Colunas do índice de busca textual -> coluna de origem em colaboradores
+COLUNAS_BUSCA_COLABORADOR = {
+    'nome_busca': 'nome_busca',
+    'cpf': 'cpf',
+}
+
+# Índices de busca textual de outras tabelas: tabela -> {coluna do índice: coluna de origem}
+COLUNAS_BUSCA_NOMES = {
+    'blocklist': {'nome_busca': 'nome_busca', 'cpf': 'cpf'},
+}
+
+# Definidos por init_database(); desativados quando o SQLite não possui FTS5
+_busca_fts_ativa = False
+_busca_nomes_fts_ativa = set()
+
+
+def normalizar_busca(texto: Optional[str]) -> Optional[str]:
+    """
+    Normaliza um texto para busca: remove acentos, ignora maiúsculas/minúsculas
+    e reduz espaços repetidos. Ex.: "  JOÃO  da Silva" -> "joao da silva".
+    Também registrada como função SQL nas conexões do sistema (usada para
+    preencher as chaves; triggers e índices não dependem dela).
+    """
+    if texto is None:
+        return None
+    decomposto = unicodedata.normalize('NFKD', str(texto))
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.casefold().split())
+
+
+def _criar_chaves_busca(conn):
+    """
+    Cria as colunas nome_busca (se não existirem) e seus índices.
+    Colunas recém-criadas são preenchidas; depois disso a chave é gravada
+    junto com o nome (criar_colaborador, atualizar_colaborador, blocklist).
+    """
+    cursor = conn.cursor()
+    for tabela, coluna in CHAVES_BUSCA.items():
+        cursor.execute(f"PRAGMA table_info({tabela})")
+        colunas = [col[1] for col in cursor.fetchall()]
+        nova = 'nome_busca' not in colunas
+        if nova:
+            cursor.execute(f'ALTER TABLE {tabela} ADD COLUMN nome_busca TEXT COLLATE NOCASE')
+
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{tabela}_nome_busca ON {tabela}(nome_busca)')
+
+        if nova:
+            cursor.execute(f'UPDATE {tabela} SET nome_busca = normalizar_busca({coluna})')
+    conn.commit()
+
+
+def preencher_chaves_busca() -> int:
+    """
+    Recalcula as chaves de busca de todos os registros cujo valor esteja
+    desatualizado (ex.: nomes gravados por fora do sistema, pelo sqlite3).
+    Retorna a quantidade de registros corrigidos.
+    """
+    corrigidos = 0
+    with conexao() as conn:
+        for tabela, coluna in CHAVES_BUSCA.items():
+            cursor = conn.execute(f'''
+                UPDATE {tabela} SET nome_busca = normalizar_busca({coluna})
+                WHERE nome_busca IS NOT normalizar_busca({coluna})
+            ''')
+            corrigidos += cursor.rowcount
+        conn.commit()
+    return corrigidos
+
+
+def _criar_indice_fts(conn, tabela: str, colunas_indice: Dict[str, str]):
+    """
+    Cria o índice FTS5 (tokenizador trigram) {tabela}_fts sobre as colunas
+    informadas (coluna do índice -> coluna de origem) e os triggers que o
+    mantêm sincronizado. Os triggers só copiam colunas, sem funções próprias
+    do sistema. Na primeira criação o índice é populado.
+    """
+    indice = f'{tabela}_fts'
+
+    def valores(linha):
+        return ', '.join(f'{linha}.{origem}' for origem in colunas_indice.values())
+
+    colunas = ', '.join(colunas_indice)
+    origens = ', '.join(colunas_indice.values())
+    novas, antigas = valores('new'), valores('old')
+
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA table_info({indice})")
+    colunas_atuais = [col[1] for col in cursor.fetchall()]
+    if colunas_atuais and colunas_atuais != list(colunas_indice):
+        # Índice criado com outras colunas: recriar
+        for sufixo in ('ai', 'ad', 'au'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {indice}_{sufixo}')
+        cursor.execute(f'DROP TABLE {indice}')
+        colunas_atuais = []
+
+    cursor.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS {indice} USING fts5(
+            {colunas}, content='{tabela}', content_rowid='id', tokenize='trigram'
         )
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {indice}_ai AFTER INSERT ON {tabela} BEGIN
+            INSERT INTO {indice}(rowid, {colunas}) VALUES (new.id, {novas});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {indice}_ad AFTER DELETE ON {tabela} BEGIN
+            INSERT INTO {indice}({indice}, rowid, {colunas})
+            VALUES ('delete', old.id, {antigas});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {indice}_au AFTER UPDATE OF {origens} ON {tabela} BEGIN
+            INSERT INTO {indice}({indice}, rowid, {colunas})
+            VALUES ('delete', old.id, {antigas});
+            INSERT INTO {indice}(rowid, {colunas}) VALUES (new.id, {novas});
+        END
+    ''')
 
-        # Backup automático
-        backup_database()
+    if not colunas_atuais:
+        cursor.execute(f"INSERT INTO {indice}({indice}) VALUES ('rebuild')")
 
-        return True
-    except Exception as e:
-        conn.rollback()
-        conn.close()
-        raise e
+
+def _criar_indice_busca(conn):
+    """Índice de busca textual de colaboradores (nome e CPF)."""
+    global _busca_fts_ativa
+    _criar_indice_fts(conn, 'colaboradores', COLUNAS_BUSCA_COLABORADOR)
+    conn.commit()
+    _busca_fts_ativa = True
+
+
+def _criar_indices_busca_nomes(conn):
+    """Índice de busca textual da blocklist (nome e CPF)."""
+    for tabela, colunas_indice in COLUNAS_BUSCA_NOMES.items():
+        _criar_indice_fts(conn, tabela, colunas_indice)
+        _busca_nomes_fts_ativa.add(tabela)
+    conn.commit()
+
+
+def reconstruir_indice_busca():
+    """Reconstrói os índices de busca textual a partir de colaboradores e blocklist."""
+    with conexao() as conn:
+        conn.execute("INSERT INTO colaboradores_fts(colaboradores_fts) VALUES ('rebuild')")
+        for tabela in _busca_nomes_fts_ativa:
+            conn.execute(f"INSERT INTO {tabela}_fts({tabela}_fts) VALUES ('rebuild')")
+        conn.commit()
+
+
+def _condicao_nome(tabela: str, alias: str, filtro: str) -> tuple:
+    """
+    Condição de busca pelo nome ou CPF (chaves de COLUNAS_BUSCA_NOMES) da
+    tabela de alias informado, comparando o nome pela chave normalizada.
+    Termos com 3 ou mais caracteres usam o índice FTS5 da tabela; os menores,
+    LIKE. Retorna (condicao, params).
+    """
+    termo = normalizar_busca(filtro)
+    if tabela in _busca_nomes_fts_ativa and len(termo) >= 3:
+        indice = f'{tabela}_fts'
+        frase = '"' + termo.replace('"', '""') + '"'
+        condicao = f'{alias}.id IN (SELECT rowid FROM {indice} WHERE {indice} MATCH ?)'
+        return condicao, ['{' + ' '.join(COLUNAS_BUSCA_NOMES[tabela]) + '} : ' + frase]
+
+    return f'({alias}.nome_busca LIKE ? OR {alias}.cpf LIKE ?)', [f'%{termo}%', f'%{termo}%']
+
+
+def _filtro_busca_colaborador(filtro: str) -> tuple:
+    """
+    Monta a condição de busca por nome/CPF (alias "c") e a expressão de relevância
+    (0 para os registros que começam com o texto buscado, 1 para os demais).
+    O nome é comparado pela chave normalizada (sem acentos e sem caixa).
+    Termos com 3 ou mais caracteres usam o índice FTS5; os menores, LIKE.
+
+    Retorna (condicao, params_condicao, relevancia, params_relevancia).
+    """
+    termo = normalizar_busca(filtro)
+    if _busca_fts_ativa and len(termo) >= 3:
+        frase = '"' + termo.replace('"', '""') + '"'
+        condicao = '''c.id IN (SELECT rowid FROM colaboradores_fts
+                                WHERE colaboradores_fts MATCH ?)'''
+        params = ['{nome_busca cpf} : ' + frase]
+    else:
+        condicao = '(c.nome_busca LIKE ? OR c.cpf LIKE ?)'
+        params = [f'%{termo}%', f'%{termo}%']
+
+    relevancia = 'CASE WHEN c.nome_busca LIKE ? OR c.cpf LIKE ? THEN 0 ELSE 1 END'
+    return condicao, params, relevancia, [f'{termo}%', f'{termo}%']
 
 
 # =============================================================================
@@ -742,23 +1628,25 @@ def excluir_empresa(empresa_id: int, excluir_colaboradores: bool = False) -> boo
 
 def criar_colaborador(dados: dict) -> int:
     """Cria um novo colaborador."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    dados = dict(dados, nome_busca=normalizar_busca(dados.get('nome_completo')))
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    # Construir query dinamicamente
-    campos = list(dados.keys())
-    placeholders = ', '.join(['?' for _ in campos])
-    campos_str = ', '.join(campos)
-    valores = [dados[c] for c in campos]
+        # Construir query dinamicamente
+        campos = list(dados.keys())
+        placeholders = ', '.join(['?' for _ in campos])
+        campos_str = ', '.join(campos)
+        valores = [dados[c] for c in campos]
 
-    cursor.execute(f'''
-        INSERT INTO colaboradores ({campos_str})
-        VALUES ({placeholders})
-    ''', valores)
+        cursor.execute(f'''
+            INSERT INTO colaboradores ({campos_str})
+            VALUES ({placeholders})
+        ''', valores)
 
-    colaborador_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+        colaborador_id = cursor.lastrowid
+        _atualizar_status_documentos(conn, colaborador_id)
+        _garantir_contratos_experiencia(conn, colaborador_id)
+        conn.commit()
 
     # Registrar log
     nome = dados.get('nome_completo', 'Colaborador')
@@ -772,46 +1660,61 @@ def criar_colaborador(dados: dict) -> int:
     )
 
     # Backup automático
-    backup_database()
+    agendar_backup()
 
     return colaborador_id
 
-def listar_colaboradores(filtro: str = None, status: str = 'ATIVO', empresa_id: int = None,
-                         localizacao: str = None, limite: int = None, offset: int = None) -> List[Dict]:
-    """Lista colaboradores com filtros opcionais e suporte a paginação."""
-    conn = get_connection()
-    cursor = conn.cursor()
+def _consulta_colaboradores(filtro: str = None, status: str = None, empresa_id: int = None,
+                            localizacao: str = None) -> tuple:
+    """
+    Monta o trecho FROM/WHERE compartilhado pelas listagens de colaboradores
+    (alias "c") e, havendo filtro de texto, a expressão de relevância da busca.
 
+    Retorna (from_where, params, relevancia, params_relevancia); relevancia é
+    None quando não há filtro.
+    """
+    from_where = '''
+        FROM colaboradores c
+        LEFT JOIN empresas e ON c.empresa_id = e.id
+    '''
     if localizacao:
         # Se filtrar por localização, fazer JOIN com a tabela de localizações
-        query = '''
-            SELECT c.*, e.razao_social as empresa_nome
-            FROM colaboradores c
-            LEFT JOIN empresas e ON c.empresa_id = e.id
-            JOIN localizacoes l ON c.id = l.colaborador_id AND l.data_fim IS NULL
-            WHERE 1=1
-        '''
-    else:
-        query = 'SELECT c.*, e.razao_social as empresa_nome FROM colaboradores c LEFT JOIN empresas e ON c.empresa_id = e.id WHERE 1=1'
+        from_where += ' JOIN localizacoes l ON c.id = l.colaborador_id AND l.data_fim IS NULL'
+    from_where += ' WHERE 1=1'
     params = []
 
     if status:
-        query += ' AND c.status = ?'
+        from_where += ' AND c.status = ?'
         params.append(status)
 
     if empresa_id:
-        query += ' AND c.empresa_id = ?'
+        from_where += ' AND c.empresa_id = ?'
         params.append(empresa_id)
 
     if localizacao:
-        query += ' AND l.local_nome = ?'
+        from_where += ' AND l.local_nome = ?'
         params.append(localizacao)
 
+    relevancia, params_relevancia = None, []
     if filtro:
-        query += ' AND (c.nome_completo LIKE ? OR c.cpf LIKE ?)'
-        params.extend([f'%{filtro}%', f'%{filtro}%'])
+        condicao, params_filtro, relevancia, params_relevancia = _filtro_busca_colaborador(filtro)
+        from_where += f' AND {condicao}'
+        params.extend(params_filtro)
+
+    return from_where, params, relevancia, params_relevancia
+
+
+def listar_colaboradores(filtro: str = None, status: str = 'ATIVO', empresa_id: int = None,
+                         localizacao: str = None, limite: int = None, offset: int = None) -> List[Dict]:
+    """Lista colaboradores com filtros opcionais e suporte a paginação."""
+    from_where, params, relevancia, params_relevancia = _consulta_colaboradores(
+        filtro, status, empresa_id, localizacao)
 
-    query += ' ORDER BY c.nome_completo'
+    query = f'SELECT c.*, e.razao_social as empresa_nome {from_where} ORDER BY '
+    if relevancia:
+        query += f'{relevancia}, '
+        params = params + params_relevancia
+    query += 'c.nome_completo'
 
     # Adicionar paginação
     if limite is not None:
@@ -821,62 +1724,170 @@ def listar_colaboradores(filtro: str = None, status: str = 'ATIVO', empresa_id:
             query += ' OFFSET ?'
             params.append(offset)
 
-    cursor.execute(query, params)
-    colaboradores = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        colaboradores = [dict(row) for row in cursor.fetchall()]
     return colaboradores
 
 
 def contar_colaboradores(filtro: str = None, status: str = 'ATIVO', empresa_id: int = None,
                          localizacao: str = None) -> int:
     """Conta o total de colaboradores com filtros opcionais."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    from_where, params, _, _ = _consulta_colaboradores(filtro, status, empresa_id, localizacao)
 
-    if localizacao:
-        # Se filtrar por localização, fazer JOIN com a tabela de localizações
-        query = '''
-            SELECT COUNT(*) FROM colaboradores c
-            JOIN localizacoes l ON c.id = l.colaborador_id AND l.data_fim IS NULL
-            WHERE 1=1
-        '''
-    else:
-        query = 'SELECT COUNT(*) FROM colaboradores c WHERE 1=1'
-    params = []
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT COUNT(*) {from_where}', params)
+        total = cursor.fetchone()[0]
+    return total
 
-    if status:
-        query += ' AND c.status = ?'
-        params.append(status)
 
-    if empresa_id:
-        query += ' AND c.empresa_id = ?'
-        params.append(empresa_id)
+# Contagens por combinação de filtros, válidas enquanto o banco não mudar.
+# Cada cache guarda só as CACHE_CONTAGEM_MAXIMO combinações usadas mais
+# recentemente (a busca digitada gera uma combinação por tecla).
+CACHE_CONTAGEM_MAXIMO = 32
+_cache_contagem_lock = threading.Lock()
+_cache_contagem_colaboradores = OrderedDict()
 
-    if localizacao:
-        query += ' AND l.local_nome = ?'
-        params.append(localizacao)
 
-    if filtro:
-        query += ' AND (c.nome_completo LIKE ? OR c.cpf LIKE ?)'
-        params.extend([f'%{filtro}%', f'%{filtro}%'])
+def _ler_contagem(cache: OrderedDict, chave) -> Optional[tuple]:
+    """Retorna o valor em cache da combinação de filtros (marcando-a como recente)."""
+    with _cache_contagem_lock:
+        em_cache = cache.get(chave)
+        if em_cache is not None:
+            cache.move_to_end(chave)
+        return em_cache
+
+
+def _guardar_contagem(cache: OrderedDict, chave, valor: tuple, maximo: int = CACHE_CONTAGEM_MAXIMO):
+    """Guarda a contagem, descartando as combinações usadas há mais tempo."""
+    with _cache_contagem_lock:
+        cache[chave] = valor
+        cache.move_to_end(chave)
+        while len(cache) > maximo:
+            cache.popitem(last=False)
+
+
+def _versao_banco(conn) -> tuple:
+    """
+    Identifica o estado do banco: muda a cada gravação, de qualquer conexão
+    (inclusive de logs; para os demais dados, use versao_dados()).
+    """
+    data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+    return (id(conn), data_version, conn.total_changes)
+
+
+def _codificar_cursor(direcao: str, chave: list) -> str:
+    """Gera o cursor opaco de paginação a partir da chave de ordenação."""
+    bruto = json.dumps([direcao, chave], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(bruto).decode('ascii')
+
+
+def _decodificar_cursor(cursor_pagina: str, tamanho_chave: int = 3) -> Optional[tuple]:
+    """Lê um cursor de paginação. Retorna (direcao, chave) ou None se inválido."""
+    try:
+        direcao, chave = json.loads(base64.urlsafe_b64decode(cursor_pagina.encode('ascii')))
+    except (ValueError, TypeError, AttributeError):
+        return None
+    if direcao not in ('>', '<') or not isinstance(chave, list) or len(chave) != tamanho_chave:
+        return None
+    return direcao, chave
+
+
+def listar_colaboradores_pagina(filtro: str = None, status: str = 'ATIVO', empresa_id: int = None,
+                                localizacao: str = None, limite: int = 50,
+                                cursor_pagina: str = None) -> Dict:
+    """
+    Lista uma página de colaboradores usando paginação por chave (keyset),
+    ordenada por (relevância da busca, nome_completo, id). O custo de cada
+    página independe da posição, ao contrário de LIMIT/OFFSET.
+
+    cursor_pagina: None para a primeira página, ou um dos cursores
+    'proximo'/'anterior' retornados pela chamada anterior.
+
+    Retorna:
+    {
+        'colaboradores': [...],
+        'total': 120,            # total com os filtros (contagem em cache)
+        'proximo': 'cursor'|None,
+        'anterior': 'cursor'|None,
+    }
+    """
+    from_where, params, relevancia, params_relevancia = _consulta_colaboradores(
+        filtro, status, empresa_id, localizacao)
+
+    cursor_lido = _decodificar_cursor(cursor_pagina) if cursor_pagina else None
+    direcao = cursor_lido[0] if cursor_lido else '>'
+    sentido = 'ASC' if direcao == '>' else 'DESC'
+
+    # Sem filtro de texto a relevância é constante e fica fora da chave,
+    # permitindo percorrer o índice (status, nome_completo) diretamente
+    colunas_chave = ['relevancia_busca', 'nome_completo', 'id'] if relevancia else ['nome_completo', 'id']
+
+    query = f'''
+        SELECT * FROM (
+            SELECT c.*, e.razao_social as empresa_nome, {relevancia or 0} AS relevancia_busca
+            {from_where}
+        )
+    '''
+    params_pagina = params_relevancia + params
+    if cursor_lido:
+        chave = cursor_lido[1][-len(colunas_chave):]
+        query += f' WHERE ({", ".join(colunas_chave)}) {direcao} ({", ".join("?" * len(chave))})'
+        params_pagina += chave
+    query += ' ORDER BY ' + ', '.join(f'{c} {sentido}' for c in colunas_chave) + ' LIMIT ?'
+    params_pagina.append(limite + 1)
+
+    chave_contagem = (filtro, status, empresa_id, localizacao)
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params_pagina)
+        colaboradores = [dict(row) for row in cursor.fetchall()]
+
+        # Lida antes da contagem: uma gravação concorrente invalida o valor guardado
+        versao = versao_dados(conn)
+        em_cache = _ler_contagem(_cache_contagem_colaboradores, chave_contagem)
+        if versao is not None and em_cache and em_cache[0] == versao:
+            total = em_cache[1]
+        else:
+            cursor.execute(f'SELECT COUNT(*) {from_where}', params)
+            total = cursor.fetchone()[0]
+            if versao is not None:
+                _guardar_contagem(_cache_contagem_colaboradores, chave_contagem, (versao, total))
+
+    mais_registros = len(colaboradores) > limite
+    colaboradores = colaboradores[:limite]
+    if direcao == '<':
+        colaboradores.reverse()
+
+    chaves = [[c.pop('relevancia_busca'), c['nome_completo'], c['id']] for c in colaboradores]
+    proximo = anterior = None
+    if chaves:
+        if direcao == '<' or mais_registros:
+            proximo = _codificar_cursor('>', chaves[-1])
+        if cursor_lido and (direcao == '>' or mais_registros):
+            anterior = _codificar_cursor('<', chaves[0])
+
+    return {
+        'colaboradores': colaboradores,
+        'total': total,
+        'proximo': proximo,
+        'anterior': anterior,
+    }
 
-    cursor.execute(query, params)
-    total = cursor.fetchone()[0]
-    conn.close()
-    return total
 
 def obter_colaborador(colaborador_id: int) -> Optional[Dict]:
     """Obtém um colaborador pelo ID."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT c.*, e.razao_social as empresa_nome, e.cnpj as empresa_cnpj
-        FROM colaboradores c 
-        LEFT JOIN empresas e ON c.empresa_id = e.id 
-        WHERE c.id = ?
-    ''', (colaborador_id,))
-    row = cursor.fetchone()
-    conn.close()
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT c.*, e.razao_social as empresa_nome, e.cnpj as empresa_cnpj
+            FROM colaboradores c 
+            LEFT JOIN empresas e ON c.empresa_id = e.id 
+            WHERE c.id = ?
+        ''', (colaborador_id,))
+        row = cursor.fetchone()
     return dict(row) if row else None
 
 def atualizar_colaborador(colaborador_id: int, dados: dict) -> bool:
@@ -885,26 +1896,32 @@ def atualizar_colaborador(colaborador_id: int, dados: dict) -> bool:
     colaborador_atual = obter_colaborador(colaborador_id)
     nome_colaborador = colaborador_atual.get('nome_completo', 'Colaborador') if colaborador_atual else 'Colaborador'
 
-    conn = get_connection()
-    cursor = conn.cursor()
+    if 'nome_completo' in dados:
+        dados = dict(dados, nome_busca=normalizar_busca(dados['nome_completo']))
 
-    campos = []
-    valores = []
-    for key, value in dados.items():
-        if key != 'id':
-            campos.append(f"{key} = ?")
-            valores.append(value)
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    valores.append(colaborador_id)
+        campos = []
+        valores = []
+        for key, value in dados.items():
+            if key != 'id':
+                campos.append(f"{key} = ?")
+                valores.append(value)
 
-    cursor.execute(f'''
-        UPDATE colaboradores SET {', '.join(campos)}, updated_at = CURRENT_TIMESTAMP
-        WHERE id = ?
-    ''', valores)
+        valores.append(colaborador_id)
 
-    conn.commit()
-    affected = cursor.rowcount
-    conn.close()
+        cursor.execute(f'''
+            UPDATE colaboradores SET {', '.join(campos)}, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', valores)
+        affected = cursor.rowcount
+
+        if affected:
+            _garantir_contratos_experiencia(conn, colaborador_id)
+        conn.commit()
+    if 'status' in dados:
+        invalidar_cache_referencia('contagem_locais')
 
     # Registrar log para campos alterados
     if affected > 0 and colaborador_atual:
@@ -944,7 +1961,7 @@ def atualizar_colaborador(colaborador_id: int, dados: dict) -> bool:
                 )
 
     # Backup automático
-    backup_database()
+    agendar_backup()
 
     return affected > 0
 
@@ -954,55 +1971,55 @@ def excluir_colaborador(colaborador_id: int) -> bool:
 
 def excluir_colaborador_permanente(colaborador_id: int) -> bool:
     """Exclui permanentemente um colaborador."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM colaboradores WHERE id = ?', (colaborador_id,))
-    conn.commit()
-    affected = cursor.rowcount
-    conn.close()
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM colaboradores WHERE id = ?', (colaborador_id,))
+        conn.commit()
+        affected = cursor.rowcount
+    invalidar_cache_referencia('locais', 'contagem_locais', 'tipos_documentos')
     return affected > 0
 
 def desligar_colaborador(colaborador_id: int, data_desligamento: str, motivo: str, observacoes: str = None) -> bool:
     """Desliga um colaborador e adiciona à blocklist."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
     
-    # Obter dados do colaborador
-    colaborador = obter_colaborador(colaborador_id)
-    if not colaborador:
-        conn.close()
-        return False
+        # Obter dados do colaborador
+        colaborador = obter_colaborador(colaborador_id)
+        if not colaborador:
+            return False
     
-    # Atualizar status do colaborador
-    cursor.execute('''
-        UPDATE colaboradores 
-        SET status = 'DESLIGADO', 
-            data_desligamento = ?,
-            motivo_desligamento = ?,
-            observacoes_desligamento = ?,
-            updated_at = CURRENT_TIMESTAMP
-        WHERE id = ?
-    ''', (data_desligamento, motivo, observacoes, colaborador_id))
+        # Atualizar status do colaborador
+        cursor.execute('''
+            UPDATE colaboradores 
+            SET status = 'DESLIGADO', 
+                data_desligamento = ?,
+                motivo_desligamento = ?,
+                observacoes_desligamento = ?,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (data_desligamento, motivo, observacoes, colaborador_id))
     
-    # Adicionar à blocklist
-    cursor.execute('''
-        INSERT INTO blocklist (cpf, nome, empresa_id, data_admissao, data_desligamento, 
-                               motivo_desligamento, observacoes)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        colaborador.get('cpf'),
-        colaborador.get('nome_completo'),
-        colaborador.get('empresa_id'),
-        colaborador.get('data_admissao'),
-        data_desligamento,
-        motivo,
-        observacoes
-    ))
+        # Adicionar à blocklist
+        cursor.execute('''
+            INSERT INTO blocklist (cpf, nome, nome_busca, empresa_id, data_admissao, data_desligamento, 
+                                   motivo_desligamento, observacoes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            colaborador.get('cpf'),
+            colaborador.get('nome_completo'),
+            normalizar_busca(colaborador.get('nome_completo')),
+            colaborador.get('empresa_id'),
+            colaborador.get('data_admissao'),
+            data_desligamento,
+            motivo,
+            observacoes
+        ))
     
-    conn.commit()
-    conn.close()
+        conn.commit()
+    invalidar_cache_referencia('contagem_locais')
     
-    backup_database()
+    agendar_backup()
     return True
 
 
@@ -1012,42 +2029,44 @@ def desligar_colaborador(colaborador_id: int, data_desligamento: str, motivo: st
 
 def adicionar_dependente(colaborador_id: int, dados: dict) -> int:
     """Adiciona um dependente a um colaborador."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        INSERT INTO dependentes (colaborador_id, nome, parentesco, data_nascimento, cpf)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (
-        colaborador_id,
-        dados.get('nome'),
-        dados.get('parentesco'),
-        dados.get('data_nascimento'),
-        dados.get('cpf')
-    ))
+        cursor.execute('''
+            INSERT INTO dependentes (colaborador_id, nome, parentesco, data_nascimento, cpf)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (
+            colaborador_id,
+            dados.get('nome'),
+            dados.get('parentesco'),
+            dados.get('data_nascimento'),
+            dados.get('cpf')
+        ))
     
-    dependente_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+        dependente_id = cursor.lastrowid
+        _atualizar_status_documentos(conn, colaborador_id)
+        conn.commit()
     return dependente_id
 
 def listar_dependentes(colaborador_id: int) -> List[Dict]:
     """Lista os dependentes de um colaborador."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM dependentes WHERE colaborador_id = ? ORDER BY nome', (colaborador_id,))
-    dependentes = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM dependentes WHERE colaborador_id = ? ORDER BY nome', (colaborador_id,))
+        dependentes = [dict(row) for row in cursor.fetchall()]
     return dependentes
 
 def excluir_dependente(dependente_id: int) -> bool:
     """Exclui um dependente."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM dependentes WHERE id = ?', (dependente_id,))
-    conn.commit()
-    affected = cursor.rowcount
-    conn.close()
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT colaborador_id FROM dependentes WHERE id = ?', (dependente_id,))
+        dependente = cursor.fetchone()
+        cursor.execute('DELETE FROM dependentes WHERE id = ?', (dependente_id,))
+        affected = cursor.rowcount
+        if dependente:
+            _atualizar_status_documentos(conn, dependente['colaborador_id'])
+        conn.commit()
     return affected > 0
 
 
@@ -1062,143 +2081,139 @@ def atribuir_localizacao(colaborador_id: int, local_nome: str, cidade: str, uf:
     Encerra automaticamente a localização anterior (se houver).
     Não permite mais de uma alteração de localização no mesmo dia.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    # Verificar se já existe uma localização iniciada no mesmo dia
-    cursor.execute('''
-        SELECT id FROM localizacoes
-        WHERE colaborador_id = ? AND data_inicio = ?
-    ''', (colaborador_id, data_inicio))
+        # Verificar se já existe uma localização iniciada no mesmo dia
+        cursor.execute('''
+            SELECT id FROM localizacoes
+            WHERE colaborador_id = ? AND data_inicio = ?
+        ''', (colaborador_id, data_inicio))
 
-    if cursor.fetchone():
-        conn.close()
-        raise ValueError("Já existe uma localização registrada para esta data. Não é permitido mais de uma alteração de localização no mesmo dia.")
+        if cursor.fetchone():
+            raise ValueError("Já existe uma localização registrada para esta data. Não é permitido mais de uma alteração de localização no mesmo dia.")
 
-    # Encerrar localização atual (se houver)
-    cursor.execute('''
-        UPDATE localizacoes
-        SET data_fim = ?, updated_at = CURRENT_TIMESTAMP
-        WHERE colaborador_id = ? AND data_fim IS NULL
-    ''', (data_inicio, colaborador_id))
+        # Encerrar localização atual (se houver)
+        cursor.execute('''
+            UPDATE localizacoes
+            SET data_fim = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE colaborador_id = ? AND data_fim IS NULL
+        ''', (data_inicio, colaborador_id))
 
-    # Inserir nova localização
-    cursor.execute('''
-        INSERT INTO localizacoes (colaborador_id, local_nome, cidade, uf, data_inicio, observacoes)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (colaborador_id, local_nome, cidade, uf, data_inicio, observacoes))
+        # Inserir nova localização
+        cursor.execute('''
+            INSERT INTO localizacoes (colaborador_id, local_nome, cidade, uf, data_inicio, observacoes)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (colaborador_id, local_nome, cidade, uf, data_inicio, observacoes))
 
-    localizacao_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+        localizacao_id = cursor.lastrowid
+        conn.commit()
+    invalidar_cache_referencia('locais', 'contagem_locais')
     return localizacao_id
 
 
 def obter_localizacao_atual(colaborador_id: int) -> Optional[Dict]:
     """Obtém a localização atual do colaborador (data_fim IS NULL)."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM localizacoes
-        WHERE colaborador_id = ? AND data_fim IS NULL
-        ORDER BY data_inicio DESC LIMIT 1
-    ''', (colaborador_id,))
-    row = cursor.fetchone()
-    conn.close()
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM localizacoes
+            WHERE colaborador_id = ? AND data_fim IS NULL
+            ORDER BY data_inicio DESC LIMIT 1
+        ''', (colaborador_id,))
+        row = cursor.fetchone()
     return dict(row) if row else None
 
 
 def listar_localizacoes_colaborador(colaborador_id: int) -> List[Dict]:
     """Lista todas as localizações (histórico) de um colaborador."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM localizacoes
-        WHERE colaborador_id = ?
-        ORDER BY data_inicio DESC
-    ''', (colaborador_id,))
-    localizacoes = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM localizacoes
+            WHERE colaborador_id = ?
+            ORDER BY data_inicio DESC
+        ''', (colaborador_id,))
+        localizacoes = [dict(row) for row in cursor.fetchall()]
     return localizacoes
 
 
 def encerrar_localizacao(localizacao_id: int, data_fim: str) -> bool:
     """Encerra uma localização específica."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        UPDATE localizacoes
-        SET data_fim = ?, updated_at = CURRENT_TIMESTAMP
-        WHERE id = ?
-    ''', (data_fim, localizacao_id))
-    conn.commit()
-    affected = cursor.rowcount
-    conn.close()
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE localizacoes
+            SET data_fim = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (data_fim, localizacao_id))
+        conn.commit()
+        affected = cursor.rowcount
+    invalidar_cache_referencia('contagem_locais')
     return affected > 0
 
 
 def listar_locais_cadastrados() -> List[str]:
-    """Lista todos os locais já cadastrados (para autocomplete)."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT DISTINCT local_nome FROM localizacoes
-        ORDER BY local_nome
-    ''')
-    locais = [row['local_nome'] for row in cursor.fetchall()]
-    conn.close()
-    return locais
+    """Lista todos os locais já cadastrados (para autocomplete, em cache)."""
+    def carregar(conn):
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT DISTINCT local_nome FROM localizacoes
+            ORDER BY local_nome
+        ''')
+        return [row['local_nome'] for row in cursor.fetchall()]
+
+    return _em_cache_referencia('locais', (), carregar)
 
 
 def listar_colaboradores_por_localizacao(local_nome: str = None, cidade: str = None,
                                           uf: str = None) -> List[Dict]:
     """Lista colaboradores filtrados por localização atual."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    query = '''
-        SELECT c.*, l.local_nome, l.cidade as loc_cidade, l.uf as loc_uf, l.data_inicio as loc_data_inicio,
-               e.razao_social as empresa_nome
-        FROM colaboradores c
-        JOIN localizacoes l ON c.id = l.colaborador_id AND l.data_fim IS NULL
-        LEFT JOIN empresas e ON c.empresa_id = e.id
-        WHERE c.status = 'ATIVO'
-    '''
-    params = []
-
-    if local_nome:
-        query += ' AND l.local_nome LIKE ?'
-        params.append(f'%{local_nome}%')
-    if cidade:
-        query += ' AND l.cidade LIKE ?'
-        params.append(f'%{cidade}%')
-    if uf:
-        query += ' AND l.uf = ?'
-        params.append(uf)
-
-    query += ' ORDER BY l.local_nome, c.nome_completo'
-
-    cursor.execute(query, params)
-    colaboradores = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+        query = '''
+            SELECT c.*, l.local_nome, l.cidade as loc_cidade, l.uf as loc_uf, l.data_inicio as loc_data_inicio,
+                   e.razao_social as empresa_nome
+            FROM colaboradores c
+            JOIN localizacoes l ON c.id = l.colaborador_id AND l.data_fim IS NULL
+            LEFT JOIN empresas e ON c.empresa_id = e.id
+            WHERE c.status = 'ATIVO'
+        '''
+        params = []
+
+        if local_nome:
+            query += ' AND l.local_nome LIKE ?'
+            params.append(f'%{local_nome}%')
+        if cidade:
+            query += ' AND l.cidade LIKE ?'
+            params.append(f'%{cidade}%')
+        if uf:
+            query += ' AND l.uf = ?'
+            params.append(uf)
+
+        query += ' ORDER BY l.local_nome, c.nome_completo'
+
+        cursor.execute(query, params)
+        colaboradores = [dict(row) for row in cursor.fetchall()]
     return colaboradores
 
 
 def contar_colaboradores_por_local() -> List[Dict]:
-    """Conta quantos colaboradores estão em cada localização."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT l.local_nome, l.cidade, l.uf, COUNT(*) as qtd_colaboradores
-        FROM localizacoes l
-        JOIN colaboradores c ON l.colaborador_id = c.id
-        WHERE l.data_fim IS NULL AND c.status = 'ATIVO'
-        GROUP BY l.local_nome, l.cidade, l.uf
-        ORDER BY qtd_colaboradores DESC
-    ''')
-    resultado = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return resultado
+    """Conta quantos colaboradores estão em cada localização (em cache)."""
+    def carregar(conn):
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT l.local_nome, l.cidade, l.uf, COUNT(*) as qtd_colaboradores
+            FROM localizacoes l
+            JOIN colaboradores c ON l.colaborador_id = c.id
+            WHERE l.data_fim IS NULL AND c.status = 'ATIVO'
+            GROUP BY l.local_nome, l.cidade, l.uf
+            ORDER BY qtd_colaboradores DESC
+        ''')
+        return [dict(row) for row in cursor.fetchall()]
+
+    return _em_cache_referencia('contagem_locais', (), carregar)
 
 
 # =============================================================================
@@ -1218,22 +2233,21 @@ def verificar_cpf_existente(cpf: str, colaborador_id: int = None) -> Dict:
     # Normalizar para 11 dígitos para garantir comparação correta
     cpf_normalizado = cpf_limpo.zfill(11) if len(cpf_limpo) < 11 else cpf_limpo[:11]
 
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    if colaborador_id:
-        cursor.execute('''
-            SELECT id, nome_completo, cpf, status FROM colaboradores
-            WHERE cpf = ? AND id != ?
-        ''', (cpf_normalizado, colaborador_id))
-    else:
-        cursor.execute('''
-            SELECT id, nome_completo, cpf, status FROM colaboradores
-            WHERE cpf = ?
-        ''', (cpf_normalizado,))
+        if colaborador_id:
+            cursor.execute('''
+                SELECT id, nome_completo, cpf, status FROM colaboradores
+                WHERE cpf = ? AND id != ?
+            ''', (cpf_normalizado, colaborador_id))
+        else:
+            cursor.execute('''
+                SELECT id, nome_completo, cpf, status FROM colaboradores
+                WHERE cpf = ?
+            ''', (cpf_normalizado,))
 
-    row = cursor.fetchone()
-    conn.close()
+        row = cursor.fetchone()
 
     return dict(row) if row else None
 
@@ -1249,38 +2263,37 @@ def verificar_blocklist(cpf: str) -> List[Dict]:
     if cpf_limpo:
         cpf_limpo = cpf_limpo.zfill(11) if len(cpf_limpo) < 11 else cpf_limpo[:11]
 
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT b.*, e.razao_social as empresa_nome
-        FROM blocklist b
-        LEFT JOIN empresas e ON b.empresa_id = e.id
-        WHERE b.cpf = ?
-        ORDER BY b.data_desligamento DESC
-    ''', (cpf_limpo,))
-    registros = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT b.*, e.razao_social as empresa_nome
+            FROM blocklist b
+            LEFT JOIN empresas e ON b.empresa_id = e.id
+            WHERE b.cpf = ?
+            ORDER BY b.data_desligamento DESC
+        ''', (cpf_limpo,))
+        registros = [dict(row) for row in cursor.fetchall()]
     return registros
 
 def listar_blocklist() -> List[Dict]:
     """Lista todos os registros da blocklist."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT b.*, e.razao_social as empresa_nome
-        FROM blocklist b
-        LEFT JOIN empresas e ON b.empresa_id = e.id
-        ORDER BY b.data_desligamento DESC
-    ''')
-    registros = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT b.*, e.razao_social as empresa_nome
+            FROM blocklist b
+            LEFT JOIN empresas e ON b.empresa_id = e.id
+            ORDER BY b.data_desligamento DESC
+        ''')
+        registros = [dict(row) for row in cursor.fetchall()]
     return registros
 
 
-def listar_blocklist_agrupado() -> List[Dict]:
+def listar_blocklist_agrupado(filtro: str = None) -> List[Dict]:
     """
     Lista os registros da blocklist agrupados por CPF.
     Cada colaborador aparece apenas uma vez, com um histórico de todas as entradas.
+    O filtro opcional seleciona os CPFs com algum registro cujo nome ou CPF contenha o texto.
 
     Retorna uma lista de dicionários no formato:
     {
@@ -1302,18 +2315,24 @@ def listar_blocklist_agrupado() -> List[Dict]:
         'ultima_entrada': {...}  # Referência ao registro mais recente
     }
     """
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    # Buscar todos os registros ordenados por CPF e data de desligamento
-    cursor.execute('''
-        SELECT b.*, e.razao_social as empresa_nome
-        FROM blocklist b
-        LEFT JOIN empresas e ON b.empresa_id = e.id
-        ORDER BY b.cpf, b.data_desligamento ASC
-    ''')
-    registros = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+        # Buscar todos os registros ordenados por CPF e data de desligamento
+        query = '''
+            SELECT b.*, e.razao_social as empresa_nome
+            FROM blocklist b
+            LEFT JOIN empresas e ON b.empresa_id = e.id
+        '''
+        params = []
+        if filtro:
+            condicao, params = _condicao_nome('blocklist', 'f', filtro)
+            query += f''' WHERE b.cpf IN (
+                SELECT f.cpf FROM blocklist f WHERE {condicao}
+            )'''
+        query += ' ORDER BY b.cpf, b.data_desligamento ASC'
+        cursor.execute(query, params)
+        registros = [dict(row) for row in cursor.fetchall()]
 
     # Agrupar por CPF
     agrupado = {}
@@ -1366,26 +2385,26 @@ def listar_blocklist_agrupado() -> List[Dict]:
 
 def adicionar_blocklist(dados: dict) -> int:
     """Adiciona um registro manualmente à blocklist."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        INSERT INTO blocklist (cpf, nome, empresa_id, data_admissao, data_desligamento,
-                               motivo_desligamento, observacoes)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        dados.get('cpf'),
-        dados.get('nome'),
-        dados.get('empresa_id'),
-        dados.get('data_admissao'),
-        dados.get('data_desligamento'),
-        dados.get('motivo_desligamento'),
-        dados.get('observacoes'),
-    ))
-
-    registro_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+        cursor.execute('''
+            INSERT INTO blocklist (cpf, nome, nome_busca, empresa_id, data_admissao, data_desligamento,
+                                   motivo_desligamento, observacoes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            dados.get('cpf'),
+            dados.get('nome'),
+            normalizar_busca(dados.get('nome')),
+            dados.get('empresa_id'),
+            dados.get('data_admissao'),
+            dados.get('data_desligamento'),
+            dados.get('motivo_desligamento'),
+            dados.get('observacoes'),
+        ))
+
+        registro_id = cursor.lastrowid
+        conn.commit()
 
     # Registrar log
     nome = dados.get('nome', 'Colaborador')
@@ -1404,31 +2423,29 @@ def adicionar_blocklist(dados: dict) -> int:
 
 def atualizar_blocklist(registro_id: int, observacoes: str) -> bool:
     """Atualiza a justificativa de um registro na blocklist."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        UPDATE blocklist SET observacoes = ? WHERE id = ?
-    ''', (observacoes, registro_id))
+        cursor.execute('''
+            UPDATE blocklist SET observacoes = ? WHERE id = ?
+        ''', (observacoes, registro_id))
 
-    conn.commit()
-    conn.close()
+        conn.commit()
     return True
 
 
 def remover_blocklist(registro_id: int) -> bool:
     """Remove um registro da blocklist."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    # Obter dados antes de excluir
-    cursor.execute('SELECT nome, cpf FROM blocklist WHERE id = ?', (registro_id,))
-    registro = cursor.fetchone()
+        # Obter dados antes de excluir
+        cursor.execute('SELECT nome, cpf FROM blocklist WHERE id = ?', (registro_id,))
+        registro = cursor.fetchone()
 
-    cursor.execute('DELETE FROM blocklist WHERE id = ?', (registro_id,))
+        cursor.execute('DELETE FROM blocklist WHERE id = ?', (registro_id,))
 
-    conn.commit()
-    conn.close()
+        conn.commit()
 
     # Registrar log
     if registro:
@@ -1448,6 +2465,11 @@ def remover_blocklist(registro_id: int) -> bool:
 # Contratos de Experiência
 # =============================================================================
 
+# Data em que o contrato de experiência vigente termina (com ou sem prorrogação);
+# a mesma expressão é usada no índice parcial idx_contratos_vigentes_fim
+_SQL_FIM_CONTRATO = '(CASE WHEN ce.prorrogacao IS NOT NULL THEN ce.data_fim_prorrogacao ELSE ce.data_fim_inicial END)'
+
+
 def criar_contrato_experiencia(colaborador_id: int, data_inicio: str, prazo_inicial: int,
                                 prorrogacao: int = None) -> int:
     """
@@ -1455,363 +2477,322 @@ def criar_contrato_experiencia(colaborador_id: int, data_inicio: str, prazo_inic
     - Verifica se já existe um contrato vigente para o colaborador
     - Valida que o total não exceda 90 dias (CLT)
     """
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    # Verificar se já existe contrato vigente para este colaborador
-    cursor.execute('''
-        SELECT id FROM contratos_experiencia
-        WHERE colaborador_id = ? AND status = 'VIGENTE'
-    ''', (colaborador_id,))
+        # Verificar se já existe contrato vigente para este colaborador
+        cursor.execute('''
+            SELECT id FROM contratos_experiencia
+            WHERE colaborador_id = ? AND status = 'VIGENTE'
+        ''', (colaborador_id,))
 
-    contrato_existente = cursor.fetchone()
-    if contrato_existente:
-        # Já existe contrato vigente, não criar duplicado
-        conn.close()
-        return contrato_existente['id']
+        contrato_existente = cursor.fetchone()
+        if contrato_existente:
+            # Já existe contrato vigente, não criar duplicado
+            return contrato_existente['id']
 
-    # Validar limite de 90 dias (CLT)
-    total_dias = prazo_inicial + (prorrogacao or 0)
-    if total_dias > 90:
-        conn.close()
-        raise ValueError(f"O contrato de experiência não pode exceder 90 dias. Total solicitado: {total_dias} dias")
+        # Validar limite de 90 dias (CLT)
+        total_dias = prazo_inicial + (prorrogacao or 0)
+        if total_dias > 90:
+            raise ValueError(f"O contrato de experiência não pode exceder 90 dias. Total solicitado: {total_dias} dias")
 
-    # Calcular datas
-    # O dia de início conta como dia 1, então o fim é início + prazo - 1
-    from datetime import datetime, timedelta
-    inicio = datetime.strptime(data_inicio, '%Y-%m-%d')
-    fim_inicial = inicio + timedelta(days=prazo_inicial - 1)
-    fim_prorrogacao = None
+        # Calcular datas
+        # O dia de início conta como dia 1, então o fim é início + prazo - 1
+        from datetime import datetime, timedelta
+        inicio = datetime.strptime(data_inicio, '%Y-%m-%d')
+        fim_inicial = inicio + timedelta(days=prazo_inicial - 1)
+        fim_prorrogacao = None
 
-    if prorrogacao:
-        # A prorrogação começa no dia seguinte ao fim do período inicial
-        fim_prorrogacao = fim_inicial + timedelta(days=prorrogacao)
+        if prorrogacao:
+            # A prorrogação começa no dia seguinte ao fim do período inicial
+            fim_prorrogacao = fim_inicial + timedelta(days=prorrogacao)
 
-    cursor.execute('''
-        INSERT INTO contratos_experiencia (colaborador_id, data_inicio, prazo_inicial,
-                                           data_fim_inicial, prorrogacao, data_fim_prorrogacao)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (
-        colaborador_id,
-        data_inicio,
-        prazo_inicial,
-        fim_inicial.strftime('%Y-%m-%d'),
-        prorrogacao,
-        fim_prorrogacao.strftime('%Y-%m-%d') if fim_prorrogacao else None
-    ))
-
-    contrato_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+        cursor.execute('''
+            INSERT INTO contratos_experiencia (colaborador_id, data_inicio, prazo_inicial,
+                                               data_fim_inicial, prorrogacao, data_fim_prorrogacao)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (
+            colaborador_id,
+            data_inicio,
+            prazo_inicial,
+            fim_inicial.strftime('%Y-%m-%d'),
+            prorrogacao,
+            fim_prorrogacao.strftime('%Y-%m-%d') if fim_prorrogacao else None
+        ))
+
+        contrato_id = cursor.lastrowid
+        conn.commit()
     return contrato_id
 
 def listar_contratos_vencendo(dias_antecedencia: int = 5) -> List[Dict]:
     """Lista contratos de experiência próximos do vencimento."""
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute('''
-        SELECT ce.*, c.nome_completo, c.funcao, e.razao_social as empresa_nome
-        FROM contratos_experiencia ce
-        JOIN colaboradores c ON ce.colaborador_id = c.id
-        LEFT JOIN empresas e ON c.empresa_id = e.id
-        WHERE ce.status = 'VIGENTE'
-        AND (
-            (ce.prorrogacao IS NULL AND date(ce.data_fim_inicial) <= date('now', '+' || ? || ' days'))
-            OR (ce.prorrogacao IS NOT NULL AND date(ce.data_fim_prorrogacao) <= date('now', '+' || ? || ' days'))
-        )
-        ORDER BY COALESCE(ce.data_fim_prorrogacao, ce.data_fim_inicial)
-    ''', (dias_antecedencia, dias_antecedencia))
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    contratos = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+        cursor.execute('''
+            SELECT ce.*, c.nome_completo, c.funcao, e.razao_social as empresa_nome
+            FROM contratos_experiencia ce
+            JOIN colaboradores c ON ce.colaborador_id = c.id
+            LEFT JOIN empresas e ON c.empresa_id = e.id
+            WHERE ce.status = 'VIGENTE'
+            AND (
+                (ce.prorrogacao IS NULL AND date(ce.data_fim_inicial) <= date('now', '+' || ? || ' days'))
+                OR (ce.prorrogacao IS NOT NULL AND date(ce.data_fim_prorrogacao) <= date('now', '+' || ? || ' days'))
+            )
+            ORDER BY COALESCE(ce.data_fim_prorrogacao, ce.data_fim_inicial)
+        ''', (dias_antecedencia, dias_antecedencia))
+
+        contratos = [dict(row) for row in cursor.fetchall()]
     return contratos
 
 
-def listar_todos_contratos_experiencia() -> List[Dict]:
-    """Lista todos os contratos de experiência vigentes com informações detalhadas."""
-    conn = get_connection()
+def _garantir_contratos_experiencia(conn, colaborador_id: int = None) -> int:
+    """
+    Cria o contrato de experiência vigente dos colaboradores ativos em
+    'Contrato de Experiência' que ainda não o têm, com as datas calculadas em
+    SQL a partir de data_admissao, prazo_experiencia e prorrogacao (mesma regra
+    de criar_contrato_experiencia). Idempotente; sem colaborador_id, trata todos.
+    Como em criar_contrato_experiencia, prazos acima de 90 dias (CLT) não geram
+    contrato, no cadastro e no preenchimento de colaboradores antigos.
+    Retorna a quantidade de contratos criados.
+    """
     cursor = conn.cursor()
+    cursor.execute(f'''
+        INSERT INTO contratos_experiencia (colaborador_id, data_inicio, prazo_inicial,
+                                           data_fim_inicial, prorrogacao, data_fim_prorrogacao)
+        SELECT id, data_admissao, prazo_experiencia, fim_inicial, prorrogacao,
+               CASE WHEN prorrogacao IS NOT NULL
+                    THEN date(fim_inicial, '+' || prorrogacao || ' days') END
+        FROM (
+            SELECT c.id, c.data_admissao, c.prazo_experiencia,
+                   NULLIF(c.prorrogacao, 0) as prorrogacao,
+                   date(c.data_admissao, '+' || (c.prazo_experiencia - 1) || ' days') as fim_inicial
+            FROM colaboradores c
+            WHERE c.tipo_contrato = 'Contrato de Experiência'
+            AND c.status = 'ATIVO'
+            AND c.prazo_experiencia > 0
+            {'AND c.id = ?' if colaborador_id is not None else ''}
+            AND c.prazo_experiencia + COALESCE(c.prorrogacao, 0) <= 90
+            AND NOT EXISTS (
+                SELECT 1 FROM contratos_experiencia ce
+                WHERE ce.colaborador_id = c.id AND ce.status = 'VIGENTE'
+            )
+        )
+        WHERE fim_inicial IS NOT NULL
+    ''', () if colaborador_id is None else (colaborador_id,))
+    return cursor.rowcount
 
-    # Buscar contratos da tabela contratos_experiencia
-    # Se tem prorrogação, a data final é sempre data_fim_prorrogacao
-    # O período atual é determinado se já passou do período inicial ou não
-    cursor.execute('''
-        SELECT ce.id, ce.colaborador_id, ce.data_inicio, ce.prazo_inicial, ce.data_fim_inicial,
-               ce.prorrogacao, ce.data_fim_prorrogacao, ce.status,
-               c.nome_completo, c.funcao, c.status as colaborador_status,
-               e.razao_social as empresa_nome,
-               CASE
-                   WHEN ce.prorrogacao IS NOT NULL AND date('now', 'localtime') > date(ce.data_fim_inicial) THEN 2
-                   ELSE 1
-               END as periodo_atual,
-               CASE
-                   WHEN ce.prorrogacao IS NOT NULL THEN ce.data_fim_prorrogacao
-                   ELSE ce.data_fim_inicial
-               END as proxima_data_vencimento,
-               CAST(julianday(
-                   CASE
-                       WHEN ce.prorrogacao IS NOT NULL THEN ce.data_fim_prorrogacao
-                       ELSE ce.data_fim_inicial
-                   END
-               ) - julianday(date('now', 'localtime')) AS INTEGER) as dias_restantes
-        FROM contratos_experiencia ce
-        JOIN colaboradores c ON ce.colaborador_id = c.id
-        LEFT JOIN empresas e ON c.empresa_id = e.id
-        WHERE ce.status = 'VIGENTE'
-        AND c.status = 'ATIVO'
-    ''')
-
-    contratos = [dict(row) for row in cursor.fetchall()]
-
-    # Buscar colaboradores com tipo_contrato = 'Contrato de Experiência' que NÃO têm registro na tabela
-    cursor.execute('''
-        SELECT c.id as colaborador_id, c.nome_completo, c.funcao, c.status as colaborador_status,
-               c.data_admissao as data_inicio, c.prazo_experiencia as prazo_inicial,
-               c.prorrogacao, e.razao_social as empresa_nome
-        FROM colaboradores c
-        LEFT JOIN empresas e ON c.empresa_id = e.id
-        LEFT JOIN contratos_experiencia ce ON c.id = ce.colaborador_id AND ce.status = 'VIGENTE'
-        WHERE c.tipo_contrato = 'Contrato de Experiência'
-        AND c.status = 'ATIVO'
-        AND ce.id IS NULL
-        AND c.data_admissao IS NOT NULL
-        AND c.prazo_experiencia IS NOT NULL
-    ''')
-
-    colaboradores_sem_contrato = cursor.fetchall()
-    conn.close()
-
-    # Para colaboradores sem registro na tabela, calcular as datas
-    for colab in colaboradores_sem_contrato:
-        colab = dict(colab)
-        try:
-            inicio = datetime.strptime(colab['data_inicio'], '%Y-%m-%d')
-            prazo = colab['prazo_inicial']
-            prorrogacao = colab.get('prorrogacao')
-
-            # A data_fim_inicial é calculada como: data_inicio + prazo_inicial - 1
-            # Porque o dia de início conta como dia 1 do contrato
-            fim_inicial = inicio + timedelta(days=prazo - 1)
-            fim_prorrogacao = None
-            if prorrogacao:
-                # A prorrogação começa no dia seguinte ao fim do período inicial
-                fim_prorrogacao = fim_inicial + timedelta(days=prorrogacao)
-
-            hoje = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-
-            # Determinar período atual e próxima data de vencimento
-            # Se tem prorrogação, a data final é sempre a data_fim_prorrogacao
-            if prorrogacao:
-                # Com prorrogação: a data final é sempre a prorrogação
-                proxima_data = fim_prorrogacao
-                # Período atual depende se já passou do período inicial
-                if hoje > fim_inicial:
-                    periodo_atual = 2
-                else:
-                    periodo_atual = 1
-            else:
-                # Sem prorrogação: apenas o período inicial
-                periodo_atual = 1
-                proxima_data = fim_inicial
 
-            dias_restantes = (proxima_data - hoje).days
+def preencher_contratos_experiencia() -> int:
+    """
+    Cria os contratos de experiência que faltam para colaboradores antigos
+    (cadastrados antes de existir a tabela contratos_experiencia).
+    Pode ser executado várias vezes; retorna quantos contratos foram criados.
+    """
+    with conexao() as conn:
+        criados = _garantir_contratos_experiencia(conn)
+        conn.commit()
+    return criados
 
-            colab['data_fim_inicial'] = fim_inicial.strftime('%Y-%m-%d')
-            colab['data_fim_prorrogacao'] = fim_prorrogacao.strftime('%Y-%m-%d') if fim_prorrogacao else None
-            colab['periodo_atual'] = periodo_atual
-            colab['proxima_data_vencimento'] = proxima_data.strftime('%Y-%m-%d')
-            colab['dias_restantes'] = dias_restantes
-            colab['status'] = 'VIGENTE'
-            colab['id'] = None  # Não tem ID de contrato
 
-            contratos.append(colab)
-        except Exception:
-            pass  # Ignorar registros com dados inválidos
+def listar_todos_contratos_experiencia() -> List[Dict]:
+    """Lista todos os contratos de experiência vigentes com informações detalhadas."""
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    # Ordenar por dias restantes
-    contratos.sort(key=lambda x: x.get('dias_restantes', 9999))
+        # Se tem prorrogação, a data final é sempre data_fim_prorrogacao
+        # O período atual é determinado se já passou do período inicial ou não
+        cursor.execute(f'''
+            SELECT ce.id, ce.colaborador_id, ce.data_inicio, ce.prazo_inicial, ce.data_fim_inicial,
+                   ce.prorrogacao, ce.data_fim_prorrogacao, ce.status,
+                   c.nome_completo, c.funcao, c.status as colaborador_status,
+                   e.razao_social as empresa_nome,
+                   CASE
+                       WHEN ce.prorrogacao IS NOT NULL AND ce.data_fim_inicial < date('now', 'localtime') THEN 2
+                       ELSE 1
+                   END as periodo_atual,
+                   {_SQL_FIM_CONTRATO} as proxima_data_vencimento,
+                   CAST(julianday({_SQL_FIM_CONTRATO}) - julianday(date('now', 'localtime')) AS INTEGER) as dias_restantes
+            FROM contratos_experiencia ce
+            JOIN colaboradores c ON ce.colaborador_id = c.id
+            LEFT JOIN empresas e ON c.empresa_id = e.id
+            WHERE ce.status = 'VIGENTE'
+            AND c.status = 'ATIVO'
+            ORDER BY dias_restantes, ce.id
+        ''')
 
+        contratos = [dict(row) for row in cursor.fetchall()]
     return contratos
 
 def obter_contrato_colaborador(colaborador_id: int) -> Optional[Dict]:
     """Obtém o contrato de experiência vigente de um colaborador."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM contratos_experiencia 
-        WHERE colaborador_id = ? AND status = 'VIGENTE'
-        ORDER BY created_at DESC LIMIT 1
-    ''', (colaborador_id,))
-    row = cursor.fetchone()
-    conn.close()
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM contratos_experiencia 
+            WHERE colaborador_id = ? AND status = 'VIGENTE'
+            ORDER BY created_at DESC LIMIT 1
+        ''', (colaborador_id,))
+        row = cursor.fetchone()
     return dict(row) if row else None
 
 def atualizar_contrato(contrato_id: int, dados: dict) -> bool:
     """Atualiza um contrato de experiência."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
     
-    campos = []
-    valores = []
-    for key, value in dados.items():
-        if key != 'id':
-            campos.append(f"{key} = ?")
-            valores.append(value)
+        campos = []
+        valores = []
+        for key, value in dados.items():
+            if key != 'id':
+                campos.append(f"{key} = ?")
+                valores.append(value)
     
-    valores.append(contrato_id)
+        valores.append(contrato_id)
     
-    cursor.execute(f'''
-        UPDATE contratos_experiencia SET {', '.join(campos)}, updated_at = CURRENT_TIMESTAMP
-        WHERE id = ?
-    ''', valores)
+        cursor.execute(f'''
+            UPDATE contratos_experiencia SET {', '.join(campos)}, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', valores)
     
-    conn.commit()
-    affected = cursor.rowcount
-    conn.close()
+        conn.commit()
+        affected = cursor.rowcount
     return affected > 0
 
 
 def resetar_prorrogacoes_contratos():
     """Remove todas as prorrogações dos contratos (para correção de dados)."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    # Resetar contratos_experiencia
-    cursor.execute('''
-        UPDATE contratos_experiencia
-        SET prorrogacao = NULL, data_fim_prorrogacao = NULL, updated_at = CURRENT_TIMESTAMP
-    ''')
+        # Resetar contratos_experiencia
+        cursor.execute('''
+            UPDATE contratos_experiencia
+            SET prorrogacao = NULL, data_fim_prorrogacao = NULL, updated_at = CURRENT_TIMESTAMP
+        ''')
 
-    # Resetar colaboradores
-    cursor.execute('''
-        UPDATE colaboradores
-        SET prorrogacao = NULL
-        WHERE tipo_contrato = 'Contrato de Experiência'
-    ''')
+        # Resetar colaboradores
+        cursor.execute('''
+            UPDATE colaboradores
+            SET prorrogacao = NULL
+            WHERE tipo_contrato = 'Contrato de Experiência'
+        ''')
 
-    conn.commit()
-    affected = cursor.rowcount
-    conn.close()
+        conn.commit()
+        affected = cursor.rowcount
     return affected
 
 
-def converter_contratos_vencidos_para_clt() -> List[Dict]:
+def processar_contratos_vencidos(hoje: date = None) -> Dict:
     """
-    Verifica contratos de experiência vencidos e converte automaticamente para CLT.
-
-    Um contrato é considerado vencido quando:
-    - Se tem prorrogação: a data_fim_prorrogacao já passou
-    - Se não tem prorrogação: a data_fim_inicial já passou
-
-    Retorna lista de colaboradores convertidos para log/notificação.
+    Converte para CLT, de forma conjunta, os colaboradores cujo contrato de
+    experiência venceu (data_fim_prorrogacao, se houve prorrogação, ou
+    data_fim_inicial anterior a hoje), encerrando o contrato como EFETIVADO.
+    Colaboradores sem registro em contratos_experiencia têm a data de fim
+    calculada em SQL a partir de data_admissao, prazo_experiencia e prorrogacao.
+
+    Retorna o resumo:
+    {'data_conversao', 'contratos_efetivados', 'sem_contrato', 'convertidos'}
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    convertidos = []
-    hoje = date.today().strftime('%Y-%m-%d')
+    hoje = (hoje or date.today()).isoformat()
 
-    # Buscar contratos vigentes que já venceram
-    cursor.execute('''
-        SELECT ce.id as contrato_id, ce.colaborador_id, ce.data_fim_inicial,
-               ce.prorrogacao, ce.data_fim_prorrogacao,
-               c.nome_completo, c.tipo_contrato
-        FROM contratos_experiencia ce
-        JOIN colaboradores c ON ce.colaborador_id = c.id
-        WHERE ce.status = 'VIGENTE'
-        AND c.status = 'ATIVO'
-        AND c.tipo_contrato = 'Contrato de Experiência'
-        AND (
-            (ce.prorrogacao IS NOT NULL AND date(ce.data_fim_prorrogacao) < date(?))
-            OR (ce.prorrogacao IS NULL AND date(ce.data_fim_inicial) < date(?))
-        )
-    ''', (hoje, hoje))
-
-    contratos_vencidos = cursor.fetchall()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    for contrato in contratos_vencidos:
-        contrato = dict(contrato)
-        colaborador_id = contrato['colaborador_id']
-        contrato_id = contrato['contrato_id']
+        # Contratos vigentes vencidos (usa o índice parcial de contratos vigentes)
+        cursor.execute('DROP TABLE IF EXISTS temp.contratos_vencidos')
+        cursor.execute(f'''
+            CREATE TEMP TABLE contratos_vencidos AS
+            SELECT ce.id as contrato_id, ce.colaborador_id, c.nome_completo as nome,
+                   {_SQL_FIM_CONTRATO} as data_fim
+            FROM contratos_experiencia ce
+            JOIN colaboradores c ON ce.colaborador_id = c.id
+            WHERE ce.status = 'VIGENTE'
+            AND {_SQL_FIM_CONTRATO} < ?
+            AND c.status = 'ATIVO'
+            AND c.tipo_contrato = 'Contrato de Experiência'
+        ''', (hoje,))
 
-        # Atualizar o tipo de contrato do colaborador para CLT
         cursor.execute('''
             UPDATE colaboradores
             SET tipo_contrato = 'CLT',
                 updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (colaborador_id,))
-
-        # Encerrar o contrato de experiência
+            WHERE id IN (SELECT colaborador_id FROM temp.contratos_vencidos)
+        ''')
         cursor.execute('''
             UPDATE contratos_experiencia
             SET status = 'EFETIVADO',
                 observacoes = COALESCE(observacoes || ' | ', '') || 'Convertido automaticamente para CLT em ' || ?,
                 updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (hoje, contrato_id))
+            WHERE id IN (SELECT contrato_id FROM temp.contratos_vencidos)
+        ''', (hoje,))
+        cursor.execute('SELECT * FROM temp.contratos_vencidos ORDER BY colaborador_id, contrato_id')
+        contratos_efetivados = [dict(row) for row in cursor.fetchall()]
+        cursor.execute('DROP TABLE temp.contratos_vencidos')
 
-        convertidos.append({
-            'colaborador_id': colaborador_id,
-            'nome': contrato['nome_completo'],
-            'data_conversao': hoje
-        })
-
-    # Também verificar colaboradores com tipo_contrato = 'Contrato de Experiência'
-    # que NÃO têm registro na tabela contratos_experiencia mas têm dados de experiência
-    cursor.execute('''
-        SELECT c.id as colaborador_id, c.nome_completo, c.data_admissao,
-               c.prazo_experiencia, c.prorrogacao
-        FROM colaboradores c
-        LEFT JOIN contratos_experiencia ce ON c.id = ce.colaborador_id AND ce.status = 'VIGENTE'
-        WHERE c.tipo_contrato = 'Contrato de Experiência'
-        AND c.status = 'ATIVO'
-        AND ce.id IS NULL
-        AND c.data_admissao IS NOT NULL
-        AND c.prazo_experiencia IS NOT NULL
-    ''')
-
-    colaboradores_sem_contrato = cursor.fetchall()
+        # Colaboradores em experiência sem contrato vigente registrado
+        cursor.execute('''
+            CREATE TEMP TABLE contratos_vencidos AS
+            SELECT colaborador_id, nome, data_fim FROM (
+                SELECT c.id as colaborador_id, c.nome_completo as nome,
+                       date(c.data_admissao, '+' || (c.prazo_experiencia - 1 + COALESCE(c.prorrogacao, 0)) || ' days') as data_fim
+                FROM colaboradores c
+                WHERE c.tipo_contrato = 'Contrato de Experiência'
+                AND c.status = 'ATIVO'
+                AND c.data_admissao IS NOT NULL
+                AND c.prazo_experiencia IS NOT NULL
+                AND NOT EXISTS (
+                    SELECT 1 FROM contratos_experiencia ce
+                    WHERE ce.colaborador_id = c.id AND ce.status = 'VIGENTE'
+                )
+            )
+            WHERE data_fim < ?
+        ''', (hoje,))
+        cursor.execute('''
+            UPDATE colaboradores
+            SET tipo_contrato = 'CLT',
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id IN (SELECT colaborador_id FROM temp.contratos_vencidos)
+        ''')
+        cursor.execute('SELECT * FROM temp.contratos_vencidos ORDER BY colaborador_id')
+        sem_contrato = [dict(row) for row in cursor.fetchall()]
+        cursor.execute('DROP TABLE temp.contratos_vencidos')
 
-    for colab in colaboradores_sem_contrato:
-        colab = dict(colab)
-        try:
-            inicio = datetime.strptime(colab['data_admissao'], '%Y-%m-%d')
-            prazo = colab['prazo_experiencia']
-            prorrogacao = colab.get('prorrogacao')
+        conn.commit()
 
-            # Calcular data fim
-            fim_inicial = inicio + timedelta(days=prazo - 1)
+    convertidos = [
+        {'colaborador_id': r['colaborador_id'], 'nome': r['nome'], 'data_conversao': hoje}
+        for r in contratos_efetivados + sem_contrato
+    ]
+    if convertidos:
+        registrar_log(
+            tipo_acao='EDITAR',
+            categoria='SISTEMA',
+            descricao=f"Conversão automática para CLT: {len(convertidos)} colaborador(es) "
+                      f"com contrato de experiência vencido",
+            entidade_tipo='COLABORADOR',
+            valor_novo=json.dumps([r['colaborador_id'] for r in convertidos])
+        )
 
-            if prorrogacao:
-                data_fim = fim_inicial + timedelta(days=prorrogacao)
-            else:
-                data_fim = fim_inicial
+    return {
+        'data_conversao': hoje,
+        'contratos_efetivados': contratos_efetivados,
+        'sem_contrato': sem_contrato,
+        'convertidos': convertidos,
+    }
 
-            hoje_dt = datetime.strptime(hoje, '%Y-%m-%d')
 
-            # Se venceu, converter para CLT
-            if data_fim < hoje_dt:
-                cursor.execute('''
-                    UPDATE colaboradores
-                    SET tipo_contrato = 'CLT',
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                ''', (colab['colaborador_id'],))
-
-                convertidos.append({
-                    'colaborador_id': colab['colaborador_id'],
-                    'nome': colab['nome_completo'],
-                    'data_conversao': hoje
-                })
-        except Exception:
-            pass  # Ignorar registros com dados inválidos
+def converter_contratos_vencidos_para_clt() -> List[Dict]:
+    """
+    Verifica contratos de experiência vencidos e converte automaticamente para CLT.
 
-    conn.commit()
-    conn.close()
+    Um contrato é considerado vencido quando:
+    - Se tem prorrogação: a data_fim_prorrogacao já passou
+    - Se não tem prorrogação: a data_fim_inicial já passou
 
-    return convertidos
+    Retorna lista de colaboradores convertidos para log/notificação.
+    """
+    return processar_contratos_vencidos()['convertidos']
 
 
 # =============================================================================
@@ -1820,307 +2801,416 @@ def converter_contratos_vencidos_para_clt() -> List[Dict]:
 
 def criar_periodo_ferias(colaborador_id: int, data_admissao: str) -> int:
     """Cria um período aquisitivo de férias baseado na data de admissão."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
     
-    from datetime import datetime, timedelta
-    from dateutil.relativedelta import relativedelta
+        from datetime import datetime, timedelta
+        from dateutil.relativedelta import relativedelta
     
-    admissao = datetime.strptime(data_admissao, '%Y-%m-%d')
+        admissao = datetime.strptime(data_admissao, '%Y-%m-%d')
 
-    # Período aquisitivo: 12 meses a partir da admissão
-    periodo_inicio = admissao
-    periodo_fim = admissao + relativedelta(years=1) - timedelta(days=1)
+        # Período aquisitivo: 12 meses a partir da admissão
+        periodo_inicio = admissao
+        periodo_fim = admissao + relativedelta(years=1) - timedelta(days=1)
 
-    # Período concessivo: 11 meses após o fim do período aquisitivo
-    concessivo_limite = periodo_fim + relativedelta(months=11)
+        # Período concessivo: 11 meses após o fim do período aquisitivo
+        concessivo_limite = periodo_fim + relativedelta(months=11)
     
-    cursor.execute('''
-        INSERT INTO ferias (colaborador_id, periodo_aquisitivo_inicio, periodo_aquisitivo_fim,
-                           periodo_concessivo_limite, dias_direito)
-        VALUES (?, ?, ?, ?, 30)
-    ''', (
-        colaborador_id,
-        periodo_inicio.strftime('%Y-%m-%d'),
-        periodo_fim.strftime('%Y-%m-%d'),
-        concessivo_limite.strftime('%Y-%m-%d')
-    ))
+        cursor.execute('''
+            INSERT INTO ferias (colaborador_id, periodo_aquisitivo_inicio, periodo_aquisitivo_fim,
+                               periodo_concessivo_limite, dias_direito)
+            VALUES (?, ?, ?, ?, 30)
+        ''', (
+            colaborador_id,
+            periodo_inicio.strftime('%Y-%m-%d'),
+            periodo_fim.strftime('%Y-%m-%d'),
+            concessivo_limite.strftime('%Y-%m-%d')
+        ))
     
-    ferias_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+        ferias_id = cursor.lastrowid
+        conn.commit()
     return ferias_id
 
 def listar_ferias_vencendo(meses_antecedencia: int = 6) -> List[Dict]:
-    """Lista férias com período concessivo próximo do vencimento (em meses)."""
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute('''
-        SELECT f.*, c.nome_completo, c.funcao, e.razao_social as empresa_nome
-        FROM ferias f
-        JOIN colaboradores c ON f.colaborador_id = c.id
-        LEFT JOIN empresas e ON c.empresa_id = e.id
-        WHERE f.status = 'PENDENTE'
-        AND c.status = 'ATIVO'
-        AND date(f.periodo_concessivo_limite) <= date('now', '+' || ? || ' months')
-        ORDER BY f.periodo_concessivo_limite
-    ''', (meses_antecedencia,))
-
-    ferias = [dict(row) for row in cursor.fetchall()]
+    """
+    Lista férias com período concessivo próximo do vencimento (em meses),
+    junto com as últimas férias gozadas de cada colaborador, em uma única consulta.
+    """
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    # Buscar últimas férias gozadas para cada colaborador
-    for f in ferias:
+        # Limite semiaberto sobre a coluna (usa idx_ferias_status_limite)
         cursor.execute('''
-            SELECT pf.data_inicio, pf.data_fim, pf.dias
-            FROM periodos_ferias pf
-            JOIN ferias fer ON pf.ferias_id = fer.id
-            WHERE fer.colaborador_id = ?
-            ORDER BY pf.data_fim DESC
-            LIMIT 1
-        ''', (f['colaborador_id'],))
-
-        ultima = cursor.fetchone()
-        if ultima:
-            f['ultimas_ferias_inicio'] = ultima[0]
-            f['ultimas_ferias_fim'] = ultima[1]
-            f['ultimas_ferias_dias'] = ultima[2]
-        else:
-            f['ultimas_ferias_inicio'] = None
-            f['ultimas_ferias_fim'] = None
-            f['ultimas_ferias_dias'] = None
-
-    conn.close()
+            WITH vencendo AS (
+                SELECT f.*, c.nome_completo, c.funcao, e.razao_social as empresa_nome
+                FROM ferias f
+                JOIN colaboradores c ON f.colaborador_id = c.id
+                LEFT JOIN empresas e ON c.empresa_id = e.id
+                WHERE f.status = 'PENDENTE'
+                AND c.status = 'ATIVO'
+                AND f.periodo_concessivo_limite < date('now', '+' || ? || ' months', '+1 day')
+            ),
+            ultimas AS (
+                SELECT fer.colaborador_id, pf.data_inicio, pf.data_fim, pf.dias,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY fer.colaborador_id
+                           ORDER BY pf.data_fim DESC, pf.id DESC
+                       ) AS ordem
+                FROM ferias fer
+                JOIN periodos_ferias pf ON pf.ferias_id = fer.id
+                WHERE fer.colaborador_id IN (SELECT colaborador_id FROM vencendo)
+            )
+            SELECT v.*,
+                   u.data_inicio as ultimas_ferias_inicio,
+                   u.data_fim as ultimas_ferias_fim,
+                   u.dias as ultimas_ferias_dias
+            FROM vencendo v
+            LEFT JOIN ultimas u ON u.colaborador_id = v.colaborador_id AND u.ordem = 1
+            ORDER BY v.periodo_concessivo_limite
+        ''', (meses_antecedencia,))
+
+        ferias = [dict(row) for row in cursor.fetchall()]
     return ferias
 
 
 def listar_ferias_vencendo_dias(dias_antecedencia: int = 90) -> List[Dict]:
     """Lista férias com período concessivo próximo do vencimento (em dias)."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        SELECT f.*, c.nome_completo, c.funcao, e.razao_social as empresa_nome,
-               CAST(julianday(f.periodo_concessivo_limite) - julianday(date('now', 'localtime')) AS INTEGER) as dias_restantes
-        FROM ferias f
-        JOIN colaboradores c ON f.colaborador_id = c.id
-        LEFT JOIN empresas e ON c.empresa_id = e.id
-        WHERE f.status = 'PENDENTE'
-        AND c.status = 'ATIVO'
-        AND date(f.periodo_concessivo_limite) <= date('now', '+' || ? || ' days')
-        ORDER BY f.periodo_concessivo_limite
-    ''', (dias_antecedencia,))
-
-    ferias = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+        cursor.execute('''
+            SELECT f.*, c.nome_completo, c.funcao, e.razao_social as empresa_nome,
+                   CAST(julianday(f.periodo_concessivo_limite) - julianday(date('now', 'localtime')) AS INTEGER) as dias_restantes
+            FROM ferias f
+            JOIN colaboradores c ON f.colaborador_id = c.id
+            LEFT JOIN empresas e ON c.empresa_id = e.id
+            WHERE f.status = 'PENDENTE'
+            AND c.status = 'ATIVO'
+            AND f.periodo_concessivo_limite < date('now', '+' || ? || ' days', '+1 day')
+            ORDER BY f.periodo_concessivo_limite
+        ''', (dias_antecedencia,))
+
+        ferias = [dict(row) for row in cursor.fetchall()]
     return ferias
 
 def listar_ferias_colaborador(colaborador_id: int) -> List[Dict]:
     """Lista todos os períodos de férias de um colaborador."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM ferias WHERE colaborador_id = ? ORDER BY periodo_aquisitivo_inicio DESC
-    ''', (colaborador_id,))
-    ferias = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM ferias WHERE colaborador_id = ? ORDER BY periodo_aquisitivo_inicio DESC
+        ''', (colaborador_id,))
+        ferias = [dict(row) for row in cursor.fetchall()]
     return ferias
 
 def registrar_gozo_ferias(ferias_id: int, data_inicio: str, data_fim: str,
                           dias: int, abono_pecuniario: bool = False, observacoes: str = None) -> int:
     """Registra um período de gozo de férias."""
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute('''
-        INSERT INTO periodos_ferias (ferias_id, data_inicio, data_fim, dias, abono_pecuniario, observacoes)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (ferias_id, data_inicio, data_fim, dias, 1 if abono_pecuniario else 0, observacoes))
-
-    periodo_id = cursor.lastrowid
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    # Atualizar dias gozados/vendidos
-    if abono_pecuniario:
-        cursor.execute('''
-            UPDATE ferias SET dias_vendidos = dias_vendidos + ?, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (dias, ferias_id))
-    else:
         cursor.execute('''
-            UPDATE ferias SET dias_gozados = dias_gozados + ?, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (dias, ferias_id))
-
-    # Verificar se completou as férias
-    cursor.execute('''
-        SELECT COALESCE(dias_direito, 30) as dias_direito, COALESCE(dias_gozados, 0) as dias_gozados,
-               COALESCE(dias_vendidos, 0) as dias_vendidos, colaborador_id, periodo_aquisitivo_fim
-        FROM ferias WHERE id = ?
-    ''', (ferias_id,))
-    row = cursor.fetchone()
-    if row:
-        total_usado = row['dias_gozados'] + row['dias_vendidos']
-        dias_direito = row['dias_direito'] if row['dias_direito'] else 30
-        if total_usado >= dias_direito:
-            cursor.execute('''
-                UPDATE ferias SET status = 'CONCLUIDO', updated_at = CURRENT_TIMESTAMP WHERE id = ?
-            ''', (ferias_id,))
+            INSERT INTO periodos_ferias (ferias_id, data_inicio, data_fim, dias, abono_pecuniario, observacoes)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (ferias_id, data_inicio, data_fim, dias, 1 if abono_pecuniario else 0, observacoes))
 
-            # Criar próximo período aquisitivo automaticamente baseado na data de RETORNO das férias
-            from dateutil.relativedelta import relativedelta
+        periodo_id = cursor.lastrowid
 
-            # Buscar a data de fim do último período de gozo (data de retorno = data_fim + 1)
+        # Atualizar dias gozados/vendidos
+        if abono_pecuniario:
             cursor.execute('''
-                SELECT data_fim FROM periodos_ferias
-                WHERE ferias_id = ?
-                ORDER BY data_fim DESC LIMIT 1
-            ''', (ferias_id,))
-            ultimo_gozo = cursor.fetchone()
-
-            if ultimo_gozo:
-                # Data de retorno = dia seguinte ao fim das férias
-                data_retorno = datetime.strptime(ultimo_gozo['data_fim'], '%Y-%m-%d') + timedelta(days=1)
-            else:
-                # Fallback: usar fim do período aquisitivo atual + 1
-                data_retorno = datetime.strptime(row['periodo_aquisitivo_fim'], '%Y-%m-%d') + timedelta(days=1)
-
-            # Novo período aquisitivo: da data de retorno até 1 ano depois
-            # Ex: retorno 03/02/2024 -> aquisitivo 03/02/2024 a 02/02/2025
-            proximo_inicio = data_retorno
-            proximo_fim = proximo_inicio + relativedelta(years=1) - timedelta(days=1)
-            # Período concessivo: começa no dia seguinte ao fim do aquisitivo e dura 11 meses
-            # Ex: concessivo 03/02/2025 a 02/01/2026
-            concessivo_limite = proximo_fim + relativedelta(months=11)
-
-            # Verificar se já existe um período que engloba essa data
+                UPDATE ferias SET dias_vendidos = dias_vendidos + ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (dias, ferias_id))
+        else:
             cursor.execute('''
-                SELECT id FROM ferias
-                WHERE colaborador_id = ?
-                AND status = 'PENDENTE'
-                AND periodo_aquisitivo_inicio >= ?
-            ''', (row['colaborador_id'], proximo_inicio.strftime('%Y-%m-%d')))
+                UPDATE ferias SET dias_gozados = dias_gozados + ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (dias, ferias_id))
 
-            if not cursor.fetchone():
+        # Verificar se completou as férias
+        cursor.execute('''
+            SELECT COALESCE(dias_direito, 30) as dias_direito, COALESCE(dias_gozados, 0) as dias_gozados,
+                   COALESCE(dias_vendidos, 0) as dias_vendidos, colaborador_id, periodo_aquisitivo_fim
+            FROM ferias WHERE id = ?
+        ''', (ferias_id,))
+        row = cursor.fetchone()
+        if row:
+            total_usado = row['dias_gozados'] + row['dias_vendidos']
+            dias_direito = row['dias_direito'] if row['dias_direito'] else 30
+            if total_usado >= dias_direito:
                 cursor.execute('''
-                    INSERT INTO ferias (colaborador_id, periodo_aquisitivo_inicio, periodo_aquisitivo_fim,
-                                       periodo_concessivo_limite, dias_direito)
-                    VALUES (?, ?, ?, ?, 30)
-                ''', (
-                    row['colaborador_id'],
-                    proximo_inicio.strftime('%Y-%m-%d'),
-                    proximo_fim.strftime('%Y-%m-%d'),
-                    concessivo_limite.strftime('%Y-%m-%d')
-                ))
+                    UPDATE ferias SET status = 'CONCLUIDO', updated_at = CURRENT_TIMESTAMP WHERE id = ?
+                ''', (ferias_id,))
 
-    conn.commit()
-    conn.close()
+                # Criar próximo período aquisitivo automaticamente baseado na data de RETORNO das férias
+                from dateutil.relativedelta import relativedelta
+
+                # Buscar a data de fim do último período de gozo (data de retorno = data_fim + 1)
+                cursor.execute('''
+                    SELECT data_fim FROM periodos_ferias
+                    WHERE ferias_id = ?
+                    ORDER BY data_fim DESC LIMIT 1
+                ''', (ferias_id,))
+                ultimo_gozo = cursor.fetchone()
+
+                if ultimo_gozo:
+                    # Data de retorno = dia seguinte ao fim das férias
+                    data_retorno = datetime.strptime(ultimo_gozo['data_fim'], '%Y-%m-%d') + timedelta(days=1)
+                else:
+                    # Fallback: usar fim do período aquisitivo atual + 1
+                    data_retorno = datetime.strptime(row['periodo_aquisitivo_fim'], '%Y-%m-%d') + timedelta(days=1)
+
+                # Novo período aquisitivo: da data de retorno até 1 ano depois
+                # Ex: retorno 03/02/2024 -> aquisitivo 03/02/2024 a 02/02/2025
+                proximo_inicio = data_retorno
+                proximo_fim = proximo_inicio + relativedelta(years=1) - timedelta(days=1)
+                # Período concessivo: começa no dia seguinte ao fim do aquisitivo e dura 11 meses
+                # Ex: concessivo 03/02/2025 a 02/01/2026
+                concessivo_limite = proximo_fim + relativedelta(months=11)
+
+                # Verificar se já existe um período que engloba essa data
+                cursor.execute('''
+                    SELECT id FROM ferias
+                    WHERE colaborador_id = ?
+                    AND status = 'PENDENTE'
+                    AND periodo_aquisitivo_inicio >= ?
+                ''', (row['colaborador_id'], proximo_inicio.strftime('%Y-%m-%d')))
+
+                if not cursor.fetchone():
+                    cursor.execute('''
+                        INSERT INTO ferias (colaborador_id, periodo_aquisitivo_inicio, periodo_aquisitivo_fim,
+                                           periodo_concessivo_limite, dias_direito)
+                        VALUES (?, ?, ?, ?, 30)
+                    ''', (
+                        row['colaborador_id'],
+                        proximo_inicio.strftime('%Y-%m-%d'),
+                        proximo_fim.strftime('%Y-%m-%d'),
+                        concessivo_limite.strftime('%Y-%m-%d')
+                    ))
+
+        conn.commit()
     return periodo_id
 
 
 def listar_periodos_ferias_gozados(ferias_id: int) -> List[Dict]:
     """Lista os períodos de férias já gozados de um período aquisitivo."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM periodos_ferias WHERE ferias_id = ? ORDER BY data_inicio
-    ''', (ferias_id,))
-    periodos = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM periodos_ferias WHERE ferias_id = ? ORDER BY data_inicio
+        ''', (ferias_id,))
+        periodos = [dict(row) for row in cursor.fetchall()]
     return periodos
 
 
-def sincronizar_ferias_colaborador(colaborador_id: int):
+def carregar_historico_ferias(colaborador_id: int, hoje: date = None) -> List[Dict]:
     """
-    Sincroniza os períodos de férias de um colaborador, garantindo que:
-    1. Períodos sem gozo registrado voltem para PENDENTE
-    2. Períodos com todos os dias gozados estejam como CONCLUIDO
-    3. Remove períodos futuros órfãos (criados automaticamente mas sem o período anterior concluído)
+    Carrega os períodos aquisitivos do colaborador com seus períodos de gozo
+    em uma única consulta (mais recente primeiro). Cada período traz a lista
+    'periodos' e, se o colaborador estiver em férias hoje, 'em_ferias_agora',
+    'periodo_ferias_atual', 'dias_ja_gozados_ate_hoje' e 'dias_restantes_ferias_atual'.
     """
-    from dateutil.relativedelta import relativedelta
+    hoje = (hoje or date.today()).isoformat()
 
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT f.*,
+                   pf.id AS pf_id, pf.data_inicio AS pf_data_inicio, pf.data_fim AS pf_data_fim,
+                   pf.dias AS pf_dias, pf.abono_pecuniario AS pf_abono_pecuniario,
+                   pf.observacoes AS pf_observacoes, pf.created_at AS pf_created_at,
+                   CASE WHEN NOT pf.abono_pecuniario AND pf.data_inicio <= :hoje AND pf.data_fim >= :hoje
+                        THEN 1 ELSE 0 END AS pf_em_curso,
+                   CAST(julianday(:hoje) - julianday(pf.data_inicio) AS INTEGER) + 1 AS pf_dias_decorridos,
+                   CAST(julianday(pf.data_fim) - julianday(:hoje) AS INTEGER) AS pf_dias_restantes
+            FROM ferias f
+            LEFT JOIN periodos_ferias pf ON pf.ferias_id = f.id
+            WHERE f.colaborador_id = :colaborador_id
+            ORDER BY f.periodo_aquisitivo_inicio DESC, f.id, pf.data_inicio, pf.id
+        ''', {'hoje': hoje, 'colaborador_id': colaborador_id})
+
+        historico = []
+        atual = None
+        for row in cursor.fetchall():
+            row = dict(row)
+            if atual is None or atual['id'] != row['id']:
+                atual = {k: v for k, v in row.items() if not k.startswith('pf_')}
+                atual.update({
+                    'periodos': [],
+                    'em_ferias_agora': False,
+                    'periodo_ferias_atual': None,
+                    'dias_ja_gozados_ate_hoje': 0,
+                    'dias_restantes_ferias_atual': 0,
+                })
+                historico.append(atual)
+            if row['pf_id'] is None:
+                continue
+
+            periodo = {
+                'id': row['pf_id'],
+                'ferias_id': row['id'],
+                'data_inicio': row['pf_data_inicio'],
+                'data_fim': row['pf_data_fim'],
+                'dias': row['pf_dias'],
+                'abono_pecuniario': row['pf_abono_pecuniario'],
+                'observacoes': row['pf_observacoes'],
+                'created_at': row['pf_created_at'],
+            }
+            atual['periodos'].append(periodo)
+            if row['pf_em_curso']:
+                atual['em_ferias_agora'] = True
+                atual['periodo_ferias_atual'] = periodo
+                atual['dias_ja_gozados_ate_hoje'] = row['pf_dias_decorridos']
+                atual['dias_restantes_ferias_atual'] = row['pf_dias_restantes']
+    return historico
 
-    # Buscar todos os períodos de férias do colaborador
-    cursor.execute('''
-        SELECT f.id, f.periodo_aquisitivo_inicio, f.periodo_aquisitivo_fim, f.status,
-               f.dias_direito, f.dias_gozados, f.dias_vendidos
-        FROM ferias f
-        WHERE f.colaborador_id = ?
-        ORDER BY f.periodo_aquisitivo_inicio ASC
-    ''', (colaborador_id,))
-    ferias_list = cursor.fetchall()
-
-    for f in ferias_list:
-        ferias_id = f['id']
-        dias_direito = f['dias_direito'] or 30
-        status_atual = f['status']
-
-        # Contar dias realmente gozados/vendidos nos períodos registrados
-        cursor.execute('''
-            SELECT COALESCE(SUM(CASE WHEN abono_pecuniario = 0 THEN dias ELSE 0 END), 0) as dias_gozados,
-                   COALESCE(SUM(CASE WHEN abono_pecuniario = 1 THEN dias ELSE 0 END), 0) as dias_vendidos
-            FROM periodos_ferias
-            WHERE ferias_id = ?
-        ''', (ferias_id,))
-        resultado = cursor.fetchone()
-        dias_gozados_real = resultado['dias_gozados']
-        dias_vendidos_real = resultado['dias_vendidos']
-        total_usado = dias_gozados_real + dias_vendidos_real
 
-        # Atualizar dias gozados/vendidos se estiverem diferentes
-        if f['dias_gozados'] != dias_gozados_real or f['dias_vendidos'] != dias_vendidos_real:
-            cursor.execute('''
-                UPDATE ferias SET dias_gozados = ?, dias_vendidos = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (dias_gozados_real, dias_vendidos_real, ferias_id))
+def _escopo_ferias(colaborador_ids) -> Tuple[str, tuple]:
+    """Monta o filtro de colaboradores (um id, lista de ids ou todos) sobre ferias f."""
+    if colaborador_ids is None:
+        return '1 = 1', ()
+    if isinstance(colaborador_ids, int):
+        colaborador_ids = [colaborador_ids]
+    return 'f.colaborador_id IN (SELECT value FROM json_each(?))', (json.dumps(list(colaborador_ids)),)
 
-        # Determinar status correto
-        if total_usado >= dias_direito:
-            novo_status = 'CONCLUIDO'
-        else:
-            novo_status = 'PENDENTE'
 
-        # Atualizar status se necessário
-        if status_atual != novo_status:
-            cursor.execute('''
-                UPDATE ferias SET status = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (novo_status, ferias_id))
+def reconciliar_ferias(colaborador_ids=None) -> Dict:
+    """
+    Reconcilia os períodos de férias com os gozos registrados, de forma
+    conjunta (um id, lista de ids ou None para todos os colaboradores):
+    1. dias_gozados/dias_vendidos passam a refletir a soma de periodos_ferias
+    2. Status CONCLUIDO quando todos os dias foram usados, senão PENDENTE
+    3. Remove períodos PENDENTE excedentes (além do mais antigo) sem gozo
+
+    Retorna o resumo do que foi alterado:
+    {'verificados', 'atualizados': [...], 'removidos': [...]}
+    """
+    escopo, params = _escopo_ferias(colaborador_ids)
 
-    # Remover períodos futuros órfãos (PENDENTE sem período anterior CONCLUIDO)
-    cursor.execute('''
-        SELECT f.id, f.periodo_aquisitivo_inicio
-        FROM ferias f
-        WHERE f.colaborador_id = ? AND f.status = 'PENDENTE'
-        ORDER BY f.periodo_aquisitivo_inicio ASC
-    ''', (colaborador_id,))
-    pendentes = cursor.fetchall()
-
-    # Verificar se há mais de um período pendente (o que indicaria inconsistência)
-    if len(pendentes) > 1:
-        # Manter apenas o mais antigo, deletar os outros
-        for p in pendentes[1:]:
-            # Verificar se tem períodos de gozo
-            cursor.execute('SELECT COUNT(*) as cnt FROM periodos_ferias WHERE ferias_id = ?', (p['id'],))
-            if cursor.fetchone()['cnt'] == 0:
-                cursor.execute('DELETE FROM ferias WHERE id = ?', (p['id'],))
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    conn.commit()
-    conn.close()
+        # Diferenças entre o registrado e o apurado em periodos_ferias
+        cursor.execute('DROP TABLE IF EXISTS temp.reconciliacao_ferias')
+        cursor.execute(f'''
+            CREATE TEMP TABLE reconciliacao_ferias AS
+            SELECT * FROM (
+                SELECT f.id AS ferias_id, f.colaborador_id,
+                       f.dias_gozados AS dias_gozados_antes,
+                       f.dias_vendidos AS dias_vendidos_antes,
+                       f.status AS status_antes,
+                       COALESCE(t.gozados, 0) AS dias_gozados,
+                       COALESCE(t.vendidos, 0) AS dias_vendidos,
+                       CASE WHEN COALESCE(t.gozados, 0) + COALESCE(t.vendidos, 0)
+                                 >= COALESCE(NULLIF(f.dias_direito, 0), 30)
+                            THEN 'CONCLUIDO' ELSE 'PENDENTE' END AS status
+                FROM ferias f
+                LEFT JOIN (
+                    SELECT ferias_id,
+                           SUM(CASE WHEN abono_pecuniario = 0 THEN dias ELSE 0 END) AS gozados,
+                           SUM(CASE WHEN abono_pecuniario = 1 THEN dias ELSE 0 END) AS vendidos
+                    FROM periodos_ferias
+                    GROUP BY ferias_id
+                ) t ON t.ferias_id = f.id
+                WHERE {escopo}
+            )
+            WHERE dias_gozados_antes IS NOT dias_gozados
+               OR dias_vendidos_antes IS NOT dias_vendidos
+               OR status_antes IS NOT status
+        ''', params)
+
+        cursor.execute('''
+            UPDATE ferias
+            SET dias_gozados = r.dias_gozados, dias_vendidos = r.dias_vendidos,
+                status = r.status, updated_at = CURRENT_TIMESTAMP
+            FROM temp.reconciliacao_ferias r
+            WHERE ferias.id = r.ferias_id
+        ''')
+        cursor.execute('SELECT * FROM temp.reconciliacao_ferias ORDER BY colaborador_id, ferias_id')
+        atualizados = [dict(row) for row in cursor.fetchall()]
+        cursor.execute('DROP TABLE temp.reconciliacao_ferias')
+
+        # Períodos PENDENTE excedentes (o mais antigo de cada colaborador é mantido)
+        cursor.execute(f'''
+            SELECT id AS ferias_id, colaborador_id, periodo_aquisitivo_inicio
+            FROM (
+                SELECT f.id, f.colaborador_id, f.periodo_aquisitivo_inicio,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY f.colaborador_id
+                           ORDER BY f.periodo_aquisitivo_inicio, f.id
+                       ) AS ordem
+                FROM ferias f
+                WHERE f.status = 'PENDENTE' AND {escopo}
+            ) p
+            WHERE p.ordem > 1
+              AND NOT EXISTS (SELECT 1 FROM periodos_ferias pf WHERE pf.ferias_id = p.id)
+        ''', params)
+        removidos = [dict(row) for row in cursor.fetchall()]
+        if removidos:
+            cursor.execute(
+                'DELETE FROM ferias WHERE id IN (SELECT value FROM json_each(?))',
+                (json.dumps([r['ferias_id'] for r in removidos]),)
+            )
+
+        cursor.execute(f'SELECT COUNT(*) FROM ferias f WHERE {escopo}', params)
+        verificados = cursor.fetchone()[0] + len(removidos)
+
+        conn.commit()
+
+    return {'verificados': verificados, 'atualizados': atualizados, 'removidos': removidos}
+
+
+def reconciliar_ferias_diario(forcar: bool = False) -> Optional[Dict]:
+    """
+    Reconcilia as férias de todos os colaboradores no máximo uma vez por dia
+    (executado na inicialização). Retorna o resumo ou None se já executado hoje.
+    """
+    hoje = date.today().isoformat()
+
+    if obter_configuracao('ferias_reconciliadas_em') == hoje and not forcar:
+        return None
+
+    with conexao() as conn:
+        resumo = reconciliar_ferias()
+        salvar_configuracao('ferias_reconciliadas_em', hoje)
+        conn.commit()
+
+    if resumo['atualizados'] or resumo['removidos']:
+        registrar_log(
+            tipo_acao='EDITAR',
+            categoria='SISTEMA',
+            descricao=f"Reconciliação de férias: {len(resumo['atualizados'])} período(s) "
+                      f"atualizado(s), {len(resumo['removidos'])} removido(s)",
+            entidade_tipo='FERIAS',
+            valor_novo=json.dumps({
+                'atualizados': [r['ferias_id'] for r in resumo['atualizados']],
+                'removidos': [r['ferias_id'] for r in resumo['removidos']]
+            })
+        )
+    return resumo
+
+
+def sincronizar_ferias_colaborador(colaborador_id: int) -> Dict:
+    """
+    Sincroniza os períodos de férias de um colaborador, garantindo que:
+    1. Períodos sem gozo registrado voltem para PENDENTE
+    2. Períodos com todos os dias gozados estejam como CONCLUIDO
+    3. Remove períodos futuros órfãos (criados automaticamente mas sem o período anterior concluído)
+    """
+    return reconciliar_ferias([colaborador_id])
 
 
 def obter_ferias_pendente(colaborador_id: int) -> Optional[Dict]:
     """Obtém o período de férias pendente mais antigo do colaborador."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM ferias
-        WHERE colaborador_id = ? AND status = 'PENDENTE'
-        ORDER BY periodo_aquisitivo_inicio ASC LIMIT 1
-    ''', (colaborador_id,))
-    row = cursor.fetchone()
-    conn.close()
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM ferias
+            WHERE colaborador_id = ? AND status = 'PENDENTE'
+            ORDER BY periodo_aquisitivo_inicio ASC LIMIT 1
+        ''', (colaborador_id,))
+        row = cursor.fetchone()
     return dict(row) if row else None
 
 
@@ -2130,25 +3220,24 @@ def listar_colaboradores_em_ferias() -> List[Dict]:
     Um colaborador está de férias se a data atual está dentro de um período
     registrado na tabela periodos_ferias e não é abono pecuniário.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        SELECT DISTINCT c.id, c.nome_completo, c.funcao, c.foto_path,
-               e.razao_social as empresa_nome,
-               pf.data_inicio, pf.data_fim, pf.dias
-        FROM periodos_ferias pf
-        JOIN ferias f ON pf.ferias_id = f.id
-        JOIN colaboradores c ON f.colaborador_id = c.id
-        LEFT JOIN empresas e ON c.empresa_id = e.id
-        WHERE date('now', 'localtime') BETWEEN date(pf.data_inicio) AND date(pf.data_fim)
-        AND pf.abono_pecuniario = 0
-        AND c.status = 'ATIVO'
-        ORDER BY c.nome_completo
-    ''')
+        cursor.execute('''
+            SELECT DISTINCT c.id, c.nome_completo, c.funcao, c.foto_path,
+                   e.razao_social as empresa_nome,
+                   pf.data_inicio, pf.data_fim, pf.dias
+            FROM periodos_ferias pf
+            JOIN ferias f ON pf.ferias_id = f.id
+            JOIN colaboradores c ON f.colaborador_id = c.id
+            LEFT JOIN empresas e ON c.empresa_id = e.id
+            WHERE date('now', 'localtime') BETWEEN date(pf.data_inicio) AND date(pf.data_fim)
+            AND pf.abono_pecuniario = 0
+            AND c.status = 'ATIVO'
+            ORDER BY c.nome_completo
+        ''')
 
-    colaboradores = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+        colaboradores = [dict(row) for row in cursor.fetchall()]
     return colaboradores
 
 
@@ -2159,72 +3248,70 @@ def atualizar_ferias_por_admissao(colaborador_id: int, nova_data_admissao: str):
     - Períodos posteriores sem gozo: são deletados e recriados
     - Ao final, cria um novo período baseado na nova data de admissão
     """
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    from datetime import datetime, timedelta
-    from dateutil.relativedelta import relativedelta
+        from datetime import datetime, timedelta
+        from dateutil.relativedelta import relativedelta
 
-    # Converter nova data de admissão para comparação
-    nova_admissao = datetime.strptime(nova_data_admissao, '%Y-%m-%d')
+        # Converter nova data de admissão para comparação
+        nova_admissao = datetime.strptime(nova_data_admissao, '%Y-%m-%d')
 
-    # Buscar todos os períodos de férias do colaborador
-    cursor.execute('''
-        SELECT f.id, f.periodo_aquisitivo_inicio, f.dias_gozados, f.dias_vendidos, f.status
-        FROM ferias f
-        WHERE f.colaborador_id = ?
-    ''', (colaborador_id,))
+        # Buscar todos os períodos de férias do colaborador
+        cursor.execute('''
+            SELECT f.id, f.periodo_aquisitivo_inicio, f.dias_gozados, f.dias_vendidos, f.status
+            FROM ferias f
+            WHERE f.colaborador_id = ?
+        ''', (colaborador_id,))
 
-    ferias_existentes = cursor.fetchall()
+        ferias_existentes = cursor.fetchall()
 
-    # Se não há férias, criar o primeiro período
-    if not ferias_existentes:
-        conn.close()
-        criar_periodo_ferias(colaborador_id, nova_data_admissao)
-        return
+        # Se não há férias, criar o primeiro período
+        if not ferias_existentes:
+            criar_periodo_ferias(colaborador_id, nova_data_admissao)
+            return
 
-    ids_para_deletar = []
+        ids_para_deletar = []
 
-    for f in ferias_existentes:
-        ferias_id = f['id']
-        periodo_inicio_str = f['periodo_aquisitivo_inicio']
+        for f in ferias_existentes:
+            ferias_id = f['id']
+            periodo_inicio_str = f['periodo_aquisitivo_inicio']
 
-        # Converter data do período para comparação
-        try:
-            periodo_inicio = datetime.strptime(periodo_inicio_str, '%Y-%m-%d')
-        except:
-            periodo_inicio = None
-
-        # REGRA 1: Se o período aquisitivo começa ANTES da nova data de admissão,
-        # é um dado inconsistente e deve ser deletado (independente de ter gozo ou não)
-        if periodo_inicio and periodo_inicio < nova_admissao:
-            ids_para_deletar.append(ferias_id)
-            # Deletar também os períodos de gozo associados
-            cursor.execute('DELETE FROM periodos_ferias WHERE ferias_id = ?', (ferias_id,))
-            continue
+            # Converter data do período para comparação
+            try:
+                periodo_inicio = datetime.strptime(periodo_inicio_str, '%Y-%m-%d')
+            except:
+                periodo_inicio = None
 
-        # REGRA 2: Para períodos posteriores à admissão, verificar se tem gozo
-        # Verificar se tem períodos de gozo na tabela periodos_ferias
-        cursor.execute('''
-            SELECT COUNT(*) as total FROM periodos_ferias WHERE ferias_id = ?
-        ''', (ferias_id,))
-        resultado = cursor.fetchone()
-        tem_periodo_gozo = resultado['total'] > 0 if resultado else False
+            # REGRA 1: Se o período aquisitivo começa ANTES da nova data de admissão,
+            # é um dado inconsistente e deve ser deletado (independente de ter gozo ou não)
+            if periodo_inicio and periodo_inicio < nova_admissao:
+                ids_para_deletar.append(ferias_id)
+                # Deletar também os períodos de gozo associados
+                cursor.execute('DELETE FROM periodos_ferias WHERE ferias_id = ?', (ferias_id,))
+                continue
 
-        # Verificar se tem dias gozados ou vendidos marcados
-        tem_dias_usados = f['dias_gozados'] > 0 or f['dias_vendidos'] > 0
+            # REGRA 2: Para períodos posteriores à admissão, verificar se tem gozo
+            # Verificar se tem períodos de gozo na tabela periodos_ferias
+            cursor.execute('''
+                SELECT COUNT(*) as total FROM periodos_ferias WHERE ferias_id = ?
+            ''', (ferias_id,))
+            resultado = cursor.fetchone()
+            tem_periodo_gozo = resultado['total'] > 0 if resultado else False
 
-        # Se não tem nenhum uso, marcar para deletar
-        if not tem_periodo_gozo and not tem_dias_usados:
-            ids_para_deletar.append(ferias_id)
+            # Verificar se tem dias gozados ou vendidos marcados
+            tem_dias_usados = f['dias_gozados'] > 0 or f['dias_vendidos'] > 0
 
-    # Deletar os períodos marcados
-    if ids_para_deletar:
-        placeholders = ','.join(['?' for _ in ids_para_deletar])
-        cursor.execute(f'DELETE FROM ferias WHERE id IN ({placeholders})', ids_para_deletar)
+            # Se não tem nenhum uso, marcar para deletar
+            if not tem_periodo_gozo and not tem_dias_usados:
+                ids_para_deletar.append(ferias_id)
 
-    conn.commit()
-    conn.close()
+        # Deletar os períodos marcados
+        if ids_para_deletar:
+            placeholders = ','.join(['?' for _ in ids_para_deletar])
+            cursor.execute(f'DELETE FROM ferias WHERE id IN ({placeholders})', ids_para_deletar)
+
+        conn.commit()
 
     # Criar novo período baseado na nova data de admissão
     criar_periodo_ferias(colaborador_id, nova_data_admissao)
@@ -2239,68 +3326,69 @@ def listar_banco_talentos(filtro: str = None, empresa_id: int = None) -> List[Di
     Lista TODOS os colaboradores que já passaram pelo sistema,
     independente de status (ativo, inativo, blocklist, etc).
     """
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    query = '''
-        SELECT c.*, e.razao_social as empresa_nome,
-               CASE
-                   WHEN c.status = 'ATIVO' THEN 'Ativo'
-                   WHEN c.status = 'INATIVO' AND EXISTS (
-                       SELECT 1 FROM blocklist b WHERE b.cpf = c.cpf
-                   ) THEN 'Block-List'
-                   WHEN c.status = 'INATIVO' THEN 'Inativo'
-                   ELSE c.status
-               END as status_detalhado,
-               (SELECT 1 FROM blocklist b WHERE b.cpf = c.cpf LIMIT 1) as na_blocklist
-        FROM colaboradores c
-        LEFT JOIN empresas e ON c.empresa_id = e.id
-        WHERE 1=1
-    '''
-    params = []
+        query = '''
+            SELECT c.*, e.razao_social as empresa_nome,
+                   CASE
+                       WHEN c.status = 'ATIVO' THEN 'Ativo'
+                       WHEN c.status = 'INATIVO' AND EXISTS (
+                           SELECT 1 FROM blocklist b WHERE b.cpf = c.cpf
+                       ) THEN 'Block-List'
+                       WHEN c.status = 'INATIVO' THEN 'Inativo'
+                       ELSE c.status
+                   END as status_detalhado,
+                   (SELECT 1 FROM blocklist b WHERE b.cpf = c.cpf LIMIT 1) as na_blocklist
+            FROM colaboradores c
+            LEFT JOIN empresas e ON c.empresa_id = e.id
+            WHERE 1=1
+        '''
+        params = []
 
-    if filtro:
-        query += ' AND (c.nome_completo LIKE ? OR c.cpf LIKE ?)'
-        params.extend([f'%{filtro}%', f'%{filtro}%'])
+        ordem, params_ordem = '', []
+        if filtro:
+            condicao, params_filtro, relevancia, params_ordem = _filtro_busca_colaborador(filtro)
+            query += f' AND {condicao}'
+            params.extend(params_filtro)
+            ordem = f'{relevancia}, '
 
-    if empresa_id:
-        query += ' AND c.empresa_id = ?'
-        params.append(empresa_id)
+        if empresa_id:
+            query += ' AND c.empresa_id = ?'
+            params.append(empresa_id)
 
-    query += ' ORDER BY c.nome_completo'
+        query += f' ORDER BY {ordem}c.nome_completo'
+        params.extend(params_ordem)
 
-    cursor.execute(query, params)
-    colaboradores = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+        cursor.execute(query, params)
+        colaboradores = [dict(row) for row in cursor.fetchall()]
     return colaboradores
 
 
 def obter_estatisticas_banco_talentos() -> Dict:
     """Retorna estatísticas do banco de talentos."""
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    # Total de colaboradores
-    cursor.execute('SELECT COUNT(*) FROM colaboradores')
-    total = cursor.fetchone()[0]
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    # Ativos
-    cursor.execute("SELECT COUNT(*) FROM colaboradores WHERE status = 'ATIVO'")
-    ativos = cursor.fetchone()[0]
+        # Total de colaboradores
+        cursor.execute('SELECT COUNT(*) FROM colaboradores')
+        total = cursor.fetchone()[0]
 
-    # Inativos (não na blocklist)
-    cursor.execute('''
-        SELECT COUNT(*) FROM colaboradores c
-        WHERE c.status = 'INATIVO'
-        AND NOT EXISTS (SELECT 1 FROM blocklist b WHERE b.cpf = c.cpf)
-    ''')
-    inativos = cursor.fetchone()[0]
+        # Ativos
+        cursor.execute("SELECT COUNT(*) FROM colaboradores WHERE status = 'ATIVO'")
+        ativos = cursor.fetchone()[0]
 
-    # Na blocklist (contar CPFs únicos, não registros)
-    cursor.execute('SELECT COUNT(DISTINCT cpf) FROM blocklist')
-    blocklist = cursor.fetchone()[0]
+        # Inativos (não na blocklist)
+        cursor.execute('''
+            SELECT COUNT(*) FROM colaboradores c
+            WHERE c.status = 'INATIVO'
+            AND NOT EXISTS (SELECT 1 FROM blocklist b WHERE b.cpf = c.cpf)
+        ''')
+        inativos = cursor.fetchone()[0]
 
-    conn.close()
+        # Na blocklist (contar CPFs únicos, não registros)
+        cursor.execute('SELECT COUNT(DISTINCT cpf) FROM blocklist')
+        blocklist = cursor.fetchone()[0]
 
     return {
         'total': total,
@@ -2314,26 +3402,96 @@ def obter_estatisticas_banco_talentos() -> Dict:
 # Aniversariantes
 # =============================================================================
 
+def _criar_colunas_aniversario(conn):
+    """
+    Cria as colunas geradas nasc_mes/nasc_dia (mês e dia de data_nascimento)
+    e o índice (status, nasc_mes, nasc_dia) usado nas consultas de aniversariantes.
+    """
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_xinfo(colaboradores)")
+    colunas = [col[1] for col in cursor.fetchall()]
+    for coluna, formato in (('nasc_mes', '%m'), ('nasc_dia', '%d')):
+        if coluna not in colunas:
+            cursor.execute(f'''
+                ALTER TABLE colaboradores ADD COLUMN {coluna} INTEGER
+                GENERATED ALWAYS AS (CAST(strftime('{formato}', data_nascimento) AS INTEGER)) VIRTUAL
+            ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_colaboradores_aniversario
+        ON colaboradores(status, nasc_mes, nasc_dia)
+    ''')
+    conn.commit()
+
+
 def listar_aniversariantes_mes(mes: int = None) -> List[Dict]:
     """Lista os aniversariantes do mês."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
     
-    if mes is None:
-        mes = datetime.now().month
+        if mes is None:
+            mes = datetime.now().month
     
-    cursor.execute('''
-        SELECT c.id, c.nome_completo, c.data_nascimento, c.funcao, c.departamento,
-               e.razao_social as empresa_nome
-        FROM colaboradores c
-        LEFT JOIN empresas e ON c.empresa_id = e.id
-        WHERE c.status = 'ATIVO'
-        AND strftime('%m', c.data_nascimento) = ?
-        ORDER BY strftime('%d', c.data_nascimento)
-    ''', (f'{mes:02d}',))
+        cursor.execute('''
+            SELECT c.id, c.nome_completo, c.data_nascimento, c.funcao, c.departamento,
+                   e.razao_social as empresa_nome
+            FROM colaboradores c
+            LEFT JOIN empresas e ON c.empresa_id = e.id
+            WHERE c.status = 'ATIVO'
+            AND c.nasc_mes = ?
+            ORDER BY c.nasc_dia
+        ''', (mes,))
     
-    aniversariantes = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+        aniversariantes = [dict(row) for row in cursor.fetchall()]
+    return aniversariantes
+
+
+def listar_aniversariantes_proximos(dias: int = 30, hoje: date = None) -> List[Dict]:
+    """
+    Lista os aniversariantes dos próximos dias (incluindo hoje), em ordem de
+    data, considerando a virada do ano. Cada item traz 'data_aniversario',
+    'dias_para_aniversario' e 'idade' (a completar).
+    """
+    hoje = hoje or date.today()
+    fim = hoje + timedelta(days=dias)
+    inicio_md = (hoje.month, hoje.day)
+    fim_md = (fim.month, fim.day)
+    if inicio_md == (3, 1) and not calendar.isleap(hoje.year):
+        inicio_md = (2, 29)
+
+    # Faixa de (mês, dia) sobre o índice (status, nasc_mes, nasc_dia)
+    if dias >= 365:
+        faixa, params = 'c.nasc_mes IS NOT NULL', ()
+    elif fim_md >= inicio_md:
+        faixa, params = '(c.nasc_mes, c.nasc_dia) BETWEEN (?, ?) AND (?, ?)', inicio_md + fim_md
+    else:
+        faixa, params = '((c.nasc_mes, c.nasc_dia) >= (?, ?) OR (c.nasc_mes, c.nasc_dia) <= (?, ?))', inicio_md + fim_md
+
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT c.id, c.nome_completo, c.data_nascimento, c.funcao, c.departamento,
+                   c.nasc_mes, c.nasc_dia, e.razao_social as empresa_nome
+            FROM colaboradores c
+            LEFT JOIN empresas e ON c.empresa_id = e.id
+            WHERE c.status = 'ATIVO'
+            AND {faixa}
+            ORDER BY CASE WHEN (c.nasc_mes, c.nasc_dia) >= (?, ?) THEN 0 ELSE 1 END,
+                     c.nasc_mes, c.nasc_dia, c.nome_completo
+        ''', params + inicio_md)
+        linhas = [dict(row) for row in cursor.fetchall()]
+
+    aniversariantes = []
+    for a in linhas:
+        mes, dia = a.pop('nasc_mes'), a.pop('nasc_dia')
+        ano = hoje.year if (mes, dia) >= inicio_md else hoje.year + 1
+        # Nascidos em 29/02 fazem aniversário em 01/03 nos anos não bissextos
+        if (mes, dia) == (2, 29) and not calendar.isleap(ano):
+            mes, dia = 3, 1
+        data_aniversario = date(ano, mes, dia)
+        a['data_aniversario'] = data_aniversario.isoformat()
+        a['dias_para_aniversario'] = (data_aniversario - hoje).days
+        a['idade'] = ano - int(a['data_nascimento'][:4])
+        aniversariantes.append(a)
     return aniversariantes
 
 
@@ -2343,30 +3501,29 @@ def listar_aniversariantes_mes(mes: int = None) -> List[Dict]:
 
 def exportar_colaboradores_dict(status: str = None, empresa_id: int = None) -> List[Dict]:
     """Exporta colaboradores como lista de dicionários."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
     
-    query = '''
-        SELECT c.*, e.razao_social as empresa_nome, e.cnpj as empresa_cnpj
-        FROM colaboradores c
-        LEFT JOIN empresas e ON c.empresa_id = e.id
-        WHERE 1=1
-    '''
-    params = []
+        query = '''
+            SELECT c.*, e.razao_social as empresa_nome, e.cnpj as empresa_cnpj
+            FROM colaboradores c
+            LEFT JOIN empresas e ON c.empresa_id = e.id
+            WHERE 1=1
+        '''
+        params = []
     
-    if status:
-        query += ' AND c.status = ?'
-        params.append(status)
+        if status:
+            query += ' AND c.status = ?'
+            params.append(status)
     
-    if empresa_id:
-        query += ' AND c.empresa_id = ?'
-        params.append(empresa_id)
+        if empresa_id:
+            query += ' AND c.empresa_id = ?'
+            params.append(empresa_id)
     
-    query += ' ORDER BY c.nome_completo'
+        query += ' ORDER BY c.nome_completo'
     
-    cursor.execute(query, params)
-    colaboradores = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+        cursor.execute(query, params)
+        colaboradores = [dict(row) for row in cursor.fetchall()]
     return colaboradores
 
 
@@ -2446,58 +3603,55 @@ CAMPOS_LEGIVEIS = {
 
 def registrar_alteracao(colaborador_id: int, campo: str, valor_anterior: str, valor_novo: str):
     """Registra uma alteração no histórico do colaborador."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        INSERT INTO historico_alteracoes (colaborador_id, campo, valor_anterior, valor_novo)
-        VALUES (?, ?, ?, ?)
-    ''', (colaborador_id, campo, str(valor_anterior) if valor_anterior is not None else None,
-          str(valor_novo) if valor_novo is not None else None))
+        cursor.execute('''
+            INSERT INTO historico_alteracoes (colaborador_id, campo, valor_anterior, valor_novo)
+            VALUES (?, ?, ?, ?)
+        ''', (colaborador_id, campo, str(valor_anterior) if valor_anterior is not None else None,
+              str(valor_novo) if valor_novo is not None else None))
 
-    conn.commit()
-    conn.close()
+        conn.commit()
 
 
 def registrar_alteracoes_colaborador(colaborador_id: int, dados_novos: dict, dados_antigos: dict):
     """Compara dados novos e antigos e registra todas as alterações."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    for campo, valor_novo in dados_novos.items():
-        if campo in ['id', 'created_at', 'updated_at']:
-            continue
+        for campo, valor_novo in dados_novos.items():
+            if campo in ['id', 'created_at', 'updated_at']:
+                continue
 
-        valor_anterior = dados_antigos.get(campo)
+            valor_anterior = dados_antigos.get(campo)
 
-        # Converter para string para comparação
-        str_anterior = str(valor_anterior) if valor_anterior is not None else ''
-        str_novo = str(valor_novo) if valor_novo is not None else ''
+            # Converter para string para comparação
+            str_anterior = str(valor_anterior) if valor_anterior is not None else ''
+            str_novo = str(valor_novo) if valor_novo is not None else ''
 
-        # Só registra se houver mudança real
-        if str_anterior != str_novo:
-            cursor.execute('''
-                INSERT INTO historico_alteracoes (colaborador_id, campo, valor_anterior, valor_novo)
-                VALUES (?, ?, ?, ?)
-            ''', (colaborador_id, campo, str_anterior if str_anterior else None, str_novo if str_novo else None))
+            # Só registra se houver mudança real
+            if str_anterior != str_novo:
+                cursor.execute('''
+                    INSERT INTO historico_alteracoes (colaborador_id, campo, valor_anterior, valor_novo)
+                    VALUES (?, ?, ?, ?)
+                ''', (colaborador_id, campo, str_anterior if str_anterior else None, str_novo if str_novo else None))
 
-    conn.commit()
-    conn.close()
+        conn.commit()
 
 
 def listar_historico_colaborador(colaborador_id: int) -> List[Dict]:
     """Lista todo o histórico de alterações de um colaborador."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        SELECT * FROM historico_alteracoes
-        WHERE colaborador_id = ?
-        ORDER BY data_alteracao DESC
-    ''', (colaborador_id,))
+        cursor.execute('''
+            SELECT * FROM historico_alteracoes
+            WHERE colaborador_id = ?
+            ORDER BY data_alteracao DESC
+        ''', (colaborador_id,))
 
-    historico = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+        historico = [dict(row) for row in cursor.fetchall()]
     return historico
 
 
@@ -2543,78 +3697,76 @@ def migrar_cpfs_para_11_digitos():
     - blocklist.cpf
     - dependentes.cpf
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    # Migrar CPFs da tabela colaboradores
-    cursor.execute('SELECT id, cpf, cpf_mae, cpf_pai FROM colaboradores WHERE cpf IS NOT NULL OR cpf_mae IS NOT NULL OR cpf_pai IS NOT NULL')
-    colaboradores = cursor.fetchall()
-
-    for colab in colaboradores:
-        updates = {}
-
-        # CPF principal
-        if colab['cpf']:
-            cpf_normalizado = normalizar_cpf(colab['cpf'])
-            if cpf_normalizado and cpf_normalizado != colab['cpf']:
-                updates['cpf'] = cpf_normalizado
-
-        # CPF da mãe
-        if colab['cpf_mae']:
-            cpf_mae_normalizado = normalizar_cpf(colab['cpf_mae'])
-            if cpf_mae_normalizado and cpf_mae_normalizado != colab['cpf_mae']:
-                updates['cpf_mae'] = cpf_mae_normalizado
-
-        # CPF do pai
-        if colab['cpf_pai']:
-            cpf_pai_normalizado = normalizar_cpf(colab['cpf_pai'])
-            if cpf_pai_normalizado and cpf_pai_normalizado != colab['cpf_pai']:
-                updates['cpf_pai'] = cpf_pai_normalizado
-
-        # Aplicar updates se houver mudanças
-        if updates:
-            set_clause = ', '.join([f"{k} = ?" for k in updates.keys()])
-            values = list(updates.values()) + [colab['id']]
-            cursor.execute(f'UPDATE colaboradores SET {set_clause} WHERE id = ?', values)
-
-    # Migrar CPFs da tabela blocklist
-    cursor.execute('SELECT id, cpf FROM blocklist WHERE cpf IS NOT NULL')
-    blocklist_registros = cursor.fetchall()
-
-    for registro in blocklist_registros:
-        if registro['cpf']:
-            cpf_normalizado = normalizar_cpf(registro['cpf'])
-            if cpf_normalizado and cpf_normalizado != registro['cpf']:
-                cursor.execute('UPDATE blocklist SET cpf = ? WHERE id = ?', (cpf_normalizado, registro['id']))
-
-    # Migrar CPFs da tabela dependentes
-    cursor.execute('SELECT id, cpf FROM dependentes WHERE cpf IS NOT NULL')
-    dependentes = cursor.fetchall()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    for dep in dependentes:
-        if dep['cpf']:
-            cpf_normalizado = normalizar_cpf(dep['cpf'])
-            if cpf_normalizado and cpf_normalizado != dep['cpf']:
-                cursor.execute('UPDATE dependentes SET cpf = ? WHERE id = ?', (cpf_normalizado, dep['id']))
+        # Migrar CPFs da tabela colaboradores
+        cursor.execute('SELECT id, cpf, cpf_mae, cpf_pai FROM colaboradores WHERE cpf IS NOT NULL OR cpf_mae IS NOT NULL OR cpf_pai IS NOT NULL')
+        colaboradores = cursor.fetchall()
+
+        for colab in colaboradores:
+            updates = {}
+
+            # CPF principal
+            if colab['cpf']:
+                cpf_normalizado = normalizar_cpf(colab['cpf'])
+                if cpf_normalizado and cpf_normalizado != colab['cpf']:
+                    updates['cpf'] = cpf_normalizado
+
+            # CPF da mãe
+            if colab['cpf_mae']:
+                cpf_mae_normalizado = normalizar_cpf(colab['cpf_mae'])
+                if cpf_mae_normalizado and cpf_mae_normalizado != colab['cpf_mae']:
+                    updates['cpf_mae'] = cpf_mae_normalizado
+
+            # CPF do pai
+            if colab['cpf_pai']:
+                cpf_pai_normalizado = normalizar_cpf(colab['cpf_pai'])
+                if cpf_pai_normalizado and cpf_pai_normalizado != colab['cpf_pai']:
+                    updates['cpf_pai'] = cpf_pai_normalizado
+
+            # Aplicar updates se houver mudanças
+            if updates:
+                set_clause = ', '.join([f"{k} = ?" for k in updates.keys()])
+                values = list(updates.values()) + [colab['id']]
+                cursor.execute(f'UPDATE colaboradores SET {set_clause} WHERE id = ?', values)
+
+        # Migrar CPFs da tabela blocklist
+        cursor.execute('SELECT id, cpf FROM blocklist WHERE cpf IS NOT NULL')
+        blocklist_registros = cursor.fetchall()
+
+        for registro in blocklist_registros:
+            if registro['cpf']:
+                cpf_normalizado = normalizar_cpf(registro['cpf'])
+                if cpf_normalizado and cpf_normalizado != registro['cpf']:
+                    cursor.execute('UPDATE blocklist SET cpf = ? WHERE id = ?', (cpf_normalizado, registro['id']))
+
+        # Migrar CPFs da tabela dependentes
+        cursor.execute('SELECT id, cpf FROM dependentes WHERE cpf IS NOT NULL')
+        dependentes = cursor.fetchall()
+
+        for dep in dependentes:
+            if dep['cpf']:
+                cpf_normalizado = normalizar_cpf(dep['cpf'])
+                if cpf_normalizado and cpf_normalizado != dep['cpf']:
+                    cursor.execute('UPDATE dependentes SET cpf = ? WHERE id = ?', (cpf_normalizado, dep['id']))
 
-    conn.commit()
-    conn.close()
+        conn.commit()
 
 
 def finalizar_contrato_experiencia(colaborador_id: int):
     """Finaliza o contrato de experiência de um colaborador (usado quando muda para CLT)."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        UPDATE contratos_experiencia
-        SET status = 'FINALIZADO', updated_at = CURRENT_TIMESTAMP
-        WHERE colaborador_id = ? AND status = 'VIGENTE'
-    ''', (colaborador_id,))
+        cursor.execute('''
+            UPDATE contratos_experiencia
+            SET status = 'FINALIZADO', updated_at = CURRENT_TIMESTAMP
+            WHERE colaborador_id = ? AND status = 'VIGENTE'
+        ''', (colaborador_id,))
 
-    conn.commit()
-    affected = cursor.rowcount
-    conn.close()
+        conn.commit()
+        affected = cursor.rowcount
     return affected > 0
 
 
@@ -2639,6 +3791,15 @@ DOCUMENTOS_OBRIGATORIOS = [
     "CÓPIA DA CNH",
 ]
 
+# Documentos exigidos por dependente ("<documento> - <nome do dependente>"):
+# CPF para todos e, para filhos, também os de DOCUMENTOS_FILHO
+PARENTESCOS_FILHO = ['filho', 'filha', 'filho(a)', 'enteado', 'enteada', 'menor sob guarda']
+DOCUMENTOS_FILHO = ["CERTIDÃO DE NASCIMENTO", "CARTÃO DE VACINA", "DECLARAÇÃO DE FREQUÊNCIA ESCOLAR"]
+
+# Versão do cálculo em _documentos_obrigatorios_de_dependentes: incremente ao
+# mudar a regra (as listas acima já entram na versão de documentos_status)
+REGRA_DOCUMENTOS_VERSAO = 1
+
 # Diretório base para documentos
 DOCUMENTOS_DIR = "documentos_colaborador"
 
@@ -2651,51 +3812,50 @@ def obter_diretorio_documentos():
 
 
 def listar_tipos_documentos() -> List[str]:
-    """Retorna a lista de tipos de documentos (obrigatórios + personalizados do banco)."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    """Retorna a lista de tipos de documentos (obrigatórios + personalizados do banco, em cache)."""
+    def carregar(conn):
+        cursor = conn.cursor()
 
-    # Buscar tipos personalizados que não estão na lista obrigatória
-    cursor.execute('''
-        SELECT DISTINCT tipo_documento FROM documentos_colaborador
-        WHERE tipo_documento NOT IN ({})
-    '''.format(','.join(['?' for _ in DOCUMENTOS_OBRIGATORIOS])), DOCUMENTOS_OBRIGATORIOS)
+        # Buscar tipos personalizados que não estão na lista obrigatória
+        cursor.execute('''
+            SELECT DISTINCT tipo_documento FROM documentos_colaborador
+            WHERE tipo_documento NOT IN ({})
+        '''.format(','.join(['?' for _ in DOCUMENTOS_OBRIGATORIOS])), DOCUMENTOS_OBRIGATORIOS)
 
-    tipos_personalizados = [row['tipo_documento'] for row in cursor.fetchall()]
-    conn.close()
+        tipos_personalizados = [row['tipo_documento'] for row in cursor.fetchall()]
 
-    # Combinar obrigatórios + personalizados
-    return DOCUMENTOS_OBRIGATORIOS + sorted(tipos_personalizados)
+        # Combinar obrigatórios + personalizados
+        return DOCUMENTOS_OBRIGATORIOS + sorted(tipos_personalizados)
+
+    return _em_cache_referencia('tipos_documentos', (), carregar)
 
 
 def listar_documentos_colaborador(colaborador_id: int) -> List[Dict]:
     """Lista todos os documentos de um colaborador."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        SELECT * FROM documentos_colaborador
-        WHERE colaborador_id = ?
-        ORDER BY tipo_documento
-    ''', (colaborador_id,))
+        cursor.execute('''
+            SELECT * FROM documentos_colaborador
+            WHERE colaborador_id = ?
+            ORDER BY tipo_documento
+        ''', (colaborador_id,))
 
-    documentos = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+        documentos = [dict(row) for row in cursor.fetchall()]
     return documentos
 
 
 def obter_documento(colaborador_id: int, tipo_documento: str) -> Optional[Dict]:
     """Obtém um documento específico de um colaborador pelo tipo."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        SELECT * FROM documentos_colaborador
-        WHERE colaborador_id = ? AND tipo_documento = ?
-    ''', (colaborador_id, tipo_documento))
+        cursor.execute('''
+            SELECT * FROM documentos_colaborador
+            WHERE colaborador_id = ? AND tipo_documento = ?
+        ''', (colaborador_id, tipo_documento))
 
-    row = cursor.fetchone()
-    conn.close()
+        row = cursor.fetchone()
     return dict(row) if row else None
 
 
@@ -2732,35 +3892,36 @@ def salvar_documento(colaborador_id: int, tipo_documento: str, caminho_origem: s
     nome_original = os.path.basename(caminho_origem)
 
     # Verificar se já existe registro no banco
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        SELECT id FROM documentos_colaborador
-        WHERE colaborador_id = ? AND tipo_documento = ?
-    ''', (colaborador_id, tipo_documento))
+        cursor.execute('''
+            SELECT id FROM documentos_colaborador
+            WHERE colaborador_id = ? AND tipo_documento = ?
+        ''', (colaborador_id, tipo_documento))
 
-    registro_existente = cursor.fetchone()
+        registro_existente = cursor.fetchone()
 
-    obrigatorio = 1 if tipo_documento in DOCUMENTOS_OBRIGATORIOS else 0
+        obrigatorio = 1 if tipo_documento in DOCUMENTOS_OBRIGATORIOS else 0
 
-    if registro_existente:
-        # Atualizar registro existente
-        cursor.execute('''
-            UPDATE documentos_colaborador
-            SET nome_arquivo_original = ?, caminho_arquivo = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (nome_original, caminho_destino, registro_existente['id']))
-    else:
-        # Inserir novo registro
-        cursor.execute('''
-            INSERT INTO documentos_colaborador
-            (colaborador_id, tipo_documento, nome_arquivo_original, caminho_arquivo, obrigatorio)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (colaborador_id, tipo_documento, nome_original, caminho_destino, obrigatorio))
+        if registro_existente:
+            # Atualizar registro existente
+            cursor.execute('''
+                UPDATE documentos_colaborador
+                SET nome_arquivo_original = ?, caminho_arquivo = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (nome_original, caminho_destino, registro_existente['id']))
+        else:
+            # Inserir novo registro
+            cursor.execute('''
+                INSERT INTO documentos_colaborador
+                (colaborador_id, tipo_documento, nome_arquivo_original, caminho_arquivo, obrigatorio)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (colaborador_id, tipo_documento, nome_original, caminho_destino, obrigatorio))
 
-    conn.commit()
-    conn.close()
+        _atualizar_status_documentos(conn, colaborador_id)
+        conn.commit()
+    invalidar_cache_referencia('tipos_documentos')
 
     # Obter nome do colaborador para log
     colaborador = obter_colaborador(colaborador_id)
@@ -2782,28 +3943,30 @@ def salvar_documento(colaborador_id: int, tipo_documento: str, caminho_origem: s
 
 def excluir_documento(documento_id: int) -> bool:
     """Exclui um documento do colaborador (banco e arquivo físico)."""
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    # Obter dados do documento antes de excluir
-    cursor.execute('''
-        SELECT dc.*, c.nome_completo
-        FROM documentos_colaborador dc
-        LEFT JOIN colaboradores c ON dc.colaborador_id = c.id
-        WHERE dc.id = ?
-    ''', (documento_id,))
-    doc = cursor.fetchone()
-
-    if doc and doc['caminho_arquivo'] and os.path.exists(doc['caminho_arquivo']):
-        try:
-            os.remove(doc['caminho_arquivo'])
-        except Exception:
-            pass  # Se não conseguir excluir o arquivo, continua com a exclusão do registro
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('DELETE FROM documentos_colaborador WHERE id = ?', (documento_id,))
-    conn.commit()
-    affected = cursor.rowcount
-    conn.close()
+        # Obter dados do documento antes de excluir
+        cursor.execute('''
+            SELECT dc.*, c.nome_completo
+            FROM documentos_colaborador dc
+            LEFT JOIN colaboradores c ON dc.colaborador_id = c.id
+            WHERE dc.id = ?
+        ''', (documento_id,))
+        doc = cursor.fetchone()
+
+        if doc and doc['caminho_arquivo'] and os.path.exists(doc['caminho_arquivo']):
+            try:
+                os.remove(doc['caminho_arquivo'])
+            except Exception:
+                pass  # Se não conseguir excluir o arquivo, continua com a exclusão do registro
+
+        cursor.execute('DELETE FROM documentos_colaborador WHERE id = ?', (documento_id,))
+        affected = cursor.rowcount
+        if doc:
+            _atualizar_status_documentos(conn, doc['colaborador_id'])
+        conn.commit()
+    invalidar_cache_referencia('tipos_documentos')
 
     # Registrar log
     if affected > 0 and doc:
@@ -2824,36 +3987,37 @@ def marcar_documento_nao_necessario(colaborador_id: int, tipo_documento: str) ->
     Marca um documento obrigatório como 'Não Necessário' para um colaborador.
     Cria um registro sem arquivo, apenas marcando como não necessário.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    # Verificar se já existe registro
-    cursor.execute('''
-        SELECT id FROM documentos_colaborador
-        WHERE colaborador_id = ? AND tipo_documento = ?
-    ''', (colaborador_id, tipo_documento))
+        # Verificar se já existe registro
+        cursor.execute('''
+            SELECT id FROM documentos_colaborador
+            WHERE colaborador_id = ? AND tipo_documento = ?
+        ''', (colaborador_id, tipo_documento))
 
-    registro_existente = cursor.fetchone()
+        registro_existente = cursor.fetchone()
 
-    if registro_existente:
-        # Atualizar registro existente
-        cursor.execute('''
-            UPDATE documentos_colaborador
-            SET nao_necessario = 1, caminho_arquivo = 'NAO_NECESSARIO', updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (registro_existente['id'],))
-    else:
-        # Inserir novo registro marcado como não necessário
-        obrigatorio = 1 if tipo_documento in DOCUMENTOS_OBRIGATORIOS else 0
-        cursor.execute('''
-            INSERT INTO documentos_colaborador
-            (colaborador_id, tipo_documento, nome_arquivo_original, caminho_arquivo, obrigatorio, nao_necessario)
-            VALUES (?, ?, 'Não Necessário', 'NAO_NECESSARIO', ?, 1)
-        ''', (colaborador_id, tipo_documento, obrigatorio))
+        if registro_existente:
+            # Atualizar registro existente
+            cursor.execute('''
+                UPDATE documentos_colaborador
+                SET nao_necessario = 1, caminho_arquivo = 'NAO_NECESSARIO', updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (registro_existente['id'],))
+        else:
+            # Inserir novo registro marcado como não necessário
+            obrigatorio = 1 if tipo_documento in DOCUMENTOS_OBRIGATORIOS else 0
+            cursor.execute('''
+                INSERT INTO documentos_colaborador
+                (colaborador_id, tipo_documento, nome_arquivo_original, caminho_arquivo, obrigatorio, nao_necessario)
+                VALUES (?, ?, 'Não Necessário', 'NAO_NECESSARIO', ?, 1)
+            ''', (colaborador_id, tipo_documento, obrigatorio))
 
-    conn.commit()
-    affected = cursor.rowcount
-    conn.close()
+        affected = cursor.rowcount
+        _atualizar_status_documentos(conn, colaborador_id)
+        conn.commit()
+    invalidar_cache_referencia('tipos_documentos')
     return affected > 0
 
 
@@ -2861,17 +4025,18 @@ def desmarcar_documento_nao_necessario(colaborador_id: int, tipo_documento: str)
     """
     Remove a marcação de 'Não Necessário' de um documento, excluindo o registro.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        DELETE FROM documentos_colaborador
-        WHERE colaborador_id = ? AND tipo_documento = ? AND nao_necessario = 1
-    ''', (colaborador_id, tipo_documento))
+        cursor.execute('''
+            DELETE FROM documentos_colaborador
+            WHERE colaborador_id = ? AND tipo_documento = ? AND nao_necessario = 1
+        ''', (colaborador_id, tipo_documento))
 
-    conn.commit()
-    affected = cursor.rowcount
-    conn.close()
+        affected = cursor.rowcount
+        _atualizar_status_documentos(conn, colaborador_id)
+        conn.commit()
+    invalidar_cache_referencia('tipos_documentos')
     return affected > 0
 
 
@@ -2881,11 +4046,15 @@ def obter_documentos_obrigatorios_dependentes(colaborador_id: int) -> List[str]:
     - Para TODOS os dependentes: CPF do dependente
     - Para dependentes FILHOS: Certidão de nascimento, Cartão de vacina, Declaração escolar
     """
-    dependentes = listar_dependentes(colaborador_id)
-    documentos_dependentes = []
+    return _documentos_obrigatorios_de_dependentes(listar_dependentes(colaborador_id))
 
-    # Parentescos considerados como "filho"
-    parentescos_filho = ['filho', 'filha', 'filho(a)', 'enteado', 'enteada', 'menor sob guarda']
+
+def _documentos_obrigatorios_de_dependentes(dependentes: List[Dict]) -> List[str]:
+    """
+    Monta a lista de documentos obrigatórios a partir dos dependentes informados.
+    Ao alterar a regra, incremente REGRA_DOCUMENTOS_VERSAO.
+    """
+    documentos_dependentes = []
 
     for dep in dependentes:
         nome_dep = dep.get('nome', 'Dependente')
@@ -2895,10 +4064,8 @@ def obter_documentos_obrigatorios_dependentes(colaborador_id: int) -> List[str]:
         documentos_dependentes.append(f"CPF - {nome_dep}")
 
         # Documentos específicos para filhos
-        if any(p in parentesco for p in parentescos_filho):
-            documentos_dependentes.append(f"CERTIDÃO DE NASCIMENTO - {nome_dep}")
-            documentos_dependentes.append(f"CARTÃO DE VACINA - {nome_dep}")
-            documentos_dependentes.append(f"DECLARAÇÃO DE FREQUÊNCIA ESCOLAR - {nome_dep}")
+        if any(p in parentesco for p in PARENTESCOS_FILHO):
+            documentos_dependentes.extend(f"{documento} - {nome_dep}" for documento in DOCUMENTOS_FILHO)
 
     return documentos_dependentes
 
@@ -2923,157 +4090,330 @@ def obter_status_documentos_colaborador(colaborador_id: int) -> Dict:
     Retorna o status dos documentos de um colaborador.
     Verifica quais documentos obrigatórios estão presentes e quais faltam.
     Inclui documentos de dependentes.
+
+    Contagens e pendências vêm de documentos_status, como na lista de
+    colaboradores e no dashboard.
     """
+    with conexao() as conn:
+        status = _ler_status_documentos(conn, colaborador_id)
+
     documentos_existentes = listar_documentos_colaborador(colaborador_id)
-    tipos_existentes = {doc['tipo_documento'] for doc in documentos_existentes}
 
     # Obter lista completa de obrigatórios (base + dependentes)
     todos_obrigatorios = obter_todos_documentos_obrigatorios(colaborador_id)
 
-    obrigatorios_completos = []
-    obrigatorios_faltando = []
-
-    for tipo in todos_obrigatorios:
-        if tipo in tipos_existentes:
-            obrigatorios_completos.append(tipo)
-        else:
-            obrigatorios_faltando.append(tipo)
+    faltando = set(status['lista_faltando'])
+    obrigatorios_completos = [tipo for tipo in todos_obrigatorios if tipo not in faltando]
 
     # Documentos extras (não obrigatórios)
     extras = [doc for doc in documentos_existentes if doc['tipo_documento'] not in todos_obrigatorios]
 
+    total = status['total_obrigatorios']
     return {
-        'total_obrigatorios': len(todos_obrigatorios),
-        'completos': len(obrigatorios_completos),
-        'faltando': len(obrigatorios_faltando),
+        'total_obrigatorios': total,
+        'completos': status['completos'],
+        'faltando': status['faltando'],
         'lista_completos': obrigatorios_completos,
-        'lista_faltando': obrigatorios_faltando,
+        'lista_faltando': status['lista_faltando'],
         'extras': extras,
-        'percentual': round((len(obrigatorios_completos) / len(todos_obrigatorios)) * 100, 1) if todos_obrigatorios else 100,
+        'percentual': round((status['completos'] / total) * 100, 1) if total else 100,
         'documentos_obrigatorios': todos_obrigatorios  # Nova chave com lista completa
     }
 
 
+def _calcular_status_documentos(tipos_existentes: set, dependentes: List[Dict]) -> Dict:
+    """Calcula a situação dos documentos obrigatórios (base + dependentes)."""
+    obrigatorios = DOCUMENTOS_OBRIGATORIOS + _documentos_obrigatorios_de_dependentes(dependentes)
+    faltando = [tipo for tipo in obrigatorios if tipo not in tipos_existentes]
+    return {
+        'total_obrigatorios': len(obrigatorios),
+        'completos': len(obrigatorios) - len(faltando),
+        'faltando': len(faltando),
+        'lista_faltando': faltando,
+    }
+
+
+_SQL_GRAVAR_STATUS_DOCUMENTOS = '''
+    INSERT OR REPLACE INTO documentos_status
+    (colaborador_id, total_obrigatorios, completos, faltando, lista_faltando, atualizado_em)
+    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+'''
+
+
+def _linha_status_documentos(colaborador_id: int, status: Dict) -> tuple:
+    return (colaborador_id, status['total_obrigatorios'], status['completos'], status['faltando'],
+            json.dumps(status['lista_faltando'], ensure_ascii=False))
+
+
+def _status_documentos_atual(conn, colaborador_id: int) -> Dict:
+    """Calcula a situação dos documentos de um colaborador a partir das tabelas de origem."""
+    cursor = conn.cursor()
+    cursor.execute('SELECT tipo_documento FROM documentos_colaborador WHERE colaborador_id = ?',
+                   (colaborador_id,))
+    tipos = {row['tipo_documento'] for row in cursor.fetchall()}
+    cursor.execute('SELECT nome, parentesco FROM dependentes WHERE colaborador_id = ? ORDER BY nome',
+                   (colaborador_id,))
+    dependentes = [dict(row) for row in cursor.fetchall()]
+    return _calcular_status_documentos(tipos, dependentes)
+
+
+def _atualizar_status_documentos(conn, colaborador_id: int):
+    """Recalcula a situação dos documentos de um colaborador na transação corrente."""
+    status = _status_documentos_atual(conn, colaborador_id)
+    conn.execute(_SQL_GRAVAR_STATUS_DOCUMENTOS, _linha_status_documentos(colaborador_id, status))
+
+
+def _ler_status_documentos(conn, colaborador_id: int) -> Dict:
+    """
+    Situação gravada em documentos_status. Sem linha (colaborador gravado por
+    fora do sistema), calcula sem gravar: a leitura não altera o banco.
+    """
+    row = conn.execute('''
+        SELECT total_obrigatorios, completos, faltando, lista_faltando
+        FROM documentos_status WHERE colaborador_id = ?
+    ''', (colaborador_id,)).fetchone()
+    if row is None:
+        return _status_documentos_atual(conn, colaborador_id)
+    status = dict(row)
+    status['lista_faltando'] = json.loads(status['lista_faltando'] or '[]')
+    return status
+
+
+def _versao_regra_documentos() -> str:
+    """Identifica a regra de documentos obrigatórios (base e de dependentes) usada na situação."""
+    regra = [REGRA_DOCUMENTOS_VERSAO, DOCUMENTOS_OBRIGATORIOS, PARENTESCOS_FILHO, DOCUMENTOS_FILHO]
+    return hashlib.sha256(json.dumps(regra).encode()).hexdigest()[:16]
+
+
+def reconstruir_status_documentos() -> int:
+    """
+    Recalcula a situação dos documentos de todos os colaboradores
+    (tabela documentos_status). Retorna a quantidade de colaboradores processados.
+    """
+    with conexao() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT id FROM colaboradores')
+        ids = [row['id'] for row in cursor.fetchall()]
+
+        tipos = {colaborador_id: set() for colaborador_id in ids}
+        cursor.execute('SELECT colaborador_id, tipo_documento FROM documentos_colaborador')
+        for row in cursor.fetchall():
+            if row['colaborador_id'] in tipos:
+                tipos[row['colaborador_id']].add(row['tipo_documento'])
+
+        dependentes = {colaborador_id: [] for colaborador_id in ids}
+        cursor.execute('SELECT colaborador_id, nome, parentesco FROM dependentes ORDER BY nome')
+        for row in cursor.fetchall():
+            if row['colaborador_id'] in dependentes:
+                dependentes[row['colaborador_id']].append(dict(row))
+
+        cursor.execute('DELETE FROM documentos_status')
+        cursor.executemany(_SQL_GRAVAR_STATUS_DOCUMENTOS, (
+            _linha_status_documentos(i, _calcular_status_documentos(tipos[i], dependentes[i]))
+            for i in ids
+        ))
+        salvar_configuracao('documentos_status_versao', _versao_regra_documentos())
+        conn.commit()
+
+    return len(ids)
+
+
+def carregar_dados_lista_colaboradores(colaborador_ids: List[int]) -> Dict[int, Dict]:
+    """
+    Carrega de uma vez os dados exibidos em cada linha da lista de colaboradores
+    (localização atual, contrato de experiência vigente e contagem de documentos,
+    esta lida de documentos_status), em uma única consulta.
+
+    Retorna {colaborador_id: {
+        'localizacao': {...} | None,
+        'contrato': {...} | None,
+        'docs_completos': 10,
+        'docs_total': 13,
+    }}
+    """
+    if not colaborador_ids:
+        return {}
+
+    marcadores = ','.join('?' * len(colaborador_ids))
+    query = f'''
+        SELECT c.id AS colaborador_id,
+               l.id AS localizacao_id, l.local_nome, l.cidade, l.uf, l.data_inicio,
+               ce.id AS contrato_id, ce.data_inicio AS contrato_inicio, ce.data_fim_inicial,
+               ce.prorrogacao, ce.data_fim_prorrogacao, ce.status AS contrato_status,
+               ds.completos AS docs_completos, ds.total_obrigatorios AS docs_total
+        FROM colaboradores c
+        LEFT JOIN localizacoes l ON l.id = (
+            SELECT id FROM localizacoes
+            WHERE colaborador_id = c.id AND data_fim IS NULL
+            ORDER BY data_inicio DESC LIMIT 1
+        )
+        LEFT JOIN contratos_experiencia ce ON ce.id = (
+            SELECT MAX(id) FROM contratos_experiencia
+            WHERE colaborador_id = c.id AND status = 'VIGENTE'
+        )
+        LEFT JOIN documentos_status ds ON ds.colaborador_id = c.id
+        WHERE c.id IN ({marcadores})
+    '''
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, colaborador_ids)
+        linhas = [dict(row) for row in cursor.fetchall()]
+
+        # Sem situação gravada (colaborador gravado por fora do sistema):
+        # calculada em memória, carregar a lista não grava no banco
+        for row in linhas:
+            if row['docs_total'] is None:
+                status = _status_documentos_atual(conn, row['colaborador_id'])
+                row['docs_completos'] = status['completos']
+                row['docs_total'] = status['total_obrigatorios']
+
+    dados = {}
+    for row in linhas:
+        dados[row['colaborador_id']] = {
+            'localizacao': {
+                'id': row['localizacao_id'],
+                'local_nome': row['local_nome'],
+                'cidade': row['cidade'],
+                'uf': row['uf'],
+                'data_inicio': row['data_inicio'],
+            } if row['localizacao_id'] else None,
+            'contrato': {
+                'id': row['contrato_id'],
+                'data_inicio': row['contrato_inicio'],
+                'data_fim_inicial': row['data_fim_inicial'],
+                'prorrogacao': row['prorrogacao'],
+                'data_fim_prorrogacao': row['data_fim_prorrogacao'],
+                'status': row['contrato_status'],
+            } if row['contrato_id'] else None,
+            'docs_completos': row['docs_completos'] or 0,
+            'docs_total': row['docs_total'] or 0,
+        }
+
+    return dados
+
+
 # =============================================================================
 # Funções para Exportação Excel
 # =============================================================================
 
 def listar_todos_dependentes_com_colaborador(empresa_id: int = None) -> List[Dict]:
     """Lista todos os dependentes com informações do colaborador."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    query = '''
-        SELECT d.*, c.nome_completo as colaborador_nome, c.cpf as colaborador_cpf
-        FROM dependentes d
-        JOIN colaboradores c ON d.colaborador_id = c.id
-        WHERE c.status = 'ATIVO'
-    '''
-    params = []
+        query = '''
+            SELECT d.*, c.nome_completo as colaborador_nome, c.cpf as colaborador_cpf
+            FROM dependentes d
+            JOIN colaboradores c ON d.colaborador_id = c.id
+            WHERE c.status = 'ATIVO'
+        '''
+        params = []
 
-    if empresa_id:
-        query += ' AND c.empresa_id = ?'
-        params.append(empresa_id)
+        if empresa_id:
+            query += ' AND c.empresa_id = ?'
+            params.append(empresa_id)
 
-    query += ' ORDER BY c.nome_completo, d.nome'
+        query += ' ORDER BY c.nome_completo, d.nome'
 
-    cursor.execute(query, params)
-    dependentes = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+        cursor.execute(query, params)
+        dependentes = [dict(row) for row in cursor.fetchall()]
     return dependentes
 
 
 def listar_todos_contratos_com_colaborador(empresa_id: int = None) -> List[Dict]:
     """Lista todos os contratos de experiência com informações do colaborador."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    query = '''
-        SELECT ce.*, c.nome_completo, c.cpf, c.funcao, e.razao_social as empresa_nome
-        FROM contratos_experiencia ce
-        JOIN colaboradores c ON ce.colaborador_id = c.id
-        LEFT JOIN empresas e ON c.empresa_id = e.id
-        WHERE c.status = 'ATIVO'
-    '''
-    params = []
+        query = '''
+            SELECT ce.*, c.nome_completo, c.cpf, c.funcao, e.razao_social as empresa_nome
+            FROM contratos_experiencia ce
+            JOIN colaboradores c ON ce.colaborador_id = c.id
+            LEFT JOIN empresas e ON c.empresa_id = e.id
+            WHERE c.status = 'ATIVO'
+        '''
+        params = []
 
-    if empresa_id:
-        query += ' AND c.empresa_id = ?'
-        params.append(empresa_id)
+        if empresa_id:
+            query += ' AND c.empresa_id = ?'
+            params.append(empresa_id)
 
-    query += ' ORDER BY ce.data_fim_prorrogacao DESC, ce.data_fim_inicial DESC'
+        query += ' ORDER BY ce.data_fim_prorrogacao DESC, ce.data_fim_inicial DESC'
 
-    cursor.execute(query, params)
-    contratos = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+        cursor.execute(query, params)
+        contratos = [dict(row) for row in cursor.fetchall()]
     return contratos
 
 
 def listar_todas_ferias_com_colaborador(empresa_id: int = None) -> List[Dict]:
     """Lista todos os períodos de férias com informações do colaborador."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    query = '''
-        SELECT f.*, c.nome_completo, c.cpf, e.razao_social as empresa_nome
-        FROM ferias f
-        JOIN colaboradores c ON f.colaborador_id = c.id
-        LEFT JOIN empresas e ON c.empresa_id = e.id
-        WHERE c.status = 'ATIVO'
-    '''
-    params = []
+        query = '''
+            SELECT f.*, c.nome_completo, c.cpf, e.razao_social as empresa_nome
+            FROM ferias f
+            JOIN colaboradores c ON f.colaborador_id = c.id
+            LEFT JOIN empresas e ON c.empresa_id = e.id
+            WHERE c.status = 'ATIVO'
+        '''
+        params = []
 
-    if empresa_id:
-        query += ' AND c.empresa_id = ?'
-        params.append(empresa_id)
+        if empresa_id:
+            query += ' AND c.empresa_id = ?'
+            params.append(empresa_id)
 
-    query += ' ORDER BY f.periodo_concessivo_limite'
+        query += ' ORDER BY f.periodo_concessivo_limite'
 
-    cursor.execute(query, params)
-    ferias = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+        cursor.execute(query, params)
+        ferias = [dict(row) for row in cursor.fetchall()]
     return ferias
 
 
 def listar_blocklist_completa() -> List[Dict]:
     """Lista toda a blocklist com nome da empresa."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        SELECT b.*, e.razao_social as empresa_nome
-        FROM blocklist b
-        LEFT JOIN empresas e ON b.empresa_id = e.id
-        ORDER BY b.data_desligamento DESC
-    ''')
+        cursor.execute('''
+            SELECT b.*, e.razao_social as empresa_nome
+            FROM blocklist b
+            LEFT JOIN empresas e ON b.empresa_id = e.id
+            ORDER BY b.data_desligamento DESC
+        ''')
 
-    blocklist = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+        blocklist = [dict(row) for row in cursor.fetchall()]
     return blocklist
 
 
 def listar_documentos_pendentes_todos(empresa_id: int = None) -> List[Dict]:
     """Lista todos os documentos pendentes de todos os colaboradores ativos."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
+
+        # Colaboradores ativos com pendências (situação mantida em documentos_status)
+        query = '''
+            SELECT c.nome_completo, c.cpf, ds.lista_faltando
+            FROM colaboradores c
+            JOIN documentos_status ds ON ds.colaborador_id = c.id
+            WHERE c.status = ? AND ds.faltando > 0
+        '''
+        params = ['ATIVO']
 
-    # Buscar colaboradores ativos
-    query = 'SELECT id, nome_completo, cpf FROM colaboradores WHERE status = ?'
-    params = ['ATIVO']
+        if empresa_id:
+            query += ' AND c.empresa_id = ?'
+            params.append(empresa_id)
 
-    if empresa_id:
-        query += ' AND empresa_id = ?'
-        params.append(empresa_id)
+        query += ' ORDER BY c.id'
 
-    cursor.execute(query, params)
-    colaboradores = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+        cursor.execute(query, params)
+        colaboradores = [dict(row) for row in cursor.fetchall()]
 
     documentos_pendentes = []
 
     for colab in colaboradores:
-        status = obter_status_documentos_colaborador(colab['id'])
-        for doc in status.get('lista_faltando', []):
+        for doc in json.loads(colab['lista_faltando'] or '[]'):
             documentos_pendentes.append({
                 'colaborador_nome': colab['nome_completo'],
                 'colaborador_cpf': colab['cpf'],
@@ -3098,67 +4438,235 @@ def sincronizar_fotos_colaboradores():
         os.makedirs(fotos_dir)
         return 0
 
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
+
+        # Buscar todos os colaboradores com CPF
+        cursor.execute('SELECT id, cpf, foto_path FROM colaboradores WHERE cpf IS NOT NULL')
+        colaboradores = cursor.fetchall()
+
+        extensoes = ['.jpg', '.jpeg', '.png', '.gif', '.bmp']
+        atualizados = 0
+
+        for colab in colaboradores:
+            colab_id = colab['id']
+            cpf = colab['cpf']
+            foto_path_atual = colab['foto_path']
+
+            if not cpf:
+                continue
+
+            # Normalizar CPF
+            cpf_limpo = ''.join(filter(str.isdigit, str(cpf)))
+            if len(cpf_limpo) < 11:
+                cpf_limpo = cpf_limpo.zfill(11)
+
+            # Procurar arquivo de foto com qualquer extensão (caminho relativo)
+            foto_encontrada = None
+            for ext in extensoes:
+                # Caminho relativo: fotos_colaboradores/CPF.ext
+                caminho_relativo = f"{fotos_dir}/{cpf_limpo}{ext}"
+                if os.path.exists(caminho_relativo):
+                    foto_encontrada = caminho_relativo
+                    break
+
+            # Se encontrou foto
+            if foto_encontrada:
+                # Verificar se o path atual é diferente (ou é um path absoluto antigo)
+                # Converter para comparar corretamente
+                path_esperado = foto_encontrada.replace("\\", "/")
+                path_atual = (foto_path_atual or "").replace("\\", "/")
+
+                # Se o path atual contém caminho absoluto ou é diferente, atualizar
+                if path_atual != path_esperado:
+                    cursor.execute('UPDATE colaboradores SET foto_path = ? WHERE id = ?',
+                                 (foto_encontrada, colab_id))
+                    atualizados += 1
+            else:
+                # Se não encontrou foto, limpar o foto_path
+                if foto_path_atual:
+                    cursor.execute('UPDATE colaboradores SET foto_path = NULL WHERE id = ?',
+                                 (colab_id,))
+                    atualizados += 1
 
-    # Buscar todos os colaboradores com CPF
-    cursor.execute('SELECT id, cpf, foto_path FROM colaboradores WHERE cpf IS NOT NULL')
-    colaboradores = cursor.fetchall()
+        if atualizados > 0:
+            conn.commit()
+    return atualizados
 
-    extensoes = ['.jpg', '.jpeg', '.png', '.gif', '.bmp']
-    atualizados = 0
 
-    for colab in colaboradores:
-        colab_id = colab['id']
-        cpf = colab['cpf']
-        foto_path_atual = colab['foto_path']
+# =============================================================================
+# Sistema de Logs
+# =============================================================================
 
-        if not cpf:
-            continue
+LOG_LOTE_MAXIMO = 50          # grava assim que N registros estiverem na fila...
+LOG_INTERVALO_SEGUNDOS = 2.0  # ...ou após N segundos, o que vier primeiro
+LOG_SINCRONO = False          # True grava cada registro imediatamente (testes)
+
+_COLUNAS_LOG = ('tipo_acao', 'categoria', 'descricao', 'entidade_tipo', 'entidade_id',
+                'entidade_nome', 'valor_anterior', 'valor_novo', 'usuario', 'data_hora')
+
+_SQL_INSERIR_LOG = f'''
+    INSERT INTO logs_sistema ({', '.join(_COLUNAS_LOG)})
+    VALUES ({', '.join('?' * len(_COLUNAS_LOG))})
+'''
+
+_SQL_TABELA_LOGS = '''
+    CREATE TABLE IF NOT EXISTS logs_sistema (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo_acao TEXT NOT NULL,
+        categoria TEXT NOT NULL,
+        descricao TEXT NOT NULL,
+        entidade_tipo TEXT,
+        entidade_id INTEGER,
+        entidade_nome TEXT,
+        valor_anterior TEXT,
+        valor_novo TEXT,
+        usuario TEXT DEFAULT 'Sistema',
+        data_hora TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+# Corpo dos triggers que mantêm logs_stats_diario ({registro} = new/old).
+# O dia é o prefixo AAAA-MM-DD de data_hora, como nas consultas por período.
+_SQL_SOMAR_ESTATISTICA_LOG = '''
+    INSERT INTO logs_stats_diario (dia, categoria, tipo_acao, total)
+    VALUES (COALESCE(substr({registro}.data_hora, 1, 10), ''), {registro}.categoria, {registro}.tipo_acao, 1)
+    ON CONFLICT (dia, categoria, tipo_acao) DO UPDATE SET total = total + 1;
+'''
+
+_SQL_SUBTRAIR_ESTATISTICA_LOG = '''
+    UPDATE logs_stats_diario SET total = total - 1
+    WHERE dia = COALESCE(substr({registro}.data_hora, 1, 10), '')
+    AND categoria = {registro}.categoria AND tipo_acao = {registro}.tipo_acao;
+    DELETE FROM logs_stats_diario
+    WHERE dia = COALESCE(substr({registro}.data_hora, 1, 10), '')
+    AND categoria = {registro}.categoria AND tipo_acao = {registro}.tipo_acao AND total <= 0;
+'''
+
+# Soma contagens já agrupadas (dia, categoria, tipo_acao, total): devolve aos
+# contadores os logs arquivados, que saem de logs_sistema pelo trigger de DELETE.
+_SQL_ACUMULAR_ESTATISTICA_LOG = '''
+    INSERT INTO logs_stats_diario (dia, categoria, tipo_acao, total)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (dia, categoria, tipo_acao) DO UPDATE SET total = total + excluded.total
+'''
+
+
+class GravadorLog:
+    """
+    Fila de registros de log gravada em lotes por uma thread dedicada.
+
+    Garantias de gravação:
+    - a fila é gravada quando atinge LOG_LOTE_MAXIMO registros ou a cada
+      LOG_INTERVALO_SEGUNDOS, em uma única transação (executemany);
+    - consultas aos logs descarregam a fila antes de ler;
+    - a fila é descarregada ao encerrar o sistema (_confirmar_saida / atexit);
+    - no modo síncrono cada registro é gravado antes de registrar_log retornar;
+    - dentro de uma unit_of_work() o registro entra na transação da unidade.
+    """
 
-        # Normalizar CPF
-        cpf_limpo = ''.join(filter(str.isdigit, str(cpf)))
-        if len(cpf_limpo) < 11:
-            cpf_limpo = cpf_limpo.zfill(11)
-
-        # Procurar arquivo de foto com qualquer extensão (caminho relativo)
-        foto_encontrada = None
-        for ext in extensoes:
-            # Caminho relativo: fotos_colaboradores/CPF.ext
-            caminho_relativo = f"{fotos_dir}/{cpf_limpo}{ext}"
-            if os.path.exists(caminho_relativo):
-                foto_encontrada = caminho_relativo
-                break
+    def __init__(self, lote_maximo: int = LOG_LOTE_MAXIMO,
+                 intervalo: float = LOG_INTERVALO_SEGUNDOS,
+                 sincrono: bool = LOG_SINCRONO):
+        self.lote_maximo = lote_maximo
+        self.intervalo = intervalo
+        self.sincrono = sincrono
+        self.ultimo_erro = None
+        self._fila = deque()
+        self._lock = threading.Lock()
+        self._lock_gravacao = threading.Lock()
+        self._sinal = threading.Event()
+        self._thread = None
+        self._parar = False
+
+    def registrar(self, registro: tuple):
+        """
+        Enfileira um registro. No modo síncrono, ou dentro de uma
+        unit_of_work(), grava imediatamente na transação corrente.
+        """
+        if self.sincrono or _unidade_de_trabalho_ativa() is not None:
+            with conexao() as conn, _gravacao_logs(conn):
+                conn.execute(_SQL_INSERIR_LOG, registro)
+            return
+
+        with self._lock:
+            self._fila.append(registro)
+            if self._thread is None or not self._thread.is_alive():
+                self._parar = False
+                self._thread = threading.Thread(target=self._executar,
+                                                name='GravadorLog', daemon=True)
+                self._thread.start()
+            if len(self._fila) >= self.lote_maximo:
+                self._sinal.set()
+
+    def _executar(self):
+        """Laço da thread de gravação."""
+        while True:
+            self._sinal.wait(timeout=self.intervalo)
+            self._sinal.clear()
+            try:
+                self.descarregar()
+            except Exception as e:
+                self.ultimo_erro = str(e)
+            if self._parar:
+                return
+
+    def descarregar(self) -> int:
+        """Grava todos os registros pendentes. Retorna a quantidade gravada."""
+        with self._lock_gravacao:
+            with self._lock:
+                if not self._fila:
+                    return 0
+                lote = list(self._fila)
+                self._fila.clear()
+            try:
+                with conexao() as conn, _gravacao_logs(conn):
+                    conn.executemany(_SQL_INSERIR_LOG, lote)
+            except Exception:
+                # Devolve o lote à fila para a próxima tentativa
+                with self._lock:
+                    self._fila.extendleft(reversed(lote))
+                raise
+            self.ultimo_erro = None
+            return len(lote)
+
+    def finalizar(self):
+        """Encerra a thread e grava o que restar na fila."""
+        with self._lock:
+            self._parar = True
+            thread = self._thread
+            self._thread = None
+        self._sinal.set()
+        if thread is not None:
+            thread.join(timeout=30)
+        self.descarregar()
+
+
+_gravador_log = GravadorLog()
+
+
+def descarregar_logs() -> int:
+    """Grava imediatamente os registros de log pendentes."""
+    return _gravador_log.descarregar()
+
+
+def finalizar_logs():
+    """Grava os logs pendentes e encerra o gravador. Chamado ao encerrar o sistema."""
+    try:
+        _gravador_log.finalizar()
+    except Exception as e:
+        _gravador_log.ultimo_erro = str(e)
 
-        # Se encontrou foto
-        if foto_encontrada:
-            # Verificar se o path atual é diferente (ou é um path absoluto antigo)
-            # Converter para comparar corretamente
-            path_esperado = foto_encontrada.replace("\\", "/")
-            path_atual = (foto_path_atual or "").replace("\\", "/")
-
-            # Se o path atual contém caminho absoluto ou é diferente, atualizar
-            if path_atual != path_esperado:
-                cursor.execute('UPDATE colaboradores SET foto_path = ? WHERE id = ?',
-                             (foto_encontrada, colab_id))
-                atualizados += 1
-        else:
-            # Se não encontrou foto, limpar o foto_path
-            if foto_path_atual:
-                cursor.execute('UPDATE colaboradores SET foto_path = NULL WHERE id = ?',
-                             (colab_id,))
-                atualizados += 1
 
-    if atualizados > 0:
-        conn.commit()
+def definir_log_sincrono(ativo: bool = True):
+    """Liga/desliga o modo síncrono de gravação dos logs (útil em testes)."""
+    if ativo:
+        _gravador_log.descarregar()
+    _gravador_log.sincrono = ativo
 
-    conn.close()
-    return atualizados
 
+atexit.register(finalizar_logs)
 
-# =============================================================================
-# Sistema de Logs
-# =============================================================================
 
 def registrar_log(
     tipo_acao: str,
@@ -3170,7 +4678,7 @@ def registrar_log(
     valor_anterior: str = None,
     valor_novo: str = None,
     usuario: str = None
-) -> int:
+) -> None:
     """
     Registra uma ação no log do sistema.
 
@@ -3185,249 +4693,687 @@ def registrar_log(
     - valor_novo: Valor após a alteração (para edições)
     - usuario: Nome do usuário que realizou a ação (se None, usa o usuário logado)
 
-    Retorna o ID do log criado.
+    O registro é enfileirado e gravado em lote pelo GravadorLog; a data/hora
+    é a do momento da chamada (UTC, como o CURRENT_TIMESTAMP da tabela).
     """
     # Se não foi especificado usuário, usa o usuário logado
     if usuario is None:
         usuario = get_nome_usuario_logado()
 
-    conn = get_connection()
+    data_hora = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    _gravador_log.registrar((tipo_acao, categoria, descricao, entidade_tipo, entidade_id,
+                             entidade_nome, valor_anterior, valor_novo, usuario, data_hora))
+
+
+_busca_logs_fts_ativa = False
+_cache_contagem_logs = OrderedDict()  # limitado como o de colaboradores (_guardar_contagem)
+
+
+def _criar_indices_log(conn):
+    """Índices de logs_sistema no banco principal; ativa a busca FTS5 dos logs."""
+    global _busca_logs_fts_ativa
+    _criar_indices_tabela_log(conn)
+    _busca_logs_fts_ativa = True
+
+
+def _criar_indices_tabela_log(conn):
+    """
+    Cria os índices de logs_sistema: data_hora (ordem da listagem), filtros
+    combinados com data_hora e o índice FTS5 (trigram) de descricao/entidade_nome,
+    populado na primeira criação e mantido por triggers. Usada também nos
+    arquivos mensais, por isso não altera o estado do módulo.
+    """
     cursor = conn.cursor()
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_data_hora ON logs_sistema(data_hora)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_categoria_data ON logs_sistema(categoria, data_hora)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_tipo_acao_data ON logs_sistema(tipo_acao, data_hora)')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_logs_entidade_data
+        ON logs_sistema(entidade_tipo, entidade_id, data_hora)
+    ''')
+    conn.commit()
+
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'logs_fts'")
+    existia = cursor.fetchone() is not None
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5(
+            descricao, entidade_nome, content='logs_sistema', content_rowid='id', tokenize='trigram'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS logs_fts_ai AFTER INSERT ON logs_sistema BEGIN
+            INSERT INTO logs_fts(rowid, descricao, entidade_nome)
+            VALUES (new.id, new.descricao, new.entidade_nome);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS logs_fts_ad AFTER DELETE ON logs_sistema BEGIN
+            INSERT INTO logs_fts(logs_fts, rowid, descricao, entidade_nome)
+            VALUES ('delete', old.id, old.descricao, old.entidade_nome);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS logs_fts_au AFTER UPDATE OF descricao, entidade_nome ON logs_sistema BEGIN
+            INSERT INTO logs_fts(logs_fts, rowid, descricao, entidade_nome)
+            VALUES ('delete', old.id, old.descricao, old.entidade_nome);
+            INSERT INTO logs_fts(rowid, descricao, entidade_nome)
+            VALUES (new.id, new.descricao, new.entidade_nome);
+        END
+    ''')
+    if not existia:
+        cursor.execute("INSERT INTO logs_fts(logs_fts) VALUES ('rebuild')")
+    conn.commit()
+
+
+def _criar_estatisticas_log(conn):
+    """
+    Cria logs_stats_diario (dia x categoria x tipo_acao -> total), mantida por
+    triggers em logs_sistema. Na primeira criação é preenchida a partir dos
+    logs existentes.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'logs_stats_diario'")
+    existia = cursor.fetchone() is not None
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS logs_stats_diario (
+            dia TEXT NOT NULL,
+            categoria TEXT NOT NULL,
+            tipo_acao TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dia, categoria, tipo_acao)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_logs_stats_categoria
+        ON logs_stats_diario(categoria, tipo_acao, total)
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS logs_stats_ai AFTER INSERT ON logs_sistema BEGIN
+            {_SQL_SOMAR_ESTATISTICA_LOG.format(registro='new')}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS logs_stats_ad AFTER DELETE ON logs_sistema BEGIN
+            {_SQL_SUBTRAIR_ESTATISTICA_LOG.format(registro='old')}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS logs_stats_au
+        AFTER UPDATE OF data_hora, categoria, tipo_acao ON logs_sistema BEGIN
+            {_SQL_SUBTRAIR_ESTATISTICA_LOG.format(registro='old')}
+            {_SQL_SOMAR_ESTATISTICA_LOG.format(registro='new')}
+        END
+    ''')
+    conn.commit()
+    if not existia:
+        reconstruir_estatisticas_log(conn)
+
 
+def reconstruir_estatisticas_log(conn=None) -> int:
+    """
+    Recalcula logs_stats_diario a partir de logs_sistema e dos arquivos
+    mensais de logs (os contadores cobrem também os logs arquivados).
+    Retorna a quantidade de linhas (dia x categoria x tipo_acao) geradas.
+    """
+    if conn is None:
+        descarregar_logs()
+        with conexao() as conn, _gravacao_logs(conn):
+            return reconstruir_estatisticas_log(conn)
+
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM logs_stats_diario')
     cursor.execute('''
-        INSERT INTO logs_sistema
-        (tipo_acao, categoria, descricao, entidade_tipo, entidade_id, entidade_nome,
-         valor_anterior, valor_novo, usuario)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (tipo_acao, categoria, descricao, entidade_tipo, entidade_id, entidade_nome,
-          valor_anterior, valor_novo, usuario))
-
-    log_id = cursor.lastrowid
+        INSERT INTO logs_stats_diario (dia, categoria, tipo_acao, total)
+        SELECT COALESCE(substr(data_hora, 1, 10), ''), categoria, tipo_acao, COUNT(*)
+        FROM logs_sistema
+        GROUP BY 1, 2, 3
+    ''')
+    for arquivo in listar_arquivos_logs():
+        with _abrir_arquivo_logs(arquivo['caminho']) as origem:
+            contagens = origem.execute('''
+                SELECT COALESCE(substr(data_hora, 1, 10), ''), categoria, tipo_acao, COUNT(*)
+                FROM logs_sistema
+                GROUP BY 1, 2, 3
+            ''').fetchall()
+        cursor.executemany(_SQL_ACUMULAR_ESTATISTICA_LOG, [tuple(c) for c in contagens])
+    cursor.execute('SELECT COUNT(*) FROM logs_stats_diario')
+    linhas = cursor.fetchone()[0]
     conn.commit()
-    conn.close()
+    return linhas
+
+
+def _filtros_log(categoria: str = None, tipo_acao: str = None, entidade_tipo: str = None,
+                 entidade_id: int = None, data_inicio: str = None, data_fim: str = None,
+                 pesquisa: str = None) -> tuple:
+    """
+    Monta o WHERE das consultas de logs. As datas viram intervalos semiabertos
+    sobre data_hora (sem funções na coluna, para usar os índices) e a pesquisa
+    usa o índice FTS5 para termos com 3 ou mais caracteres.
+
+    Retorna (where, params).
+    """
+    condicoes = []
+    params = []
+
+    if categoria:
+        condicoes.append('categoria = ?')
+        params.append(categoria)
+
+    if tipo_acao:
+        condicoes.append('tipo_acao = ?')
+        params.append(tipo_acao)
+
+    if entidade_tipo:
+        condicoes.append('entidade_tipo = ?')
+        params.append(entidade_tipo)
+
+    if entidade_id:
+        condicoes.append('entidade_id = ?')
+        params.append(entidade_id)
+
+    if data_inicio:
+        condicoes.append('data_hora >= date(?)')
+        params.append(data_inicio)
+
+    if data_fim:
+        condicoes.append("data_hora < date(?, '+1 day')")
+        params.append(data_fim)
+
+    if pesquisa:
+        termo = pesquisa.strip()
+        if _busca_logs_fts_ativa and len(termo) >= 3:
+            condicoes.append('id IN (SELECT rowid FROM logs_fts WHERE logs_fts MATCH ?)')
+            params.append('"' + termo.replace('"', '""') + '"')
+        else:
+            condicoes.append('(descricao LIKE ? OR entidade_nome LIKE ?)')
+            params.extend([f'%{termo}%', f'%{termo}%'])
+
+    where = ' WHERE ' + ' AND '.join(condicoes) if condicoes else ''
+    return where, params
+
+
+def listar_logs(
+    limite: int = 100,
+    offset: int = 0,
+    categoria: str = None,
+    tipo_acao: str = None,
+    entidade_tipo: str = None,
+    entidade_id: int = None,
+    data_inicio: str = None,
+    data_fim: str = None,
+    pesquisa: str = None,
+    incluir_arquivo: bool = False
+) -> List[Dict]:
+    """
+    Lista os logs do sistema com filtros opcionais.
+
+    Parâmetros:
+    - limite: Quantidade máxima de registros
+    - offset: Offset para paginação
+    - categoria: Filtrar por categoria
+    - tipo_acao: Filtrar por tipo de ação
+    - entidade_tipo: Filtrar por tipo de entidade
+    - entidade_id: Filtrar por ID de entidade específica
+    - data_inicio: Data inicial (formato YYYY-MM-DD)
+    - data_fim: Data final (formato YYYY-MM-DD)
+    - pesquisa: Texto para buscar na descrição ou nome da entidade
+    - incluir_arquivo: Consultar também os meses arquivados (ver arquivar_logs);
+      com data_inicio/data_fim os meses do período são incluídos automaticamente
+
+    Retorna lista de logs ordenados do mais recente para o mais antigo.
+    Para navegar por páginas, prefira listar_logs_pagina.
+    """
+    descarregar_logs()
+    where, params = _filtros_log(categoria, tipo_acao, entidade_tipo, entidade_id,
+                                 data_inicio, data_fim, pesquisa)
+    arquivos = _arquivos_logs_no_periodo(data_inicio, data_fim, incluir_arquivo)
+    if arquivos:
+        logs = _consultar_logs(
+            f'SELECT * FROM logs_sistema{where} ORDER BY data_hora DESC, id DESC LIMIT ?',
+            params + [limite + offset], arquivos
+        )
+        return _ordenar_logs(logs, decrescente=True)[offset:offset + limite]
+
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f'SELECT * FROM logs_sistema{where} ORDER BY data_hora DESC, id DESC LIMIT ? OFFSET ?',
+            params + [limite, offset]
+        )
+        logs = [dict(row) for row in cursor.fetchall()]
+
+    return logs
+
 
-    return log_id
+def listar_logs_pagina(
+    limite: int = 50,
+    cursor_pagina: str = None,
+    categoria: str = None,
+    tipo_acao: str = None,
+    entidade_tipo: str = None,
+    entidade_id: int = None,
+    data_inicio: str = None,
+    data_fim: str = None,
+    pesquisa: str = None,
+    incluir_arquivo: bool = False
+) -> Dict:
+    """
+    Lista uma página de logs (mais recentes primeiro) com paginação por chave
+    (data_hora, id): cada página custa o mesmo, em qualquer posição.
+    Filtros iguais aos de listar_logs, inclusive a consulta aos meses arquivados.
+
+    cursor_pagina: None para a primeira página, ou um dos cursores
+    'proximo'/'anterior' retornados pela chamada anterior.
+
+    Retorna {'logs': [...], 'total': 1234, 'proximo': 'cursor'|None, 'anterior': 'cursor'|None}
+    """
+    descarregar_logs()
+    filtros = (categoria, tipo_acao, entidade_tipo, entidade_id, data_inicio, data_fim, pesquisa)
+    where, params = _filtros_log(*filtros)
+
+    cursor_lido = _decodificar_cursor(cursor_pagina, 2) if cursor_pagina else None
+    direcao = cursor_lido[0] if cursor_lido else '>'
+    # '>' avança para registros mais antigos
+    comparacao, sentido = ('<', 'DESC') if direcao == '>' else ('>', 'ASC')
+
+    query = f'SELECT * FROM logs_sistema{where}'
+    params_pagina = list(params)
+    if cursor_lido:
+        query += (' AND' if where else ' WHERE') + f' (data_hora, id) {comparacao} (?, ?)'
+        params_pagina += cursor_lido[1]
+    query += f' ORDER BY data_hora {sentido}, id {sentido} LIMIT ?'
+    params_pagina.append(limite + 1)
+
+    arquivos = _arquivos_logs_no_periodo(data_inicio, data_fim, incluir_arquivo)
+    if arquivos:
+        logs = _consultar_logs(query, params_pagina, arquivos)
+        logs = _ordenar_logs(logs, decrescente=sentido == 'DESC')[:limite + 1]
+
+    with conexao() as conn:
+        cursor = conn.cursor()
+        if not arquivos:
+            cursor.execute(query, params_pagina)
+            logs = [dict(row) for row in cursor.fetchall()]
+
+        versao = _versao_banco(conn)
+        em_cache = _ler_contagem(_cache_contagem_logs, filtros)
+        if em_cache and em_cache[0] == versao:
+            total = em_cache[1]
+        else:
+            cursor.execute(f'SELECT COUNT(*) FROM logs_sistema{where}', params)
+            total = cursor.fetchone()[0]
+            _guardar_contagem(_cache_contagem_logs, filtros, (versao, total))
+    total += _contar_logs_arquivos(arquivos, where, params)
+
+    mais_registros = len(logs) > limite
+    logs = logs[:limite]
+    if direcao == '<':
+        logs.reverse()
+
+    proximo = anterior = None
+    if logs:
+        if direcao == '<' or mais_registros:
+            proximo = _codificar_cursor('>', [logs[-1]['data_hora'], logs[-1]['id']])
+        if cursor_lido and (direcao == '>' or mais_registros):
+            anterior = _codificar_cursor('<', [logs[0]['data_hora'], logs[0]['id']])
+
+    return {
+        'logs': logs,
+        'total': total,
+        'proximo': proximo,
+        'anterior': anterior,
+    }
 
 
-def listar_logs(
-    limite: int = 100,
-    offset: int = 0,
+def contar_logs(
     categoria: str = None,
     tipo_acao: str = None,
     entidade_tipo: str = None,
     entidade_id: int = None,
     data_inicio: str = None,
     data_fim: str = None,
-    pesquisa: str = None
-) -> List[Dict]:
-    """
-    Lista os logs do sistema com filtros opcionais.
+    pesquisa: str = None,
+    incluir_arquivo: bool = False
+) -> int:
+    """Conta o total de logs com os filtros aplicados (e os meses arquivados do período)."""
+    descarregar_logs()
+    where, params = _filtros_log(categoria, tipo_acao, entidade_tipo, entidade_id,
+                                 data_inicio, data_fim, pesquisa)
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT COUNT(*) FROM logs_sistema{where}', params)
+        total = cursor.fetchone()[0]
 
-    Parâmetros:
-    - limite: Quantidade máxima de registros
-    - offset: Offset para paginação
-    - categoria: Filtrar por categoria
-    - tipo_acao: Filtrar por tipo de ação
-    - entidade_tipo: Filtrar por tipo de entidade
-    - entidade_id: Filtrar por ID de entidade específica
-    - data_inicio: Data inicial (formato YYYY-MM-DD)
-    - data_fim: Data final (formato YYYY-MM-DD)
-    - pesquisa: Texto para buscar na descrição ou nome da entidade
+    arquivos = _arquivos_logs_no_periodo(data_inicio, data_fim, incluir_arquivo)
+    return total + _contar_logs_arquivos(arquivos, where, params)
 
-    Retorna lista de logs ordenados do mais recente para o mais antigo.
-    """
-    conn = get_connection()
-    cursor = conn.cursor()
 
-    query = 'SELECT * FROM logs_sistema WHERE 1=1'
-    params = []
+def obter_categorias_log() -> List[str]:
+    """Retorna lista de categorias únicas registradas nos logs."""
+    descarregar_logs()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    if categoria:
-        query += ' AND categoria = ?'
-        params.append(categoria)
+        cursor.execute('SELECT DISTINCT categoria FROM logs_stats_diario ORDER BY categoria')
+        categorias = [row['categoria'] for row in cursor.fetchall()]
 
-    if tipo_acao:
-        query += ' AND tipo_acao = ?'
-        params.append(tipo_acao)
+    return categorias
 
-    if entidade_tipo:
-        query += ' AND entidade_tipo = ?'
-        params.append(entidade_tipo)
 
-    if entidade_id:
-        query += ' AND entidade_id = ?'
-        params.append(entidade_id)
+def obter_tipos_acao_log() -> List[str]:
+    """Retorna lista de tipos de ação únicos registrados nos logs."""
+    descarregar_logs()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    if data_inicio:
-        query += ' AND DATE(data_hora) >= ?'
-        params.append(data_inicio)
+        cursor.execute('SELECT DISTINCT tipo_acao FROM logs_stats_diario ORDER BY tipo_acao')
+        tipos = [row['tipo_acao'] for row in cursor.fetchall()]
 
-    if data_fim:
-        query += ' AND DATE(data_hora) <= ?'
-        params.append(data_fim)
+    return tipos
 
-    if pesquisa:
-        query += ' AND (descricao LIKE ? OR entidade_nome LIKE ?)'
-        params.append(f'%{pesquisa}%')
-        params.append(f'%{pesquisa}%')
 
-    query += ' ORDER BY data_hora DESC LIMIT ? OFFSET ?'
-    params.extend([limite, offset])
+def obter_estatisticas_log() -> Dict:
+    """
+    Retorna estatísticas gerais dos logs, lidas dos contadores diários
+    (logs_stats_diario): o custo não cresce com o volume de logs. Os
+    contadores incluem os logs já arquivados.
+    """
+    descarregar_logs()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute(query, params)
-    logs = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+        # Hoje, últimos 7 dias e mês atual (faixa da chave primária)
+        cursor.execute("""
+            SELECT
+                COALESCE(SUM(CASE WHEN dia = DATE('now', 'localtime') THEN total END), 0) AS hoje,
+                COALESCE(SUM(CASE WHEN dia >= DATE('now', 'localtime', '-7 days') THEN total END), 0) AS semana,
+                COALESCE(SUM(CASE WHEN dia >= DATE('now', 'localtime', 'start of month')
+                                  AND dia < DATE('now', 'localtime', 'start of month', '+1 month')
+                             THEN total END), 0) AS mes
+            FROM logs_stats_diario
+            WHERE dia >= MIN(DATE('now', 'localtime', '-7 days'), DATE('now', 'localtime', 'start of month'))
+        """)
+        row = cursor.fetchone()
+        hoje, semana, mes = row['hoje'], row['semana'], row['mes']
+
+        # Total, por categoria e por tipo de ação
+        cursor.execute('''
+            SELECT categoria, tipo_acao, SUM(total) as total
+            FROM logs_stats_diario
+            GROUP BY categoria, tipo_acao
+        ''')
+        total = 0
+        por_categoria = {}
+        por_tipo_acao = {}
+        for row in cursor.fetchall():
+            total += row['total']
+            por_categoria[row['categoria']] = por_categoria.get(row['categoria'], 0) + row['total']
+            por_tipo_acao[row['tipo_acao']] = por_tipo_acao.get(row['tipo_acao'], 0) + row['total']
+
+        por_categoria = dict(sorted(por_categoria.items(), key=lambda item: item[1], reverse=True))
+        por_tipo_acao = dict(sorted(por_tipo_acao.items(), key=lambda item: item[1], reverse=True))
 
-    return logs
+    return {
+        'total': total,
+        'hoje': hoje,
+        'semana': semana,
+        'mes': mes,
+        'por_categoria': por_categoria,
+        'por_tipo_acao': por_tipo_acao
+    }
 
 
-def contar_logs(
-    categoria: str = None,
-    tipo_acao: str = None,
-    entidade_tipo: str = None,
-    entidade_id: int = None,
-    data_inicio: str = None,
-    data_fim: str = None,
-    pesquisa: str = None
-) -> int:
-    """Conta o total de logs com os filtros aplicados."""
-    conn = get_connection()
-    cursor = conn.cursor()
+# =============================================================================
+# Arquivamento de Logs
+# =============================================================================
 
-    query = 'SELECT COUNT(*) FROM logs_sistema WHERE 1=1'
-    params = []
+LOGS_MESES_ATIVOS = 12     # meses fechados mantidos em logs_sistema
+LOGS_ARQUIVO_LOTE = 2000   # registros movidos por transação
 
-    if categoria:
-        query += ' AND categoria = ?'
-        params.append(categoria)
+_arquivamento_logs_lock = threading.Lock()
+# Uma entrada por arquivo mensal e filtro: cabe uma consulta de vários anos
+_cache_contagem_arquivos = OrderedDict()
+CACHE_CONTAGEM_ARQUIVOS_MAXIMO = 256
 
-    if tipo_acao:
-        query += ' AND tipo_acao = ?'
-        params.append(tipo_acao)
 
-    if entidade_tipo:
-        query += ' AND entidade_tipo = ?'
-        params.append(entidade_tipo)
+def _caminho_arquivo_logs(ano: int, mes: int) -> str:
+    """Caminho do arquivo mensal de logs (logs_AAAA_MM.db)."""
+    return os.path.join(LOGS_ARQUIVO_DIR, f"logs_{ano:04d}_{mes:02d}.db")
 
-    if entidade_id:
-        query += ' AND entidade_id = ?'
-        params.append(entidade_id)
 
-    if data_inicio:
-        query += ' AND DATE(data_hora) >= ?'
-        params.append(data_inicio)
+def listar_arquivos_logs() -> List[Dict]:
+    """
+    Lista os meses de log arquivados, do mais antigo para o mais recente.
 
-    if data_fim:
-        query += ' AND DATE(data_hora) <= ?'
-        params.append(data_fim)
+    Retorna [{'ano', 'mes', 'caminho', 'inicio': 'AAAA-MM-01', 'fim': 'AAAA-MM-01'}],
+    com 'fim' exclusivo (primeiro dia do mês seguinte).
+    """
+    if not os.path.isdir(LOGS_ARQUIVO_DIR):
+        return []
 
-    if pesquisa:
-        query += ' AND (descricao LIKE ? OR entidade_nome LIKE ?)'
-        params.append(f'%{pesquisa}%')
-        params.append(f'%{pesquisa}%')
+    arquivos = []
+    for nome in os.listdir(LOGS_ARQUIVO_DIR):
+        partes = nome[:-3].split('_') if nome.endswith('.db') else []
+        if len(partes) != 3 or partes[0] != 'logs' or not (partes[1] + partes[2]).isdigit():
+            continue
+        ano, mes = int(partes[1]), int(partes[2])
+        if not 1 <= mes <= 12:
+            continue
+        seguinte = date(ano + mes // 12, mes % 12 + 1, 1)
+        arquivos.append({
+            'ano': ano,
+            'mes': mes,
+            'caminho': os.path.join(LOGS_ARQUIVO_DIR, nome),
+            'inicio': f"{ano:04d}-{mes:02d}-01",
+            'fim': seguinte.isoformat(),
+        })
 
-    cursor.execute(query, params)
-    total = cursor.fetchone()[0]
-    conn.close()
+    arquivos.sort(key=lambda a: (a['ano'], a['mes']))
+    return arquivos
 
-    return total
 
+def _arquivos_logs_no_periodo(data_inicio: str = None, data_fim: str = None,
+                              incluir_arquivo: bool = False) -> List[str]:
+    """
+    Arquivos mensais que a consulta precisa abrir: os meses que cruzam
+    [data_inicio, data_fim] ou, sem período, todos quando incluir_arquivo.
+    """
+    if not (data_inicio or data_fim or incluir_arquivo):
+        return []
 
-def obter_categorias_log() -> List[str]:
-    """Retorna lista de categorias únicas registradas nos logs."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    caminhos = []
+    for arquivo in listar_arquivos_logs():
+        if data_inicio and arquivo['fim'] <= data_inicio[:10]:
+            continue
+        if data_fim and arquivo['inicio'] > data_fim[:10]:
+            continue
+        caminhos.append(arquivo['caminho'])
+    return caminhos
 
-    cursor.execute('SELECT DISTINCT categoria FROM logs_sistema ORDER BY categoria')
-    categorias = [row['categoria'] for row in cursor.fetchall()]
-    conn.close()
 
-    return categorias
+@contextmanager
+def _abrir_arquivo_logs(caminho: str):
+    """Abre um arquivo mensal de logs somente para leitura."""
+    uri = Path(caminho).resolve().as_uri() + '?mode=ro'
+    conn = sqlite3.connect(uri, uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        yield conn
+    finally:
+        conn.close()
 
 
-def obter_tipos_acao_log() -> List[str]:
-    """Retorna lista de tipos de ação únicos registrados nos logs."""
-    conn = get_connection()
-    cursor = conn.cursor()
+def _consultar_logs(query: str, params: list, arquivos: List[str]) -> List[Dict]:
+    """
+    Executa a mesma consulta no banco principal e em cada arquivo mensal,
+    juntando os resultados (cada arquivo é aberto em separado, sem ATTACH).
+    """
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        logs = [dict(row) for row in cursor.fetchall()]
 
-    cursor.execute('SELECT DISTINCT tipo_acao FROM logs_sistema ORDER BY tipo_acao')
-    tipos = [row['tipo_acao'] for row in cursor.fetchall()]
-    conn.close()
+    for caminho in arquivos:
+        try:
+            with _abrir_arquivo_logs(caminho) as conn:
+                logs.extend(dict(row) for row in conn.execute(query, params))
+        except sqlite3.Error:
+            continue
+    return logs
 
-    return tipos
 
+def _ordenar_logs(logs: List[Dict], decrescente: bool = True) -> List[Dict]:
+    """Ordena por (data_hora, id) descartando ids repetidos (mês em arquivamento)."""
+    unicos = {log['id']: log for log in logs}
+    return sorted(unicos.values(), key=lambda log: (log['data_hora'] or '', log['id']),
+                  reverse=decrescente)
 
-def obter_estatisticas_log() -> Dict:
-    """Retorna estatísticas gerais dos logs."""
-    conn = get_connection()
-    cursor = conn.cursor()
 
-    # Total de logs
-    cursor.execute('SELECT COUNT(*) FROM logs_sistema')
-    total = cursor.fetchone()[0]
+def _contar_logs_arquivos(arquivos: List[str], where: str, params: list) -> int:
+    """Soma as contagens dos arquivos mensais (em cache até o arquivo mudar)."""
+    total = 0
+    for caminho in arquivos:
+        try:
+            chave = (caminho, where, tuple(params))
+            modificado = os.path.getmtime(caminho)
+            em_cache = _ler_contagem(_cache_contagem_arquivos, chave)
+            if em_cache and em_cache[0] == modificado:
+                total += em_cache[1]
+                continue
+            with _abrir_arquivo_logs(caminho) as conn:
+                contagem = conn.execute(f'SELECT COUNT(*) FROM logs_sistema{where}', params).fetchone()[0]
+            _guardar_contagem(_cache_contagem_arquivos, chave, (modificado, contagem),
+                              CACHE_CONTAGEM_ARQUIVOS_MAXIMO)
+            total += contagem
+        except (OSError, sqlite3.Error):
+            continue
+    return total
 
-    # Logs de hoje
-    cursor.execute("SELECT COUNT(*) FROM logs_sistema WHERE DATE(data_hora) = DATE('now', 'localtime')")
-    hoje = cursor.fetchone()[0]
 
-    # Logs desta semana
-    cursor.execute("SELECT COUNT(*) FROM logs_sistema WHERE DATE(data_hora) >= DATE('now', 'localtime', '-7 days')")
-    semana = cursor.fetchone()[0]
+def _abrir_destino_arquivo(ano: int, mes: int) -> sqlite3.Connection:
+    """Abre (criando se preciso) o arquivo mensal para escrita."""
+    os.makedirs(LOGS_ARQUIVO_DIR, exist_ok=True)
+    destino = sqlite3.connect(_caminho_arquivo_logs(ano, mes))
+    destino.execute(_SQL_TABELA_LOGS)
+    _criar_indices_tabela_log(destino)
+    return destino
 
-    # Logs deste mês
-    cursor.execute("SELECT COUNT(*) FROM logs_sistema WHERE strftime('%Y-%m', data_hora) = strftime('%Y-%m', 'now', 'localtime')")
-    mes = cursor.fetchone()[0]
 
-    # Por categoria
-    cursor.execute('''
-        SELECT categoria, COUNT(*) as total
-        FROM logs_sistema
-        GROUP BY categoria
-        ORDER BY total DESC
-    ''')
-    por_categoria = {row['categoria']: row['total'] for row in cursor.fetchall()}
+def arquivar_logs(antes_de: date = None, lote: int = LOGS_ARQUIVO_LOTE) -> Dict:
+    """
+    Move os logs anteriores a antes_de (primeiro dia de um mês) de logs_sistema
+    para arquivos mensais somente leitura em logs_arquivo/logs_AAAA_MM.db.
+    Por padrão mantém os últimos LOGS_MESES_ATIVOS meses no banco principal.
 
-    # Por tipo de ação
-    cursor.execute('''
-        SELECT tipo_acao, COUNT(*) as total
-        FROM logs_sistema
-        GROUP BY tipo_acao
-        ORDER BY total DESC
-    ''')
-    por_tipo_acao = {row['tipo_acao']: row['total'] for row in cursor.fetchall()}
+    A cópia é feita em lotes: cada lote é gravado no arquivo e só então
+    removido do banco principal, em uma transação curta. Uma execução
+    interrompida é retomada na próxima (a cópia ignora ids já arquivados).
 
-    conn.close()
+    Retorna {'meses': ['AAAA-MM', ...], 'movidos': 12345}
+    """
+    resultado = {'meses': [], 'movidos': 0}
+    if not _arquivamento_logs_lock.acquire(blocking=False):
+        return resultado
 
-    return {
-        'total': total,
-        'hoje': hoje,
-        'semana': semana,
-        'mes': mes,
-        'por_categoria': por_categoria,
-        'por_tipo_acao': por_tipo_acao
-    }
+    try:
+        if antes_de is None:
+            hoje = date.today()
+            indice = hoje.year * 12 + hoje.month - 1 - LOGS_MESES_ATIVOS
+            antes_de = date(indice // 12, indice % 12 + 1, 1)
+        colunas = ', '.join(('id',) + _COLUNAS_LOG)
+        sql_copia = (f"INSERT OR IGNORE INTO logs_sistema ({colunas}) "
+                     f"VALUES ({', '.join('?' * (len(_COLUNAS_LOG) + 1))})")
+
+        descarregar_logs()
+        while True:
+            with conexao() as conn:
+                mais_antigo = conn.execute('SELECT MIN(data_hora) FROM logs_sistema').fetchone()[0]
+            try:
+                dia = datetime.strptime(str(mais_antigo)[:10], '%Y-%m-%d').date()
+            except ValueError:
+                break
+            if dia >= antes_de:
+                break
 
+            inicio = dia.replace(day=1)
+            fim = min(date(inicio.year + inicio.month // 12, inicio.month % 12 + 1, 1), antes_de)
+            movidos_mes = 0
+            destino = _abrir_destino_arquivo(inicio.year, inicio.month)
+            try:
+                while True:
+                    with conexao() as conn:
+                        registros = conn.execute(f'''
+                            SELECT {colunas} FROM logs_sistema
+                            WHERE data_hora >= ? AND data_hora < ?
+                            ORDER BY data_hora, id
+                            LIMIT ?
+                        ''', (inicio.isoformat(), fim.isoformat(), lote)).fetchall()
+                    if not registros:
+                        break
+
+                    destino.executemany(sql_copia, [tuple(r) for r in registros])
+                    destino.commit()
+
+                    # O trigger logs_stats_ad desconta os registros apagados;
+                    # as contagens do lote voltam na mesma transação, para que
+                    # os contadores continuem cobrindo os meses arquivados.
+                    contagens = Counter(
+                        ((r['data_hora'] or '')[:10], r['categoria'], r['tipo_acao'])
+                        for r in registros
+                    )
+                    with conexao() as conn, _gravacao_logs(conn):
+                        conn.execute(
+                            'DELETE FROM logs_sistema WHERE id IN (SELECT value FROM json_each(?))',
+                            (json.dumps([r['id'] for r in registros]),)
+                        )
+                        conn.executemany(
+                            _SQL_ACUMULAR_ESTATISTICA_LOG,
+                            [chave + (total,) for chave, total in contagens.items()]
+                        )
+                    movidos_mes += len(registros)
+            finally:
+                destino.close()
+            if not movidos_mes:
+                break
+            resultado['movidos'] += movidos_mes
+            resultado['meses'].append(inicio.strftime('%Y-%m'))
+    finally:
+        _arquivamento_logs_lock.release()
 
-def limpar_logs_antigos(dias: int = 365) -> int:
-    """
-    Remove logs mais antigos que o número de dias especificado.
-    Por padrão, mantém logs do último ano.
+    if resultado['movidos']:
+        registrar_log(
+            tipo_acao='EDITAR',
+            categoria='SISTEMA',
+            descricao=(f"{resultado['movidos']} registros de log arquivados "
+                       f"({', '.join(resultado['meses'])})"),
+            entidade_tipo='LOGS',
+            valor_novo=json.dumps(resultado)
+        )
+    return resultado
 
-    Retorna a quantidade de logs removidos.
-    """
-    conn = get_connection()
-    cursor = conn.cursor()
 
-    cursor.execute('''
-        DELETE FROM logs_sistema
-        WHERE DATE(data_hora) < DATE('now', 'localtime', ?)
-    ''', (f'-{dias} days',))
+def iniciar_arquivamento_logs():
+    """Executa arquivar_logs em segundo plano, sem atrasar a abertura do sistema."""
+    def executar():
+        try:
+            arquivar_logs()
+        except (sqlite3.Error, OSError):
+            pass
 
-    removidos = cursor.rowcount
-    conn.commit()
-    conn.close()
+    threading.Thread(target=executar, name='arquivamento-logs', daemon=True).start()
+
+
+def limpar_logs_antigos(dias: int = 365) -> int:
+    """
+    Tira do banco principal os logs mais antigos que o número de dias
+    especificado, arquivando-os por mês (ver arquivar_logs) em vez de
+    excluí-los. Os meses são arquivados inteiros: o mês que contém o corte
+    permanece no banco principal.
 
-    return removidos
+    Retorna a quantidade de logs arquivados.
+    """
+    corte = date.today() - timedelta(days=dias)
+    return arquivar_logs(antes_de=corte.replace(day=1))['movidos']
 
 
 # =============================================================================
@@ -3436,59 +5382,55 @@ def limpar_logs_antigos(dias: int = 365) -> int:
 
 def hash_senha(senha: str) -> str:
     """Gera hash da senha usando SHA256."""
-    import hashlib
     return hashlib.sha256(senha.encode()).hexdigest()
 
 
 def criar_usuario_admin_padrao():
     """Cria o usuário admin padrão se não existir."""
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    # Verificar se já existe algum usuário admin
-    cursor.execute("SELECT id FROM usuarios WHERE login = 'admin'")
-    if cursor.fetchone() is None:
-        cursor.execute('''
-            INSERT INTO usuarios (nome_completo, login, senha, nivel_acesso, ativo)
-            VALUES (?, ?, ?, ?, ?)
-        ''', ('Administrador', 'admin', hash_senha('admin'), 'administrador', 1))
-        conn.commit()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    conn.close()
+        # Verificar se já existe algum usuário admin
+        cursor.execute("SELECT id FROM usuarios WHERE login = 'admin'")
+        if cursor.fetchone() is None:
+            cursor.execute('''
+                INSERT INTO usuarios (nome_completo, login, senha, nivel_acesso, ativo)
+                VALUES (?, ?, ?, ?, ?)
+            ''', ('Administrador', 'admin', hash_senha('admin'), 'administrador', 1))
+            conn.commit()
 
 
 def criar_usuario(dados: dict, usuario_logado: str = 'Sistema') -> int:
     """Cria um novo usuário no sistema."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    # Hash da senha
-    senha_hash = hash_senha(dados.get('senha', ''))
+        # Hash da senha
+        senha_hash = hash_senha(dados.get('senha', ''))
 
-    # Hash da resposta de segurança (se fornecida)
-    resposta_hash = None
-    if dados.get('resposta_seguranca'):
-        resposta_hash = hash_senha(dados.get('resposta_seguranca').lower().strip())
+        # Hash da resposta de segurança (se fornecida)
+        resposta_hash = None
+        if dados.get('resposta_seguranca'):
+            resposta_hash = hash_senha(dados.get('resposta_seguranca').lower().strip())
 
-    cursor.execute('''
-        INSERT INTO usuarios (nome_completo, login, senha, email, cargo, nivel_acesso,
-                             pergunta_seguranca, resposta_seguranca, ativo)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        dados.get('nome_completo'),
-        dados.get('login'),
-        senha_hash,
-        dados.get('email'),
-        dados.get('cargo'),
-        dados.get('nivel_acesso', 'operador'),
-        dados.get('pergunta_seguranca'),
-        resposta_hash,
-        1
-    ))
-
-    usuario_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+        cursor.execute('''
+            INSERT INTO usuarios (nome_completo, login, senha, email, cargo, nivel_acesso,
+                                 pergunta_seguranca, resposta_seguranca, ativo)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            dados.get('nome_completo'),
+            dados.get('login'),
+            senha_hash,
+            dados.get('email'),
+            dados.get('cargo'),
+            dados.get('nivel_acesso', 'operador'),
+            dados.get('pergunta_seguranca'),
+            resposta_hash,
+            1
+        ))
+
+        usuario_id = cursor.lastrowid
+        conn.commit()
 
     # Registrar log
     registrar_log(
@@ -3506,86 +5448,82 @@ def criar_usuario(dados: dict, usuario_logado: str = 'Sistema') -> int:
 
 def listar_usuarios() -> List[Dict]:
     """Lista todos os usuários do sistema."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        SELECT id, nome_completo, login, email, cargo, nivel_acesso, ativo,
-               ultimo_login, created_at
-        FROM usuarios
-        ORDER BY nome_completo
-    ''')
+        cursor.execute('''
+            SELECT id, nome_completo, login, email, cargo, nivel_acesso, ativo,
+                   ultimo_login, created_at
+            FROM usuarios
+            ORDER BY nome_completo
+        ''')
 
-    usuarios = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+        usuarios = [dict(row) for row in cursor.fetchall()]
     return usuarios
 
 
 def obter_usuario(usuario_id: int) -> Optional[Dict]:
     """Obtém um usuário pelo ID."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        SELECT id, nome_completo, login, email, cargo, nivel_acesso, ativo,
-               pergunta_seguranca, ultimo_login, created_at
-        FROM usuarios WHERE id = ?
-    ''', (usuario_id,))
+        cursor.execute('''
+            SELECT id, nome_completo, login, email, cargo, nivel_acesso, ativo,
+                   pergunta_seguranca, ultimo_login, created_at
+            FROM usuarios WHERE id = ?
+        ''', (usuario_id,))
 
-    row = cursor.fetchone()
-    conn.close()
+        row = cursor.fetchone()
     return dict(row) if row else None
 
 
 def obter_usuario_por_login(login: str) -> Optional[Dict]:
     """Obtém um usuário pelo login."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        SELECT id, nome_completo, login, senha, email, cargo, nivel_acesso, ativo,
-               pergunta_seguranca, resposta_seguranca, ultimo_login
-        FROM usuarios WHERE login = ?
-    ''', (login,))
+        cursor.execute('''
+            SELECT id, nome_completo, login, senha, email, cargo, nivel_acesso, ativo,
+                   pergunta_seguranca, resposta_seguranca, ultimo_login
+            FROM usuarios WHERE login = ?
+        ''', (login,))
 
-    row = cursor.fetchone()
-    conn.close()
+        row = cursor.fetchone()
     return dict(row) if row else None
 
 
 def atualizar_usuario(usuario_id: int, dados: dict, usuario_logado: str = 'Sistema') -> bool:
     """Atualiza os dados de um usuário."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    campos = []
-    valores = []
+        campos = []
+        valores = []
 
-    for key, value in dados.items():
-        if key not in ['id', 'senha', 'resposta_seguranca']:
-            campos.append(f"{key} = ?")
-            valores.append(value)
+        for key, value in dados.items():
+            if key not in ['id', 'senha', 'resposta_seguranca']:
+                campos.append(f"{key} = ?")
+                valores.append(value)
 
-    # Se houver nova senha, fazer hash
-    if 'senha' in dados and dados['senha']:
-        campos.append("senha = ?")
-        valores.append(hash_senha(dados['senha']))
+        # Se houver nova senha, fazer hash
+        if 'senha' in dados and dados['senha']:
+            campos.append("senha = ?")
+            valores.append(hash_senha(dados['senha']))
 
-    # Se houver nova resposta de segurança, fazer hash
-    if 'resposta_seguranca' in dados and dados['resposta_seguranca']:
-        campos.append("resposta_seguranca = ?")
-        valores.append(hash_senha(dados['resposta_seguranca'].lower().strip()))
+        # Se houver nova resposta de segurança, fazer hash
+        if 'resposta_seguranca' in dados and dados['resposta_seguranca']:
+            campos.append("resposta_seguranca = ?")
+            valores.append(hash_senha(dados['resposta_seguranca'].lower().strip()))
 
-    valores.append(usuario_id)
+        valores.append(usuario_id)
 
-    cursor.execute(f'''
-        UPDATE usuarios SET {', '.join(campos)}, updated_at = CURRENT_TIMESTAMP
-        WHERE id = ?
-    ''', valores)
+        cursor.execute(f'''
+            UPDATE usuarios SET {', '.join(campos)}, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', valores)
 
-    conn.commit()
-    affected = cursor.rowcount
-    conn.close()
+        conn.commit()
+        affected = cursor.rowcount
 
     if affected > 0:
         usuario = obter_usuario(usuario_id)
@@ -3608,17 +5546,16 @@ def desativar_usuario(usuario_id: int, usuario_logado: str = 'Sistema') -> bool:
     if not usuario:
         return False
 
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        UPDATE usuarios SET ativo = 0, updated_at = CURRENT_TIMESTAMP
-        WHERE id = ?
-    ''', (usuario_id,))
+        cursor.execute('''
+            UPDATE usuarios SET ativo = 0, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (usuario_id,))
 
-    conn.commit()
-    affected = cursor.rowcount
-    conn.close()
+        conn.commit()
+        affected = cursor.rowcount
 
     if affected > 0:
         registrar_log(
@@ -3640,17 +5577,16 @@ def reativar_usuario(usuario_id: int, usuario_logado: str = 'Sistema') -> bool:
     if not usuario:
         return False
 
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        UPDATE usuarios SET ativo = 1, updated_at = CURRENT_TIMESTAMP
-        WHERE id = ?
-    ''', (usuario_id,))
+        cursor.execute('''
+            UPDATE usuarios SET ativo = 1, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (usuario_id,))
 
-    conn.commit()
-    affected = cursor.rowcount
-    conn.close()
+        conn.commit()
+        affected = cursor.rowcount
 
     if affected > 0:
         registrar_log(
@@ -3668,17 +5604,16 @@ def reativar_usuario(usuario_id: int, usuario_logado: str = 'Sistema') -> bool:
 
 def alterar_senha_usuario(usuario_id: int, nova_senha: str, usuario_logado: str = 'Sistema') -> bool:
     """Altera a senha de um usuário."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        UPDATE usuarios SET senha = ?, updated_at = CURRENT_TIMESTAMP
-        WHERE id = ?
-    ''', (hash_senha(nova_senha), usuario_id))
+        cursor.execute('''
+            UPDATE usuarios SET senha = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (hash_senha(nova_senha), usuario_id))
 
-    conn.commit()
-    affected = cursor.rowcount
-    conn.close()
+        conn.commit()
+        affected = cursor.rowcount
 
     if affected > 0:
         usuario = obter_usuario(usuario_id)
@@ -3701,33 +5636,30 @@ def resetar_senha_admin(usuario_id: int, nova_senha: str, usuario_logado: str =
 
     if resultado:
         # Marcar que a senha foi resetada e precisa ser alterada
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute('UPDATE usuarios SET senha_resetada = 1 WHERE id = ?', (usuario_id,))
-        conn.commit()
-        conn.close()
+        with conexao() as conn:
+            cursor = conn.cursor()
+            cursor.execute('UPDATE usuarios SET senha_resetada = 1 WHERE id = ?', (usuario_id,))
+            conn.commit()
 
     return resultado
 
 
 def verificar_senha_resetada(usuario_id: int) -> bool:
     """Verifica se o usuário precisa alterar a senha (após reset)."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT senha_resetada FROM usuarios WHERE id = ?', (usuario_id,))
-    resultado = cursor.fetchone()
-    conn.close()
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT senha_resetada FROM usuarios WHERE id = ?', (usuario_id,))
+        resultado = cursor.fetchone()
     return resultado and resultado['senha_resetada'] == 1
 
 
 def limpar_senha_resetada(usuario_id: int) -> bool:
     """Limpa o flag de senha resetada após o usuário alterar a senha."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('UPDATE usuarios SET senha_resetada = 0 WHERE id = ?', (usuario_id,))
-    conn.commit()
-    affected = cursor.rowcount
-    conn.close()
+    with conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute('UPDATE usuarios SET senha_resetada = 0 WHERE id = ?', (usuario_id,))
+        conn.commit()
+        affected = cursor.rowcount
     return affected > 0
 
 
@@ -3740,16 +5672,15 @@ def verificar_login_bloqueado(login: str) -> Optional[datetime]:
     Verifica se o login está bloqueado.
     Retorna a data/hora até quando está bloqueado, ou None se não estiver.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        SELECT bloqueado_ate FROM bloqueios_login
-        WHERE login = ? AND bloqueado_ate > datetime('now', 'localtime')
-    ''', (login,))
+        cursor.execute('''
+            SELECT bloqueado_ate FROM bloqueios_login
+            WHERE login = ? AND bloqueado_ate > datetime('now', 'localtime')
+        ''', (login,))
 
-    row = cursor.fetchone()
-    conn.close()
+        row = cursor.fetchone()
 
     if row:
         return datetime.strptime(row['bloqueado_ate'], '%Y-%m-%d %H:%M:%S')
@@ -3761,55 +5692,53 @@ def registrar_tentativa_login(login: str, sucesso: bool) -> int:
     Registra uma tentativa de login.
     Retorna o número de tentativas falhas recentes.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    # Registrar tentativa
-    cursor.execute('''
-        INSERT INTO tentativas_login (login, sucesso)
-        VALUES (?, ?)
-    ''', (login, 1 if sucesso else 0))
+        # Registrar tentativa
+        cursor.execute('''
+            INSERT INTO tentativas_login (login, sucesso)
+            VALUES (?, ?)
+        ''', (login, 1 if sucesso else 0))
 
-    if sucesso:
-        # Se login bem sucedido, limpar tentativas anteriores e bloqueios
-        cursor.execute('DELETE FROM tentativas_login WHERE login = ? AND sucesso = 0', (login,))
-        cursor.execute('DELETE FROM bloqueios_login WHERE login = ?', (login,))
+        if sucesso:
+            # Se login bem sucedido, limpar tentativas anteriores e bloqueios
+            cursor.execute('DELETE FROM tentativas_login WHERE login = ? AND sucesso = 0', (login,))
+            cursor.execute('DELETE FROM bloqueios_login WHERE login = ?', (login,))
 
-        # Atualizar último login do usuário
-        cursor.execute('''
-            UPDATE usuarios SET ultimo_login = datetime('now', 'localtime')
-            WHERE login = ?
-        ''', (login,))
+            # Atualizar último login do usuário
+            cursor.execute('''
+                UPDATE usuarios SET ultimo_login = datetime('now', 'localtime')
+                WHERE login = ?
+            ''', (login,))
 
-    conn.commit()
+        conn.commit()
 
-    # Contar tentativas falhas na última hora
-    cursor.execute('''
-        SELECT COUNT(*) FROM tentativas_login
-        WHERE login = ? AND sucesso = 0
-        AND data_hora > datetime('now', 'localtime', '-1 hour')
-    ''', (login,))
+        # Contar tentativas falhas na última hora
+        cursor.execute('''
+            SELECT COUNT(*) FROM tentativas_login
+            WHERE login = ? AND sucesso = 0
+            AND data_hora > datetime('now', 'localtime', '-1 hour')
+        ''', (login,))
 
-    falhas = cursor.fetchone()[0]
-    conn.close()
+        falhas = cursor.fetchone()[0]
 
     return falhas
 
 
 def bloquear_login(login: str, horas: int = 1) -> bool:
     """Bloqueia um login por determinado número de horas."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with conexao() as conn:
+        cursor = conn.cursor()
 
-    bloqueado_ate = datetime.now() + timedelta(hours=horas)
+        bloqueado_ate = datetime.now() + timedelta(hours=horas)
 
-    cursor.execute('''
-        INSERT OR REPLACE INTO bloqueios_login (login, bloqueado_ate)
-        VALUES (?, ?)
-    ''', (login, bloqueado_ate.strftime('%Y-%m-%d %H:%M:%S')))
+        cursor.execute('''
+            INSERT OR REPLACE INTO bloqueios_login (login, bloqueado_ate)
+            VALUES (?, ?)
+        ''', (login, bloqueado_ate.strftime('%Y-%m-%d %H:%M:%S')))
 
-    conn.commit()
-    conn.close()
+        conn.commit()
 
     registrar_log(
         tipo_acao='BLOQUEAR',
@@ -4037,10 +5966,48 @@ def usuario_pode(permissao: str) -> bool:
     return permissao in permissoes.get(nivel, [])
 
 
+# =============================================================================
+# Lista de Migrações
+# =============================================================================
+
+# Definida após todas as funções que referencia; aplicada por init_database()
+MIGRACOES = [
+    (1, 'Esquema inicial', _migracao_esquema_inicial),
+    (2, 'CPFs com 11 dígitos', _migracao_cpfs_11_digitos),
+    (3, 'Contratos de experiência de colaboradores antigos', _migracao_contratos_experiencia),
+    (4, 'Mês/dia de nascimento indexáveis', _criar_colunas_aniversario),
+    (5, 'Chaves de busca normalizadas', _criar_chaves_busca),
+    (6, 'Situação dos documentos', _migracao_documentos_status),
+    (7, 'Índice de busca textual de colaboradores', _migracao_indice_busca),
+    (8, 'Índices de logs', _migracao_indices_log),
+    (9, 'Contadores diários de logs', _criar_estatisticas_log),
+    (10, 'Índice de férias em andamento', _migracao_indice_ferias_em_andamento),
+    (11, 'Índice de busca textual da blocklist', _migracao_indices_busca_nomes),
+]
+
+
 # Inicializar banco de dados ao importar o módulo
 if __name__ != "__main__":
+    if perfil_sql.ativo():
+        # Funções de infraestrutura (normalizar_busca também é função SQL) ficam de fora
+        perfil_sql.instrumentar_modulo(sys.modules[__name__],
+                                       ignorar=('get_base_path', 'get_connection', 'normalizar_busca'))
     init_database()
+    # Log de importação de backup feita antes do reinício (banco já migrado)
+    registrar_importacao_pendente()
     # Criar usuário admin padrão se não existir
     criar_usuario_admin_padrao()
     # Sincronizar fotos dos colaboradores ao iniciar
     sincronizar_fotos_colaboradores()
+    # Converter para CLT os contratos de experiência vencidos
+    try:
+        processar_contratos_vencidos()
+    except sqlite3.Error:
+        pass
+    # Reconciliar as férias de todos os colaboradores (uma vez por dia)
+    try:
+        reconciliar_ferias_diario()
+    except sqlite3.Error:
+        pass
+    # Arquivar os meses antigos de logs_sistema (em segundo plano)
+    iniciar_arquivamento_logs()
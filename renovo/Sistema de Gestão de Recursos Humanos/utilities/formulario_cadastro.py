@@ -1315,76 +1315,79 @@ class FormularioCadastro:
                 return
 
         try:
-            if self.colaborador_id:
-                # Obter dados antigos para registrar histórico
-                dados_antigos = dict(self.colaborador) if self.colaborador else {}
-
-                # Verificar se a data de admissão mudou
-                data_admissao_antiga = self.colaborador.get('data_admissao') if self.colaborador else None
-                data_admissao_nova = dados.get('data_admissao')
-                tipo_contrato_antigo = self.colaborador.get('tipo_contrato') if self.colaborador else None
-                tipo_contrato_novo = dados.get('tipo_contrato')
-
-                db.atualizar_colaborador(self.colaborador_id, dados)
-
-                # Registrar alterações no histórico
-                db.registrar_alteracoes_colaborador(self.colaborador_id, dados, dados_antigos)
-
-                # Se mudou de Contrato de Experiência para outro tipo, finalizar contrato
-                if tipo_contrato_antigo == 'Contrato de Experiência' and tipo_contrato_novo != 'Contrato de Experiência':
-                    db.finalizar_contrato_experiencia(self.colaborador_id)
-                colaborador_id = self.colaborador_id
-
-                # Se a data de admissão mudou, atualizar as férias
-                if data_admissao_nova and data_admissao_antiga != data_admissao_nova:
-                    db.atualizar_ferias_por_admissao(colaborador_id, data_admissao_nova)
-
-                # Verificar se mudou para contrato de experiência ou se os dados mudaram
-                if tipo_contrato_novo == "Contrato de Experiência" and dados.get('data_admissao') and dados.get('prazo_experiencia'):
-                    # Verificar se já existe contrato vigente
-                    contrato_existente = db.obter_contrato_colaborador(colaborador_id)
-                    if not contrato_existente:
-                        # Criar novo contrato
+            # Grava colaborador, histórico, contrato, férias, dependentes e logs
+            # em uma única transação
+            with db.unit_of_work():
+                if self.colaborador_id:
+                    # Obter dados antigos para registrar histórico
+                    dados_antigos = dict(self.colaborador) if self.colaborador else {}
+
+                    # Verificar se a data de admissão mudou
+                    data_admissao_antiga = self.colaborador.get('data_admissao') if self.colaborador else None
+                    data_admissao_nova = dados.get('data_admissao')
+                    tipo_contrato_antigo = self.colaborador.get('tipo_contrato') if self.colaborador else None
+                    tipo_contrato_novo = dados.get('tipo_contrato')
+
+                    db.atualizar_colaborador(self.colaborador_id, dados)
+
+                    # Registrar alterações no histórico
+                    db.registrar_alteracoes_colaborador(self.colaborador_id, dados, dados_antigos)
+
+                    # Se mudou de Contrato de Experiência para outro tipo, finalizar contrato
+                    if tipo_contrato_antigo == 'Contrato de Experiência' and tipo_contrato_novo != 'Contrato de Experiência':
+                        db.finalizar_contrato_experiencia(self.colaborador_id)
+                    colaborador_id = self.colaborador_id
+
+                    # Se a data de admissão mudou, atualizar as férias
+                    if data_admissao_nova and data_admissao_antiga != data_admissao_nova:
+                        db.atualizar_ferias_por_admissao(colaborador_id, data_admissao_nova)
+
+                    # Verificar se mudou para contrato de experiência ou se os dados mudaram
+                    if tipo_contrato_novo == "Contrato de Experiência" and dados.get('data_admissao') and dados.get('prazo_experiencia'):
+                        # Verificar se já existe contrato vigente
+                        contrato_existente = db.obter_contrato_colaborador(colaborador_id)
+                        if not contrato_existente:
+                            # Criar novo contrato
+                            db.criar_contrato_experiencia(colaborador_id, dados['data_admissao'], dados['prazo_experiencia'], dados.get('prorrogacao'))
+                        else:
+                            # Atualizar contrato existente se os dados mudaram
+                            from datetime import datetime, timedelta
+                            inicio = datetime.strptime(dados['data_admissao'], '%Y-%m-%d')
+                            # O dia de início conta como dia 1, então o fim é início + prazo - 1
+                            fim_inicial = inicio + timedelta(days=dados['prazo_experiencia'] - 1)
+                            fim_prorrogacao = None
+                            if dados.get('prorrogacao'):
+                                # A prorrogação começa no dia seguinte ao fim do período inicial
+                                fim_prorrogacao = fim_inicial + timedelta(days=dados['prorrogacao'])
+
+                            db.atualizar_contrato(contrato_existente['id'], {
+                                'data_inicio': dados['data_admissao'],
+                                'prazo_inicial': dados['prazo_experiencia'],
+                                'data_fim_inicial': fim_inicial.strftime('%Y-%m-%d'),
+                                'prorrogacao': dados.get('prorrogacao'),
+                                'data_fim_prorrogacao': fim_prorrogacao.strftime('%Y-%m-%d') if fim_prorrogacao else None,
+                            })
+
+                    msg = "Colaborador atualizado!"
+                else:
+                    colaborador_id = db.criar_colaborador(dados)
+                    if dados.get('tipo_contrato') == "Contrato de Experiência" and dados.get('prazo_experiencia') and dados.get('data_admissao'):
                         db.criar_contrato_experiencia(colaborador_id, dados['data_admissao'], dados['prazo_experiencia'], dados.get('prorrogacao'))
-                    else:
-                        # Atualizar contrato existente se os dados mudaram
-                        from datetime import datetime, timedelta
-                        inicio = datetime.strptime(dados['data_admissao'], '%Y-%m-%d')
-                        # O dia de início conta como dia 1, então o fim é início + prazo - 1
-                        fim_inicial = inicio + timedelta(days=dados['prazo_experiencia'] - 1)
-                        fim_prorrogacao = None
-                        if dados.get('prorrogacao'):
-                            # A prorrogação começa no dia seguinte ao fim do período inicial
-                            fim_prorrogacao = fim_inicial + timedelta(days=dados['prorrogacao'])
-
-                        db.atualizar_contrato(contrato_existente['id'], {
-                            'data_inicio': dados['data_admissao'],
-                            'prazo_inicial': dados['prazo_experiencia'],
-                            'data_fim_inicial': fim_inicial.strftime('%Y-%m-%d'),
-                            'prorrogacao': dados.get('prorrogacao'),
-                            'data_fim_prorrogacao': fim_prorrogacao.strftime('%Y-%m-%d') if fim_prorrogacao else None,
-                        })
-
-                msg = "Colaborador atualizado!"
-            else:
-                colaborador_id = db.criar_colaborador(dados)
-                if dados.get('tipo_contrato') == "Contrato de Experiência" and dados.get('prazo_experiencia') and dados.get('data_admissao'):
-                    db.criar_contrato_experiencia(colaborador_id, dados['data_admissao'], dados['prazo_experiencia'], dados.get('prorrogacao'))
-                if dados.get('data_admissao'):
-                    db.criar_periodo_ferias(colaborador_id, dados['data_admissao'])
-                msg = "Colaborador cadastrado!"
-
-            # Salvar dependentes
-            # Primeiro remove os existentes (para edição)
-            if self.colaborador_id:
-                deps_existentes = db.listar_dependentes(self.colaborador_id)
-                for dep_existente in deps_existentes:
-                    db.excluir_dependente(dep_existente['id'])
-
-            # Adiciona os novos/atualizados
-            for dep in self.dependentes_lista:
-                dep_dict = dict(dep) if hasattr(dep, 'keys') else dep
-                db.adicionar_dependente(colaborador_id, dep_dict)
+                    if dados.get('data_admissao'):
+                        db.criar_periodo_ferias(colaborador_id, dados['data_admissao'])
+                    msg = "Colaborador cadastrado!"
+
+                # Salvar dependentes
+                # Primeiro remove os existentes (para edição)
+                if self.colaborador_id:
+                    deps_existentes = db.listar_dependentes(self.colaborador_id)
+                    for dep_existente in deps_existentes:
+                        db.excluir_dependente(dep_existente['id'])
+
+                # Adiciona os novos/atualizados
+                for dep in self.dependentes_lista:
+                    dep_dict = dict(dep) if hasattr(dep, 'keys') else dep
+                    db.adicionar_dependente(colaborador_id, dep_dict)
 
             self.page.snack_bar = ft.SnackBar(content=ft.Text(msg), bgcolor=COR_SUCESSO)
             self.page.snack_bar.open = True
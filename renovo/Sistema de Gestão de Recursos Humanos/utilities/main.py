@@ -1671,7 +1671,7 @@ class FichaColaborador:
         for d in dialogos_fechados:
             self.page.overlay.remove(d)
 
-        ferias_lista = db.listar_ferias_colaborador(self.colaborador_id)
+        ferias_lista = db.carregar_historico_ferias(self.colaborador_id)
 
         def fechar(ev):
             dialog.open = False
@@ -1942,9 +1942,8 @@ class FichaColaborador:
                 tooltip_btn = "Registrar férias"
 
             # Listar períodos gozados
-            periodos_gozados = db.listar_periodos_ferias_gozados(f['id'])
             gozados_widgets = []
-            for pg in periodos_gozados:
+            for pg in f['periodos']:
                 tipo = "Abono" if pg.get('abono_pecuniario') else "Gozo"
                 obs_pg = pg.get('observacoes', '') or ''
 
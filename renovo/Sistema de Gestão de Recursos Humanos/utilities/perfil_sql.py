@@ -0,0 +1,433 @@
+"""
+Módulo de Perfil SQL - Sistema de Gestão de RH
+RENOVO Montagens Industriais
+
+Instrumentação opcional da camada de dados: mede o tempo de cada função
+pública de database.py e dashboard.py, de cada comando SQL (com linhas
+retornadas e EXPLAIN QUERY PLAN dos comandos lentos) e grava tudo em um
+arquivo JSONL rotativo.
+
+Ativação: variável de ambiente RH_PERFIL_SQL=1 antes de abrir o sistema
+(RH_PERFIL_SQL_LENTO_MS define o limite de comando lento, padrão 20 ms).
+
+Relatório: python -m utilities.perfil_sql [arquivo_ou_pasta]
+"""
+
+import os
+import sys
+import glob
+import json
+import math
+import time
+import atexit
+import inspect
+import sqlite3
+import functools
+import threading
+from datetime import datetime
+from typing import Optional, List, Dict
+
+PERFIL_ARQUIVO = "perfil_sql.jsonl"
+PERFIL_TAMANHO_MAXIMO = 5 * 1024 * 1024   # bytes por arquivo antes de rotacionar
+PERFIL_ARQUIVOS_MANTIDOS = 5              # perfil_sql.jsonl + perfil_sql.1..4.jsonl
+PERFIL_LOTE = 200                         # eventos acumulados antes de gravar
+PERFIL_LENTO_MS = 20.0                    # comandos acima disso têm o plano registrado
+
+_configuracao = {'diretorio': None, 'lento_ms': PERFIL_LENTO_MS}
+_eventos = []
+_eventos_lock = threading.Lock()
+_contexto = threading.local()
+
+
+def ativo() -> bool:
+    """Indica se o perfil SQL está ligado."""
+    return _configuracao['diretorio'] is not None
+
+
+def ativar(diretorio: str, lento_ms: float = PERFIL_LENTO_MS):
+    """Liga o perfil SQL, gravando em diretorio/perfil_sql.jsonl."""
+    os.makedirs(diretorio, exist_ok=True)
+    _configuracao['diretorio'] = diretorio
+    _configuracao['lento_ms'] = lento_ms
+    atexit.register(descarregar)
+
+
+def ativar_se_configurado(diretorio: str) -> bool:
+    """Liga o perfil SQL se a variável de ambiente RH_PERFIL_SQL estiver definida."""
+    if os.environ.get('RH_PERFIL_SQL', '').strip() in ('', '0'):
+        return False
+    try:
+        lento_ms = float(os.environ.get('RH_PERFIL_SQL_LENTO_MS', PERFIL_LENTO_MS))
+    except ValueError:
+        lento_ms = PERFIL_LENTO_MS
+    ativar(diretorio, lento_ms)
+    return True
+
+
+# =============================================================================
+# Gravação do arquivo JSONL
+# =============================================================================
+
+def _registrar(evento: Dict):
+    """Acumula um evento; a gravação é feita em lotes."""
+    evento['ts'] = datetime.now().isoformat(timespec='milliseconds')
+    with _eventos_lock:
+        _eventos.append(evento)
+        cheio = len(_eventos) >= PERFIL_LOTE
+    if cheio:
+        descarregar()
+
+
+def _rotacionar(caminho: str):
+    """Renomeia perfil_sql.jsonl -> .1.jsonl -> .2.jsonl ..., descartando o mais antigo."""
+    base, extensao = os.path.splitext(caminho)
+    for indice in range(PERFIL_ARQUIVOS_MANTIDOS - 1, 0, -1):
+        origem = f"{base}.{indice - 1}{extensao}" if indice > 1 else caminho
+        if os.path.exists(origem):
+            os.replace(origem, f"{base}.{indice}{extensao}")
+
+
+def descarregar():
+    """Grava no arquivo os eventos acumulados."""
+    diretorio = _configuracao['diretorio']
+    with _eventos_lock:
+        lote = list(_eventos)
+        _eventos.clear()
+        if not lote or diretorio is None:
+            return
+        caminho = os.path.join(diretorio, PERFIL_ARQUIVO)
+        try:
+            if os.path.exists(caminho) and os.path.getsize(caminho) >= PERFIL_TAMANHO_MAXIMO:
+                _rotacionar(caminho)
+            with open(caminho, 'a', encoding='utf-8') as arquivo:
+                for evento in lote:
+                    arquivo.write(json.dumps(evento, ensure_ascii=False, default=str) + '\n')
+        except OSError:
+            pass
+
+
+# =============================================================================
+# Funções e comandos SQL
+# =============================================================================
+
+def _pilha() -> List[list]:
+    """Pilha de chamadas instrumentadas da thread: [nome, comandos_sql]."""
+    pilha = getattr(_contexto, 'pilha', None)
+    if pilha is None:
+        pilha = _contexto.pilha = []
+    return pilha
+
+
+def _funcao_atual() -> Optional[str]:
+    pilha = _pilha()
+    return pilha[-1][0] if pilha else None
+
+
+def _medir_funcao(funcao, nome: str):
+    """Envolve a função registrando duração e quantidade de comandos SQL executados."""
+    @functools.wraps(funcao)
+    def medida(*args, **kwargs):
+        pilha = _pilha()
+        quadro = [nome, 0]
+        pilha.append(quadro)
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            pilha.pop()
+            if pilha:
+                pilha[-1][1] += quadro[1]
+            _registrar({
+                'tipo': 'funcao',
+                'funcao': nome,
+                'ms': round(ms, 3),
+                'comandos': quadro[1],
+                'aninhada': bool(pilha),
+            })
+
+    medida.__perfil_sql__ = True
+    return medida
+
+
+def instrumentar_modulo(modulo, ignorar: tuple = ()) -> int:
+    """
+    Substitui as funções públicas do módulo por versões medidas.
+    Context managers, geradores e os nomes em ignorar ficam de fora.
+    Retorna quantas foram instrumentadas.
+    """
+    prefixo = modulo.__name__.rsplit('.', 1)[-1]
+    total = 0
+    for nome, objeto in list(vars(modulo).items()):
+        if nome.startswith('_') or nome in ignorar or not inspect.isfunction(objeto):
+            continue
+        if objeto.__module__ != modulo.__name__ or getattr(objeto, '__perfil_sql__', False):
+            continue
+        original = inspect.unwrap(objeto)
+        if inspect.isgeneratorfunction(original) or original is not objeto:
+            continue
+        setattr(modulo, nome, _medir_funcao(objeto, f"{prefixo}.{nome}"))
+        total += 1
+    return total
+
+
+def _rastrear_comando(sql: str):
+    """Callback de set_trace_callback: conta cada comando executado pelo SQLite."""
+    pilha = _pilha()
+    if pilha:
+        pilha[-1][1] += 1
+
+
+def instrumentar_conexao(conn: sqlite3.Connection):
+    """
+    Faz a conexão usar CursorPerfilado (inclusive em conn.execute/executemany)
+    e liga o rastreamento de comandos (set_trace_callback).
+    """
+    cursor_original = conn.cursor
+
+    def cursor(factory=None):
+        return cursor_original(factory or CursorPerfilado)
+
+    conn.cursor = cursor
+    conn.execute = lambda sql, parametros=(): cursor().execute(sql, parametros)
+    conn.executemany = lambda sql, parametros: cursor().executemany(sql, parametros)
+    conn.executescript = lambda script: cursor().executescript(script)
+    conn.set_trace_callback(_rastrear_comando)
+
+
+def _plano(conn: sqlite3.Connection, sql: str, params) -> List[str]:
+    """EXPLAIN QUERY PLAN do comando (lista de detalhes), ou [] se não aplicável."""
+    palavras = sql.split(None, 1)
+    if not palavras or palavras[0].upper() not in ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT'):
+        return []
+    try:
+        cursor = sqlite3.Cursor(conn)
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params or ())
+        return [linha[3] for linha in cursor.fetchall()]
+    except sqlite3.Error:
+        return []
+
+
+def varredura_completa(plano: List[str]) -> bool:
+    """Indica se o plano percorre alguma tabela inteira (SCAN sem índice)."""
+    for detalhe in plano:
+        if detalhe.startswith('SCAN ') and 'USING' not in detalhe \
+                and 'VIRTUAL TABLE' not in detalhe and 'CONSTANT ROW' not in detalhe:
+            return True
+    return False
+
+
+class CursorPerfilado(sqlite3.Cursor):
+    """
+    Cursor que mede cada comando: o tempo do execute somado ao das leituras
+    (fetch*) até o próximo comando, com a quantidade de linhas retornadas.
+    """
+
+    def _abrir(self, sql: str, params, em_lote: bool = False):
+        self._finalizar()
+        self._comando = {'sql': sql, 'params': None if em_lote else params,
+                         'funcao': _funcao_atual(), 'ms': 0.0, 'linhas': 0}
+
+    def _medir(self, inicio: float, linhas: int = 0):
+        comando = getattr(self, '_comando', None)
+        if comando is not None:
+            comando['ms'] += (time.perf_counter() - inicio) * 1000
+            comando['linhas'] += linhas
+
+    def _finalizar(self):
+        comando = getattr(self, '_comando', None)
+        if comando is None:
+            return
+        self._comando = None
+        linhas = comando['linhas'] or max(self.rowcount, 0)
+        evento = {
+            'tipo': 'sql',
+            'funcao': comando['funcao'],
+            'sql': ' '.join(comando['sql'].split()),
+            'ms': round(comando['ms'], 3),
+            'linhas': linhas,
+        }
+        if comando['ms'] >= _configuracao['lento_ms'] and comando['params'] is not None:
+            plano = _plano(self.connection, comando['sql'], comando['params'])
+            evento['plano'] = plano
+            evento['varredura_completa'] = varredura_completa(plano)
+        _registrar(evento)
+
+    def execute(self, sql, params=()):
+        self._abrir(sql, params)
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self._medir(inicio)
+
+    def executemany(self, sql, seq_params):
+        self._abrir(sql, None, em_lote=True)
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_params)
+        finally:
+            self._medir(inicio)
+
+    def executescript(self, script):
+        self._abrir(script, None, em_lote=True)
+        inicio = time.perf_counter()
+        try:
+            return super().executescript(script)
+        finally:
+            self._medir(inicio)
+
+    def fetchone(self):
+        inicio = time.perf_counter()
+        linha = super().fetchone()
+        self._medir(inicio, 0 if linha is None else 1)
+        return linha
+
+    def fetchmany(self, size=None):
+        inicio = time.perf_counter()
+        linhas = super().fetchmany(self.arraysize if size is None else size)
+        self._medir(inicio, len(linhas))
+        return linhas
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        linhas = super().fetchall()
+        self._medir(inicio, len(linhas))
+        return linhas
+
+    def __next__(self):
+        inicio = time.perf_counter()
+        linha = super().__next__()
+        self._medir(inicio, 1)
+        return linha
+
+    def close(self):
+        self._finalizar()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finalizar()
+        except Exception:
+            pass
+
+
+# =============================================================================
+# Relatório
+# =============================================================================
+
+def _percentil(valores: List[float], p: float) -> float:
+    """Percentil por posição mais próxima (valores já ordenados)."""
+    if not valores:
+        return 0.0
+    posicao = math.ceil(p / 100 * len(valores))
+    return valores[min(max(posicao, 1), len(valores)) - 1]
+
+
+def _arquivos_perfil(caminho: str) -> List[str]:
+    """Arquivos JSONL do perfil, do mais antigo para o mais recente."""
+    if os.path.isdir(caminho):
+        base = os.path.join(caminho, os.path.splitext(PERFIL_ARQUIVO)[0])
+        rotacionados = sorted(glob.glob(base + '.*.jsonl'),
+                              key=lambda c: int(c.rsplit('.', 2)[-2]), reverse=True)
+        atual = base + '.jsonl'
+        return rotacionados + ([atual] if os.path.exists(atual) else [])
+    return [caminho]
+
+
+def relatorio(caminho: str) -> Dict:
+    """
+    Resume o perfil gravado (arquivo ou pasta com os arquivos rotacionados).
+
+    Retorna {'funcoes': [...], 'comandos': [...]}, cada item com chamadas,
+    p50_ms, p95_ms, max_ms e total_ms, ordenados pelo tempo total. Os comandos
+    trazem também linhas (média) e varredura_completa (algum plano lento com
+    SCAN sem índice).
+    """
+    funcoes = {}
+    comandos = {}
+    for arquivo in _arquivos_perfil(caminho):
+        with open(arquivo, encoding='utf-8') as entrada:
+            for linha in entrada:
+                try:
+                    evento = json.loads(linha)
+                except ValueError:
+                    continue
+                if evento.get('tipo') == 'funcao':
+                    funcoes.setdefault(evento['funcao'], []).append(evento['ms'])
+                elif evento.get('tipo') == 'sql':
+                    item = comandos.setdefault(evento['sql'], {
+                        'tempos': [], 'linhas': 0, 'funcoes': set(), 'varredura_completa': False, 'plano': None
+                    })
+                    item['tempos'].append(evento['ms'])
+                    item['linhas'] += evento.get('linhas', 0)
+                    if evento.get('funcao'):
+                        item['funcoes'].add(evento['funcao'])
+                    if evento.get('varredura_completa'):
+                        item['varredura_completa'] = True
+                    if evento.get('plano'):
+                        item['plano'] = evento['plano']
+
+    def resumo(tempos: List[float]) -> Dict:
+        tempos.sort()
+        return {
+            'chamadas': len(tempos),
+            'p50_ms': round(_percentil(tempos, 50), 3),
+            'p95_ms': round(_percentil(tempos, 95), 3),
+            'max_ms': round(tempos[-1], 3),
+            'total_ms': round(sum(tempos), 3),
+        }
+
+    lista_funcoes = [dict(funcao=nome, **resumo(tempos)) for nome, tempos in funcoes.items()]
+    lista_comandos = []
+    for sql, item in comandos.items():
+        dados = resumo(item['tempos'])
+        dados.update({
+            'sql': sql,
+            'linhas': round(item['linhas'] / dados['chamadas'], 1),
+            'funcoes': sorted(item['funcoes']),
+            'varredura_completa': item['varredura_completa'],
+            'plano': item['plano'],
+        })
+        lista_comandos.append(dados)
+
+    lista_funcoes.sort(key=lambda f: f['total_ms'], reverse=True)
+    lista_comandos.sort(key=lambda c: c['total_ms'], reverse=True)
+    return {'funcoes': lista_funcoes, 'comandos': lista_comandos}
+
+
+def imprimir_relatorio(caminho: str, limite: int = 30):
+    """Imprime o relatório de relatorio() em forma de tabela."""
+    dados = relatorio(caminho)
+
+    print(f"{'Função':<48} {'chamadas':>9} {'p50 ms':>9} {'p95 ms':>9} {'máx ms':>9} {'total ms':>11}")
+    for f in dados['funcoes'][:limite]:
+        print(f"{f['funcao'][:48]:<48} {f['chamadas']:>9} {f['p50_ms']:>9.2f} {f['p95_ms']:>9.2f} "
+              f"{f['max_ms']:>9.2f} {f['total_ms']:>11.1f}")
+
+    print()
+    print(f"{'Comando SQL':<60} {'exec':>7} {'p50 ms':>9} {'p95 ms':>9} {'linhas':>8}  ")
+    for c in dados['comandos'][:limite]:
+        alerta = 'SCAN' if c['varredura_completa'] else ''
+        print(f"{c['sql'][:60]:<60} {c['chamadas']:>7} {c['p50_ms']:>9.2f} {c['p95_ms']:>9.2f} "
+              f"{c['linhas']:>8.1f}  {alerta}")
+
+    varreduras = [c for c in dados['comandos'] if c['varredura_completa']]
+    if varreduras:
+        print()
+        print("Comandos lentos com varredura completa de tabela:")
+        for c in varreduras:
+            print(f"- {c['sql'][:100]}")
+            print(f"  funções: {', '.join(c['funcoes']) or '-'}")
+            for detalhe in c['plano'] or []:
+                print(f"  {detalhe}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        origem = sys.argv[1]
+    else:
+        base = os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) \
+            else os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        origem = os.path.join(base, "perfil_sql")
+    imprimir_relatorio(origem)
@@ -19,6 +19,7 @@ import time
 import argparse
 from PIL import Image
 import pystray
+from rh_comum.migracoes import aplicar_migracoes
 
 # Corrigir sys.stdin/stdout/stderr para PyInstaller --noconsole
 if getattr(sys, 'frozen', False):
@@ -97,11 +98,13 @@ def gerar_codigo_recuperacao():
     return f"REC-{codigo}"
 
 
-def init_database():
-    """Inicializa o banco de dados com as tabelas necessárias"""
-    conn = sqlite3.connect(get_db_path())
-    cursor = conn.cursor()
+# Migrações do esquema: cada uma é aplicada uma única vez e o número da
+# última aplicada fica em PRAGMA user_version. Para alterar o esquema,
+# acrescente uma nova migração ao final de MIGRACOES.
 
+def _migracao_esquema_inicial(conn):
+    """Tabelas do sistema"""
+    cursor = conn.cursor()
     # Tabela de tipos de conta
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS tipos_conta (
@@ -177,6 +180,18 @@ def init_database():
         )
     ''')
 
+
+MIGRACOES = [
+    (1, 'Esquema inicial', _migracao_esquema_inicial),
+]
+
+
+def init_database():
+    """Inicializa o banco de dados: aplica as migrações pendentes e garante o administrador padrão"""
+    conn = sqlite3.connect(get_db_path())
+    aplicar_migracoes(conn, MIGRACOES)
+    cursor = conn.cursor()
+
     # Criar tipo Administrador padrão se não existir
     cursor.execute("SELECT id FROM tipos_conta WHERE nome = 'Administrador'")
     if not cursor.fetchone():
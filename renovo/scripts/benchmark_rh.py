@@ -0,0 +1,399 @@
+"""
+Benchmark da Camada de Dados - Sistema de Gestão de RH
+Renovo ERP - Sistema Unificado
+
+Gera bancos sintéticos (1k, 10k e 100k colaboradores, com dependentes,
+localizações, férias, períodos, contratos, block-list, documentos e logs)
+usando o esquema real de init_database(), mede as funções mais usadas
+pelas telas e grava os tempos em um JSON de referência.
+
+Cada tamanho roda em um processo separado, com RH_BASE_PATH apontando
+para uma pasta temporária: o banco real não é tocado.
+
+Uso:
+    python scripts/benchmark_rh.py
+    python scripts/benchmark_rh.py --tamanhos 1000 10000 --saida benchmark_rh.json
+    python scripts/benchmark_rh.py --comparar benchmark_rh_anterior.json
+
+Para ver o detalhe das consultas, combine com o perfil SQL:
+    RH_PERFIL_SQL=1 python scripts/benchmark_rh.py --tamanhos 10000 --manter
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import platform
+import tempfile
+import subprocess
+from pathlib import Path
+from datetime import date, datetime, timedelta
+
+# Raiz do sistema de RH no path (utilities)
+ROOT_DIR = Path(__file__).parent.parent
+RH_DIR = ROOT_DIR / 'Sistema de Gestão de Recursos Humanos'
+
+TAMANHOS_PADRAO = [1000, 10000, 100000]
+REPETICOES_PADRAO = 5
+TOLERANCIA_PADRAO = 20.0   # % de piora aceita na comparação...
+PIORA_MINIMA_MS = 1.0      # ...desde que acima de 1 ms (abaixo disso é ruído)
+
+NOMES = ['Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Fábio', 'Gabriela', 'Heitor', 'Isabela',
+         'João', 'Karina', 'Lucas', 'Mariana', 'Nelson', 'Otávio', 'Patrícia', 'Rafael', 'Sônia',
+         'Thiago', 'Valéria', 'William', 'Yara']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira',
+              'Lima', 'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Araújo', 'Conceição']
+FUNCOES = ['Montador', 'Soldador', 'Caldeireiro', 'Eletricista', 'Encanador', 'Pintor',
+           'Técnico de Segurança', 'Engenheiro', 'Auxiliar Administrativo', 'Almoxarife',
+           'Supervisor', 'Encarregado', 'Motorista', 'Mecânico']
+DEPARTAMENTOS = ['Obras', 'Manutenção', 'Administrativo', 'SSMA', 'Suprimentos', 'Engenharia']
+LOCAIS = [('Canteiro Norte', 'Belo Horizonte', 'MG'), ('Canteiro Sul', 'Betim', 'MG'),
+          ('Refinaria', 'Ipatinga', 'MG'), ('Usina', 'Ouro Preto', 'MG'),
+          ('Sede', 'Contagem', 'MG'), ('Porto', 'Vitória', 'ES')]
+TIPOS_ACAO = ['CRIAR', 'EDITAR', 'EXCLUIR', 'ANEXAR', 'DESATIVAR']
+CATEGORIAS = ['COLABORADOR', 'DOCUMENTO', 'FERIAS', 'CONTRATO', 'DEPENDENTE']
+# Mesmos valores de utilities/constantes.py (que importa flet)
+GRAUS_INSTRUCAO = ["Fundamental Incompleto", "Fundamental Completo", "Médio Incompleto",
+                   "Médio Completo", "Superior Incompleto", "Superior Completo", "Pós-Graduação"]
+ESTADOS_CIVIS = ["Solteiro(a)", "Casado(a)", "Divorciado(a)", "Viúvo(a)", "União Estável", "Separado(a)"]
+PARENTESCOS = ["Filho(a)", "Cônjuge", "Pai", "Mãe", "Enteado(a)", "Menor sob Guarda"]
+
+
+# =============================================================================
+# Geração dos dados sintéticos
+# =============================================================================
+
+def _data(d: date) -> str:
+    return d.strftime('%Y-%m-%d')
+
+
+def gerar_dados(db, quantidade: int, semente: int = 42) -> dict:
+    """Popula o banco (já inicializado por init_database) e retorna a contagem por tabela."""
+    rnd = random.Random(semente)
+    hoje = date.today()
+
+    with db.conexao() as conn:
+        cursor = conn.cursor()
+
+        empresas = max(3, quantidade // 2000)
+        cursor.executemany(
+            'INSERT INTO empresas (razao_social, cnpj, cidade, uf) VALUES (?, ?, ?, ?)',
+            [(f'Empresa {i} Montagens Ltda', f'{i:014d}', 'Belo Horizonte', 'MG') for i in range(1, empresas + 1)]
+        )
+
+        colaboradores = []
+        for i in range(1, quantidade + 1):
+            admissao = hoje - timedelta(days=rnd.randint(0, 365 * 8))
+            experiencia = (hoje - admissao).days < 120
+            ativo = rnd.random() < 0.85
+            colaboradores.append((
+                f'{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)} {i}',
+                f'{i:011d}',
+                rnd.randint(1, empresas),
+                _data(hoje - timedelta(days=rnd.randint(18 * 365, 65 * 365))),
+                rnd.choice(['M', 'F']),
+                rnd.choice(ESTADOS_CIVIS),
+                rnd.choice(GRAUS_INSTRUCAO),
+                rnd.choice(FUNCOES),
+                rnd.choice(DEPARTAMENTOS),
+                round(rnd.uniform(1412, 25000), 2),
+                _data(admissao),
+                'Contrato de Experiência' if experiencia else 'CLT',
+                45 if experiencia else None,
+                45 if experiencia and rnd.random() < 0.5 else None,
+                int(rnd.random() < 0.7), int(rnd.random() < 0.6), int(rnd.random() < 0.5),
+                int(rnd.random() < 0.4), int(rnd.random() < 0.3), int(rnd.random() < 0.2),
+                'ATIVO' if ativo else 'INATIVO',
+                None if ativo else _data(hoje - timedelta(days=rnd.randint(1, 700))),
+            ))
+        cursor.executemany('''
+            INSERT INTO colaboradores (
+                nome_completo, cpf, empresa_id, data_nascimento, sexo, estado_civil, grau_instrucao,
+                funcao, departamento, salario, data_admissao, tipo_contrato, prazo_experiencia,
+                prorrogacao, vale_transporte, vale_refeicao, vale_alimentacao, assistencia_medica,
+                assistencia_odontologica, seguro_vida, status, data_inativacao
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', colaboradores)
+
+        dependentes, localizacoes, ferias, contratos, documentos = [], [], [], [], []
+        for i, colab in enumerate(colaboradores, start=1):
+            admissao = datetime.strptime(colab[10], '%Y-%m-%d').date()
+
+            for d in range(rnd.choice([0, 0, 1, 1, 2, 3])):
+                dependentes.append((i, f'Dependente {d + 1} de {i}', rnd.choice(PARENTESCOS),
+                                    _data(hoje - timedelta(days=rnd.randint(365, 30 * 365))), f'9{i:09d}{d}'))
+
+            local = rnd.choice(LOCAIS)
+            inicio_local = admissao
+            if rnd.random() < 0.3:
+                anterior = rnd.choice(LOCAIS)
+                meio = admissao + timedelta(days=max(1, (hoje - admissao).days // 2))
+                localizacoes.append((i, anterior[0], anterior[1], anterior[2], _data(admissao), _data(meio)))
+                inicio_local = meio
+            localizacoes.append((i, local[0], local[1], local[2], _data(inicio_local), None))
+
+            # Períodos aquisitivos desde a admissão
+            inicio = admissao
+            while inicio + timedelta(days=365) <= hoje + timedelta(days=365):
+                fim = inicio + timedelta(days=364)
+                concluido = fim + timedelta(days=200) < hoje
+                ferias.append((i, _data(inicio), _data(fim), _data(fim + timedelta(days=335)),
+                               30 if concluido else 0, 'CONCLUIDO' if concluido else 'PENDENTE'))
+                inicio = fim + timedelta(days=1)
+
+            if colab[11] == 'Contrato de Experiência':
+                fim_inicial = admissao + timedelta(days=44)
+                fim_prorrogacao = fim_inicial + timedelta(days=45) if colab[13] else None
+                contratos.append((i, _data(admissao), 45, _data(fim_inicial), colab[13],
+                                  _data(fim_prorrogacao) if fim_prorrogacao else None))
+
+            for tipo in db.DOCUMENTOS_OBRIGATORIOS:
+                if rnd.random() < 0.8:
+                    documentos.append((i, tipo, f'{tipo.lower()}.pdf', f'documentos_colaborador/{i}/{tipo}.pdf'))
+
+        cursor.executemany('''
+            INSERT INTO dependentes (colaborador_id, nome, parentesco, data_nascimento, cpf)
+            VALUES (?, ?, ?, ?, ?)
+        ''', dependentes)
+        cursor.executemany('''
+            INSERT INTO localizacoes (colaborador_id, local_nome, cidade, uf, data_inicio, data_fim)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', localizacoes)
+        cursor.executemany('''
+            INSERT INTO ferias (colaborador_id, periodo_aquisitivo_inicio, periodo_aquisitivo_fim,
+                                periodo_concessivo_limite, dias_gozados, status)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', ferias)
+        cursor.execute('''
+            INSERT INTO periodos_ferias (ferias_id, data_inicio, data_fim, dias)
+            SELECT id, date(periodo_aquisitivo_fim, '+60 days'), date(periodo_aquisitivo_fim, '+89 days'), 30
+            FROM ferias WHERE status = 'CONCLUIDO'
+        ''')
+        cursor.executemany('''
+            INSERT INTO contratos_experiencia (colaborador_id, data_inicio, prazo_inicial, data_fim_inicial,
+                                               prorrogacao, data_fim_prorrogacao)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', contratos)
+        cursor.executemany('''
+            INSERT INTO blocklist (cpf, nome, empresa_id, data_desligamento, motivo_desligamento, pode_recontratar)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(f'8{i:010d}', f'Ex-colaborador {i}', rnd.randint(1, empresas),
+               _data(hoje - timedelta(days=rnd.randint(1, 2000))), 'Término de contrato', int(rnd.random() < 0.7))
+              for i in range(1, quantidade // 10 + 1)])
+        cursor.executemany('''
+            INSERT INTO documentos_colaborador (colaborador_id, tipo_documento, nome_arquivo_original, caminho_arquivo)
+            VALUES (?, ?, ?, ?)
+        ''', documentos)
+
+        # Logs dos últimos 11 meses (fora do alcance do arquivamento)
+        cursor.executemany(db._SQL_INSERIR_LOG, [
+            (rnd.choice(TIPOS_ACAO), rnd.choice(CATEGORIAS), f'Registro sintético {n}', 'COLABORADOR',
+             rnd.randint(1, quantidade), None, None, None, 'benchmark',
+             (datetime.now() - timedelta(minutes=rnd.randint(0, 60 * 24 * 330))).strftime('%Y-%m-%d %H:%M:%S'))
+            for n in range(quantidade * 5)
+        ])
+
+    # Inserções diretas: chaves de busca e situação dos documentos em lote
+    db.preencher_chaves_busca()
+    db.reconstruir_status_documentos()
+
+    with db.conexao() as conn:
+        tabelas = ['empresas', 'colaboradores', 'dependentes', 'localizacoes', 'ferias', 'periodos_ferias',
+                   'contratos_experiencia', 'blocklist', 'documentos_colaborador', 'logs_sistema']
+        return {t: conn.execute(f'SELECT COUNT(*) FROM {t}').fetchone()[0] for t in tabelas}
+
+
+# =============================================================================
+# Medição
+# =============================================================================
+
+def medir(funcao, repeticoes: int) -> dict:
+    """Executa a função (1 aquecimento + repetições) e resume os tempos em ms."""
+    funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return {
+        'execucoes': len(tempos),
+        'min_ms': round(tempos[0], 3),
+        'mediana_ms': round(tempos[len(tempos) // 2], 3),
+        'p95_ms': round(tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))], 3),
+        'max_ms': round(tempos[-1], 3),
+    }
+
+
+def cenarios(db, pasta: str) -> dict:
+    """Funções medidas: nome -> (função sem argumentos, repetições relativas)."""
+    with db.conexao() as conn:
+        ids = [row[0] for row in conn.execute('SELECT id FROM colaboradores ORDER BY random() LIMIT 50')]
+
+    def coletar_exportacao():
+        return dict(
+            colaboradores_ativos=db.listar_colaboradores(status='ATIVO'),
+            colaboradores_inativos=db.listar_colaboradores(status='INATIVO'),
+            contratos=db.listar_todos_contratos_com_colaborador(None),
+            ferias=db.listar_todas_ferias_com_colaborador(None),
+            dependentes=db.listar_todos_dependentes_com_colaborador(None),
+            blocklist=db.listar_blocklist_completa(),
+            documentos_pendentes=db.listar_documentos_pendentes_todos(None),
+        )
+
+    lista = {
+        'listar_colaboradores': (lambda: db.listar_colaboradores(), 1),
+        'listar_colaboradores(filtro)': (lambda: db.listar_colaboradores(filtro='silva'), 1),
+        'listar_colaboradores_pagina': (lambda: db.listar_colaboradores_pagina(limite=50), 1),
+        'contar_colaboradores': (lambda: db.contar_colaboradores(), 1),
+        'contar_colaboradores(filtro)': (lambda: db.contar_colaboradores(filtro='silva'), 1),
+        'obter_status_documentos_colaborador(x50)':
+            (lambda: [db.obter_status_documentos_colaborador(i) for i in ids], 1),
+        'listar_todos_contratos_experiencia': (lambda: db.listar_todos_contratos_experiencia(), 1),
+        'listar_ferias_vencendo': (lambda: db.listar_ferias_vencendo(), 1),
+        'listar_aniversariantes_mes': (lambda: db.listar_aniversariantes_mes(date.today().month), 1),
+        'listar_logs_pagina': (lambda: db.listar_logs_pagina(), 1),
+        'obter_estatisticas_log': (lambda: db.obter_estatisticas_log(), 1),
+        'coleta_exportacao': (coletar_exportacao, 0),
+    }
+
+    try:
+        from utilities import dashboard
+    except ImportError as erro:
+        print(f"  [AVISO] dashboard indisponível ({erro}); agregados do dashboard não medidos")
+    else:
+        for nome in ['obter_estatisticas_gerais', 'obter_colaboradores_por_empresa',
+                     'obter_colaboradores_por_localizacao', 'obter_colaboradores_por_funcao',
+                     'obter_colaboradores_por_departamento', 'obter_distribuicao_escolaridade',
+                     'obter_distribuicao_estado_civil', 'obter_distribuicao_sexo', 'obter_distribuicao_idade',
+                     'obter_distribuicao_tipo_contrato', 'obter_admissoes_por_mes', 'obter_contratos_vencendo',
+                     'obter_ferias_vencendo', 'obter_aniversariantes_mes', 'obter_utilizacao_beneficios',
+                     'obter_faixas_salariais', 'obter_distribuicao_tempo_casa', 'obter_distribuicao_qtd_beneficios',
+                     'obter_documentos_pendentes', 'obter_agregados_dashboard']:
+            lista[f'dashboard.{nome}'] = (getattr(dashboard, nome), 1)
+
+    from utilities import excel_export
+    if excel_export.OPENPYXL_AVAILABLE:
+        arquivo = os.path.join(pasta, 'exportacao.xlsx')
+        lista['exportar_completo_excel'] = (
+            lambda: excel_export.exportar_completo_excel(output_path=arquivo, **coletar_exportacao()), 0)
+    else:
+        print("  [AVISO] openpyxl não instalado; exportar_completo_excel não medido")
+
+    return lista
+
+
+def executar_tamanho(quantidade: int, pasta: str, repeticoes: int) -> dict:
+    """Roda em um processo próprio: cria o banco sintético, popula e mede."""
+    os.environ['RH_BASE_PATH'] = pasta
+    sys.path.insert(0, str(RH_DIR))
+    from utilities import database as db
+    db.definir_log_sincrono(True)  # sem a thread do GravadorLog gravando durante as medições
+
+    inicio = time.perf_counter()
+    linhas = gerar_dados(db, quantidade)
+    geracao_s = time.perf_counter() - inicio
+    with db.conexao() as conn:
+        conn.execute('ANALYZE')
+    db.sincronizar_wal()
+
+    funcoes = {}
+    for nome, (funcao, peso) in cenarios(db, pasta).items():
+        vezes = repeticoes if peso else max(1, repeticoes // 5 if quantidade >= 100000 else repeticoes // 2)
+        funcoes[nome] = medir(funcao, vezes)
+        print(f"  {nome:<48} mediana {funcoes[nome]['mediana_ms']:>10.2f} ms")
+
+    return {
+        'colaboradores': quantidade,
+        'geracao_s': round(geracao_s, 2),
+        'tamanho_banco_mb': round(os.path.getsize(db.DATABASE_PATH) / 1024 / 1024, 2),
+        'linhas': linhas,
+        'funcoes': funcoes,
+    }
+
+
+# =============================================================================
+# Comparação com uma execução anterior
+# =============================================================================
+
+def comparar(atual: dict, anterior: dict, tolerancia: float) -> int:
+    """Imprime a variação das medianas e retorna quantas funções pioraram além da tolerância."""
+    regressoes = 0
+    for tamanho, dados in atual['tamanhos'].items():
+        base = anterior.get('tamanhos', {}).get(tamanho)
+        if not base:
+            continue
+        print(f"\n{tamanho} colaboradores (mediana, ms)")
+        for nome, medida in dados['funcoes'].items():
+            referencia = base['funcoes'].get(nome)
+            if not referencia or not referencia['mediana_ms']:
+                continue
+            variacao = (medida['mediana_ms'] / referencia['mediana_ms'] - 1) * 100
+            alerta = ''
+            if variacao > tolerancia and medida['mediana_ms'] - referencia['mediana_ms'] > PIORA_MINIMA_MS:
+                alerta = '  <-- REGRESSÃO'
+                regressoes += 1
+            print(f"  {nome:<48} {referencia['mediana_ms']:>10.2f} -> {medida['mediana_ms']:>10.2f} "
+                  f"({variacao:+.1f}%){alerta}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da camada de dados do sistema de RH')
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO,
+                        help='quantidades de colaboradores (padrão: 1000 10000 100000)')
+    parser.add_argument('--repeticoes', type=int, default=REPETICOES_PADRAO)
+    parser.add_argument('--saida', default='benchmark_rh.json', help='arquivo JSON com os resultados')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior para comparação')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_PADRAO,
+                        help='piora percentual aceita na comparação (padrão: 20)')
+    parser.add_argument('--manter', action='store_true', help='não apagar os bancos sintéticos')
+    parser.add_argument('--executar-tamanho', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--pasta', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar_tamanho:
+        resultado = executar_tamanho(args.executar_tamanho, args.pasta, args.repeticoes)
+        with open(os.path.join(args.pasta, 'resultado.json'), 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo)
+        return 0
+
+    resultados = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'plataforma': platform.platform(),
+        'repeticoes': args.repeticoes,
+        'tamanhos': {},
+    }
+
+    for quantidade in args.tamanhos:
+        pasta = tempfile.mkdtemp(prefix=f'benchmark_rh_{quantidade}_')
+        print(f"\n=== {quantidade} colaboradores ({pasta})")
+        try:
+            subprocess.run([sys.executable, __file__, '--executar-tamanho', str(quantidade),
+                            '--pasta', pasta, '--repeticoes', str(args.repeticoes)], check=True)
+            with open(os.path.join(pasta, 'resultado.json'), encoding='utf-8') as arquivo:
+                resultados['tamanhos'][str(quantidade)] = json.load(arquivo)
+        finally:
+            if not args.manter:
+                shutil.rmtree(pasta, ignore_errors=True)
+
+    with open(args.saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+    print(f"\nResultados gravados em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            regressoes = comparar(resultados, json.load(arquivo), args.tolerancia)
+        print(f"\n{regressoes} função(ões) acima da tolerância de {args.tolerancia:.0f}%")
+        return 1 if regressoes else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())